@@ -39,7 +39,7 @@ setup(
         "pydantic>=2.0.0",
         "pydantic-settings>=2.0.0",
         "openai>=1.0.0",
-        "google-genai>=0.8.0",
+        "google-genai>=2.29.0",
         "click>=8.1.0",
         "rich>=13.0.0",
         "tabulate>=0.9.0",
@@ -61,7 +61,9 @@ setup(
             "pre-commit>=3.3.0",
             "ruff>=0.1.0",
         ],
-        "optional": [],
+        "optional": [
+            "numpy>=1.24",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -7,15 +7,20 @@ without requiring bot restart.
 
 Key Features:
 - Sequential key rotation (1→2→3→4)
+- Least-loaded scheduling: concurrent requests lease the healthy key with
+  the fewest in-flight requests, weighted by its recent latency and kept
+  within an optional local RPM/RPD budget (``acquire_key``/``release_key``)
 - Automatic rotation on 429 errors
 - Daily quota tracking with Pacific midnight reset
 - Thread-safe operations
 """
 
 import asyncio
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Any, Callable, Deque, List, Dict, Optional
 from enum import Enum
 
 import pytz
@@ -25,6 +30,16 @@ from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Key scheduling modes
+SCHEDULING_SEQUENTIAL = "sequential"      # stay on one key until it fails
+SCHEDULING_LEAST_LOADED = "least_loaded"  # spread requests over healthy keys
+SCHEDULING_MODES = (SCHEDULING_SEQUENTIAL, SCHEDULING_LEAST_LOADED)
+
+# Smoothing for the per-key latency average (weight of the newest sample).
+LATENCY_EWMA_ALPHA = 0.3
+# Latency assumed for a key that has not completed a request yet.
+DEFAULT_KEY_LATENCY_SECONDS = 1.0
+
 
 class KeyStatus(Enum):
     """Status of an API key."""
@@ -44,6 +59,22 @@ class KeyState:
     last_used: Optional[datetime] = None
     # When not None, key is considered exhausted until this UTC timestamp
     exhausted_until: Optional[datetime] = None
+    # Scheduler load tracking
+    in_flight: int = 0
+    latency_ewma: Optional[float] = None
+    total_requests: int = 0
+    # Monotonic start times of requests in the last minute (local RPM budget)
+    recent_requests: Deque[float] = field(default_factory=deque)
+    # Requests in the current Pacific quota day (local RPD budget)
+    day_requests: int = 0
+    day_ends_at: Optional[datetime] = None
+
+    def record_latency(self, seconds: float) -> None:
+        """Fold one completed request's latency into the moving average."""
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += LATENCY_EWMA_ALPHA * (seconds - self.latency_ewma)
 
     def is_available(self, cooldown_seconds: int) -> bool:
         """Check if key is available for use.
@@ -94,6 +125,15 @@ class KeyState:
         self.status = KeyStatus.RATE_LIMITED if is_rate_limit else KeyStatus.ERROR
 
 
+@dataclass
+class KeyLease:
+    """One request's claim on a key; hand it back with ``release_key``."""
+    index: int
+    key: str
+    started: float
+    released: bool = False
+
+
 class APIKeyManager:
     """
     Manages multiple API keys with auto-rotation.
@@ -114,6 +154,15 @@ class APIKeyManager:
         
         # On success
         manager.mark_success()
+    
+    Concurrent callers lease keys instead, so each request is scheduled
+    and accounted on its own key:
+        lease = manager.acquire_key()
+        try:
+            ...  # on 429: manager.mark_key_exhausted_for_day(lease.key)
+            manager.release_key(lease, success=True)
+        finally:
+            manager.release_key(lease)  # no-op once released
     """
     
     # Default cooldown period for rate-limited keys (seconds)
@@ -123,7 +172,10 @@ class APIKeyManager:
         self,
         api_keys: List[str],
         cooldown_seconds: int = DEFAULT_COOLDOWN,
-        provider_name: str = "API"
+        provider_name: str = "API",
+        scheduling: str = SCHEDULING_SEQUENTIAL,
+        rpm_limit: Optional[int] = None,
+        rpd_limit: Optional[int] = None
     ):
         """
         Initialize key manager.
@@ -132,9 +184,14 @@ class APIKeyManager:
             api_keys: List of API keys
             cooldown_seconds: Seconds to wait before retrying a failed key
             provider_name: Name of provider for logging (e.g., 'Gemini', 'OpenRouter')
+            scheduling: How ``acquire_key`` picks a key ('sequential' or 'least_loaded')
+            rpm_limit: Optional local requests-per-minute budget per key
+            rpd_limit: Optional local requests-per-day budget per key
         """
         if not api_keys:
             raise ValueError("At least one API key must be provided")
+        if scheduling not in SCHEDULING_MODES:
+            raise ValueError(f"Unknown key scheduling mode: {scheduling}")
         
         self._keys: List[KeyState] = [
             KeyState(key=key) for key in api_keys if key
@@ -146,12 +203,16 @@ class APIKeyManager:
         self._current_index = 0
         self._cooldown_seconds = cooldown_seconds
         self._provider_name = provider_name
+        self._scheduling = scheduling
+        self._rpm_limit = rpm_limit
+        self._rpd_limit = rpd_limit
+        self._last_decision: Optional[Dict[str, Any]] = None
         self._lock = asyncio.Lock()
         self._logger = logger
         
         self._logger.info(
             f"Initialized {provider_name} KeyManager with {len(self._keys)} keys, "
-            f"cooldown: {cooldown_seconds}s"
+            f"cooldown: {cooldown_seconds}s, scheduling: {scheduling}"
         )
     
     @property
@@ -159,6 +220,16 @@ class APIKeyManager:
         """Get total number of keys."""
         return len(self._keys)
     
+    def available_key_count(self) -> int:
+        """Number of keys usable right now (not cooling down or exhausted)."""
+        return sum(
+            1 for k in self._keys if k.is_available(self._cooldown_seconds)
+        )
+    
+    def available_keys(self) -> List[str]:
+        """Keys usable right now, in rotation order."""
+        return [k.key for k in self._keys if k.is_available(self._cooldown_seconds)]
+    
     @property
     def current_key(self) -> str:
         """Get current API key (without rotation logic)."""
@@ -200,42 +271,171 @@ class APIKeyManager:
         self._logger.warning("All API keys are currently in cooldown")
         return None
     
-    def mark_success(self):
-        """Mark current key as successfully used."""
-        current = self._keys[self._current_index]
+    # ---------- scheduling ----------
+    def _index_of(self, key: Optional[str]) -> int:
+        """Index of ``key``, or the current index when not given/unknown."""
+        if key is not None:
+            for i, state in enumerate(self._keys):
+                if state.key == key:
+                    return i
+        return self._current_index
+    
+    def _within_budget(self, state: KeyState, now: float) -> bool:
+        """Whether ``state`` has local RPM/RPD budget left (prunes old samples)."""
+        while state.recent_requests and now - state.recent_requests[0] >= 60:
+            state.recent_requests.popleft()
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        if state.day_ends_at is None or now_utc >= state.day_ends_at:
+            state.day_requests = 0
+            state.day_ends_at = self._compute_next_pacific_midnight_utc()
+        if self._rpm_limit is not None and len(state.recent_requests) >= self._rpm_limit:
+            return False
+        if self._rpd_limit is not None and state.day_requests >= self._rpd_limit:
+            return False
+        return True
+    
+    @staticmethod
+    def _load_score(state: KeyState) -> float:
+        """Expected wait on a key: queue depth weighted by its latency."""
+        latency = state.latency_ewma if state.latency_ewma is not None else DEFAULT_KEY_LATENCY_SECONDS
+        return (state.in_flight + 1) * latency
+    
+    def acquire_key(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[KeyLease]:
+        """
+        Lease a key for one request.
+        
+        In ``least_loaded`` mode this picks the available key with the
+        lowest load score among keys still within their local RPM/RPD
+        budget (falling back to all available keys when every budget is
+        spent - the provider's 429 stays the real authority). In
+        ``sequential`` mode it is the current key, as ``get_current_key``.
+        
+        Args:
+            eligible: Optional predicate on the key (e.g. "has model quota
+                left"). Keys passing it are preferred in either mode; when
+                none do, any available key is leased (reason ``no_quota``)
+                and the caller decides whether to wait.
+        
+        Returns:
+            A KeyLease, or None if every key is cooling down or exhausted
+        """
+        now = time.monotonic()
+        available = [
+            i for i, k in enumerate(self._keys) if k.is_available(self._cooldown_seconds)
+        ]
+        if not available:
+            self._logger.warning("All API keys are currently in cooldown")
+            return None
+        
+        candidates = available
+        fits = True
+        if eligible is not None:
+            candidates = [i for i in available if eligible(self._keys[i].key)]
+            fits = bool(candidates)
+            candidates = candidates or available
+        
+        within_budget = [i for i in candidates if self._within_budget(self._keys[i], now)]
+        if self._scheduling == SCHEDULING_SEQUENTIAL:
+            if self.get_current_key() is None:
+                return None
+            if self._current_index not in candidates:
+                # First candidate after the current key, in rotation order.
+                self._current_index = min(
+                    candidates, key=lambda i: (i - self._current_index) % len(self._keys)
+                )
+            index, reason = self._current_index, "sequential" if fits else "no_quota"
+        else:
+            pool = within_budget or candidates
+            index = min(
+                pool,
+                key=lambda i: (
+                    self._load_score(self._keys[i]),
+                    len(self._keys[i].recent_requests),
+                    i,
+                ),
+            )
+            reason = "least_loaded" if within_budget else "over_budget"
+            if not fits:
+                reason = "no_quota"
+            if index != self._current_index:
+                self._logger.debug(
+                    f"{self._provider_name}: scheduled key {index + 1}/{len(self._keys)} ({reason})"
+                )
+            self._current_index = index
+        
+        state = self._keys[index]
+        state.in_flight += 1
+        state.total_requests += 1
+        state.day_requests += 1
+        state.recent_requests.append(now)
+        self._last_decision = {
+            "index": index,
+            "reason": reason,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "scores": {i: round(self._load_score(self._keys[i]), 3) for i in available},
+        }
+        return KeyLease(index=index, key=state.key, started=now)
+    
+    def release_key(self, lease: Optional[KeyLease], success: bool = False) -> None:
+        """
+        Return a leased key. Idempotent: only the first release counts.
+        
+        Args:
+            lease: Lease from ``acquire_key`` (None is ignored)
+            success: The request succeeded - record its latency and mark
+                the key healthy. Failures are reported separately through
+                ``mark_key_error``/``mark_key_rate_limited``/
+                ``mark_key_exhausted_for_day`` with ``lease.key``.
+        """
+        if lease is None or lease.released:
+            return
+        lease.released = True
+        state = self._keys[lease.index] if lease.index < len(self._keys) else None
+        if state is None or state.key != lease.key:
+            return
+        state.in_flight = max(0, state.in_flight - 1)
+        if success:
+            state.record_latency(time.monotonic() - lease.started)
+            state.mark_healthy()
+    
+    def mark_success(self, key: Optional[str] = None):
+        """Mark a key (default: current) as successfully used."""
+        current = self._keys[self._index_of(key)]
         current.mark_healthy()
     
-    def mark_key_rate_limited(self) -> bool:
+    def mark_key_rate_limited(self, key: Optional[str] = None) -> bool:
         """
-        Mark current key as rate limited.
+        Mark a key (default: current) as rate limited.
         
         Returns:
             True if there are other keys to try, False if all exhausted
         """
-        current = self._keys[self._current_index]
+        index = self._index_of(key)
+        current = self._keys[index]
         current.mark_failed(is_rate_limit=True)
         
         masked_key = f"{current.key[:8]}...{current.key[-4:]}"
         self._logger.warning(
-            f"Key {self._current_index + 1}/{len(self._keys)} rate limited: {masked_key}"
+            f"Key {index + 1}/{len(self._keys)} rate limited: {masked_key}"
         )
         
         # Check if there are other available keys
         return self._find_available_key() is not None
     
-    def mark_key_error(self) -> bool:
+    def mark_key_error(self, key: Optional[str] = None) -> bool:
         """
-        Mark current key as having an error.
+        Mark a key (default: current) as having an error.
         
         Returns:
             True if there are other keys to try, False if all exhausted
         """
-        current = self._keys[self._current_index]
+        index = self._index_of(key)
+        current = self._keys[index]
         current.mark_failed(is_rate_limit=False)
         
         masked_key = f"{current.key[:8]}...{current.key[-4:]}"
         self._logger.warning(
-            f"Key {self._current_index + 1}/{len(self._keys)} error: {masked_key}"
+            f"Key {index + 1}/{len(self._keys)} error: {masked_key}"
         )
         
         # Check if there are other available keys
@@ -287,11 +487,18 @@ class APIKeyManager:
         )
     
     def get_status(self) -> Dict[str, any]:
-        """Get status of all keys for debugging."""
+        """Get status of all keys (health, load and scheduler decision)."""
+        now = time.monotonic()
+        for k in self._keys:
+            self._within_budget(k, now)  # prune the RPM window / roll the day
         return {
             "current_index": self._current_index,
             "total_keys": len(self._keys),
             "cooldown_seconds": self._cooldown_seconds,
+            "scheduling": self._scheduling,
+            "rpm_limit": self._rpm_limit,
+            "rpd_limit": self._rpd_limit,
+            "last_decision": self._last_decision,
             "keys": [
                 {
                     "index": i,
@@ -299,6 +506,11 @@ class APIKeyManager:
                     "error_count": k.error_count,
                     "is_current": i == self._current_index,
                     "available": k.is_available(self._cooldown_seconds),
+                    "in_flight": k.in_flight,
+                    "latency_ms": round(k.latency_ewma * 1000) if k.latency_ewma is not None else None,
+                    "requests_last_minute": len(k.recent_requests),
+                    "requests_today": k.day_requests,
+                    "total_requests": k.total_requests,
                     "masked_key": f"{k.key[:8]}...{k.key[-4:]}" if len(k.key) > 12 else "***"
                 }
                 for i, k in enumerate(self._keys)
@@ -328,9 +540,9 @@ class APIKeyManager:
 
         return next_midnight_pacific.astimezone(pytz.utc)
 
-    def mark_key_exhausted_for_day(self) -> bool:
+    def mark_key_exhausted_for_day(self, key: Optional[str] = None) -> bool:
         """
-        Mark current key as exhausted for the rest of the quota day.
+        Mark a key (default: current) as exhausted for the rest of the quota day.
 
         Daily exhaustion is distinct from short-term rate limiting. The
         key will not be considered available again until after the next
@@ -339,7 +551,8 @@ class APIKeyManager:
         Returns:
             True if there are other keys to try, False if all exhausted.
         """
-        current = self._keys[self._current_index]
+        index = self._index_of(key)
+        current = self._keys[index]
         current.status = KeyStatus.EXHAUSTED
         current.failed_at = datetime.now()
         current.error_count += 1
@@ -348,7 +561,7 @@ class APIKeyManager:
         masked_key = f"{current.key[:8]}...{current.key[-4:]}" if len(current.key) > 12 else "***"
         self._logger.warning(
             "Key %s/%s exhausted for the day until %s UTC: %s",
-            self._current_index + 1,
+            index + 1,
             len(self._keys),
             current.exhausted_until.isoformat(),
             masked_key,
@@ -391,7 +604,10 @@ def get_api_key_manager() -> Optional[APIKeyManager]:
 def initialize_api_key_manager(
     api_keys: List[str],
     cooldown_seconds: int = 60,
-    provider_name: str = "API"
+    provider_name: str = "API",
+    scheduling: str = SCHEDULING_SEQUENTIAL,
+    rpm_limit: Optional[int] = None,
+    rpd_limit: Optional[int] = None
 ) -> Optional[APIKeyManager]:
     """
     Initialize the global API key manager.
@@ -400,6 +616,9 @@ def initialize_api_key_manager(
         api_keys: List of API keys
         cooldown_seconds: Cooldown period for failed keys
         provider_name: Provider name for logging
+        scheduling: Key scheduling mode ('sequential' or 'least_loaded')
+        rpm_limit: Optional local requests-per-minute budget per key
+        rpd_limit: Optional local requests-per-day budget per key
 
     Returns:
         Initialized APIKeyManager instance
@@ -410,7 +629,10 @@ def initialize_api_key_manager(
         logger.warning(f"No {provider_name} API keys provided for key manager")
         return None
 
-    _api_key_manager = APIKeyManager(api_keys, cooldown_seconds, provider_name)
+    _api_key_manager = APIKeyManager(
+        api_keys, cooldown_seconds, provider_name,
+        scheduling=scheduling, rpm_limit=rpm_limit, rpd_limit=rpd_limit
+    )
     return _api_key_manager
 
 
@@ -425,8 +647,14 @@ def get_gemini_key_manager() -> Optional[APIKeyManager]:
 
 def initialize_gemini_key_manager(
     api_keys: List[str],
-    cooldown_seconds: int = 60
+    cooldown_seconds: int = 60,
+    scheduling: str = SCHEDULING_SEQUENTIAL,
+    rpm_limit: Optional[int] = None,
+    rpd_limit: Optional[int] = None
 ) -> Optional[APIKeyManager]:
     """Backward compat: Initialize key manager for Gemini."""
-    return initialize_api_key_manager(api_keys, cooldown_seconds, "Gemini")
+    return initialize_api_key_manager(
+        api_keys, cooldown_seconds, "Gemini",
+        scheduling=scheduling, rpm_limit=rpm_limit, rpd_limit=rpd_limit
+    )
 
@@ -0,0 +1,192 @@
+"""Map-reduce analysis for chats too long for one useful prompt.
+
+/analyze accepts up to 10,000 messages. Sending them as one prompt blows past
+the context a model uses well, makes the single call slow, and fails outright
+when the model truncates. Past a token budget the transcript is instead split
+into contiguous, token-budgeted windows; each window is condensed into notes
+concurrently (a cheap flash-tier ``analyze_window`` task), and one final
+reduce prompt — the regular ``build_analysis_prompt`` via
+``build_merge_analysis_prompt`` — merges the notes into the analysis.
+
+Providers pass their own ``execute_prompt`` and a concurrency equal to the
+number of API keys currently available, so windows fan out across keys
+instead of queueing on one.
+"""
+
+import asyncio
+import math
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from .prompts import build_merge_analysis_prompt, build_window_notes_prompt
+from .response_metadata import AIResponseMetadata
+from ..core.exceptions import AIProcessorError
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rough token estimate without a tokenizer. Persian script tokenizes denser
+# than English, so err on the small side (over-estimating tokens is safe).
+CHARS_PER_TOKEN = 3
+SINGLE_PASS_TOKEN_BUDGET = 48_000  # transcripts up to this stay one prompt
+WINDOW_TOKEN_BUDGET = 24_000       # ceiling for each map window
+WINDOW_NOTES_MAX_TOKENS = 2048
+WINDOW_NOTES_TEMPERATURE = 0.3
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+ExecutePrompt = Callable[..., Awaitable[AIResponseMetadata]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text`` (never 0 for a line)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def needs_map_reduce(lines: List[str], budget: int = SINGLE_PASS_TOKEN_BUDGET) -> bool:
+    """True when the transcript is too large for a single analysis prompt."""
+    return sum(estimate_tokens(line) for line in lines) > budget
+
+
+def split_into_windows(lines: List[str], budget: int = WINDOW_TOKEN_BUDGET) -> List[List[str]]:
+    """Split chronological transcript lines into contiguous windows.
+
+    Windows are balanced (about the same size) and each stays within
+    ``budget`` tokens; a single line larger than the budget gets a window of
+    its own rather than being cut mid-message.
+    """
+    if not lines:
+        return []
+    costs = [estimate_tokens(line) for line in lines]
+    total = sum(costs)
+    if total <= budget:
+        return [list(lines)]
+    count = math.ceil(total / budget)
+    remaining = total
+    target = math.ceil(remaining / count)
+
+    windows: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for line, cost in zip(lines, costs):
+        if current and size + cost > target:
+            windows.append(current)
+            remaining -= size
+            current, size = [], 0
+            # Re-balance what's left over the windows still to fill.
+            target = min(budget, math.ceil(remaining / max(1, count - len(windows))))
+        current.append(line)
+        size += cost
+    if current:
+        windows.append(current)
+    return windows
+
+
+async def _report(progress_cb: Optional[ProgressCallback], done: int, total: int) -> None:
+    if progress_cb is None:
+        return
+    try:
+        await progress_cb(done, total)
+    except Exception as e:  # noqa: BLE001 - progress is cosmetic, never fatal
+        logger.debug(f"Analysis progress callback failed: {e}")
+
+
+def _sum_optional(values: List[Optional[int]]) -> Optional[int]:
+    known = [v for v in values if v is not None]
+    return sum(known) if known else None
+
+
+async def analyze_in_windows(
+    execute_prompt: ExecutePrompt,
+    lines: List[str],
+    analysis_type: str,
+    output_language: str,
+    *,
+    max_tokens: int,
+    temperature: float,
+    use_thinking: bool = False,
+    concurrency: int = 1,
+    progress_cb: Optional[ProgressCallback] = None,
+    window_budget: int = WINDOW_TOKEN_BUDGET,
+) -> AIResponseMetadata:
+    """
+    Analyze a long transcript window by window, then merge.
+
+    Args:
+        execute_prompt: The provider's ``execute_prompt`` coroutine.
+        lines: Formatted transcript lines, oldest first.
+        analysis_type: Analysis mode for the final prompt (general/fun/romance).
+        output_language: Output language of the final analysis.
+        max_tokens: Output cap for the final (reduce) call.
+        temperature: Temperature for the final (reduce) call.
+        use_thinking: Enable deep thinking for the final call only.
+        concurrency: Maximum window calls in flight (the usable key count).
+        progress_cb: Optional async callback invoked as ``(done, total)``
+            each time a window finishes.
+        window_budget: Token ceiling per window.
+
+    Returns:
+        AIResponseMetadata of the reduce call, with latency and token counts
+        covering the whole run.
+
+    Raises:
+        AIProcessorError: If a window or the final merge fails.
+    """
+    windows = split_into_windows(lines, window_budget)
+    total = len(windows)
+    if total == 0:
+        raise AIProcessorError("No messages provided for analysis")
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    notes: List[str] = [""] * total
+    results: List[Any] = []
+    done = 0
+    logger.info(
+        f"Map-reduce analysis: {len(lines)} msgs in {total} windows, "
+        f"concurrency={max(1, concurrency)}"
+    )
+    await _report(progress_cb, 0, total)
+
+    async def _map(index: int, window: List[str]) -> None:
+        nonlocal done
+        async with semaphore:
+            result = await execute_prompt(
+                build_window_notes_prompt("\n".join(window), index + 1, total),
+                max_tokens=WINDOW_NOTES_MAX_TOKENS,
+                temperature=WINDOW_NOTES_TEMPERATURE,
+                task_type="analyze_window",
+            )
+        text = (getattr(result, "response_text", None) or str(result or "")).strip()
+        if not text:
+            raise AIProcessorError(f"Empty notes for analysis window {index + 1}/{total}")
+        notes[index] = text
+        results.append(result)
+        done += 1
+        await _report(progress_cb, done, total)
+
+    tasks = [asyncio.ensure_future(_map(i, w)) for i, w in enumerate(windows)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # One window failing fails the analysis; don't leave the rest burning quota.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    notes_text = "\n\n".join(
+        f"── {i}/{total} ──\n{text}" for i, text in enumerate(notes, start=1)
+    )
+    final = await execute_prompt(
+        build_merge_analysis_prompt(analysis_type, output_language, notes_text, len(lines), total),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        task_type="analyze",
+        use_thinking=use_thinking,
+    )
+    if isinstance(final, AIResponseMetadata):
+        runs = results + [final]
+        final.latency_seconds = time.monotonic() - started
+        final.input_tokens = _sum_optional([getattr(r, "input_tokens", None) for r in runs])
+        final.output_tokens = _sum_optional([getattr(r, "output_tokens", None) for r in runs])
+    return final
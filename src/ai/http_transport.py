@@ -0,0 +1,230 @@
+"""Process-wide pooled HTTP transport for AI providers and image workers.
+
+Every outbound AI call used to bring its own connection pool: OpenRouter built
+a fresh ``httpx.AsyncClient`` whenever the active key changed, each
+``genai.Client`` opened its own, and the image generator kept a third. Every
+new pool meant a new TCP + TLS handshake to a host we had talked to seconds
+earlier.
+
+This module owns one async and one sync ``httpx`` client for the whole
+process. httpx keeps a keep-alive pool per origin inside each client, so
+OpenRouter, Gemini (``generativelanguage.googleapis.com``) and the Cloudflare
+workers each get warm connections that every provider, ``tts_gemini`` and the
+panel key tester reuse. HTTP/2 is negotiated when the optional ``h2`` package
+is installed. ``warm_up`` opens connections to the known hosts at startup so
+the first command skips the handshake too.
+
+A trace hook counts per-host requests, new TCP connections and TLS handshakes;
+``stats()`` feeds ``/api/status``.
+"""
+
+import asyncio
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+HTTP_MAX_CONNECTIONS = 32
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 16
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 120.0
+# Per-request timeouts override this; it only applies to callers that pass none.
+HTTP_DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=30.0)
+WARMUP_TIMEOUT_SECONDS = 5.0
+
+GEMINI_API_ORIGIN = "https://generativelanguage.googleapis.com"
+OPENROUTER_API_ORIGIN = "https://openrouter.ai"
+
+
+def http2_available() -> bool:
+    """Whether httpx can negotiate HTTP/2 (needs the ``h2`` package)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HttpTransport:
+    """Shared keep-alive HTTP clients with per-host connection statistics."""
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2_available()
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._hosts: Dict[str, Dict[str, int]] = {}
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    @property
+    def http2(self) -> bool:
+        return self._http2
+
+    # ---------- clients ----------
+    def client(self) -> httpx.AsyncClient:
+        """The shared async client (created on first use)."""
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                http2=self._http2,
+                limits=self._limits,
+                timeout=HTTP_DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                event_hooks={"request": [self._on_async_request]},
+            )
+            logger.info(f"Shared async HTTP transport ready (http2={self._http2})")
+        return self._async_client
+
+    def sync_client(self) -> httpx.Client:
+        """The shared sync client, for SDK calls made from worker threads."""
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(
+                http2=self._http2,
+                limits=self._limits,
+                timeout=HTTP_DEFAULT_TIMEOUT,
+                follow_redirects=True,
+                event_hooks={"request": [self._on_request]},
+            )
+        return self._sync_client
+
+    def genai_http_options(self) -> Any:
+        """``HttpOptions`` that make a ``genai.Client`` use the shared pools."""
+        from google.genai import types
+
+        return types.HttpOptions(
+            httpx_client=self.sync_client(),
+            httpx_async_client=self.client(),
+        )
+
+    async def aclose(self) -> None:
+        """Close both clients (process shutdown only)."""
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    # ---------- warm-up ----------
+    async def warm_up(self, urls: Iterable[str]) -> None:
+        """Open a keep-alive connection to each origin (TCP + TLS, no payload)."""
+        origins = []
+        for url in urls:
+            parts = urlsplit(url or "")
+            if parts.scheme in ("http", "https") and parts.netloc:
+                origin = f"{parts.scheme}://{parts.netloc}"
+                if origin not in origins:
+                    origins.append(origin)
+
+        async def _touch(origin: str) -> None:
+            try:
+                # Any status will do: the point is the pooled connection.
+                await self.client().head(origin, timeout=WARMUP_TIMEOUT_SECONDS)
+            except httpx.HTTPError as e:
+                logger.debug(f"HTTP warm-up of {origin} failed: {e}")
+
+        await asyncio.gather(*(_touch(o) for o in origins))
+        logger.info(f"HTTP transport warmed up {len(origins)} host(s)")
+
+    def start_warm_up(self, config: Any) -> Optional[asyncio.Task]:
+        """Warm the configured AI hosts in the background; never delays startup."""
+        urls = []
+        if getattr(config, "gemini_api_keys", None) or getattr(config, "gemini_api_key", None):
+            urls.append(GEMINI_API_ORIGIN)
+        if getattr(config, "openrouter_api_keys", None) or getattr(config, "openrouter_api_key", None):
+            urls.append(OPENROUTER_API_ORIGIN)
+        urls.extend(
+            u for u in (getattr(config, "flux_worker_url", None), getattr(config, "sdxl_worker_url", None)) if u
+        )
+        if not urls:
+            return None
+        self._warmup_task = asyncio.ensure_future(self.warm_up(urls))
+        return self._warmup_task
+
+    # ---------- statistics ----------
+    def _count(self, request: httpx.Request) -> Any:
+        """Count the request; return an event handler for its connection trace."""
+        host = request.url.host
+        counters = self._hosts.setdefault(
+            host, {"requests": 0, "connections": 0, "tls_handshakes": 0, "http2_requests": 0}
+        )
+        counters["requests"] += 1
+
+        def on_event(event: str) -> None:
+            if event == "connection.connect_tcp.complete":
+                counters["connections"] += 1
+            elif event == "connection.start_tls.complete":
+                counters["tls_handshakes"] += 1
+            elif event == "http2.send_request_headers.started":
+                counters["http2_requests"] += 1
+
+        return on_event
+
+    def _on_request(self, request: httpx.Request) -> None:
+        on_event = self._count(request)
+        previous = request.extensions.get("trace")
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            on_event(event)
+            if previous is not None:
+                previous(event, info)
+
+        request.extensions["trace"] = trace
+
+    async def _on_async_request(self, request: httpx.Request) -> None:
+        # httpcore's async pool insists on a coroutine trace callback.
+        on_event = self._count(request)
+        previous = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            on_event(event)
+            if previous is not None:
+                await previous(event, info)
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics: per-host requests, connections, reuse and HTTP/2."""
+        open_connections = 0
+        for client in (self._async_client, self._sync_client):
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            open_connections += len(getattr(pool, "connections", None) or [])
+        hosts = {}
+        for host, c in self._hosts.items():
+            hosts[host] = dict(c, reused=max(0, c["requests"] - c["connections"]))
+        return {
+            "http2": self._http2,
+            "open_connections": open_connections,
+            "max_connections": self._limits.max_connections,
+            "hosts": hosts,
+        }
+
+
+# Global transport instance
+_http_transport: Optional[HttpTransport] = None
+
+
+def get_http_transport() -> HttpTransport:
+    """
+    Get the global HttpTransport instance.
+
+    Returns:
+        Global HttpTransport instance
+    """
+    global _http_transport
+    if _http_transport is None:
+        _http_transport = HttpTransport()
+    return _http_transport
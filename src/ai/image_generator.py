@@ -2,8 +2,6 @@
 
 import asyncio
 import httpx
-import uuid
-from pathlib import Path
 from typing import Optional, Tuple
 from urllib.parse import quote
 
@@ -11,11 +9,13 @@ from ..core.config import get_settings
 from ..core.constants import (
     IMAGE_GENERATION_TIMEOUT,
     IMAGE_GENERATION_CONNECT_TIMEOUT,
-    IMAGE_TEMP_DIR
+    IMAGE_RATE_LIMIT_ERROR
 )
 from ..core.exceptions import AIProcessorError
+from ..utils.image_cache import ImageCache, image_cache_key
 from ..utils.logging import get_logger
 from ..utils.retry import retry_with_backoff
+from .http_transport import get_http_transport
 
 
 class ImageGenerator:
@@ -27,62 +27,75 @@ class ImageGenerator:
         self._config = get_settings()
         self._http_client: Optional[httpx.AsyncClient] = None
     
+        self._timeout = httpx.Timeout(
+            connect=IMAGE_GENERATION_CONNECT_TIMEOUT,
+            read=IMAGE_GENERATION_TIMEOUT,
+            write=IMAGE_GENERATION_TIMEOUT,
+            pool=IMAGE_GENERATION_CONNECT_TIMEOUT
+        )
+        self._cache = ImageCache(
+            max_bytes=self._config.image_cache_max_mb * 1024 * 1024,
+            max_age_seconds=self._config.image_cache_max_age_hours * 3600
+        )
+    
     def _get_http_client(self) -> httpx.AsyncClient:
-        """Get or create httpx AsyncClient."""
+        """Get the shared keep-alive client (worker connections stay warm)."""
         if self._http_client is None:
-            self._http_client = httpx.AsyncClient(
-                timeout=httpx.Timeout(
-                    connect=IMAGE_GENERATION_CONNECT_TIMEOUT,
-                    read=IMAGE_GENERATION_TIMEOUT,
-                    write=IMAGE_GENERATION_TIMEOUT,
-                    pool=IMAGE_GENERATION_CONNECT_TIMEOUT
-                ),
-                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
-                follow_redirects=True
-            )
-            self._logger.info("Initialized httpx client for image generation")
+            self._http_client = get_http_transport().client()
         return self._http_client
     
     async def close(self):
-        """Close HTTP client."""
-        if self._http_client:
-            await self._http_client.aclose()
-            self._http_client = None
+        """Drop the HTTP client reference (the shared pool outlives us)."""
+        self._http_client = None
     
-    def _save_image(self, response_content: bytes, model_name: str) -> str:
+    async def _save_image(self, response: httpx.Response, cache_key: str, model_name: str) -> str:
         """
-        Save image to temporary file.
+        Stream the image body into the cache.
         
         Args:
-            response_content: Image bytes
+            response: Streamed image response (closed on return)
+            cache_key: Cache key of the request
             model_name: Model name (flux or sdxl)
             
         Returns:
-            Path to saved image file
+            Path to the cached image file
             
         Raises:
-            AIProcessorError: If file I/O fails
+            AIProcessorError: If the download or file I/O fails
         """
-        # Create temp directory if it doesn't exist
-        temp_dir = Path(IMAGE_TEMP_DIR)
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate unique filename
-        request_id = str(uuid.uuid4())[:8]
-        timestamp = int(asyncio.get_event_loop().time())
-        filename = f"image_{model_name}_{request_id}_{timestamp}.png"
-        filepath = temp_dir / filename
-        
+        temp_path = self._cache.temp_path(cache_key)
+        size = 0
         try:
-            # Write image bytes to file
-            with open(filepath, 'wb') as f:
-                f.write(response_content)
-            
-            self._logger.info(f"Saved image to {filepath} ({len(response_content)} bytes)")
-            return str(filepath)
-        except Exception as e:
+            # Chunks go straight to disk (through a worker thread, so slow
+            # storage never blocks the loop); the image is never held in memory
+            f = await asyncio.to_thread(open, temp_path, 'wb')
+            try:
+                async for chunk in response.aiter_bytes():
+                    await asyncio.to_thread(f.write, chunk)
+                    size += len(chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            if size == 0:
+                raise AIProcessorError("Image generation service returned an empty image")
+            filepath = self._cache.commit(cache_key, temp_path)
+            self._logger.info(f"Saved {model_name} image to {filepath} ({size} bytes)")
+            return filepath
+        except httpx.HTTPError as e:
+            self._logger.error(f"Image download failed: {e}")
+            raise AIProcessorError(f"Network error during image download: {e}")
+        except OSError as e:
             self._logger.error(f"Failed to save image: {e}")
             raise AIProcessorError(f"Failed to save image: {e}")
+        finally:
+            await response.aclose()
+            temp_path.unlink(missing_ok=True)
+    
+    @staticmethod
+    async def _read_error_body(response: httpx.Response) -> None:
+        """Buffer a non-image (error) response so it can be parsed as JSON."""
+        content_type = response.headers.get("content-type", "").lower()
+        if response.status_code != 200 or not content_type.startswith("image/"):
+            await response.aread()
     
     async def _make_flux_request(self, prompt: str) -> httpx.Response:
         """
@@ -92,7 +105,7 @@ class ImageGenerator:
             prompt: Image generation prompt
             
         Returns:
-            HTTP response
+            Streamed HTTP response (error bodies already read)
             
         Raises:
             AIProcessorError: If request fails
@@ -102,7 +115,9 @@ class ImageGenerator:
         
         try:
             self._logger.info(f"Making Flux request: {url[:100]}...")
-            response = await client.get(url)
+            request = client.build_request("GET", url, timeout=self._timeout)
+            response = await client.send(request, stream=True)
+            await self._read_error_body(response)
             return response
         except httpx.TimeoutException as e:
             self._logger.error(f"Flux request timeout: {e}")
@@ -119,7 +134,7 @@ class ImageGenerator:
             prompt: Image generation prompt
             
         Returns:
-            HTTP response
+            Streamed HTTP response (error bodies already read)
             
         Raises:
             AIProcessorError: If request fails or auth is invalid
@@ -137,7 +152,11 @@ class ImageGenerator:
         
         try:
             self._logger.info(f"Making SDXL request to {url}")
-            response = await client.post(url, json=payload, headers=headers)
+            request = client.build_request(
+                "POST", url, json=payload, headers=headers, timeout=self._timeout
+            )
+            response = await client.send(request, stream=True)
+            await self._read_error_body(response)
             return response
         except httpx.TimeoutException as e:
             self._logger.error(f"SDXL request timeout: {e}")
@@ -158,11 +177,17 @@ class ImageGenerator:
             Tuple of (success, image_path, error_message)
         """
         try:
+            cache_key = image_cache_key("flux", enhanced_prompt)
+            cached_path = self._cache.get(cache_key)
+            if cached_path:
+                self._logger.info("Image cache hit, skipping Flux request")
+                return (True, cached_path, None)
+            
             response = await self._make_flux_request(enhanced_prompt)
             
             # Handle HTTP errors
             if response.status_code == 429:
-                return (False, None, "Rate limit exceeded. Please try again later.")
+                return (False, None, IMAGE_RATE_LIMIT_ERROR)
             elif response.status_code == 400:
                 return (False, None, "Invalid prompt or request format.")
             elif response.status_code >= 500:
@@ -183,7 +208,7 @@ class ImageGenerator:
                     return (False, None, "Invalid response from image generation service")
             
             # Save image
-            image_path = self._save_image(response.content, "flux")
+            image_path = await self._save_image(response, cache_key, "flux")
             return (True, image_path, None)
             
         except AIProcessorError as e:
@@ -204,6 +229,12 @@ class ImageGenerator:
             Tuple of (success, image_path, error_message)
         """
         try:
+            cache_key = image_cache_key("sdxl", enhanced_prompt)
+            cached_path = self._cache.get(cache_key)
+            if cached_path:
+                self._logger.info("Image cache hit, skipping SDXL request")
+                return (True, cached_path, None)
+            
             response = await self._make_sdxl_request(enhanced_prompt)
             
             # Handle HTTP errors
@@ -220,7 +251,7 @@ class ImageGenerator:
                 except:
                     return (False, None, "Invalid prompt or request format")
             elif response.status_code == 429:
-                return (False, None, "Rate limit exceeded. Please try again later.")
+                return (False, None, IMAGE_RATE_LIMIT_ERROR)
             elif response.status_code >= 500:
                 # Try to parse error message
                 try:
@@ -248,7 +279,7 @@ class ImageGenerator:
                     return (False, None, "Invalid response from image generation service")
             
             # Save image
-            image_path = self._save_image(response.content, "sdxl")
+            image_path = await self._save_image(response, cache_key, "sdxl")
             return (True, image_path, None)
             
         except AIProcessorError as e:
@@ -1,12 +1,38 @@
-"""Image generation queue system with separate FIFO queues per model."""
+"""Image generation queue system with separate FIFO queues per model.
 
+Each model (backend) runs up to ``<model>_max_concurrency`` requests at once.
+Pending requests sit in an ordered dict keyed by request id and get a ticket
+number when added, so a request's queue position is ``ticket - served``
+instead of a scan. Requests only start from the head of the queue. A 429
+from a backend starts a shared, growing backoff: no new request for that
+model starts until it expires, and in-flight workers wait on it before
+retrying. Finished requests are kept in a small bounded history and then
+evicted automatically.
+
+Waiters never poll: every state change of a model's queue (new request,
+request started, finished or removed) sets that model's change event and
+replaces it with a fresh one, waking ``wait_for_turn`` and
+``start_processing`` exactly when something they care about happened.
+"""
+
+import asyncio
+import time
 import uuid
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Optional, List
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
 
 from ..utils.logging import get_logger
-from ..core.constants import SUPPORTED_IMAGE_MODELS
+from ..core.constants import (
+    DEFAULT_IMAGE_MAX_CONCURRENCY,
+    IMAGE_RATE_LIMIT_BACKOFF_SECONDS,
+    IMAGE_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    SUPPORTED_IMAGE_MODELS,
+)
+
+# Finished requests remembered for late status lookups
+FINISHED_HISTORY_SIZE = 100
 
 
 class ImageStatus(Enum):
@@ -27,199 +53,229 @@ class ImageRequest:
     status: ImageStatus = ImageStatus.PENDING
     image_path: Optional[str] = None
     error_message: Optional[str] = None
+    # Arrival order within the model queue (positions are derived from it)
+    ticket: int = field(default=0, repr=False)
+
+
+@dataclass
+class _ModelQueue:
+    """Pending/running bookkeeping for one backend."""
+    limit: int
+    pending: "OrderedDict[str, ImageRequest]" = field(default_factory=OrderedDict)
+    running: Set[str] = field(default_factory=set)
+    next_ticket: int = 0
+    served: int = 0  # requests that have left the head of the queue
+    backoff_until: float = 0.0
+    rate_limit_streak: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def backoff_remaining(self) -> float:
+        return max(0.0, self.backoff_until - time.monotonic())
 
 
 class ImageQueue:
     """Manages image generation requests with separate FIFO queues per model."""
-    
-    def __init__(self):
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
         """Initialize ImageQueue with separate queues for each model."""
         self._logger = get_logger(self.__class__.__name__)
-        
-        # Separate queues for each model
-        self._flux_queue: List[ImageRequest] = []
-        self._sdxl_queue: List[ImageRequest] = []
-        
-        # Processing flags
-        self._flux_processing = False
-        self._sdxl_processing = False
-        
-        # Request storage by ID
+        limits = limits or {}
+        self._queues: Dict[str, _ModelQueue] = {
+            model: _ModelQueue(limit=limits.get(model, DEFAULT_IMAGE_MAX_CONCURRENCY))
+            for model in SUPPORTED_IMAGE_MODELS
+        }
+
+        # Active (pending/processing) requests by ID
         self._requests: Dict[str, ImageRequest] = {}
-    
+        # Recently finished requests, oldest first
+        self._finished: "OrderedDict[str, ImageRequest]" = OrderedDict()
+
+    def configure(self, config: Any) -> None:
+        """Apply per-backend concurrency limits (``flux_max_concurrency``, ...)."""
+        for model, queue in self._queues.items():
+            limit = getattr(config, f"{model}_max_concurrency", None)
+            if isinstance(limit, int) and limit >= 1 and limit != queue.limit:
+                queue.limit = limit
+                self._logger.info(f"{model.upper()} concurrency limit set to {limit}")
+                self._notify(model)
+
+    def _notify(self, model: str) -> None:
+        """Wake everything waiting on this model's queue."""
+        queue = self._queues[model]
+        queue.changed.set()
+        queue.changed = asyncio.Event()
+
     def add_request(self, model: str, prompt: str, user_id: int) -> str:
         """
         Add a request to the appropriate model queue.
-        
+
         Args:
             model: Model name ("flux" or "sdxl")
             prompt: Image generation prompt
             user_id: User ID making the request
-            
+
         Returns:
             Request ID
         """
         if model not in SUPPORTED_IMAGE_MODELS:
             raise ValueError(f"Unsupported model: {model}")
-        
+
+        queue = self._queues[model]
         request_id = f"img_{uuid.uuid4().hex[:8]}"
         request = ImageRequest(
             request_id=request_id,
             model=model,
             prompt=prompt,
-            user_id=user_id
+            user_id=user_id,
+            ticket=queue.next_ticket,
         )
-        
+        queue.next_ticket += 1
+
         self._requests[request_id] = request
-        
-        # Add to appropriate queue
-        if model == "flux":
-            self._flux_queue.append(request)
-            self._logger.info(f"Added Flux request {request_id} to queue (position: {len(self._flux_queue)})")
-        elif model == "sdxl":
-            self._sdxl_queue.append(request)
-            self._logger.info(f"Added SDXL request {request_id} to queue (position: {len(self._sdxl_queue)})")
-        
+        queue.pending[request_id] = request
+        self._logger.info(
+            f"Added {model.upper()} request {request_id} to queue (position: {len(queue.pending)})"
+        )
+
+        self._notify(model)
         return request_id
-    
+
     def get_queue_position(self, request_id: str, model: str) -> Optional[int]:
         """
         Get the position of a request in its model queue (1-based).
-        
+
         Args:
             request_id: Request ID
             model: Model name
-            
+
         Returns:
             Position in queue (1-based) or None if not pending
         """
-        request = self._requests.get(request_id)
-        if not request or request.model != model:
+        queue = self._queues.get(model)
+        request = queue.pending.get(request_id) if queue else None
+        if request is None:
             return None
-        
-        if request.status != ImageStatus.PENDING:
-            return None
-        
-        # Get appropriate queue
-        queue = self._flux_queue if model == "flux" else self._sdxl_queue
-        
-        # Find position (1-based)
-        position = 1
-        for req in queue:
-            if req.request_id == request_id:
-                return position
-            if req.status == ImageStatus.PENDING:
-                position += 1
-        
-        return None
-    
+        return request.ticket - queue.served + 1
+
     def get_status(self, request_id: str) -> Optional[str]:
         """
         Get status of a request.
-        
+
         Args:
             request_id: Request ID
-            
+
         Returns:
             Status string or None if not found
         """
-        request = self._requests.get(request_id)
+        request = self.get_request(request_id)
         if not request:
             return None
         return request.status.value
-    
+
     def get_next_pending(self, model: str) -> Optional[ImageRequest]:
         """
         Get next pending request without marking as processing.
-        
+
         Args:
             model: Model name
-            
+
         Returns:
             Next pending request or None
         """
-        queue = self._flux_queue if model == "flux" else self._sdxl_queue
-        for request in queue:
-            if request.status == ImageStatus.PENDING:
-                return request
-        return None
-    
+        queue = self._queues[model]
+        return next(iter(queue.pending.values()), None)
+
+    def _can_start(self, queue: _ModelQueue) -> bool:
+        return len(queue.running) < queue.limit and queue.backoff_remaining() == 0
+
+    def _start(self, request: ImageRequest) -> None:
+        """Move the head request of its queue to running."""
+        queue = self._queues[request.model]
+        queue.pending.popitem(last=False)
+        queue.served += 1
+        queue.running.add(request.request_id)
+        request.status = ImageStatus.PROCESSING
+        self._logger.info(
+            f"Started processing {request.model.upper()} request {request.request_id} "
+            f"({len(queue.running)}/{queue.limit} running)"
+        )
+        self._notify(request.model)
+
     def try_start_processing(self, request_id: str, model: str) -> bool:
         """
         Try to start processing a specific request if it's next in line.
-        
+
         Args:
             request_id: Request ID to process
             model: Model name
-            
+
         Returns:
             True if processing started, False otherwise
         """
-        if model == "flux":
-            if self._flux_processing:
-                return False
-            next_request = self.get_next_pending("flux")
-            if next_request and next_request.request_id == request_id:
-                next_request.status = ImageStatus.PROCESSING
-                self._flux_processing = True
-                self._logger.info(f"Started processing Flux request {request_id}")
-                return True
-        elif model == "sdxl":
-            if self._sdxl_processing:
-                return False
-            next_request = self.get_next_pending("sdxl")
-            if next_request and next_request.request_id == request_id:
-                next_request.status = ImageStatus.PROCESSING
-                self._sdxl_processing = True
-                self._logger.info(f"Started processing SDXL request {request_id}")
-                return True
-        
-        return False
-    
-    def process_next_flux(self) -> Optional[ImageRequest]:
+        queue = self._queues.get(model)
+        if queue is None or not self._can_start(queue):
+            return False
+        next_request = self.get_next_pending(model)
+        if next_request is None or next_request.request_id != request_id:
+            return False
+        self._start(next_request)
+        return True
+
+    def process_next(self, model: str) -> Optional[ImageRequest]:
         """
-        Get next pending Flux request and mark as processing.
-        
+        Get next pending request and mark as processing.
+
+        Args:
+            model: Model name
+
         Returns:
-            Next Flux request or None if queue is empty or processing
+            Next request or None if the queue is empty or at its limit
         """
-        if self._flux_processing:
+        queue = self._queues[model]
+        if not self._can_start(queue):
             return None
-        
-        # Find first pending request
-        for request in self._flux_queue:
-            if request.status == ImageStatus.PENDING:
-                request.status = ImageStatus.PROCESSING
-                self._flux_processing = True
-                self._logger.info(f"Processing Flux request {request.request_id}")
-                return request
-        
-        return None
-    
+        next_request = self.get_next_pending(model)
+        if next_request is not None:
+            self._start(next_request)
+        return next_request
+
+    def process_next_flux(self) -> Optional[ImageRequest]:
+        """Get next pending Flux request and mark as processing."""
+        return self.process_next("flux")
+
     def process_next_sdxl(self) -> Optional[ImageRequest]:
-        """
-        Get next pending SDXL request and mark as processing.
-        
-        Returns:
-            Next SDXL request or None if queue is empty or processing
-        """
-        if self._sdxl_processing:
-            return None
-        
-        # Find first pending request
-        for request in self._sdxl_queue:
-            if request.status == ImageStatus.PENDING:
-                request.status = ImageStatus.PROCESSING
-                self._sdxl_processing = True
-                self._logger.info(f"Processing SDXL request {request.request_id}")
-                return request
-        
-        return None
-    
+        """Get next pending SDXL request and mark as processing."""
+        return self.process_next("sdxl")
+
+    def _finish(self, request: ImageRequest) -> None:
+        """Release the request's slot and move it to the bounded history."""
+        queue = self._queues[request.model]
+        queue.running.discard(request.request_id)
+        if request.request_id in queue.pending:
+            self._remove_pending(queue, request.request_id)
+        self._requests.pop(request.request_id, None)
+        self._finished[request.request_id] = request
+        while len(self._finished) > FINISHED_HISTORY_SIZE:
+            self._finished.popitem(last=False)
+        self._notify(request.model)
+
+    def _remove_pending(self, queue: _ModelQueue, request_id: str) -> None:
+        """Drop a pending request, keeping later positions contiguous."""
+        if next(iter(queue.pending), None) == request_id:
+            queue.pending.popitem(last=False)
+            queue.served += 1
+            return
+        removed = queue.pending.pop(request_id)
+        # Rare (cancelled while queued): shift everyone behind it forward.
+        for request in queue.pending.values():
+            if request.ticket > removed.ticket:
+                request.ticket -= 1
+        queue.next_ticket -= 1
+
     def mark_completed(self, request_id: str, image_path: str):
         """
         Mark a request as completed.
-        
+
         Args:
             request_id: Request ID
             image_path: Path to generated image
@@ -227,22 +283,17 @@ class ImageQueue:
         request = self._requests.get(request_id)
         if not request:
             return
-        
+
         request.status = ImageStatus.COMPLETED
         request.image_path = image_path
-        
-        # Reset processing flag for the model
-        if request.model == "flux":
-            self._flux_processing = False
-        elif request.model == "sdxl":
-            self._sdxl_processing = False
-        
+        self._queues[request.model].rate_limit_streak = 0
+        self._finish(request)
         self._logger.info(f"Request {request_id} completed")
-    
+
     def mark_failed(self, request_id: str, error_message: str):
         """
         Mark a request as failed.
-        
+
         Args:
             request_id: Request ID
             error_message: Error message
@@ -250,109 +301,166 @@ class ImageQueue:
         request = self._requests.get(request_id)
         if not request:
             return
-        
+
         request.status = ImageStatus.FAILED
         request.error_message = error_message
-        
-        # Reset processing flag for the model
-        if request.model == "flux":
-            self._flux_processing = False
-        elif request.model == "sdxl":
-            self._sdxl_processing = False
-        
+        self._finish(request)
         self._logger.error(f"Request {request_id} failed: {error_message}")
-    
+
+    def note_rate_limited(self, model: str) -> float:
+        """
+        Record a 429 from a backend and back off all of its workers.
+
+        The delay doubles with each consecutive 429 and resets on the next
+        completed request.
+
+        Returns:
+            Backoff delay in seconds
+        """
+        queue = self._queues[model]
+        queue.rate_limit_streak += 1
+        delay = min(
+            IMAGE_RATE_LIMIT_BACKOFF_SECONDS * 2 ** (queue.rate_limit_streak - 1),
+            IMAGE_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+        )
+        queue.backoff_until = max(queue.backoff_until, time.monotonic() + delay)
+        self._logger.warning(f"{model.upper()} rate limited; backing off {delay:.0f}s")
+        return delay
+
+    async def wait_for_backoff(self, model: str) -> None:
+        """Sleep until the model's shared 429 backoff (if any) has expired."""
+        queue = self._queues[model]
+        while queue.backoff_remaining() > 0:
+            await asyncio.sleep(queue.backoff_remaining())
+
+    def get_running_count(self, model: str) -> int:
+        """Number of requests currently being generated for a model."""
+        return len(self._queues[model].running)
+
     def is_flux_processing(self) -> bool:
         """Check if Flux queue is currently processing."""
-        return self._flux_processing
-    
+        return bool(self._queues["flux"].running)
+
     def is_sdxl_processing(self) -> bool:
         """Check if SDXL queue is currently processing."""
-        return self._sdxl_processing
-    
+        return bool(self._queues["sdxl"].running)
+
     def get_request(self, request_id: str) -> Optional[ImageRequest]:
         """Get request by ID."""
-        return self._requests.get(request_id)
-    
+        return self._requests.get(request_id) or self._finished.get(request_id)
+
     def cleanup_request(self, request_id: str):
         """Remove a request from tracking (after image is sent)."""
-        if request_id in self._requests:
-            request = self._requests[request_id]
-            # Remove from queue
-            if request.model == "flux":
-                if request in self._flux_queue:
-                    self._flux_queue.remove(request)
-            elif request.model == "sdxl":
-                if request in self._sdxl_queue:
-                    self._sdxl_queue.remove(request)
-            del self._requests[request_id]
-    
+        request = self._requests.pop(request_id, None) or self._finished.pop(request_id, None)
+        if request is None:
+            return
+        queue = self._queues[request.model]
+        if request_id in queue.pending:
+            self._remove_pending(queue, request_id)
+        queue.running.discard(request_id)
+        self._finished.pop(request_id, None)
+        self._notify(request.model)
+
     def get_pending_count(self, model: Optional[str] = None) -> int:
         """
         Get number of pending requests.
-        
+
         Args:
             model: Model name (None for total)
-            
+
         Returns:
             Number of pending requests
         """
         if model:
-            queue = self._flux_queue if model == "flux" else self._sdxl_queue
-            return len([r for r in queue if r.status == ImageStatus.PENDING])
-        else:
-            return (
-                len([r for r in self._flux_queue if r.status == ImageStatus.PENDING]) +
-                len([r for r in self._sdxl_queue if r.status == ImageStatus.PENDING])
-            )
-    
+            return len(self._queues[model].pending)
+        return sum(len(queue.pending) for queue in self._queues.values())
+
+    async def _wait_for_change(self, model: str, changed: asyncio.Event) -> None:
+        """Wait for a queue change, or for the model's backoff to expire."""
+        remaining = self._queues[model].backoff_remaining()
+        if remaining <= 0:
+            await changed.wait()
+            return
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait_for_turn(
+        self,
+        request_id: str,
+        model: str,
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> Optional[ImageRequest]:
+        """
+        Block until a request may start, then mark it as processing.
+
+        Args:
+            request_id: Request ID
+            model: Model name
+            on_position: Awaited with the new queue position whenever it changes
+
+        Returns:
+            The request (PROCESSING when it is our turn; COMPLETED/FAILED if it
+            was settled elsewhere) or None if it was removed
+        """
+        last_position = self.get_queue_position(request_id, model)
+        while True:
+            # Grab the event before checking, so no change can slip in between
+            changed = self._queues[model].changed
+            if self.try_start_processing(request_id, model):
+                return self.get_request(request_id)
+            request = self.get_request(request_id)
+            if request is None or request.status in (ImageStatus.COMPLETED, ImageStatus.FAILED):
+                return request
+
+            position = self.get_queue_position(request_id, model)
+            if position != last_position:
+                last_position = position
+                if on_position and position:
+                    await on_position(position)
+                continue  # state may have moved while the callback ran
+            await self._wait_for_change(model, changed)
+
     async def start_processing(self, model: str, process_callback):
         """
-        Start processing queue for a specific model.
-        
+        Run a worker pool for a specific model.
+
+        Up to the model's concurrency limit, each pending request is handed to
+        ``process_callback`` in its own task. The pool sleeps until a request
+        is added, a running one finishes or a backoff expires.
+
         Args:
             model: Model name ("flux" or "sdxl")
             process_callback: Async callback function(request) to process each request
         """
-        import asyncio
-        
-        queue = self._flux_queue if model == "flux" else self._sdxl_queue
-        processing_flag = "_flux_processing" if model == "flux" else "_sdxl_processing"
-        
-        while True:
-            # Check if already processing
-            if getattr(self, processing_flag):
-                await asyncio.sleep(1)
-                continue
-            
-            # Get next pending request
-            next_request = None
-            for request in queue:
-                if request.status == ImageStatus.PENDING:
-                    next_request = request
-                    break
-            
-            if not next_request:
-                # No pending requests, wait a bit and check again
-                await asyncio.sleep(2)
-                continue
-            
-            # Mark as processing
-            next_request.status = ImageStatus.PROCESSING
-            setattr(self, processing_flag, True)
-            
+        workers: Set[asyncio.Task] = set()
+
+        async def run(request: ImageRequest) -> None:
             try:
-                # Process the request
-                await process_callback(next_request)
+                await process_callback(request)
             except Exception as e:
-                self._logger.error(f"Error processing {model} request {next_request.request_id}: {e}", exc_info=True)
-                next_request.status = ImageStatus.FAILED
-                next_request.error_message = str(e)
+                self._logger.error(f"Error processing {model} request {request.request_id}: {e}", exc_info=True)
+                self.mark_failed(request.request_id, str(e))
             finally:
-                # Reset processing flag
-                setattr(self, processing_flag, False)
+                # Free the slot even if the callback never settled the request
+                self._queues[model].running.discard(request.request_id)
+                self._notify(model)
+
+        try:
+            while True:
+                changed = self._queues[model].changed
+                next_request = self.process_next(model)
+                if next_request is None:
+                    await self._wait_for_change(model, changed)
+                    continue
+                task = asyncio.create_task(run(next_request))
+                workers.add(task)
+                task.add_done_callback(workers.discard)
+        finally:
+            for task in workers:
+                task.cancel()
 
 
 # Global image queue instance
 image_queue = ImageQueue()
-
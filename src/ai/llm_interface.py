@@ -1,10 +1,14 @@
 """Abstract interface for LLM providers."""
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
 
 from .response_metadata import AIResponseMetadata
 
+# One item of a streamed response: a text delta (str), or — always last —
+# the AIResponseMetadata for the whole answer (full text, usage, latency).
+StreamItem = Union[str, AIResponseMetadata]
+
 
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
@@ -40,7 +44,8 @@ class LLMProvider(ABC):
         temperature: float = 0.7,
         task_type: str = "default",
         use_thinking: bool = False,
-        use_web_search: bool = False
+        use_web_search: bool = False,
+        use_cache: bool = False
     ) -> AIResponseMetadata:
         """
         Execute a prompt and return the response with metadata.
@@ -52,6 +57,7 @@ class LLMProvider(ABC):
             task_type: Type of task (for model selection)
             use_thinking: Enable deep thinking/reasoning mode
             use_web_search: Enable web search grounding
+            use_cache: Serve/store this idempotent call via the response cache
             
         Returns:
             AIResponseMetadata with response text and execution status
@@ -61,6 +67,46 @@ class LLMProvider(ABC):
         """
         pass
     
+    async def stream_prompt(
+        self,
+        user_prompt: str,
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        task_type: str = "default",
+        use_thinking: bool = False,
+        use_web_search: bool = False
+    ) -> AsyncIterator[StreamItem]:
+        """
+        Execute a prompt, yielding the answer as it is generated.
+        
+        Yields text deltas (``str``) as they arrive, then exactly one
+        ``AIResponseMetadata`` describing the complete answer. Providers
+        with native streaming override this; the default yields the whole
+        ``execute_prompt`` answer as a single delta.
+        
+        Args:
+            user_prompt: The user's prompt
+            max_tokens: Maximum tokens in response
+            temperature: Temperature for generation
+            task_type: Type of task (for model selection)
+            use_thinking: Enable deep thinking/reasoning mode
+            use_web_search: Enable web search grounding
+            
+        Raises:
+            AIProcessorError: If generation fails
+        """
+        result = await self.execute_prompt(
+            user_prompt=user_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            task_type=task_type,
+            use_thinking=use_thinking,
+            use_web_search=use_web_search
+        )
+        if result.response_text:
+            yield result.response_text
+        yield result
+    
     @abstractmethod
     async def translate_text(
         self,
@@ -90,16 +136,22 @@ class LLMProvider(ABC):
         messages: List[Dict[str, Any]],
         analysis_type: str = "summary",
         output_language: str = "english",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        progress_cb: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> str:
         """
         Analyze a list of messages.
         
+        Long transcripts are analyzed window by window and merged; the
+        windows report through ``progress_cb``.
+        
         Args:
             messages: List of message dictionaries
             analysis_type: Type of analysis to perform
             output_language: Output language for analysis
             use_thinking: Enable deep thinking mode
+            progress_cb: Optional async callback invoked as ``(done, total)``
+                windows while a long transcript is analyzed
             
         Returns:
             Analysis result
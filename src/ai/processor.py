@@ -1,8 +1,9 @@
 """AI processing functionality with multiple LLM provider support."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional
 
-from .llm_interface import LLMProvider
+from .chunked_analysis import ProgressCallback
+from .llm_interface import LLMProvider, StreamItem
 from .response_metadata import AIResponseMetadata
 from .providers import OpenRouterProvider, GeminiProvider
 from ..core.config import Config
@@ -294,11 +295,14 @@ class AIProcessor:
         temperature: float = 0.7,
         task_type: str = "prompt",
         use_thinking: bool = False,
-        use_web_search: bool = False
+        use_web_search: bool = False,
+        use_cache: bool = False
     ) -> AIResponseMetadata:
-        """Execute a custom prompt with configured provider fallback.
+        """Execute a custom prompt with configured provider fallback.
         
         Returns AIResponseMetadata with response text and execution status.
+        ``use_cache`` serves repeats of an idempotent prompt from the response
+        cache (the result is then marked ``cache_hit``).
         """
         if not self.is_configured:
             raise AIProcessorError(
@@ -318,7 +322,8 @@ class AIProcessor:
                 temperature=temperature,
                 task_type=task_type,
                 use_thinking=use_thinking,
-                use_web_search=use_web_search
+                use_web_search=use_web_search,
+                use_cache=use_cache
             )
         
         # Use fallback mechanism
@@ -331,9 +336,88 @@ class AIProcessor:
             max_tokens=max_tokens,
             temperature=temperature,
             task_type=task_type,
-            use_web_search=use_web_search
+            use_web_search=use_web_search,
+            use_cache=use_cache
         )
     
+    async def stream_custom_prompt(
+        self,
+        user_prompt: str,
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        task_type: str = "prompt",
+        use_thinking: bool = False,
+        use_web_search: bool = False
+    ) -> AsyncIterator[StreamItem]:
+        """Stream a custom prompt: text deltas, then the final AIResponseMetadata.
+        
+        The fallback provider takes over only if the primary fails before
+        its first delta; once text has been shown, switching providers would
+        splice two different answers, so later failures propagate.
+        """
+        if not self.is_configured:
+            raise AIProcessorError(
+                f"AI processor not configured. Provider: {self._config.llm_provider}"
+            )
+        
+        self._logger.info(
+            f"Streaming {task_type} prompt with {self.provider_name} "
+            f"(thinking={use_thinking}, web_search={use_web_search})"
+        )
+        kwargs = dict(
+            user_prompt=user_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            task_type=task_type,
+            use_web_search=use_web_search,
+        )
+        delivered = False
+        try:
+            async for item in self._provider.stream_prompt(use_thinking=use_thinking, **kwargs):
+                delivered = delivered or isinstance(item, str)
+                yield item
+            self._using_fallback = False
+            return
+        except Exception as e:
+            if delivered or self._fallback_provider is None:
+                if isinstance(e, AIProcessorError):
+                    raise
+                raise AIProcessorError(f"stream_custom_prompt failed: {e}")
+            primary_error = e
+        
+        self._logger.warning(
+            f"stream_custom_prompt: primary provider failed ({primary_error}); "
+            f"falling back to {self._fallback_provider.provider_name}"
+        )
+        self._using_fallback = True
+        fallback_thinking = (
+            use_thinking
+            if self._provider_supports_native_thinking(self._fallback_provider)
+            else False
+        )
+        try:
+            async for item in self._fallback_provider.stream_prompt(
+                use_thinking=fallback_thinking, **kwargs
+            ):
+                if isinstance(item, AIResponseMetadata):
+                    item.provider_fallback_applied = True
+                    item.provider_fallback_reason = f"Primary provider failed: {primary_error}"
+                    item.provider_used = item.provider_used or self._fallback_provider.provider_name
+                    if use_thinking and not fallback_thinking:
+                        item.thinking_requested = True
+                        item.thinking_applied = False
+                        item.fallback_reason = (
+                            f"{self._fallback_provider.provider_name} fallback "
+                            "(no native thinking)"
+                        )
+                yield item
+        except AIProcessorError:
+            raise
+        except Exception as fallback_error:
+            raise AIProcessorError(
+                f"Both primary and fallback providers failed: {fallback_error}"
+            )
+    
     async def translate_text_with_phonetics(
         self,
         text_to_translate: str,
@@ -376,7 +460,8 @@ class AIProcessor:
         max_messages: int = 10000,
         analysis_mode: str = "general",
         output_language: str = "english",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        progress_cb: Optional[ProgressCallback] = None
     ) -> AIResponseMetadata:
         """Analyze a collection of messages.
 
@@ -416,7 +501,8 @@ class AIProcessor:
                 messages=processed_messages,
                 analysis_type=analysis_mode,
                 output_language=output_language,
-                use_thinking=use_thinking
+                use_thinking=use_thinking,
+                progress_cb=progress_cb
             )
 
         # Route through configured provider fallback.
@@ -427,7 +513,8 @@ class AIProcessor:
             use_thinking=use_thinking,
             messages=processed_messages,
             analysis_type=analysis_mode,
-            output_language=output_language
+            output_language=output_language,
+            progress_cb=progress_cb
         )
     
     async def close(self) -> None:
@@ -455,11 +542,14 @@ class AIProcessor:
         messages_data: List[Dict[str, Any]],
         analysis_mode: str = "general",
         output_language: str = "english",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        progress_cb: Optional[ProgressCallback] = None
     ) -> AIResponseMetadata:
         """Analyze conversation messages (compatibility wrapper).
 
         Returns AIResponseMetadata (string-compatible via __str__/strip()).
+        Long chats are analyzed in windows; ``progress_cb(done, total)``
+        reports them.
         """
         # Convert to expected format for analyze_messages
         messages = []
@@ -483,7 +573,8 @@ class AIProcessor:
             participant_mapping=participant_mapping,
             analysis_mode=analysis_mode,
             output_language=output_language,
-            use_thinking=use_thinking
+            use_thinking=use_thinking,
+            progress_cb=progress_cb
         )
     
     async def answer_question_from_chat_history(
@@ -546,3 +637,37 @@ class AIProcessor:
                 else None
             ),
         )
+    
+    async def stream_answer_from_chat_history(
+        self,
+        messages_data: List[Dict[str, Any]],
+        user_question: str,
+        use_thinking: bool = False,
+        use_web_search: bool = False
+    ) -> AsyncIterator[StreamItem]:
+        """Streaming counterpart of ``answer_question_from_chat_history``.
+        
+        Builds the same tellme prompt and streams it via
+        ``stream_custom_prompt``.
+        """
+        from .prompts import build_question_prompt
+        
+        if not user_question:
+            raise AIProcessorError("No question provided")
+        history = [
+            f"{msg.get('sender', 'Unknown')}: {msg.get('text', '')}"
+            for msg in messages_data
+            if msg.get('text')
+        ]
+        if not history:
+            raise AIProcessorError("No messages provided for question answering")
+        
+        async for item in self.stream_custom_prompt(
+            user_prompt=build_question_prompt("persian", "\n".join(history), user_question),
+            max_tokens=32000,  # Full token budget for comprehensive Q&A
+            temperature=0.6,
+            task_type="tellme",
+            use_thinking=use_thinking,
+            use_web_search=use_web_search
+        ):
+            yield item
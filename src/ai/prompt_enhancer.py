@@ -1,6 +1,14 @@
-"""LLM-based prompt enhancement for image generation."""
+"""LLM-based prompt enhancement for image generation.
 
-from typing import Optional, Tuple
+Enhancement is a full LLM call. The image handler starts it with
+``start_enhancement`` as soon as a request is queued, so it overlaps the queue
+wait. Identical prompts share one in-flight call, and successful results are
+remembered so retries skip the LLM.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 from ..core.constants import MAX_IMAGE_PROMPT_LENGTH
 from ..utils.logging import get_logger
@@ -9,6 +17,8 @@ from .prompts import (
     IMAGE_PROMPT_ENHANCEMENT_PROMPT
 )
 
+ENHANCED_PROMPT_CACHE_SIZE = 256
+
 
 class PromptEnhancer:
     """Enhances user prompts for better image generation using LLM."""
@@ -22,8 +32,61 @@ class PromptEnhancer:
         """
         self._ai_processor = ai_processor
         self._logger = get_logger(self.__class__.__name__)
+        self._results: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def start_enhancement(self, user_prompt: str) -> "asyncio.Future[Tuple[str, str]]":
+        """
+        Begin enhancing a prompt in the background.
+
+        Args:
+            user_prompt: Original user prompt
+
+        Returns:
+            Future resolving to ``(enhanced_prompt, model_used)``; already
+            done when the prompt was enhanced before
+        """
+        cached = self._results.get(user_prompt)
+        if cached is not None:
+            self._results.move_to_end(user_prompt)
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached)
+            return future
+
+        task = self._pending.get(user_prompt)
+        if task is None:
+            task = asyncio.create_task(self._enhance_uncached(user_prompt))
+            self._pending[user_prompt] = task
+            task.add_done_callback(lambda t: self._remember(user_prompt, t))
+        return task
+
+    def _remember(self, user_prompt: str, task: asyncio.Task) -> None:
+        """Cache a finished enhancement unless it fell back to the original."""
+        self._pending.pop(user_prompt, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        if result[1] == "none":
+            return
+        self._results[user_prompt] = result
+        self._results.move_to_end(user_prompt)
+        while len(self._results) > ENHANCED_PROMPT_CACHE_SIZE:
+            self._results.popitem(last=False)
 
     async def enhance_prompt(self, user_prompt: str) -> Tuple[str, str]:
+        """
+        Enhance a user prompt, reusing a cached or in-flight enhancement.
+
+        Args:
+            user_prompt: Original user prompt
+
+        Returns:
+            Tuple of (enhanced_prompt, model_used), see ``_enhance_uncached``
+        """
+        # Shielded: a cancelled caller must not cancel a call others share
+        return await asyncio.shield(self.start_enhancement(user_prompt))
+
+    async def _enhance_uncached(self, user_prompt: str) -> Tuple[str, str]:
         """
         Enhance a user prompt for image generation using the LLM.
 
@@ -56,9 +119,19 @@ class PromptEnhancer:
                 user_prompt=enhancement_prompt,
                 max_tokens=2000,  # Short enhanced prompt
                 task_type="prompt_enhancer",
+                # Retries re-enhance the same prompt verbatim. Safe because
+                # placeholder replies are never cached (is_placeholder).
+                use_cache=True,
             )
             enhanced = result.response_text
 
+            if getattr(result, "is_placeholder", False):
+                # Canned error text standing in for an empty reply, not a prompt
+                self._logger.warning(
+                    "LLM returned no enhancement, using original prompt"
+                )
+                return (user_prompt, "none")
+
             if not enhanced or not enhanced.strip():
                 self._logger.warning(
                     "Empty response from LLM, using original prompt"
@@ -156,6 +156,10 @@ _ANALYZE_SECTIONS_EN = {
 }
 
 
+# Analysis types served by build_analysis_prompt (anything else → default summary).
+ANALYSIS_MODES: Final[tuple[str, ...]] = ("fun", "general", "romance", "persian_detailed")
+
+
 def build_analysis_prompt(
     analysis_type: str, language: str, messages_text: str, num_messages: int = 0
 ) -> str:
@@ -173,6 +177,48 @@ def build_analysis_prompt(
     )
 
 
+# ============================================================================
+# Map-reduce analysis of very long chats (window notes → merged analysis)
+# ============================================================================
+def build_window_notes_prompt(messages_text: str, index: int, total: int) -> str:
+    """Map step: compact, evidence-preserving notes for ONE window of a long chat.
+
+    The notes are intermediate (never shown to the user), so they stay plain text
+    and keep quotes verbatim in the chat's own language for the merge step.
+    """
+    return (
+        f"You are reading part {index} of {total} of a long chat, in chronological order. "
+        "Write compact working notes that a later step will merge with the notes of the other "
+        "parts into one analysis.\n"
+        "• Cover: topics and events (in order), decisions and open tasks, each person's role, "
+        "tone and behavior, tensions, jokes, and relationship signals.\n"
+        "• Keep 3-8 of the most telling direct quotes VERBATIM, each as: "
+        "[time] Sender: \"quote\".\n"
+        "• Use the senders' names exactly as written. Invent nothing; skip what isn't there.\n"
+        "• Plain text only — no HTML, no Markdown, no introduction. At most ~400 words.\n\n"
+        f"Chat part {index}/{total}:\n{messages_text}\n"
+    )
+
+
+def build_merge_analysis_prompt(
+    analysis_type: str, language: str, notes_text: str, num_messages: int, num_windows: int
+) -> str:
+    """Reduce step: the regular analysis prompt, run over the per-window notes."""
+    if language == "persian":
+        preface = (
+            f"(این متنِ خامِ چت نیست: یادداشت‌های {num_windows} بخشِ پشتِ‌سرهمِ یه چتِ "
+            f"{num_messages} پیامیه، به ترتیبِ زمانی. نقل‌قول‌ها عینِ چت‌ان. "
+            "همه‌ی بخش‌ها رو با هم یک‌جا تحلیل کن، نه بخش‌به‌بخش.)\n\n"
+        )
+    else:
+        preface = (
+            f"(Not the raw chat: these are notes on {num_windows} consecutive parts of a "
+            f"{num_messages}-message chat, in chronological order. Quotes are verbatim. "
+            "Analyze the whole conversation as one, not part by part.)\n\n"
+        )
+    return build_analysis_prompt(analysis_type, language, preface + notes_text, num_messages)
+
+
 # ============================================================================
 # Question answering from chat history (tellme) — builder
 # ============================================================================
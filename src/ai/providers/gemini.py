@@ -4,29 +4,53 @@ import asyncio
 import time
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional
 import pytz
 
-from ..llm_interface import LLMProvider
+from ..llm_interface import LLMProvider, StreamItem
 from ..response_metadata import AIResponseMetadata
 from ...core.exceptions import AIProcessorError
 from ...core.constants import COMPLEX_TASKS, SIMPLE_TASKS
 from ...utils.logging import get_logger
 from ..api_key_manager import initialize_gemini_key_manager
+from ..response_cache import get_response_cache, response_cache_key
 from ..prompts import (
     TRANSLATION_AUTO_DETECT_PROMPT,
     TRANSLATION_SOURCE_TARGET_PROMPT,
     VOICE_MESSAGE_SUMMARY_PROMPT,
     DEFAULT_CHAT_SUMMARY_PROMPT,
+    ANALYSIS_MODES,
     build_analysis_prompt,
     build_question_prompt,
 )
+from ..chunked_analysis import ProgressCallback, analyze_in_windows, estimate_tokens, needs_map_reduce
+from ..quota_tracker import QUOTA_MAX_HOLD_SECONDS, get_quota_tracker
+from ..http_transport import get_http_transport
 
 # Constants
 THINKING_BUDGET_DEFAULT: int = 4096
+# Requests allowed in flight on one API key at a time (all paths together).
+DEFAULT_MAX_CONCURRENCY_PER_KEY: int = 4
 THINKING_SUMMARY_MAX_CHARS: int = 600
 
 
+def _summarize_thinking(raw_thinking: Optional[str]) -> Optional[str]:
+    """Brief line-wise preview of the model's thought summary."""
+    if not raw_thinking:
+        return None
+    preview_lines = []
+    char_count = 0
+    for line in raw_thinking.strip().split('\n'):
+        if char_count + len(line) > THINKING_SUMMARY_MAX_CHARS:
+            break
+        preview_lines.append(line)
+        char_count += len(line)
+    thinking_summary = '\n'.join(preview_lines)
+    if len(raw_thinking) > len(thinking_summary):
+        thinking_summary += "\n[...truncated]"
+    return thinking_summary
+
+
 class GeminiProvider(LLMProvider):
     """Google Gemini provider for LLM operations with key rotation support."""
 
@@ -45,12 +69,22 @@ class GeminiProvider(LLMProvider):
         self._config = config
         self._logger = get_logger(self.__class__.__name__)
         self._client = None
-        self._clients: Dict[str, Any] = {}  # Cache clients per API key
+        self._clients: Dict[str, Any] = {}  # genai.Client per API key
+        self._key_slots: Dict[str, asyncio.Semaphore] = {}
+        self._max_concurrency_per_key = (
+            getattr(config, "gemini_key_max_concurrency", None) or DEFAULT_MAX_CONCURRENCY_PER_KEY
+        )
         
         # Initialize key manager if multiple keys available
         api_keys = getattr(config, 'gemini_api_keys', [])
         if api_keys:
-            self._key_manager = initialize_gemini_key_manager(api_keys, cooldown_seconds=60)
+            self._key_manager = initialize_gemini_key_manager(
+                api_keys,
+                cooldown_seconds=60,
+                scheduling=getattr(config, "gemini_key_scheduling", "least_loaded"),
+                rpm_limit=getattr(config, "gemini_key_rpm_limit", None),
+                rpd_limit=getattr(config, "gemini_key_rpd_limit", None),
+            )
             self._api_key = self._key_manager.get_current_key() if self._key_manager else None
             self._logger.info(f"Initialized with {len(api_keys)} Gemini API keys for rotation")
         else:
@@ -69,10 +103,12 @@ class GeminiProvider(LLMProvider):
         
         # Pro model fallback state - when Pro is exhausted, fallback to Flash
         self._pro_model_exhausted_until: Optional[datetime] = None
-        # Serializes legacy-SDK standard calls so a concurrent request can't
-        # change the GLOBAL genai key mid-flight (the thinking path uses a
-        # per-key Client and is unaffected).
-        self._genai_lock = asyncio.Lock()
+        # Client-side free-tier accounting; "off" (paid tiers) leaves quota
+        # decisions to Google's 429s alone.
+        self._quota = (
+            get_quota_tracker()
+            if getattr(config, "gemini_quota_tier", "off") == "free" else None
+        )
     
     @property
     def is_configured(self) -> bool:
@@ -180,38 +216,127 @@ class GeminiProvider(LLMProvider):
             # Default fallback
             return 16000
     
-    def _get_client(self, api_key: Optional[str] = None, model: Optional[str] = None):
-        """Get or create Gemini client for specified key and model."""
+    async def _acquire_key(self, model: str, prompt: str = ""):
+        """Lease a key with quota headroom for ``model``: ``(lease, key, reservation)``.
+
+        Without a key manager the single configured key is used and the
+        lease is None. ``key`` is None when every key is unavailable.
+
+        With the quota tracker on, keys whose minute window for ``model`` is
+        full are skipped; when every key is full the request is held until
+        one drains, and when every key's daily budget is spent it fails
+        without calling Google (Pro answers ``RETRY_WITH_FLASH``).
+        """
+        if self._quota is None:
+            if not self._key_manager:
+                return None, self._api_key, None
+            lease = self._key_manager.acquire_key()
+            return lease, lease.key if lease else None, None
+
+        tokens = estimate_tokens(prompt)
+        held = 0.0
+        while True:
+            # Check headroom before leasing: a lease counts as a request in
+            # the key manager, so only take one that will actually be sent.
+            if self._key_manager:
+                keys = self._key_manager.available_keys()
+            else:
+                keys = [self._api_key] if self._api_key else []
+            if not keys:
+                return None, None, None
+            headroom = {k: self._quota.wait_time(k, model, tokens) for k in keys}
+            if 0 in headroom.values():
+                if self._key_manager:
+                    lease = self._key_manager.acquire_key(eligible=lambda k: headroom.get(k) == 0)
+                    key = lease.key if lease else None
+                else:
+                    lease, key = None, keys[0]
+                if key is None:
+                    return lease, None, None
+                if any(w != 0 for w in headroom.values()):
+                    self._quota.reroutes += 1
+                return lease, key, self._quota.reserve(key, model, tokens)
+
+            waits = [w for w in headroom.values() if w is not None]
+            if not waits:
+                self._logger.warning(f"Local quota: daily budget for '{model}' spent on every key")
+                if model == self._model_pro and model != self._model_flash:
+                    self._mark_pro_model_exhausted()
+                    raise AIProcessorError("RETRY_WITH_FLASH: Pro model daily quota spent.")
+                raise AIProcessorError(
+                    "All Gemini API keys are exhausted for today. "
+                    "Requests per day (RPD) reset at midnight Pacific Time."
+                )
+            delay = min(waits)
+            if held + delay > QUOTA_MAX_HOLD_SECONDS:
+                raise AIProcessorError(
+                    f"Gemini '{model}' is rate-limited on every key. Try again in {delay:.0f}s."
+                )
+            self._logger.info(f"Local quota: '{model}' minute limit reached on every key, holding {delay:.1f}s")
+            await asyncio.sleep(delay + 0.05)
+            held += delay
+            self._quota.held_seconds += delay
+
+    def _reserve_retry(self, key: Optional[str], model: str, prompt: str, reservation):
+        """Count an in-key retry as its own request; returns its reservation."""
+        if self._quota is None or not key:
+            return reservation
+        return self._quota.reserve(key, model, estimate_tokens(prompt))
+
+    def _settle_quota(self, reservation, usage_meta) -> None:
+        """Correct a reservation's token estimate from ``usage_metadata``."""
+        if self._quota and reservation is not None:
+            self._quota.settle(reservation, getattr(usage_meta, "prompt_token_count", None) if usage_meta else None)
+
+    def _note_quota_429(self, key: Optional[str], model: str) -> None:
+        """A 429 got through anyway: keep the tracker off this key/model for a minute."""
+        if self._quota and key:
+            self._quota.note_rate_limited(key, model)
+
+    def _note_quota_day_exhausted(self, key: Optional[str], model: str) -> None:
+        """The key was written off until midnight Pacific: stop routing ``model`` to it."""
+        if self._quota and key:
+            self._quota.note_day_exhausted(key, model)
+
+    def _release_key(self, lease, success: bool = False) -> None:
+        """Hand a leased key back (idempotent); ``success`` records its latency."""
+        if lease is not None and self._key_manager:
+            self._key_manager.release_key(lease, success=success)
+
+    def _get_client(self, api_key: Optional[str] = None):
+        """Get or create the ``genai.Client`` for a key.
+
+        One client per key, all on the shared HTTP transport. Each client
+        carries its own key, so concurrent requests on different keys never
+        touch process-global SDK state.
+        """
         key = api_key or self._api_key
-        model_name = model or self._model
-        
         if not key:
             raise AIProcessorError("Gemini API key not configured or invalid")
         
-        # Create cache key
-        cache_key = f"{key[:8]}_{model_name}"
-        
-        if cache_key not in self._clients:
+        client = self._clients.get(key)
+        if client is None:
             try:
-                import google.generativeai as genai
-                
-                # Configure the GenAI library with the API key
-                genai.configure(api_key=key)
-                
-                # Create client with model
-                self._clients[cache_key] = genai.GenerativeModel(model_name)
-                
-                masked_key = f"{key[:8]}...{key[-4:]}" if len(key) > 12 else "***"
-                self._logger.info(f"Initialized Gemini client: key={masked_key}, model={model_name}")
+                from google import genai
                 
+                client = genai.Client(api_key=key, http_options=get_http_transport().genai_http_options())
             except ImportError:
                 raise AIProcessorError(
-                    "Google GenAI library not installed. Run: pip install google-generativeai"
+                    "Google GenAI library not installed. Run: pip install google-genai"
                 )
             except Exception as e:
                 raise AIProcessorError(f"Failed to initialize Gemini client: {e}")
-        
-        return self._clients[cache_key]
+            self._clients[key] = client
+            masked_key = f"{key[:8]}...{key[-4:]}" if len(key) > 12 else "***"
+            self._logger.info(f"Initialized Gemini client: key={masked_key}")
+        return client
+    
+    def _key_slot(self, api_key: str) -> asyncio.Semaphore:
+        """Per-key concurrency cap; requests on other keys are unaffected."""
+        slot = self._key_slots.get(api_key)
+        if slot is None:
+            slot = self._key_slots[api_key] = asyncio.Semaphore(self._max_concurrency_per_key)
+        return slot
     
     async def _execute_with_native_thinking(
         self,
@@ -237,7 +362,6 @@ class GeminiProvider(LLMProvider):
         Returns:
             AIResponseMetadata with thinking_summary populated
         """
-        from google import genai
         from google.genai import types
 
         max_retries = 3
@@ -259,11 +383,7 @@ class GeminiProvider(LLMProvider):
         
         while keys_tried < max_key_attempts:
             # Get current API key
-            current_key = (
-                self._key_manager.get_current_key() 
-                if self._key_manager 
-                else self._api_key
-            )
+            lease, current_key, reservation = await self._acquire_key(model, prompt)
             
             if not current_key:
                 if self._key_manager and self._key_manager.all_keys_exhausted():
@@ -272,190 +392,206 @@ class GeminiProvider(LLMProvider):
                     )
                 raise AIProcessorError("No valid Gemini API key available")
             
-            # Create client with new SDK
-            client = genai.Client(api_key=current_key)
+            client = self._get_client(current_key)
             
-            for attempt in range(max_retries):
-                try:
-                    self._logger.info(
-                        f"[THINKING] Attempt {attempt + 1}: model={model}, "
-                        f"key={current_key[:8]}..."
-                    )
+            try:
+                for attempt in range(max_retries):
+                    if attempt:
+                        reservation = self._reserve_retry(current_key, model, prompt, reservation)
+                    try:
+                        self._logger.info(
+                            f"[THINKING] Attempt {attempt + 1}: model={model}, "
+                            f"key={current_key[:8]}..."
+                        )
                     
-                    # Build thinking config with include_thoughts=True
-                    thinking_config = types.ThinkingConfig(
-                        thinking_budget=THINKING_BUDGET_DEFAULT,
-                        include_thoughts=True
-                    )
+                        # Build thinking config with include_thoughts=True
+                        thinking_config = types.ThinkingConfig(
+                            thinking_budget=THINKING_BUDGET_DEFAULT,
+                            include_thoughts=True
+                        )
                     
-                    config = types.GenerateContentConfig(
-                        temperature=temperature,
-                        max_output_tokens=max_tokens,
-                        thinking_config=thinking_config
-                    )
+                        config = types.GenerateContentConfig(
+                            temperature=temperature,
+                            max_output_tokens=max_tokens,
+                            thinking_config=thinking_config
+                        )
                     
-                    # Execute with thinking using ASYNC client
-                    self._logger.debug(
-                        f"[THINKING] Calling async generate_content with model={model}, "
-                        f"budget={thinking_config.thinking_budget}"
-                    )
-                    response = await client.aio.models.generate_content(
-                        model=model,
-                        contents=prompt,
-                        config=config
-                    )
-                    usage_meta = getattr(response, "usage_metadata", None)
-
-                    # Debug logging for troubleshooting (only in debug mode)
-                    if self._logger.isEnabledFor(logging.DEBUG):
+                        # Execute with thinking using ASYNC client
                         self._logger.debug(
-                            f"[THINKING-DEBUG] Response type: {type(response)}, "
-                            f"has_candidates: {bool(response.candidates)}"
+                            f"[THINKING] Calling async generate_content with model={model}, "
+                            f"budget={thinking_config.thinking_budget}"
                         )
-                        if response.candidates and response.candidates[0].content.parts:
+                        async with self._key_slot(current_key):
+                            response = await client.aio.models.generate_content(
+                                model=model,
+                                contents=prompt,
+                                config=config
+                            )
+                        usage_meta = getattr(response, "usage_metadata", None)
+
+                        # Debug logging for troubleshooting (only in debug mode)
+                        if self._logger.isEnabledFor(logging.DEBUG):
                             self._logger.debug(
-                                f"[THINKING-DEBUG] Found {len(response.candidates[0].content.parts)} parts"
+                                f"[THINKING-DEBUG] Response type: {type(response)}, "
+                                f"has_candidates: {bool(response.candidates)}"
                             )
+                            if response.candidates and response.candidates[0].content.parts:
+                                self._logger.debug(
+                                    f"[THINKING-DEBUG] Found {len(response.candidates[0].content.parts)} parts"
+                                )
                     
-                    # Extract parts: thought=True is reasoning, thought=None/False is answer
-                    raw_thinking = None
-                    answer_text = None
+                        # Extract parts: thought=True is reasoning, thought=None/False is answer
+                        raw_thinking = None
+                        answer_text = None
                     
-                    if response.candidates and response.candidates[0].content.parts:
-                        for part in response.candidates[0].content.parts:
-                            if not hasattr(part, 'text') or not part.text:
-                                continue
+                        if response.candidates and response.candidates[0].content.parts:
+                            for part in response.candidates[0].content.parts:
+                                if not hasattr(part, 'text') or not part.text:
+                                    continue
                             
-                            is_thinking_part = getattr(part, 'thought', None) is True
+                                is_thinking_part = getattr(part, 'thought', None) is True
                             
-                            if is_thinking_part:
-                                raw_thinking = part.text
-                                self._logger.info(
-                                    f"Found thinking part: {len(raw_thinking)} chars"
-                                )
-                            else:
-                                answer_text = part.text
-                                self._logger.info(
-                                    f"Found answer part: {len(answer_text)} chars"
-                                )
+                                if is_thinking_part:
+                                    raw_thinking = part.text
+                                    self._logger.info(
+                                        f"Found thinking part: {len(raw_thinking)} chars"
+                                    )
+                                else:
+                                    answer_text = part.text
+                                    self._logger.info(
+                                        f"Found answer part: {len(answer_text)} chars"
+                                    )
                     
-                    # Fallback to response.text if no answer found
-                    if not answer_text:
-                        answer_text = response.text if hasattr(response, 'text') else ""
+                        # Fallback to response.text if no answer found
+                        if not answer_text:
+                            answer_text = response.text if hasattr(response, 'text') else ""
                     
-                    # Create brief summary of thinking
-                    thinking_summary = None
-                    if raw_thinking:
-                        lines = raw_thinking.strip().split('\n')
-                        preview_lines = []
-                        char_count = 0
-                        for line in lines:
-                            if char_count + len(line) > THINKING_SUMMARY_MAX_CHARS:
-                                break
-                            preview_lines.append(line)
-                            char_count += len(line)
-                        thinking_summary = '\n'.join(preview_lines)
-                        if len(raw_thinking) > len(thinking_summary):
-                            thinking_summary += "\n[...truncated]"
+                        # Create brief summary of thinking
+                        thinking_summary = _summarize_thinking(raw_thinking)
                     
-                    # Log thinking result (debug level only)
-                    if raw_thinking:
-                        self._logger.debug(
-                            f"[THINKING] Received thinking parts: "
-                            f"{len(raw_thinking)} chars, summary: {len(thinking_summary or '')} chars"
-                        )
-                    else:
-                        self._logger.warning(
-                            f"[THINKING] No thinking parts in response for model={model}. "
-                            f"Model may not support thinking mode or API issue occurred."
-                        )
+                        # Log thinking result (debug level only)
+                        if raw_thinking:
+                            self._logger.debug(
+                                f"[THINKING] Received thinking parts: "
+                                f"{len(raw_thinking)} chars, summary: {len(thinking_summary or '')} chars"
+                            )
+                        else:
+                            self._logger.warning(
+                                f"[THINKING] No thinking parts in response for model={model}. "
+                                f"Model may not support thinking mode or API issue occurred."
+                            )
                     
-                    # Mark key as successful
-                    if self._key_manager:
-                        self._key_manager.mark_success()
+                        # Mark key as successful
+                        if self._key_manager:
+                            self._release_key(lease, success=True)
+                        self._settle_quota(reservation, usage_meta)
                     
-                    self._logger.info(
-                        f"Native thinking completed. "
-                        f"Answer: {len(answer_text or '')} chars, "
-                        f"Thinking: {len(raw_thinking or '')} chars"
-                    )
+                        self._logger.info(
+                            f"Native thinking completed. "
+                            f"Answer: {len(answer_text or '')} chars, "
+                            f"Thinking: {len(raw_thinking or '')} chars"
+                        )
                     
-                    latency = time.monotonic() - started
-                    in_tok = getattr(usage_meta, "prompt_token_count", None) if usage_meta else None
-                    out_tok = getattr(usage_meta, "candidates_token_count", None) if usage_meta else None
+                        latency = time.monotonic() - started
+                        in_tok = getattr(usage_meta, "prompt_token_count", None) if usage_meta else None
+                        out_tok = getattr(usage_meta, "candidates_token_count", None) if usage_meta else None
 
-                    return AIResponseMetadata(
-                        response_text=answer_text.strip() if answer_text else "",
-                        thinking_requested=True,
-                        thinking_applied=True,
-                        thinking_summary=thinking_summary,
-                        web_search_requested=use_web_search,
-                        web_search_applied=False,
-                        model_used=model,
-                        provider_used=self.provider_name,
-                        latency_seconds=latency,
-                        input_tokens=in_tok,
-                        output_tokens=out_tok,
-                    )
+                        return AIResponseMetadata(
+                            response_text=answer_text.strip() if answer_text else "",
+                            thinking_requested=True,
+                            thinking_applied=True,
+                            thinking_summary=thinking_summary,
+                            web_search_requested=use_web_search,
+                            web_search_applied=False,
+                            model_used=model,
+                            provider_used=self.provider_name,
+                            latency_seconds=latency,
+                            input_tokens=in_tok,
+                            output_tokens=out_tok,
+                        )
                     
-                except Exception as e:
-                    last_error = e
-                    error_str = str(e).lower()
+                    except Exception as e:
+                        last_error = e
+                        error_str = str(e).lower()
                     
-                    # Check for rate limit (429)
-                    is_429 = "429" in error_str or "rate" in error_str
+                        # Check for rate limit (429)
+                        is_429 = "429" in error_str or "rate" in error_str
+                        if is_429:
+                            self._note_quota_429(current_key, model)
                     
-                    if is_429 and self._key_manager:
-                        self._logger.warning(
-                            f"Thinking mode: 429 rate limit hit. "
-                            f"Rotating key and retrying..."
-                        )
-                        has_more_keys = self._key_manager.mark_key_exhausted_for_day()
-                        if has_more_keys:
-                            keys_tried += 1
-                            retry_delay = 1.0
-                            break  # Try next key
-                        else:
-                            # All keys exhausted - try Flash if we were using Pro
-                            if model == self._model_pro:
-                                self._mark_pro_model_exhausted()
-                                raise AIProcessorError(
-                                    "RETRY_WITH_FLASH: All Pro keys exhausted"
-                                )
-                            raise AIProcessorError(
-                                "All Gemini API keys are exhausted for today. "
-                                "Please try again later."
+                        if is_429 and self._key_manager:
+                            self._logger.warning(
+                                f"Thinking mode: 429 rate limit hit. "
+                                f"Rotating key and retrying..."
                             )
-                    
-                    self._logger.error(
-                        f"Thinking mode attempt {attempt + 1} failed: {e}"
-                    )
-                    
-                    if attempt < max_retries - 1:
-                        self._logger.info(f"Retrying in {retry_delay}s...")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        # All attempts failed for this key
-                        if self._key_manager:
-                            self._key_manager.mark_key_error()
-                            if not self._key_manager.all_keys_exhausted():
+                            self._note_quota_day_exhausted(current_key, model)
+                            has_more_keys = self._key_manager.mark_key_exhausted_for_day(current_key)
+                            if has_more_keys:
                                 keys_tried += 1
                                 retry_delay = 1.0
                                 break  # Try next key
-                        # No more keys or no key manager
-                        raise AIProcessorError(
-                            f"Thinking mode failed after {max_retries} attempts: {e}"
+                            else:
+                                # All keys exhausted - try Flash if we were using Pro
+                                if model == self._model_pro:
+                                    self._mark_pro_model_exhausted()
+                                    raise AIProcessorError(
+                                        "RETRY_WITH_FLASH: All Pro keys exhausted"
+                                    )
+                                raise AIProcessorError(
+                                    "All Gemini API keys are exhausted for today. "
+                                    "Please try again later."
+                                )
+                    
+                        self._logger.error(
+                            f"Thinking mode attempt {attempt + 1} failed: {e}"
                         )
-            else:
-                # Inner loop completed without break - all attempts exhausted
-                break
+                    
+                        if attempt < max_retries - 1:
+                            self._logger.info(f"Retrying in {retry_delay}s...")
+                            await asyncio.sleep(retry_delay)
+                            retry_delay *= 2
+                        else:
+                            # All attempts failed for this key
+                            if self._key_manager:
+                                self._key_manager.mark_key_error(current_key)
+                                if not self._key_manager.all_keys_exhausted():
+                                    keys_tried += 1
+                                    retry_delay = 1.0
+                                    break  # Try next key
+                            # No more keys or no key manager
+                            raise AIProcessorError(
+                                f"Thinking mode failed after {max_retries} attempts: {e}"
+                            )
+                else:
+                    # Inner loop completed without break - all attempts exhausted
+                    break
+            finally:
+                self._release_key(lease)
         
         # All keys exhausted
         raise AIProcessorError(
             f"Thinking mode failed with all available keys. Last error: {last_error}"
         )
 
+    def _model_for_request(self, task_type: str, use_web_search: bool) -> str:
+        """Select the model for one request from its task type and web flag."""
+        model = self.get_model_for_task(task_type)
+
+        # Web-search grounding is currently only available on Gemini 2.5
+        # Flash via the free tier; Gemini 3.x doesn't expose the Search
+        # tool in the same way, so override the task-tier choice for any
+        # ``=web`` request. ``get_model_for_task`` stays pure on its
+        # ``task_type`` argument; the routing lives in the calling layer.
+        if use_web_search:
+            web_model = getattr(self._config, "gemini_model_web_search", None)
+            if web_model and web_model != model:
+                self._logger.info(
+                    f"use_web_search=True; overriding model "
+                    f"'{model}' -> '{web_model}'"
+                )
+                model = web_model
+        return model
+
     async def execute_prompt(
         self,
         user_prompt: str,
@@ -464,9 +600,14 @@ class GeminiProvider(LLMProvider):
         task_type: str = "default",
         use_thinking: bool = False,
         use_web_search: bool = False,
+        use_cache: bool = False,
         _is_model_fallback_retry: bool = False
     ) -> AIResponseMetadata:
-        """Execute a prompt using Google Gemini with retry logic and key rotation."""
+        """Execute a prompt using Google Gemini with retry logic and key rotation.
+
+        ``use_cache`` opts an idempotent call (translate, prompt enhancement)
+        into the content-addressed response cache.
+        """
         self._logger.info(
             f"[TRACE] execute_prompt called: use_thinking={use_thinking}, "
             f"task_type={task_type}, _is_model_fallback_retry={_is_model_fallback_retry}"
@@ -478,25 +619,18 @@ class GeminiProvider(LLMProvider):
         if not self.is_configured:
             raise AIProcessorError("Gemini API key not configured or invalid")
         
-        # Select model based on task type
-        model = self.get_model_for_task(task_type)
-
-        # Web-search grounding is currently only available on Gemini 2.5
-        # Flash via the free tier; Gemini 3.x doesn't expose the Search
-        # tool in the same way, so override the task-tier choice for any
-        # ``=web`` request. ``get_model_for_task`` stays pure on its
-        # ``task_type`` argument; the routing lives in the calling layer.
-        if use_web_search:
-            web_model = getattr(self._config, "gemini_model_web_search", None)
-            if web_model and web_model != model:
-                self._logger.info(
-                    f"use_web_search=True; overriding model "
-                    f"'{model}' -> '{web_model}'"
-                )
-                model = web_model
+        model = self._model_for_request(task_type, use_web_search)
 
         # Prompt is already self-contained (system messages merged into prompts)
         full_prompt = user_prompt
+
+        cache_key = None
+        if use_cache and not (use_thinking or use_web_search or _is_model_fallback_retry):
+            cache_key = response_cache_key(task_type, model, full_prompt, temperature)
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                self._logger.info(f"Response cache hit: task={task_type}, model={model}")
+                return cached
         
         # Track if we're using model fallback
         model_fallback_applied = _is_model_fallback_retry
@@ -516,6 +650,8 @@ class GeminiProvider(LLMProvider):
             if model_fallback_applied:
                 result.model_fallback_applied = True
                 result.model_fallback_reason = model_fallback_reason
+            if cache_key is not None:
+                get_response_cache().put(cache_key, result)
             return result
         except AIProcessorError as e:
             # Check if we should retry with Flash model
@@ -587,245 +723,399 @@ class GeminiProvider(LLMProvider):
         # Track web search usage - may be disabled if 403 error occurs
         actual_use_web_search = use_web_search
         web_search_fallback_reason = None
+
+        from google.genai import types
         
         while keys_tried < max_key_attempts:
             # Get current API key
-            current_key = self._key_manager.get_current_key() if self._key_manager else self._api_key
+            lease, current_key, reservation = await self._acquire_key(model, full_prompt)
             
             if not current_key:
                 if self._key_manager and self._key_manager.all_keys_exhausted():
                     raise AIProcessorError("All Gemini API keys are rate-limited. Please try again later.")
                 raise AIProcessorError("No valid Gemini API key available")
             
-            for attempt in range(max_retries):
-                try:
-                    client = self._get_client(api_key=current_key, model=model)
+            try:
+                for attempt in range(max_retries):
+                    placeholder = False
+                    if attempt:
+                        reservation = self._reserve_retry(current_key, model, full_prompt, reservation)
+                    try:
+                        client = self._get_client(current_key)
 
-                    self._logger.info(
-                        f"Attempt {attempt + 1}: Sending prompt to Gemini '{model}'. "
-                        f"Prompt length: {len(full_prompt)} chars"
-                    )
+                        self._logger.info(
+                            f"Attempt {attempt + 1}: Sending prompt to Gemini '{model}'. "
+                            f"Prompt length: {len(full_prompt)} chars"
+                        )
                     
-                    # Configure the generation parameters
-                    # Use the max_tokens parameter instead of hardcoded value
-                    generation_config = {
-                        "temperature": temperature,
-                        "top_p": 0.95,
-                        "top_k": 40,
-                        "max_output_tokens": max_tokens,
-                    }
-
-                    # Prepare tools for web search if enabled
-                    tools = None
-                    if actual_use_web_search:
-                        try:
-                            import google.generativeai as genai
-                            # Enable Google Search tool using correct protobuf format
-                            # Tool.GoogleSearch is a nested class, not a top-level GoogleSearch
-                            google_search_tool = genai.protos.Tool(
-                                google_search=genai.protos.Tool.GoogleSearch()
-                            )
-                            tools = [google_search_tool]
+                        # Prepare tools for web search if enabled
+                        tools = None
+                        if actual_use_web_search:
+                            tools = [types.Tool(google_search=types.GoogleSearch())]
                             self._logger.info("Google Search tool enabled for this request")
-                        except Exception as e:
-                            self._logger.warning(
-                                f"Failed to enable Google Search tool: {e}. "
-                                "Continuing without web search."
-                            )
-                            tools = None  # Ensure tools is None if setup fails
+
+                        # Use the max_tokens parameter instead of hardcoded value
+                        generation_config = types.GenerateContentConfig(
+                            temperature=temperature,
+                            top_p=0.95,
+                            top_k=40,
+                            max_output_tokens=max_tokens,
+                            tools=tools,
+                        )
                     
-                    # Use asyncio to run the async call with timeout.
-                    # The legacy SDK keys requests via a GLOBAL genai.configure(),
-                    # so we serialize configure+call under a lock and re-assert
-                    # the current key right before the request. This prevents a
-                    # concurrent request from swapping the global key mid-flight
-                    # (a real correctness risk under the panel's concurrency).
-                    import google.generativeai as _genai_legacy
-                    try:
-                        # Build request parameters
-                        async with self._genai_lock:
-                            _genai_legacy.configure(api_key=current_key)
-                            if tools:
+                        # Per-key async client: requests on other keys (and up
+                        # to the per-key cap on this one) run concurrently.
+                        try:
+                            async with self._key_slot(current_key):
                                 response = await asyncio.wait_for(
-                                    client.generate_content_async(
-                                        full_prompt,
-                                        tools=tools
+                                    client.aio.models.generate_content(
+                                        model=model,
+                                        contents=full_prompt,
+                                        config=generation_config
                                     ),
                                     timeout=300 # 5 minute timeout for LLM response
                                 )
-                            else:
-                                response = await asyncio.wait_for(
-                                    client.generate_content_async(full_prompt),
-                                    timeout=300 # 5 minute timeout for LLM response
-                                )
-                    except asyncio.TimeoutError:
-                        self._logger.error(f"LLM response timed out after 5 minutes for model '{model}'")
-                        raise AIProcessorError("Request timed out. The LLM did not respond within the expected time. Try again later or with a shorter prompt.")
+                        except asyncio.TimeoutError:
+                            self._logger.error(f"LLM response timed out after 5 minutes for model '{model}'")
+                            raise AIProcessorError("Request timed out. The LLM did not respond within the expected time. Try again later or with a shorter prompt.")
 
-                    # Capture usage stats for the metadata footer (may be None).
-                    usage_meta = getattr(response, "usage_metadata", None)
+                        # Capture usage stats for the metadata footer (may be None).
+                        usage_meta = getattr(response, "usage_metadata", None)
 
-                    # Extract text from response
-                    response_text = None
+                        # Extract text from response
+                        response_text = None
                     
-                    # First try direct text attribute
-                    if response and hasattr(response, 'text') and response.text:
-                        response_text = response.text.strip()
-                        self._logger.info(f"Got response text directly: {len(response_text)} chars")
-                    elif response and hasattr(response, 'candidates') and response.candidates:
-                        # If text attribute not available, check candidates
-                        for candidate in response.candidates:
-                            if hasattr(candidate, 'content') and candidate.content:
-                                if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                                    # Extract text from parts
-                                    text_parts = []
-                                    for part in candidate.content.parts:
-                                        if hasattr(part, 'text') and part.text:
-                                            text_parts.append(part.text)
-                                    if text_parts:
-                                        response_text = ' '.join(text_parts).strip()
-                                        self._logger.info(f"Got response text from parts: {len(response_text)} chars")
-                                        break
+                        # First try direct text attribute
+                        if response and hasattr(response, 'text') and response.text:
+                            response_text = response.text.strip()
+                            self._logger.info(f"Got response text directly: {len(response_text)} chars")
+                        elif response and hasattr(response, 'candidates') and response.candidates:
+                            # If text attribute not available, check candidates
+                            for candidate in response.candidates:
+                                if hasattr(candidate, 'content') and candidate.content:
+                                    if hasattr(candidate.content, 'parts') and candidate.content.parts:
+                                        # Extract text from parts
+                                        text_parts = []
+                                        for part in candidate.content.parts:
+                                            if hasattr(part, 'text') and part.text:
+                                                text_parts.append(part.text)
+                                        if text_parts:
+                                            response_text = ' '.join(text_parts).strip()
+                                            self._logger.info(f"Got response text from parts: {len(response_text)} chars")
+                                            break
                     
-                    # Check for safety blocks or other issues
-                    if not response_text:
-                        if hasattr(response, 'prompt_feedback'):
-                            feedback = response.prompt_feedback
-                            self._logger.error(f"Prompt feedback: {feedback}")
-                            if 'block_reason' in str(feedback).lower():
-                                raise AIProcessorError("Content was blocked by safety filters. Try rephrasing.")
+                        # Check for safety blocks or other issues
+                        if not response_text:
+                            if hasattr(response, 'prompt_feedback'):
+                                feedback = response.prompt_feedback
+                                self._logger.error(f"Prompt feedback: {feedback}")
+                                if 'block_reason' in str(feedback).lower():
+                                    raise AIProcessorError("Content was blocked by safety filters. Try rephrasing.")
                         
-                        # If this is not the last attempt, retry
-                        if attempt < max_retries - 1:
-                            self._logger.warning(f"No response on attempt {attempt + 1}, retrying in {retry_delay} seconds...")
-                            await asyncio.sleep(retry_delay)
-                            retry_delay *= 2  # Exponential backoff
-                            continue
-                        else:
-                            # Last attempt failed - return user-friendly error message
-                            response_text = (
-                                "⚠️ <b>Processing Error</b>\n\n"
-                                "I received your request but couldn't generate a proper response.\n\n"
-                                "<i>💡 This may be due to API issues or content filtering. Please try again.</i>"
-                            )
+                            # If this is not the last attempt, retry
+                            if attempt < max_retries - 1:
+                                self._logger.warning(f"No response on attempt {attempt + 1}, retrying in {retry_delay} seconds...")
+                                await asyncio.sleep(retry_delay)
+                                retry_delay *= 2  # Exponential backoff
+                                continue
+                            else:
+                                # Last attempt failed - return user-friendly error message
+                                placeholder = True
+                                response_text = (
+                                    "⚠️ <b>Processing Error</b>\n\n"
+                                    "I received your request but couldn't generate a proper response.\n\n"
+                                    "<i>💡 This may be due to API issues or content filtering. Please try again.</i>"
+                                )
                     
-                    if response_text:
-                        # Mark key as successful
-                        if self._key_manager:
-                            self._key_manager.mark_success()
+                        if response_text:
+                            # Mark key as successful
+                            if self._key_manager:
+                                self._release_key(lease, success=True)
+                            self._settle_quota(reservation, usage_meta)
 
-                        self._logger.info(
-                            f"Gemini '{model}' completed successfully. Response: {len(response_text)} chars"
-                        )
+                            self._logger.info(
+                                f"Gemini '{model}' completed successfully. Response: {len(response_text)} chars"
+                            )
                         
-                        # Build and return metadata with execution status
-                        # Thinking is considered applied if it was requested and we got a response
-                        # (since it's prompt-based, if the API call succeeded, thinking worked)
-                        latency = time.monotonic() - started
-                        in_tok = getattr(usage_meta, "prompt_token_count", None) if usage_meta else None
-                        out_tok = getattr(usage_meta, "candidates_token_count", None) if usage_meta else None
+                            # Build and return metadata with execution status
+                            # Thinking is considered applied if it was requested and we got a response
+                            # (since it's prompt-based, if the API call succeeded, thinking worked)
+                            latency = time.monotonic() - started
+                            in_tok = getattr(usage_meta, "prompt_token_count", None) if usage_meta else None
+                            out_tok = getattr(usage_meta, "candidates_token_count", None) if usage_meta else None
 
-                        return AIResponseMetadata(
-                            response_text=response_text,
-                            thinking_requested=use_thinking,
-                            thinking_applied=use_thinking,  # Prompt-based, always works if response received
-                            web_search_requested=use_web_search,
-                            web_search_applied=use_web_search and actual_use_web_search and tools is not None,
-                            fallback_reason=web_search_fallback_reason,
-                            model_used=model,
-                            provider_used=self.provider_name,
-                            latency_seconds=latency,
-                            input_tokens=in_tok,
-                            output_tokens=out_tok,
-                        )
+                            return AIResponseMetadata(
+                                response_text=response_text,
+                                thinking_requested=use_thinking,
+                                thinking_applied=use_thinking,  # Prompt-based, always works if response received
+                                web_search_requested=use_web_search,
+                                web_search_applied=use_web_search and actual_use_web_search and tools is not None,
+                                fallback_reason=web_search_fallback_reason,
+                                model_used=model,
+                                provider_used=self.provider_name,
+                                latency_seconds=latency,
+                                input_tokens=in_tok,
+                                output_tokens=out_tok,
+                                is_placeholder=placeholder,
+                            )
 
-                except Exception as e:
-                    error_str = str(e).lower()
+                    except Exception as e:
+                        error_str = str(e).lower()
 
-                    # Try to get an HTTP status code if available (no regex needed)
-                    status_code = None
-                    response = getattr(e, "response", None)
-                    if response is not None:
-                        status_code = getattr(response, "status_code", None)
+                        # Try to get an HTTP status code if available (no regex needed)
+                        status_code = getattr(e, "code", None)
+                        response = getattr(e, "response", None)
+                        if response is not None:
+                            status_code = getattr(response, "status_code", None) or status_code
                     
-                    # Check for 403 Permission Denied (often means Google Search tool not available)
-                    is_403 = (status_code == 403) or ("403" in error_str) or ("permissiondenied" in error_str)
+                        # Check for 403 Permission Denied (often means Google Search tool not available)
+                        is_403 = (status_code == 403) or ("403" in error_str) or ("permissiondenied" in error_str)
                     
-                    # If 403 and web search was enabled, disable it and retry
-                    if is_403 and actual_use_web_search:
-                        self._logger.warning(
-                            f"Google Search tool returned 403 (Permission Denied). "
-                            f"This may indicate the tool is not available for your API key or requires special permissions. "
-                            f"Continuing without web search..."
-                        )
-                        # Disable web search for remaining attempts and track the fallback
-                        actual_use_web_search = False
-                        web_search_fallback_reason = "API returned 403 - billing may be required"
-                        # Continue to retry without web search
-                        if attempt < max_retries - 1:
-                            continue
-
-                    is_429 = (status_code == 429) or ("429" in error_str)
-
-                    if is_429:
-                        # Check if this is a Pro model request - if so, don't
-                        # exhaust keys, just mark Pro model as exhausted
-                        if model == self._model_pro and model != self._model_flash:
+                        # If 403 and web search was enabled, disable it and retry
+                        if is_403 and actual_use_web_search:
                             self._logger.warning(
-                                "Gemini Pro model returned 429. "
-                                "Marking Pro model exhausted and falling back to Flash."
+                                f"Google Search tool returned 403 (Permission Denied). "
+                                f"This may indicate the tool is not available for your API key or requires special permissions. "
+                                f"Continuing without web search..."
                             )
-                            self._mark_pro_model_exhausted()
-                            raise AIProcessorError(
-                                "RETRY_WITH_FLASH: Pro model quota exhausted. "
-                                "Falling back to Flash model."
-                            )
-                        
-                        # For Flash model 429s, exhaust keys as before
-                        if self._key_manager:
-                            self._logger.warning(
-                                "Gemini returned 429 (rate limit / quota). "
-                                "Marking current key exhausted until next Pacific midnight "
-                                "and rotating to another key if available."
-                            )
-                            has_more_keys = self._key_manager.mark_key_exhausted_for_day()
-                            if has_more_keys:
-                                # Break inner loop to try next key
-                                keys_tried += 1
-                                retry_delay = 1.0  # Reset delay for new key
-                                break
-                            else:
+                            # Disable web search for remaining attempts and track the fallback
+                            actual_use_web_search = False
+                            web_search_fallback_reason = "API returned 403 - billing may be required"
+                            # Continue to retry without web search
+                            if attempt < max_retries - 1:
+                                continue
+
+                        is_429 = (status_code == 429) or ("429" in error_str)
+
+                        if is_429:
+                            self._note_quota_429(current_key, model)
+                            # Check if this is a Pro model request - if so, don't
+                            # exhaust keys, just mark Pro model as exhausted
+                            if model == self._model_pro and model != self._model_flash:
+                                self._logger.warning(
+                                    "Gemini Pro model returned 429. "
+                                    "Marking Pro model exhausted and falling back to Flash."
+                                )
+                                self._mark_pro_model_exhausted()
                                 raise AIProcessorError(
-                                    "All Gemini API keys are exhausted for today. "
-                                    "Requests per day (RPD) reset at midnight Pacific Time. "
-                                    "See ai.google.dev/gemini-api/docs/rate-limits"
+                                    "RETRY_WITH_FLASH: Pro model quota exhausted. "
+                                    "Falling back to Flash model."
+                                )
+                        
+                            # For Flash model 429s, exhaust keys as before
+                            if self._key_manager:
+                                self._logger.warning(
+                                    "Gemini returned 429 (rate limit / quota). "
+                                    "Marking current key exhausted until next Pacific midnight "
+                                    "and rotating to another key if available."
                                 )
+                                self._note_quota_day_exhausted(current_key, model)
+                                has_more_keys = self._key_manager.mark_key_exhausted_for_day(current_key)
+                                if has_more_keys:
+                                    # Break inner loop to try next key
+                                    keys_tried += 1
+                                    retry_delay = 1.0  # Reset delay for new key
+                                    break
+                                else:
+                                    raise AIProcessorError(
+                                        "All Gemini API keys are exhausted for today. "
+                                        "Requests per day (RPD) reset at midnight Pacific Time. "
+                                        "See ai.google.dev/gemini-api/docs/rate-limits"
+                                    )
 
-                    self._logger.error(
-                        f"Attempt {attempt + 1} failed for Gemini '{model}': {e}",
-                        exc_info=True
-                    )
+                        self._logger.error(
+                            f"Attempt {attempt + 1} failed for Gemini '{model}': {e}",
+                            exc_info=True
+                        )
 
-                    # If this is not the last attempt, retry
-                    if attempt < max_retries - 1:
-                        self._logger.info(f"Retrying in {retry_delay} seconds...")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2
-                    else:
-                        # All attempts failed for this key
-                        if self._key_manager:
-                            self._key_manager.mark_key_error()
-                            if not self._key_manager.all_keys_exhausted():
-                                keys_tried += 1
-                                retry_delay = 1.0
-                                break  # Try next key
-                        raise AIProcessorError(f"Failed after {max_retries} attempts: {e}")
-            else:
-                # Inner loop completed without break - success or exhausted retries
-                break
+                        # If this is not the last attempt, retry
+                        if attempt < max_retries - 1:
+                            self._logger.info(f"Retrying in {retry_delay} seconds...")
+                            await asyncio.sleep(retry_delay)
+                            retry_delay *= 2
+                        else:
+                            # All attempts failed for this key
+                            if self._key_manager:
+                                self._key_manager.mark_key_error(current_key)
+                                if not self._key_manager.all_keys_exhausted():
+                                    keys_tried += 1
+                                    retry_delay = 1.0
+                                    break  # Try next key
+                            raise AIProcessorError(f"Failed after {max_retries} attempts: {e}")
+                else:
+                    # Inner loop completed without break - success or exhausted retries
+                    break
+            finally:
+                self._release_key(lease)
         
         # Should not reach here
         raise AIProcessorError("Unexpected error in Gemini execution")
+
+    async def stream_prompt(
+        self,
+        user_prompt: str,
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        task_type: str = "default",
+        use_thinking: bool = False,
+        use_web_search: bool = False
+    ) -> AsyncIterator[StreamItem]:
+        """Stream a prompt through ``generate_content_stream`` with key rotation.
+
+        Yields answer deltas as Gemini produces them, then the final
+        AIResponseMetadata. Thought parts are collected for the thinking
+        summary, never streamed. Rate limits, 403s on the search tool and
+        Pro quota exhaustion are retried (rotating keys / falling back to
+        Flash) only until the first delta is out: after that a retry would
+        repeat text the caller already showed, so errors propagate.
+        """
+        from google.genai import types
+
+        if not user_prompt:
+            raise AIProcessorError("Prompt cannot be empty")
+        if not self.is_configured:
+            raise AIProcessorError("Gemini API key not configured or invalid")
+
+        model = self._model_for_request(task_type, use_web_search)
+        started = time.monotonic()
+        actual_use_web_search = use_web_search
+        web_search_fallback_reason = None
+        model_fallback_applied = False
+        max_key_attempts = self._key_manager.num_keys if self._key_manager else 1
+        max_attempts = max_key_attempts + 2
+        attempts = 0
+        last_error: Optional[Exception] = None
+
+        while attempts < max_attempts:
+            attempts += 1
+            try:
+                lease, current_key, reservation = await self._acquire_key(model, user_prompt)
+            except AIProcessorError as e:
+                # Pro's daily budget is spent locally: same Flash fallback as a Pro 429.
+                if "RETRY_WITH_FLASH" in str(e) and not model_fallback_applied:
+                    if self._key_manager:
+                        self._key_manager.reset_for_model_switch()
+                    model = self._model_flash
+                    model_fallback_applied = True
+                    continue
+                raise
+            if not current_key:
+                if self._key_manager and self._key_manager.all_keys_exhausted():
+                    raise AIProcessorError("All Gemini API keys are rate-limited. Please try again later.")
+                raise AIProcessorError("No valid Gemini API key available")
+
+            config = types.GenerateContentConfig(
+                temperature=temperature,
+                top_p=0.95,
+                top_k=40,
+                max_output_tokens=max_tokens,
+                thinking_config=(
+                    types.ThinkingConfig(thinking_budget=THINKING_BUDGET_DEFAULT, include_thoughts=True)
+                    if use_thinking else None
+                ),
+                tools=[types.Tool(google_search=types.GoogleSearch())] if actual_use_web_search else None,
+            )
+            answer_parts: List[str] = []
+            thinking_parts: List[str] = []
+            usage_meta = None
+            completed = False
+            self._logger.info(
+                f"Streaming prompt to Gemini '{model}' (attempt {attempts}/{max_attempts}). "
+                f"Prompt length: {len(user_prompt)} chars"
+            )
+            try:
+                client = self._get_client(current_key)
+                async with self._key_slot(current_key):
+                    stream = await client.aio.models.generate_content_stream(
+                        model=model, contents=user_prompt, config=config
+                    )
+                    async for chunk in stream:
+                        usage_meta = getattr(chunk, "usage_metadata", None) or usage_meta
+                        candidates = getattr(chunk, "candidates", None) or []
+                        content = getattr(candidates[0], "content", None) if candidates else None
+                        for part in (getattr(content, "parts", None) or []):
+                            text = getattr(part, "text", None)
+                            if not text:
+                                continue
+                            if getattr(part, "thought", None) is True:
+                                thinking_parts.append(text)
+                            else:
+                                answer_parts.append(text)
+                                yield text
+                completed = True
+            except Exception as e:
+                if answer_parts:
+                    raise AIProcessorError(f"Gemini stream interrupted: {e}")
+                last_error = e
+                error_str = str(e).lower()
+                status_code = getattr(e, "code", None) or getattr(e, "status_code", None)
+
+                if actual_use_web_search and (status_code == 403 or "403" in error_str
+                                              or "permission" in error_str):
+                    self._logger.warning(
+                        "Google Search tool returned 403 while streaming; continuing without web search"
+                    )
+                    actual_use_web_search = False
+                    web_search_fallback_reason = "API returned 403 - billing may be required"
+                    continue
+
+                if status_code == 429 or "429" in error_str:
+                    self._note_quota_429(current_key, model)
+                    if model == self._model_pro and model != self._model_flash and not model_fallback_applied:
+                        self._logger.warning("Gemini Pro returned 429 while streaming; falling back to Flash")
+                        self._mark_pro_model_exhausted()
+                        if self._key_manager:
+                            self._key_manager.reset_for_model_switch()
+                        model = self._model_flash
+                        model_fallback_applied = True
+                        continue
+                    if self._key_manager:
+                        self._note_quota_day_exhausted(current_key, model)
+                    if self._key_manager and self._key_manager.mark_key_exhausted_for_day(current_key):
+                        continue
+                    raise AIProcessorError(
+                        "All Gemini API keys are exhausted for today. "
+                        "Requests per day (RPD) reset at midnight Pacific Time."
+                    )
+
+                self._logger.error(f"Gemini streaming attempt {attempts} failed for '{model}': {e}")
+                if self._key_manager:
+                    self._key_manager.mark_key_error(current_key)
+                    if not self._key_manager.all_keys_exhausted():
+                        continue
+                raise AIProcessorError(f"Gemini streaming failed: {e}")
+            finally:
+                self._release_key(lease, success=completed and bool(answer_parts))
+
+            answer_text = "".join(answer_parts).strip()
+            if not answer_text:
+                last_error = AIProcessorError("Gemini returned an empty response")
+                self._logger.warning(f"Empty Gemini stream on attempt {attempts}, retrying")
+                continue
+
+            self._settle_quota(reservation, usage_meta)
+            thinking_summary = _summarize_thinking("".join(thinking_parts))
+            yield AIResponseMetadata(
+                response_text=answer_text,
+                thinking_requested=use_thinking,
+                thinking_applied=use_thinking and bool(thinking_parts),
+                thinking_summary=thinking_summary,
+                web_search_requested=use_web_search,
+                web_search_applied=use_web_search and actual_use_web_search,
+                fallback_reason=web_search_fallback_reason,
+                model_used=model,
+                provider_used=self.provider_name,
+                model_fallback_applied=model_fallback_applied,
+                model_fallback_reason="Pro model quota exceeded" if model_fallback_applied else None,
+                latency_seconds=time.monotonic() - started,
+                input_tokens=getattr(usage_meta, "prompt_token_count", None) if usage_meta else None,
+                output_tokens=getattr(usage_meta, "candidates_token_count", None) if usage_meta else None,
+            )
+            return
+
+        raise AIProcessorError(
+            f"Gemini streaming failed after {attempts} attempts. Last error: {last_error}"
+        )
     
     async def execute_prompt_simple(
         self,
@@ -891,7 +1181,8 @@ class GeminiProvider(LLMProvider):
             prompt,
             max_tokens=max_tokens,
             temperature=0.2,
-            task_type="translate"
+            task_type="translate",
+            use_cache=True
         )
         raw_response = result.response_text
         
@@ -912,7 +1203,8 @@ class GeminiProvider(LLMProvider):
         messages: List[Dict[str, Any]],
         analysis_type: str = "summary",
         output_language: str = "english",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        progress_cb: Optional[ProgressCallback] = None
     ) -> AIResponseMetadata:
         """Analyze messages using Google Gemini with Persian analysis."""
         if not messages:
@@ -955,7 +1247,7 @@ class GeminiProvider(LLMProvider):
         # One complete, self-contained prompt (single source of truth in prompts.py).
         if analysis_type == "voice_summary":
             formatted_prompt = VOICE_MESSAGE_SUMMARY_PROMPT.format(transcribed_text=messages_text)
-        elif analysis_type in ("fun", "general", "romance", "persian_detailed"):
+        elif analysis_type in ANALYSIS_MODES:
             formatted_prompt = build_analysis_prompt(
                 analysis_type, output_language, messages_text, num_messages
             )
@@ -969,6 +1261,21 @@ class GeminiProvider(LLMProvider):
             f"Analysis: {num_messages} msgs, type={analysis_type}, lang={output_language}, "
             f"max_tokens={max_tokens}, temp={temperature}"
         )
+        if analysis_type in ANALYSIS_MODES and needs_map_reduce(formatted_messages):
+            # Too long for one useful prompt: summarize windows across keys, then merge.
+            return await analyze_in_windows(
+                self.execute_prompt,
+                formatted_messages,
+                analysis_type,
+                output_language,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                use_thinking=use_thinking,
+                concurrency=(
+                    self._key_manager.available_key_count() if self._key_manager else 1
+                ),
+                progress_cb=progress_cb,
+            )
         result = await self.execute_prompt(
             formatted_prompt,
             max_tokens=max_tokens,
@@ -1040,3 +1347,5 @@ class GeminiProvider(LLMProvider):
         """Clean up Gemini clients."""
         self._client = None
         self._clients.clear()
+        if self._quota:
+            self._quota.save()
@@ -3,15 +3,16 @@
 import asyncio
 import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional
 import pytz
 
 import openai
 from openai import AsyncOpenAI
 
-from ..llm_interface import LLMProvider
+from ..llm_interface import LLMProvider, StreamItem
 from ..response_metadata import AIResponseMetadata
 from ..api_key_manager import APIKeyManager
+from ..response_cache import get_response_cache, response_cache_key
 from ...core.constants import OPENROUTER_HEADERS, COMPLEX_TASKS, SIMPLE_TASKS
 from ...core.exceptions import AIProcessorError
 from ...utils.logging import get_logger
@@ -20,9 +21,24 @@ from ..prompts import (
     TRANSLATION_SOURCE_TARGET_PROMPT,
     VOICE_MESSAGE_SUMMARY_PROMPT,
     DEFAULT_CHAT_SUMMARY_PROMPT,
+    ANALYSIS_MODES,
     build_analysis_prompt,
     build_question_prompt,
 )
+from ..chunked_analysis import ProgressCallback, analyze_in_windows, needs_map_reduce
+from ..http_transport import get_http_transport
+
+# OpenRouter models have no native thinking switch; thinking mode is
+# requested through the prompt instead.
+THINKING_MODE_INSTRUCTION = (
+    "\n\n**THINKING MODE ENABLED:** "
+    "Before generating your final response, perform step-by-step reasoning internally. "
+    "Think through the problem systematically, consider multiple perspectives, "
+    "and reason through to a well-justified conclusion. "
+    "Do NOT show your intermediate reasoning steps in the output - only provide the final, "
+    "well-reasoned answer. The quality and depth of your internal reasoning should be "
+    "reflected in the thoroughness and accuracy of your final response."
+)
 
 
 class OpenRouterProvider(LLMProvider):
@@ -149,22 +165,17 @@ class OpenRouterProvider(LLMProvider):
         if not key:
             raise AIProcessorError("No available OpenRouter API key")
 
-        # Recreate client if key changed
+        # Recreate client if key changed. The client object is cheap: the
+        # connections live in the shared transport, so a key switch no longer
+        # costs a fresh TLS handshake.
         if self._client is None or self._last_used_key != key:
             import httpx as _httpx
 
-            http_client = _httpx.AsyncClient(
-                timeout=_httpx.Timeout(600.0, connect=30.0),
-                limits=_httpx.Limits(
-                    max_keepalive_connections=5, max_connections=10
-                ),
-                follow_redirects=True
-            )
-
             self._client = AsyncOpenAI(
                 base_url="https://openrouter.ai/api/v1",
                 api_key=key,
-                http_client=http_client,
+                http_client=get_http_transport().client(),
+                timeout=_httpx.Timeout(600.0, connect=30.0),
                 max_retries=3
             )
             self._last_used_key = key
@@ -241,9 +252,14 @@ class OpenRouterProvider(LLMProvider):
         temperature: float = 0.7,
         task_type: str = "default",
         use_thinking: bool = False,
-        use_web_search: bool = False
+        use_web_search: bool = False,
+        use_cache: bool = False
     ) -> AIResponseMetadata:
-        """Execute a prompt using OpenRouter with task-based model selection."""
+        """Execute a prompt using OpenRouter with task-based model selection.
+
+        ``use_cache`` opts an idempotent call (translate, prompt enhancement)
+        into the content-addressed response cache.
+        """
         if not user_prompt:
             raise AIProcessorError("Prompt cannot be empty")
         
@@ -252,19 +268,18 @@ class OpenRouterProvider(LLMProvider):
         
         # Select model based on task type
         model = self.get_model_for_task(task_type)
+
+        cache_key = None
+        if use_cache and not (use_thinking or use_web_search):
+            cache_key = response_cache_key(task_type, model, user_prompt, temperature)
+            cached = get_response_cache().get(cache_key)
+            if cached is not None:
+                self._logger.info(f"Response cache hit: task={task_type}, model={model}")
+                return cached
         
         # Add thinking mode instructions if enabled
         if use_thinking:
-            thinking_instruction = (
-                "\n\n**THINKING MODE ENABLED:** "
-                "Before generating your final response, perform step-by-step reasoning internally. "
-                "Think through the problem systematically, consider multiple perspectives, "
-                "and reason through to a well-justified conclusion. "
-                "Do NOT show your intermediate reasoning steps in the output - only provide the final, "
-                "well-reasoned answer. The quality and depth of your internal reasoning should be "
-                "reflected in the thoroughness and accuracy of your final response."
-            )
-            user_prompt = user_prompt + thinking_instruction
+            user_prompt = user_prompt + THINKING_MODE_INSTRUCTION
 
         # Note: OpenRouter doesn't support Google Search tool directly
         if use_web_search:
@@ -415,7 +430,7 @@ class OpenRouterProvider(LLMProvider):
         out_tok = getattr(usage, "completion_tokens", None) if usage else None
 
         # Return AIResponseMetadata for consistency with GeminiProvider
-        return AIResponseMetadata(
+        result = AIResponseMetadata(
             response_text=response_text,
             thinking_requested=use_thinking,
             thinking_applied=use_thinking,  # Prompt-based thinking
@@ -428,6 +443,154 @@ class OpenRouterProvider(LLMProvider):
             input_tokens=in_tok,
             output_tokens=out_tok,
         )
+        if cache_key is not None:
+            get_response_cache().put(cache_key, result)
+        return result
+
+    async def stream_prompt(
+        self,
+        user_prompt: str,
+        max_tokens: int = 1500,
+        temperature: float = 0.7,
+        task_type: str = "default",
+        use_thinking: bool = False,
+        use_web_search: bool = False
+    ) -> AsyncIterator[StreamItem]:
+        """Stream a prompt through OpenRouter's SSE chat completions.
+
+        Yields content deltas as they arrive, then the final
+        AIResponseMetadata (usage comes from the ``include_usage`` chunk when
+        the model reports it). Retryable errors and empty streams rotate keys
+        like ``execute_prompt``, but only before the first delta is out.
+        """
+        if not user_prompt:
+            raise AIProcessorError("Prompt cannot be empty")
+        if not self.is_configured:
+            raise AIProcessorError("OpenRouter API key not configured or invalid")
+
+        model = self.get_model_for_task(task_type)
+        if use_thinking:
+            user_prompt = user_prompt + THINKING_MODE_INSTRUCTION
+        if use_web_search:
+            self._logger.warning("Web search requested but OpenRouter doesn't support Google Search tool")
+
+        started = time.monotonic()
+        max_key_attempts = self._key_manager.num_keys if self._key_manager else 1
+        max_attempts = max_key_attempts + 2
+        attempts = 0
+        last_error = None
+
+        while attempts < max_attempts:
+            attempts += 1
+            content_parts: List[str] = []
+            # DeepSeek-style models may stream only a reasoning field; it is
+            # used as the answer when no content arrives (see
+            # ``_extract_response_text``).
+            reasoning_parts: List[str] = []
+            finish_reason = None
+            usage = None
+            try:
+                client = self._get_client()
+                self._logger.info(
+                    f"Streaming prompt to OpenRouter model '{model}' "
+                    f"(attempt {attempts}/{max_attempts})"
+                )
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": user_prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    extra_headers=OPENROUTER_HEADERS,
+                    timeout=600.0,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if not getattr(chunk, "choices", None):
+                        continue
+                    choice = chunk.choices[0]
+                    if getattr(choice, "finish_reason", None):
+                        finish_reason = str(choice.finish_reason).lower()
+                    delta = getattr(choice, "delta", None)
+                    text = getattr(delta, "content", None) if delta is not None else None
+                    if isinstance(text, str) and text:
+                        content_parts.append(text)
+                        yield text
+                        continue
+                    extra = (getattr(delta, "model_extra", None) or {}) if delta is not None else {}
+                    for attr in ("reasoning_content", "reasoning"):
+                        value = getattr(delta, attr, None) or extra.get(attr)
+                        if isinstance(value, str) and value:
+                            reasoning_parts.append(value)
+                            break
+            except openai.APITimeoutError:
+                self._logger.error(f"Streaming request timed out for model '{model}'")
+                raise AIProcessorError("Request timed out. Try with fewer messages.")
+            except (openai.RateLimitError,
+                    openai.APIConnectionError,
+                    openai.InternalServerError) as e:
+                if content_parts:
+                    raise AIProcessorError(f"OpenRouter stream interrupted: {str(e)[:160]}")
+                self._logger.warning(
+                    f"OpenRouter retryable error on attempt {attempts}: "
+                    f"{type(e).__name__}: {str(e)[:160]}"
+                )
+                last_error = AIProcessorError(f"OpenRouter error: {str(e)[:160]}")
+                if self._key_manager and self._key_manager.num_keys > 1:
+                    self._key_manager.mark_key_rate_limited()
+                self._client = None
+                self._last_used_key = None
+                await asyncio.sleep(2.0)
+                continue
+            except openai.APIStatusError as e:
+                status = getattr(e, "status_code", "?")
+                self._logger.error(f"OpenRouter API error {status}: {str(e)[:200]}")
+                raise AIProcessorError(f"OpenRouter API error {status}: {str(e)[:200]}")
+            except AIProcessorError:
+                raise
+            except Exception as e:
+                self._logger.error(f"OpenRouter streaming request failed: {e}")
+                raise AIProcessorError(f"OpenRouter API error: {e}")
+
+            response_text = "".join(content_parts).strip()
+            if not response_text and reasoning_parts:
+                response_text = "".join(reasoning_parts).strip()
+                if response_text:
+                    yield response_text
+            if not response_text:
+                if finish_reason and ("content_filter" in finish_reason or "safety" in finish_reason):
+                    raise AIProcessorError(
+                        "Content was filtered by AI provider. Try with different text."
+                    )
+                self._logger.warning(
+                    f"OpenRouter stream was empty (finish_reason={finish_reason}); retrying "
+                    f"(attempt {attempts}/{max_attempts})"
+                )
+                last_error = AIProcessorError("OpenRouter returned an empty response")
+                if self._key_manager and self._key_manager.num_keys > 1:
+                    self._key_manager.mark_key_rate_limited()
+                self._client = None
+                self._last_used_key = None
+                await asyncio.sleep(1.0)
+                continue
+
+            yield AIResponseMetadata(
+                response_text=response_text,
+                thinking_requested=use_thinking,
+                thinking_applied=use_thinking,  # Prompt-based thinking
+                web_search_requested=use_web_search,
+                web_search_applied=False,
+                fallback_reason="OpenRouter doesn't support web search" if use_web_search else None,
+                model_used=model,
+                provider_used=self.provider_name,
+                latency_seconds=time.monotonic() - started,
+                input_tokens=getattr(usage, "prompt_tokens", None) if usage else None,
+                output_tokens=getattr(usage, "completion_tokens", None) if usage else None,
+            )
+            return
+
+        raise last_error or AIProcessorError("OpenRouter did not return content after retries.")
     
     async def translate_text(
         self,
@@ -471,7 +634,8 @@ class OpenRouterProvider(LLMProvider):
             prompt,
             max_tokens=self._calculate_max_tokens("translate"),
             temperature=0.2,
-            task_type="translate"
+            task_type="translate",
+            use_cache=True
         )
         raw_response = result.response_text
         
@@ -492,7 +656,8 @@ class OpenRouterProvider(LLMProvider):
         messages: List[Dict[str, Any]],
         analysis_type: str = "summary",
         output_language: str = "english",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        progress_cb: Optional[ProgressCallback] = None
     ) -> AIResponseMetadata:
         """Analyze messages using OpenRouter."""
         if not messages:
@@ -535,7 +700,7 @@ class OpenRouterProvider(LLMProvider):
         # One complete, self-contained prompt (single source of truth in prompts.py).
         if analysis_type == "voice_summary":
             formatted_prompt = VOICE_MESSAGE_SUMMARY_PROMPT.format(transcribed_text=messages_text)
-        elif analysis_type in ("fun", "general", "romance", "persian_detailed"):
+        elif analysis_type in ANALYSIS_MODES:
             formatted_prompt = build_analysis_prompt(
                 analysis_type, output_language, messages_text, num_messages
             )
@@ -549,6 +714,21 @@ class OpenRouterProvider(LLMProvider):
             f"Analysis: {num_messages} msgs, type={analysis_type}, lang={output_language}, "
             f"max_tokens={max_tokens}, temp={temperature}"
         )
+        if analysis_type in ANALYSIS_MODES and needs_map_reduce(formatted_messages):
+            # Too long for one useful prompt: summarize windows across keys, then merge.
+            return await analyze_in_windows(
+                self.execute_prompt,
+                formatted_messages,
+                analysis_type,
+                output_language,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                use_thinking=use_thinking,
+                concurrency=(
+                    self._key_manager.available_key_count() if self._key_manager else 1
+                ),
+                progress_cb=progress_cb,
+            )
         result = await self.execute_prompt(
             formatted_prompt,
             max_tokens=max_tokens,
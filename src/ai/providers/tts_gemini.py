@@ -2,16 +2,19 @@
 
 Uses the official Google Gemini TTS API pattern from:
 https://ai.google.dev/gemini-api/docs/speech-generation
+
+Synthesis is async (``client.aio``) and leases a key per request from its own
+``APIKeyManager``: TTS quota is counted per model, so a key that is out of text
+quota can still speak and vice versa. A 429 puts that key in cooldown and the
+request moves to the next key without backing off. Results are stored in the
+content-addressed ``TtsAudioCache``, so repeating a phrase costs no quota.
 """
 
+import asyncio
 import os
-import time
-from typing import Optional, Tuple, TYPE_CHECKING, Any
+from typing import Any, Dict, Optional, Tuple
 import wave
 
-if TYPE_CHECKING:
-    from google import genai
-
 try:
     from google import genai
     from google.genai import types
@@ -20,14 +23,20 @@ except ImportError:
     types = None
 
 from ...utils.logging import get_logger
+from ...utils.tts_cache import get_tts_cache, tts_cache_key
+from ..api_key_manager import APIKeyManager, SCHEDULING_LEAST_LOADED
+from ..http_transport import get_http_transport
 from ...core.tts_config import (
-    GOOGLE_API_KEY, 
-    MAX_RETRIES, 
-    RETRY_DELAYS, 
-    TTS_MODEL, 
+    GOOGLE_API_KEY,
+    GOOGLE_API_KEYS,
+    MAX_RETRIES,
+    RETRY_DELAYS,
+    TTS_MODEL,
     DEFAULT_VOICE
 )
 
+logger = get_logger("GeminiTTS")
+
 
 def wave_file(filename: str, pcm: bytes, channels: int = 1, rate: int = 24000, sample_width: int = 2) -> None:
     """Set up the wave file to save the output."""
@@ -38,169 +47,210 @@ def wave_file(filename: str, pcm: bytes, channels: int = 1, rate: int = 24000, s
         wf.writeframes(pcm)
 
 
-# Global client instance to reuse (created lazily)
-if TYPE_CHECKING:
-    _client_instance: Optional["genai.Client"] = None
-else:
-    _client_instance: Optional[Any] = None
+# Key rotation and per-key clients (created lazily)
+_key_manager: Optional[APIKeyManager] = None
+_clients: Dict[str, Any] = {}
+
+
+def _get_key_manager() -> Optional[APIKeyManager]:
+    """Key manager over every configured TTS key, or None without keys."""
+    global _key_manager
+    if _key_manager is None and GOOGLE_API_KEYS:
+        _key_manager = APIKeyManager(
+            GOOGLE_API_KEYS,
+            provider_name="Gemini TTS",
+            scheduling=SCHEDULING_LEAST_LOADED,
+        )
+    return _key_manager
+
+
+def _get_client(api_key: str) -> Any:
+    """One ``genai.Client`` per key, all on the shared HTTP pool."""
+    client = _clients.get(api_key)
+    if client is None:
+        client = genai.Client(
+            api_key=api_key,
+            http_options=get_http_transport().genai_http_options(),
+        )
+        _clients[api_key] = client
+    return client
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    status_code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    error_str = str(error)
+    return status_code == 429 or "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def _missing_key_error() -> str:
+    # Check which keys are actually set (for debugging)
+    keys_checked = []
+    for name in ("GEMINI_API_KEY_TTS", "GEMINI_API_KEY_1", "GEMINI_API_KEY_2", "GEMINI_API_KEY", "GOOGLE_API_KEY"):
+        if os.getenv(name):
+            keys_checked.append(f"{name} (found but invalid/empty)")
+
+    return (
+        "Google API key not configured for Gemini AI Studio TTS. "
+        "Checked (in order): GEMINI_API_KEY_TTS, GEMINI_API_KEY_1, "
+        "GEMINI_API_KEY_2, GEMINI_API_KEY, GOOGLE_API_KEY. "
+        f"{'Found keys (but invalid): ' + ', '.join(keys_checked) if keys_checked else 'No keys found in environment.'}"
+    )
+
+
+def _extract_pcm(response: Any) -> bytes:
+    """Audio bytes from a TTS response (response.candidates[0].content.parts[0].inline_data.data)."""
+    if not hasattr(response, 'candidates') or not response.candidates:
+        logger.error(f"No candidates in response. Response type: {type(response)}")
+        raise RuntimeError("No candidates returned from Gemini TTS")
+
+    candidate = response.candidates[0]
+    if not getattr(candidate, 'content', None):
+        finish_reason = getattr(candidate, 'finish_reason', None)
+        safety_ratings = getattr(candidate, 'safety_ratings', None)
+        logger.error(
+            f"Candidate content is None. "
+            f"Finish reason: {finish_reason}, "
+            f"Safety ratings: {safety_ratings}"
+        )
+        if finish_reason:
+            error_msg = f"No content in candidate response. Finish reason: {finish_reason}"
+            if safety_ratings:
+                error_msg += f", Safety: {safety_ratings}"
+            raise RuntimeError(error_msg)
+        raise RuntimeError("No content in candidate response (content is None)")
+
+    if not getattr(candidate.content, 'parts', None):
+        raise RuntimeError("No parts in content")
+
+    part = candidate.content.parts[0]
+    if not getattr(part, 'inline_data', None):
+        raise RuntimeError("No inline_data in part")
+    if not getattr(part.inline_data, 'data', None):
+        raise RuntimeError("No data in inline_data")
+
+    # Already PCM (24 kHz, mono, 16-bit) ready for WAV
+    return part.inline_data.data
+
+
+async def synthesize_pcm(
+    text: str,
+    voice_name: Optional[str] = None,
+    model: Optional[str] = None
+) -> bytes:
+    """
+    Synthesize speech to raw PCM, from the cache when possible.
+
+    Args:
+        text: Text to convert to speech
+        voice_name: Voice name to use (default: DEFAULT_VOICE)
+        model: TTS model (default: TTS_MODEL)
+
+    Returns:
+        24 kHz mono 16-bit PCM
+
+    Raises:
+        RuntimeError: No key is configured or every attempt failed
+    """
+    if genai is None or types is None:
+        raise RuntimeError("google-genai library not installed. Install with: pip install google-genai")
 
+    manager = _get_key_manager()
+    if manager is None:
+        raise RuntimeError(_missing_key_error())
 
-def synthesize_speech(
-    text: str, 
-    output_file: str = "output.wav", 
+    selected_voice = voice_name or DEFAULT_VOICE
+    selected_model = model or TTS_MODEL
+    cache = get_tts_cache()
+    key = tts_cache_key(text, selected_voice, selected_model)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached:
+        logger.info("TTS cache hit, skipping Gemini call")
+        return cached
+
+    config = types.GenerateContentConfig(
+        response_modalities=["AUDIO"],
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                    voice_name=selected_voice,
+                )
+            )
+        ),
+    )
+
+    # 429s rotate straight to the next key; other errors back off and retry.
+    errors = 0
+    rotations = 0
+    last_error: Optional[Exception] = None
+    while errors < MAX_RETRIES and rotations <= manager.num_keys:
+        lease = manager.acquire_key()
+        if lease is None:
+            raise RuntimeError(
+                f"All Gemini TTS keys are rate limited: {last_error}" if last_error
+                else "All Gemini TTS keys are rate limited"
+            )
+        try:
+            response = await _get_client(lease.key).aio.models.generate_content(
+                model=selected_model,
+                contents=text,
+                config=config,
+            )
+            pcm = _extract_pcm(response)
+            manager.release_key(lease, success=True)
+        except Exception as e:
+            manager.release_key(lease)
+            last_error = e
+            if _is_rate_limit(e):
+                rotations += 1
+                manager.mark_key_rate_limited(lease.key)
+                logger.warning(f"Gemini TTS key {lease.index + 1} rate limited, trying next key")
+                continue
+            errors += 1
+            if errors < MAX_RETRIES:
+                delay = RETRY_DELAYS[errors - 1] if errors - 1 < len(RETRY_DELAYS) else RETRY_DELAYS[-1]
+                logger.error(f"Gemini AI Studio TTS error (attempt {errors}/{MAX_RETRIES}): {e}")
+                logger.info(f"Retrying in {delay}s...")
+                await asyncio.sleep(delay)
+            continue
+
+        await asyncio.to_thread(cache.put, key, pcm)
+        return pcm
+
+    logger.error(f"Gemini AI Studio TTS failed after {errors + rotations} attempts: {last_error}")
+    raise RuntimeError(str(last_error) if last_error else "Failed after all retry attempts")
+
+
+async def synthesize_speech(
+    text: str,
+    output_file: str = "output.wav",
     voice_name: Optional[str] = None
 ) -> Tuple[bool, Optional[str]]:
     """
     Synthesize speech using Gemini AI Studio TTS.
-    
+
     Args:
         text: Text to convert to speech
         output_file: Path to save the audio file
         voice_name: Voice name to use (default: Orus - masculine voice)
-    
+
     Returns:
         Tuple of (success: bool, error_message: Optional[str])
     """
-    global _client_instance
-    logger = get_logger("GeminiTTS")
-    
     if not text or not text.strip():
         return False, "Empty text provided for synthesis"
 
     if not GOOGLE_API_KEY:
-        # Check which keys are actually set (for debugging)
-        keys_checked = []
-        if os.getenv("GEMINI_API_KEY_TTS"):
-            keys_checked.append("GEMINI_API_KEY_TTS (found but invalid/empty)")
-        if os.getenv("GEMINI_API_KEY_1"):
-            keys_checked.append("GEMINI_API_KEY_1 (found but invalid/empty)")
-        if os.getenv("GEMINI_API_KEY_2"):
-            keys_checked.append("GEMINI_API_KEY_2 (found but invalid/empty)")
-        if os.getenv("GEMINI_API_KEY"):
-            keys_checked.append("GEMINI_API_KEY (found but invalid/empty)")
-        if os.getenv("GOOGLE_API_KEY"):
-            keys_checked.append("GOOGLE_API_KEY (found but invalid/empty)")
-
-        error_msg = (
-            "Google API key not configured for Gemini AI Studio TTS. "
-            "Checked (in order): GEMINI_API_KEY_TTS, GEMINI_API_KEY_1, "
-            "GEMINI_API_KEY_2, GEMINI_API_KEY, GOOGLE_API_KEY. "
-            f"{'Found keys (but invalid): ' + ', '.join(keys_checked) if keys_checked else 'No keys found in environment.'}"
-        )
+        error_msg = _missing_key_error()
         logger.error(error_msg)
         return False, error_msg
 
-    if genai is None or types is None:
-        return False, "google-genai library not installed. Install with: pip install google-genai"
-
-    selected_voice = voice_name or DEFAULT_VOICE
-    
-    # Log which key was used (for debugging)
-    if os.getenv("GEMINI_API_KEY_TTS") == GOOGLE_API_KEY:
-        logger.debug("Using GEMINI_API_KEY_TTS for TTS")
-    elif os.getenv("GEMINI_API_KEY_1") == GOOGLE_API_KEY:
-        logger.debug("Using GEMINI_API_KEY_1 for TTS")
-    elif os.getenv("GEMINI_API_KEY_2") == GOOGLE_API_KEY:
-        logger.debug("Using GEMINI_API_KEY_2 for TTS")
-    elif os.getenv("GEMINI_API_KEY") == GOOGLE_API_KEY:
-        logger.debug("Using GEMINI_API_KEY for TTS")
-    elif os.getenv("GOOGLE_API_KEY") == GOOGLE_API_KEY:
-        logger.debug("Using GOOGLE_API_KEY for TTS")
-
-    for attempt in range(MAX_RETRIES):
-        try:
-            # Reuse client instance if available, otherwise create new one
-            if _client_instance is None:
-                _client_instance = genai.Client(api_key=GOOGLE_API_KEY)
-            client = _client_instance
-            
-            # Generate content with TTS (exact pattern from official docs)
-            response = client.models.generate_content(
-                model=TTS_MODEL,
-                contents=text,
-                config=types.GenerateContentConfig(
-                    response_modalities=["AUDIO"],
-                    speech_config=types.SpeechConfig(
-                        voice_config=types.VoiceConfig(
-                            prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                voice_name=selected_voice,
-                            )
-                        )
-                    ),
-                )
-            )
-
-            # Extract audio data (exact pattern from official snippet)
-            # response.candidates[0].content.parts[0].inline_data.data
-            if not hasattr(response, 'candidates') or not response.candidates:
-                logger.error(f"No candidates in response. Response type: {type(response)}, attributes: {dir(response)}")
-                raise RuntimeError("No candidates returned from Gemini TTS")
-            
-            candidate = response.candidates[0]
-            logger.debug(f"Candidate type: {type(candidate)}, has content: {hasattr(candidate, 'content')}")
-            
-            if not hasattr(candidate, 'content'):
-                logger.error(f"Candidate has no 'content' attribute. Candidate attributes: {dir(candidate)}")
-                raise RuntimeError("No content attribute in candidate response")
-            
-            if not candidate.content:
-                # Log more details about what we got
-                finish_reason = getattr(candidate, 'finish_reason', None)
-                safety_ratings = getattr(candidate, 'safety_ratings', None)
-                error_msg_parts = []
-                
-                if finish_reason:
-                    error_msg_parts.append(f"Finish reason: {finish_reason}")
-                
-                if safety_ratings:
-                    error_msg_parts.append(f"Safety ratings: {safety_ratings}")
-                
-                logger.error(
-                    f"Candidate content is None. "
-                    f"Finish reason: {finish_reason}, "
-                    f"Safety ratings: {safety_ratings}, "
-                    f"Candidate attributes: {[attr for attr in dir(candidate) if not attr.startswith('_')]}"
-                )
-                
-                # Build detailed error message
-                if finish_reason:
-                    error_msg = f"No content in candidate response. Finish reason: {finish_reason}"
-                    if safety_ratings:
-                        error_msg += f", Safety: {safety_ratings}"
-                    raise RuntimeError(error_msg)
-                raise RuntimeError("No content in candidate response (content is None)")
-            
-            if not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                raise RuntimeError("No parts in content")
-            
-            part = candidate.content.parts[0]
-            
-            if not hasattr(part, 'inline_data') or not part.inline_data:
-                raise RuntimeError("No inline_data in part")
-            
-            if not hasattr(part.inline_data, 'data') or not part.inline_data.data:
-                raise RuntimeError("No data in inline_data")
-            
-            # Get audio data (this is already PCM bytes ready for WAV)
-            data = part.inline_data.data
-
-            # Save to WAV file using the exact pattern from official docs
-            wave_file(output_file, data)
-
-            if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-                logger.info(f"Audio saved to {output_file} (Gemini AI Studio TTS)")
-                return True, None
-            else:
-                raise RuntimeError("Written audio file is empty")
-
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                delay = RETRY_DELAYS[attempt] if attempt < len(RETRY_DELAYS) else RETRY_DELAYS[-1]
-                logger.error(f"Gemini AI Studio TTS error (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
-                logger.info(f"Retrying in {delay}s...")
-                time.sleep(delay)
-            else:
-                logger.error(f"Gemini AI Studio TTS failed after {MAX_RETRIES} attempts: {e}")
-                return False, str(e)
+    try:
+        data = await synthesize_pcm(text, voice_name)
+        await asyncio.to_thread(wave_file, output_file, data)
+    except Exception as e:
+        return False, str(e)
 
-    return False, "Failed after all retry attempts"
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        logger.info(f"Audio saved to {output_file} (Gemini AI Studio TTS)")
+        return True, None
+    return False, "Written audio file is empty"
@@ -0,0 +1,331 @@
+"""Client-side Gemini quota accounting (RPM / TPM / RPD per key and model).
+
+Gemini enforces its free-tier limits per project key *and* per model, and the
+provider used to learn about them only from a 429 - after a wasted round
+trip, retry sleeps, and a key or the Pro tier being written off until Pacific
+midnight even when only the per-minute window was full. This tracker knows the
+published free-tier limits of the configured models and counts every request
+and its input tokens per ``(key, model)``:
+
+* a sliding 60-second window for requests (RPM) and input tokens (TPM),
+  with token estimates settled against ``usage_metadata`` once the answer
+  is back;
+* a per-day request count (RPD) that resets at midnight Pacific time, as
+  Google's quota does.
+
+Before a request goes out the provider asks ``wait_time`` for each key: it
+reroutes to a key with headroom, holds briefly when every key's minute window
+is full, and only gives up (or drops Pro to Flash) when the daily budget is
+spent everywhere. Counters persist to a small JSON file so a restart doesn't
+forget a nearly-spent day. Keys are stored as fingerprints, never raw.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import pytz
+
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+QUOTA_STATE_FILE = Path("cache/gemini_quota.json")
+QUOTA_WINDOW_SECONDS = 60.0
+QUOTA_SAVE_INTERVAL_SECONDS = 5.0
+# A full minute window always drains within this; longer waits mean a 429
+# cool-down the tracker can't shorten, so the request fails instead.
+QUOTA_MAX_HOLD_SECONDS = 60.0
+RATE_LIMIT_BLOCK_SECONDS = 60.0
+
+_PACIFIC = pytz.timezone("America/Los_Angeles")
+
+
+@dataclass(frozen=True)
+class ModelQuota:
+    """Per-key limits of one model; None means unlimited."""
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+    rpd: Optional[int] = None
+
+
+# Free-tier limits (ai.google.dev/gemini-api/docs/rate-limits). Matched by
+# longest prefix, so dated/preview variants inherit their family's limits.
+FREE_TIER_QUOTAS: Dict[str, ModelQuota] = {
+    "gemini-2.5-pro": ModelQuota(rpm=5, tpm=250_000, rpd=100),
+    "gemini-2.5-flash": ModelQuota(rpm=10, tpm=250_000, rpd=250),
+    "gemini-2.5-flash-lite": ModelQuota(rpm=15, tpm=250_000, rpd=1000),
+    "gemini-2.0-flash": ModelQuota(rpm=15, tpm=1_000_000, rpd=200),
+    "gemini-2.0-flash-lite": ModelQuota(rpm=30, tpm=1_000_000, rpd=200),
+}
+
+
+def quota_for_model(model: str, table: Optional[Dict[str, ModelQuota]] = None) -> ModelQuota:
+    """Limits for ``model`` (longest matching prefix), unlimited if unknown."""
+    table = FREE_TIER_QUOTAS if table is None else table
+    name = (model or "").strip().lower()
+    if name.startswith("models/"):
+        name = name[len("models/"):]
+    best = ""
+    for prefix in table:
+        if name.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return table[best] if best else ModelQuota()
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable, non-reversible id for an API key (safe to persist)."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+def pacific_day(now: Optional[float] = None) -> str:
+    """The current quota day: the calendar date in America/Los_Angeles."""
+    moment = datetime.fromtimestamp(time.time() if now is None else now, tz=pytz.utc)
+    return moment.astimezone(_PACIFIC).date().isoformat()
+
+
+@dataclass
+class _Usage:
+    """Counters of one (key, model) pair. Times are wall-clock seconds."""
+    day: str = ""
+    day_requests: int = 0
+    day_tokens: int = 0
+    requests: Deque[float] = field(default_factory=deque)
+    tokens: Deque[List[float]] = field(default_factory=deque)  # [at, count]
+    token_sum: int = 0
+    blocked_until: float = 0.0
+
+
+@dataclass
+class QuotaReservation:
+    """One counted request; ``settle`` corrects its token estimate."""
+    key_id: str
+    model: str
+    entry: List[float]
+    day: str
+
+
+class QuotaTracker:
+    """Sliding-window RPM/TPM and daily RPD accounting per key and model."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = QUOTA_STATE_FILE,
+        quotas: Optional[Dict[str, ModelQuota]] = None,
+        window_seconds: float = QUOTA_WINDOW_SECONDS,
+    ) -> None:
+        self._path = Path(path) if path is not None else None
+        self._window = window_seconds
+        self._quotas = FREE_TIER_QUOTAS if quotas is None else quotas
+        self._usage: Dict[Tuple[str, str], _Usage] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self.held_seconds = 0.0
+        self.reroutes = 0
+        self._load()
+
+    def limits(self, model: str) -> ModelQuota:
+        return quota_for_model(model, self._quotas)
+
+    # ---------- accounting ----------
+    def _get(self, api_key: str, model: str, now: float) -> _Usage:
+        usage = self._usage.setdefault((key_fingerprint(api_key), model), _Usage())
+        day = pacific_day(now)
+        if usage.day != day:
+            usage.day, usage.day_requests, usage.day_tokens = day, 0, 0
+        cutoff = now - self._window
+        while usage.requests and usage.requests[0] <= cutoff:
+            usage.requests.popleft()
+        while usage.tokens and usage.tokens[0][0] <= cutoff:
+            usage.token_sum -= int(usage.tokens.popleft()[1])
+        return usage
+
+    def wait_time(self, api_key: str, model: str, tokens: int = 0) -> Optional[float]:
+        """
+        Seconds until a request of ``tokens`` input tokens fits the limits.
+
+        Returns:
+            0.0 when it can go now, None when the key's daily budget for
+            ``model`` is spent (nothing to wait for before midnight Pacific)
+        """
+        now = time.time()
+        usage = self._get(api_key, model, now)
+        quota = self.limits(model)
+        if quota.rpd is not None and usage.day_requests >= quota.rpd:
+            return None
+        wait = max(0.0, usage.blocked_until - now)
+        if quota.rpm is not None and len(usage.requests) >= quota.rpm:
+            oldest = usage.requests[len(usage.requests) - quota.rpm]
+            wait = max(wait, oldest + self._window - now)
+        if quota.tpm is not None and usage.token_sum + tokens > quota.tpm:
+            # Wait until enough of the window's tokens have aged out; a
+            # request bigger than the whole budget only needs an empty window.
+            excess = usage.token_sum + min(tokens, quota.tpm) - quota.tpm
+            for at, count in usage.tokens:
+                excess -= count
+                if excess <= 0:
+                    wait = max(wait, at + self._window - now)
+                    break
+        return wait
+
+    def reserve(self, api_key: str, model: str, tokens: int = 0) -> QuotaReservation:
+        """Count one request (with its estimated input tokens) against the key."""
+        now = time.time()
+        usage = self._get(api_key, model, now)
+        entry = [now, int(tokens)]
+        usage.requests.append(now)
+        usage.tokens.append(entry)
+        usage.token_sum += int(tokens)
+        usage.day_requests += 1
+        usage.day_tokens += int(tokens)
+        self._changed()
+        return QuotaReservation(key_fingerprint(api_key), model, entry, usage.day)
+
+    def settle(self, reservation: Optional[QuotaReservation], input_tokens: Optional[int]) -> None:
+        """Replace a reservation's estimate with the real ``prompt_token_count``."""
+        if reservation is None or input_tokens is None:
+            return
+        usage = self._usage.get((reservation.key_id, reservation.model))
+        if usage is None:
+            return
+        delta = int(input_tokens) - int(reservation.entry[1])
+        reservation.entry[1] = int(input_tokens)
+        if any(e is reservation.entry for e in usage.tokens):
+            usage.token_sum += delta
+        if usage.day == reservation.day:
+            usage.day_tokens += delta
+        self._changed()
+
+    def note_rate_limited(self, api_key: str, model: str, seconds: float = RATE_LIMIT_BLOCK_SECONDS) -> None:
+        """Google answered 429 anyway: keep this key off ``model`` for a while."""
+        now = time.time()
+        usage = self._get(api_key, model, now)
+        usage.blocked_until = max(usage.blocked_until, now + seconds)
+        self._changed()
+
+    def note_day_exhausted(self, api_key: str, model: str) -> None:
+        """Google says the daily quota is gone: remember it until midnight Pacific."""
+        usage = self._get(api_key, model, time.time())
+        quota = self.limits(model)
+        if quota.rpd is not None:
+            usage.day_requests = max(usage.day_requests, quota.rpd)
+            self._changed()
+        else:
+            self.note_rate_limited(api_key, model)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hold/reroute totals and per (key, model) counters for status pages."""
+        now = time.time()
+        rows = []
+        for (key_id, model) in list(self._usage):
+            usage = self._usage[(key_id, model)]
+            if usage.day != pacific_day(now):
+                continue
+            quota = self.limits(model)
+            cutoff = now - self._window
+            rows.append({
+                "key": key_id,
+                "model": model,
+                "requests_last_minute": sum(1 for t in usage.requests if t > cutoff),
+                "tokens_last_minute": sum(int(c) for t, c in usage.tokens if t > cutoff),
+                "requests_today": usage.day_requests,
+                "rpm": quota.rpm,
+                "tpm": quota.tpm,
+                "rpd": quota.rpd,
+            })
+        return {"held_seconds": round(self.held_seconds, 1), "reroutes": self.reroutes, "usage": rows}
+
+    # ---------- persistence ----------
+    def _changed(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._last_save >= QUOTA_SAVE_INTERVAL_SECONDS:
+            self.save()
+
+    def _load(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+            now = time.time()
+            for name, row in (data.get("usage") or {}).items():
+                key_id, _, model = name.partition("|")
+                usage = _Usage(
+                    day=row.get("day", ""),
+                    day_requests=int(row.get("day_requests", 0)),
+                    day_tokens=int(row.get("day_tokens", 0)),
+                    blocked_until=float(row.get("blocked_until", 0.0)),
+                )
+                for at in row.get("requests", []):
+                    if now - at < self._window:
+                        usage.requests.append(float(at))
+                for at, count in row.get("tokens", []):
+                    if now - at < self._window:
+                        usage.tokens.append([float(at), int(count)])
+                        usage.token_sum += int(count)
+                self._usage[(key_id, model)] = usage
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            # Losing the counters only costs accuracy; never block startup.
+            logger.warning(f"Gemini quota state unreadable, starting fresh: {e}")
+            self._usage.clear()
+
+    def save(self) -> None:
+        """Write the counters atomically (temp file + os.replace)."""
+        self._last_save = time.monotonic()
+        if self._path is None or not self._dirty:
+            return
+        payload = {
+            "version": 1,
+            "saved_at": time.time(),
+            "usage": {
+                f"{key_id}|{model}": {
+                    "day": u.day,
+                    "day_requests": u.day_requests,
+                    "day_tokens": u.day_tokens,
+                    "blocked_until": u.blocked_until,
+                    "requests": list(u.requests),
+                    "tokens": [list(e) for e in u.tokens],
+                }
+                for (key_id, model), u in self._usage.items()
+            },
+        }
+        tmp = None
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self._path.parent), prefix=".quota.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp, self._path)
+            tmp = None
+            self._dirty = False
+        except OSError as e:
+            logger.debug(f"Gemini quota state write failed: {e}")
+        finally:
+            if tmp and os.path.exists(tmp):
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+
+# Global quota tracker instance
+_quota_tracker: Optional[QuotaTracker] = None
+
+
+def get_quota_tracker() -> QuotaTracker:
+    """
+    Get the global QuotaTracker instance.
+
+    Returns:
+        Global QuotaTracker instance
+    """
+    global _quota_tracker
+    if _quota_tracker is None:
+        _quota_tracker = QuotaTracker()
+    return _quota_tracker
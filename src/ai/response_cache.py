@@ -0,0 +1,230 @@
+"""Content-addressed cache for idempotent LLM calls.
+
+Translations and image-prompt enhancements are often repeated verbatim (the
+same phrase translated twice, a prompt re-enhanced on retry), and each repeat
+used to be a full paid round-trip. Calls that opt in (``use_cache=True`` on a
+provider's ``execute_prompt``) are keyed by::
+
+    sha256(task_type, resolved model, normalized prompt, temperature)
+
+and served from a small in-memory LRU, backed by a size-bounded SQLite file
+that survives restarts. Entries expire after a TTL. Hits come back as a fresh
+``AIResponseMetadata`` with ``cache_hit=True`` and near-zero latency.
+
+Only deterministic-enough tasks should opt in: never thinking, web search or
+free-form chat answers.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .response_metadata import AIResponseMetadata
+from ..utils.disk_cache import TRIM_TARGET_RATIO
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+RESPONSE_CACHE_FILE = Path("cache/llm_responses.db")
+RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+MEMORY_CACHE_ENTRIES = 256
+DISK_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+_METADATA_FIELDS = {f.name for f in fields(AIResponseMetadata)}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    data       TEXT    NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL    NOT NULL,
+    used_at    REAL    NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical prompt text: NFC, trimmed, inner whitespace runs collapsed."""
+    return " ".join(unicodedata.normalize("NFC", prompt or "").split())
+
+
+def response_cache_key(task_type: str, model: str, prompt: str, temperature: float) -> str:
+    """Stable content hash identifying one idempotent LLM call."""
+    payload = json.dumps(
+        [task_type, model, round(float(temperature), 3), normalize_prompt(prompt)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) TTL cache of AIResponseMetadata."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = RESPONSE_CACHE_FILE,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        memory_entries: int = MEMORY_CACHE_ENTRIES,
+        max_disk_bytes: int = DISK_CACHE_MAX_BYTES,
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._memory_entries = memory_entries
+        self._max_disk_bytes = max_disk_bytes
+        # key -> (stored_at wall time, serialized metadata fields)
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            try:
+                path = Path(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(path), check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.executescript(_SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                # The memory tier still works; a broken disk tier must never
+                # break AI commands.
+                logger.warning(f"LLM response cache disk tier disabled: {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[AIResponseMetadata]:
+        """Cached response for ``key`` marked ``cache_hit``, or None."""
+        started = time.monotonic()
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and now - entry[0] > self._ttl:
+            self._memory.pop(key, None)
+            entry = None
+        if entry is None:
+            entry = self._disk_get(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._memory.move_to_end(key)
+        self.hits += 1
+        data = {k: v for k, v in entry[1].items() if k in _METADATA_FIELDS}
+        # Nothing was generated: no tokens spent, latency is the lookup itself.
+        data.update(
+            cache_hit=True,
+            latency_seconds=time.monotonic() - started,
+            input_tokens=None,
+            output_tokens=None,
+        )
+        return AIResponseMetadata(**data)
+
+    def put(self, key: str, result: AIResponseMetadata) -> None:
+        """Store a successful response. Empty or placeholder responses are never cached."""
+        if not isinstance(result, AIResponseMetadata) or not (result.response_text or "").strip():
+            return
+        if result.is_placeholder:
+            return
+        data = {k: v for k, v in asdict(result).items() if k in _METADATA_FIELDS}
+        data["cache_hit"] = False
+        now = time.time()
+        self._remember(key, (now, data))
+        self._disk_put(key, now, data)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._db is not None:
+            try:
+                with self._db:
+                    self._db.execute("DELETE FROM responses")
+            except sqlite3.Error as e:
+                logger.debug(f"LLM response cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory)}
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+    # ---------- tiers ----------
+    def _remember(self, key: str, entry: Tuple[float, Dict]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, Dict]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT data, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self._ttl:
+                with self._db:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            with self._db:
+                self._db.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            return row[1], json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logger.debug(f"LLM response cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key: str, now: float, data: Dict) -> None:
+        if self._db is None:
+            return
+        blob = json.dumps(data, ensure_ascii=False, default=str)
+        try:
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, data, size, created_at, used_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob.encode("utf-8")), now, now),
+                )
+                self._evict(now)
+        except sqlite3.Error as e:
+            logger.debug(f"LLM response cache write failed: {e}")
+
+    def _evict(self, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows past the size cap."""
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self._ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self._max_disk_bytes:
+            return
+        excess = total - int(self._max_disk_bytes * TRIM_TARGET_RATIO)
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY used_at"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+
+# Global response cache instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Get the global ResponseCache instance.
+
+    Returns:
+        Global ResponseCache instance
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
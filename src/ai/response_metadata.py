@@ -22,6 +22,9 @@ class AIResponseMetadata:
         fallback_reason: Explanation if a feature fell back to normal mode
         model_used: Name of the AI model that generated the response
         provider_used: Provider that generated the response
+        cache_hit: Served from the LLM response cache (no provider call)
+        is_placeholder: response_text is a canned error shown in place of an
+            empty model reply (never cached, never used as real output)
     """
     response_text: str
     thinking_requested: bool = False
@@ -44,6 +47,10 @@ class AIResponseMetadata:
     latency_seconds: Optional[float] = None
     input_tokens: Optional[int] = None
     output_tokens: Optional[int] = None
+    # Served from the content-addressed response cache (see response_cache.py).
+    cache_hit: bool = False
+    # Canned "couldn't generate a response" text standing in for an empty reply.
+    is_placeholder: bool = False
     
     def __str__(self) -> str:
         """Return response text for backward compatibility."""
@@ -192,6 +199,8 @@ def build_response_parts(metadata: AIResponseMetadata) -> tuple:
         provider = metadata.provider_used or "fallback"
         reason = metadata.provider_fallback_reason or "primary unavailable"
         badge_parts.append(f"🔄 Fallback: {provider} ({reason})")
+    if metadata.cache_hit:
+        badge_parts.append("♻️ Cached")
 
     # ---- Assemble ----
     header = ("\n".join(header_parts) + "\n\n") if header_parts else ""
@@ -0,0 +1,165 @@
+"""Vectorized silence detection for STT chunking.
+
+``pydub.silence.split_on_silence`` slides a ``min_silence_len`` window across
+the audio every ``seek_step`` ms and computes each window's RMS with a fresh
+slice and an ``audioop`` call, all in a Python loop. For an hour of audio at a
+10 ms step that is ~360k slices and is CPU-bound on small hardware.
+
+``split_on_silence`` here returns the same segments. It squares the decoded
+int16 samples once in NumPy and sums them per millisecond. A prefix sum over
+those per-ms energies then gives the RMS of every candidate window with array
+operations, and silence runs are merged with ``np.diff`` instead of a loop.
+The per-ms energies are built block by block so the int64 squares never
+exceed a few MB. pydub's own implementation is used when NumPy is not
+installed or when the audio is not 16-bit.
+"""
+
+import itertools
+from typing import List
+
+from pydub import AudioSegment
+from pydub import silence as pydub_silence
+from pydub.utils import db_to_float
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+# Milliseconds of audio squared per block when building per-ms energies.
+_ENERGY_BLOCK_MS = 60_000
+
+
+def numpy_available() -> bool:
+    """Whether the vectorized path can run."""
+    return np is not None
+
+
+def _ms_energy_prefix(audio: AudioSegment, n_ms: int):
+    """Return ``(prefix, bounds)`` for per-millisecond energies.
+
+    ``bounds[k]`` is the first sample of millisecond ``k`` (pydub's own
+    slicing rule) and ``prefix[k]`` is the sum of squared samples before it.
+    """
+    channels = audio.channels
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    frames = len(samples) // channels
+    ms = np.arange(n_ms + 1, dtype=np.int64)
+    # Same float arithmetic as AudioSegment._parse_position, so the window
+    # edges land on exactly the frames a pydub slice would use.
+    bounds = np.minimum((ms * (audio.frame_rate / 1000.0)).astype(np.int64), frames) * channels
+
+    energies = np.zeros(n_ms, dtype=np.int64)
+    for k0 in range(0, n_ms, _ENERGY_BLOCK_MS):
+        k1 = min(k0 + _ENERGY_BLOCK_MS, n_ms)
+        lo, hi = bounds[k0], bounds[k1]
+        if hi <= lo:
+            continue
+        block = samples[lo:hi].astype(np.int64)
+        block *= block
+        starts = bounds[k0:k1] - lo
+        # reduceat needs strictly valid start indices; empty ms (only at the
+        # very end, past the data) keep zero energy.
+        valid = starts < len(block)
+        energies[k0:k1][valid] = np.add.reduceat(block, starts[valid])
+        # reduceat sums [start_i, start_{i+1}); equal neighbours yield the
+        # single element instead of zero, so clear those.
+        empty = np.diff(np.append(starts, hi - lo)) == 0
+        energies[k0:k1][empty] = 0
+
+    prefix = np.zeros(n_ms + 1, dtype=np.int64)
+    np.cumsum(energies, out=prefix[1:])
+    return prefix, bounds
+
+
+def detect_silence(
+    audio: AudioSegment,
+    min_silence_len: int = 1000,
+    silence_thresh: float = -16,
+    seek_step: int = 1,
+) -> List[List[int]]:
+    """Vectorized ``pydub.silence.detect_silence`` (same arguments and result)."""
+    if np is None or audio.sample_width != 2:
+        return pydub_silence.detect_silence(audio, min_silence_len, silence_thresh, seek_step)
+
+    seg_len = len(audio)
+    if seg_len < min_silence_len:
+        return []
+
+    thresh = db_to_float(silence_thresh) * audio.max_possible_amplitude
+    last_slice_start = seg_len - min_silence_len
+    starts = np.arange(0, last_slice_start + 1, seek_step, dtype=np.int64)
+    if last_slice_start % seek_step:
+        starts = np.append(starts, last_slice_start)
+
+    prefix, bounds = _ms_energy_prefix(audio, seg_len)
+    ends = starts + min_silence_len
+    energy = prefix[ends] - prefix[starts]
+    counts = bounds[ends] - bounds[starts]
+    # audioop.rms truncates sqrt(sum / n) to an integer; match it exactly.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rms = np.floor(np.sqrt(energy / np.maximum(counts, 1)))
+    silence_starts = starts[rms <= thresh]
+
+    if silence_starts.size == 0:
+        return []
+
+    # A run breaks where the next silent window neither follows directly nor
+    # overlaps the previous one (same rule as pydub's merge loop).
+    steps = np.diff(silence_starts)
+    breaks = np.flatnonzero((steps != seek_step) & (steps > min_silence_len)) + 1
+    run_starts = silence_starts[np.concatenate(([0], breaks))]
+    run_ends = silence_starts[np.concatenate((breaks - 1, [silence_starts.size - 1]))]
+    return [[int(s), int(e) + min_silence_len] for s, e in zip(run_starts, run_ends)]
+
+
+def detect_nonsilent(
+    audio: AudioSegment,
+    min_silence_len: int = 1000,
+    silence_thresh: float = -16,
+    seek_step: int = 1,
+) -> List[List[int]]:
+    """``pydub.silence.detect_nonsilent`` on top of the vectorized detector."""
+    silent_ranges = detect_silence(audio, min_silence_len, silence_thresh, seek_step)
+    len_seg = len(audio)
+
+    if not silent_ranges:
+        return [[0, len_seg]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+        return []
+
+    prev_end_i = 0
+    nonsilent_ranges = []
+    for start_i, end_i in silent_ranges:
+        nonsilent_ranges.append([prev_end_i, start_i])
+        prev_end_i = end_i
+    if end_i != len_seg:
+        nonsilent_ranges.append([prev_end_i, len_seg])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+
+def split_on_silence(
+    audio: AudioSegment,
+    min_silence_len: int = 1000,
+    silence_thresh: float = -16,
+    keep_silence: int = 100,
+    seek_step: int = 1,
+) -> List[AudioSegment]:
+    """Drop-in for ``pydub.silence.split_on_silence`` using the fast detector."""
+    if isinstance(keep_silence, bool):
+        keep_silence = len(audio) if keep_silence else 0
+
+    output_ranges = [
+        [start - keep_silence, end + keep_silence]
+        for start, end in detect_nonsilent(audio, min_silence_len, silence_thresh, seek_step)
+    ]
+    a, b = itertools.tee(output_ranges)
+    next(b, None)
+    for range_i, range_ii in zip(a, b):
+        if range_ii[0] < range_i[1]:
+            range_i[1] = (range_i[1] + range_ii[0]) // 2
+            range_ii[0] = range_i[1]
+
+    return [audio[max(start, 0):min(end, len(audio))] for start, end in output_ranges]
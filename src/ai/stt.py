@@ -1,16 +1,19 @@
 """Speech-to-Text processing for SakaiBot."""
 
 import asyncio
-import os
+import shutil
 from pathlib import Path
-from typing import Awaitable, Callable, List, Optional, Set
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import speech_recognition as sr
 from pydub import AudioSegment
-from pydub.silence import split_on_silence
 
+from ..core.constants import DEFAULT_STT_LANGUAGE
 from ..core.exceptions import AIProcessorError
 from ..utils.logging import get_logger
+from ..utils.rate_limiter import TokenBucket
+from ..utils.stt_cache import CHUNK_OK, CHUNK_SILENT, SttCache, get_stt_cache
+from .silence import split_on_silence
 
 
 # Google Web Speech API is unofficial and fragile. Although it may accept
@@ -29,139 +32,241 @@ _FALLBACK_SILENCE_THRESH = -40  # dBFS, used when audio.dBFS is -inf
 # Resilience: Google's free Web Speech endpoint has no SLA and occasionally
 # returns an empty response (raised as UnknownValueError) when throttled, or
 # transient 5xx/connection errors (RequestError). Retry each chunk a few times
-# before giving up, and space requests apart slightly to be polite.
+# before giving up, and pace requests through a shared token bucket to be polite.
 _MAX_CHUNK_ATTEMPTS = 3         # 1 initial + 2 retries
 _RETRY_BASE_DELAY_S = 1.5       # exponential backoff: 1.5s, 3s, ...
-_INTER_CHUNK_DELAY_S = 0.4      # quiet gap between successive chunk requests
+_MAX_PARALLEL_CHUNKS = 4        # chunks transcribed concurrently per processor
+_REQUESTS_PER_SECOND = 2.5      # sustained request rate across all chunks
+_REQUEST_BURST = 2              # requests allowed back-to-back before pacing
+
+# Decoded format handed to the chunker and recognizer.
+_STT_SAMPLE_RATE = 16_000
+_DECODE_ERROR_TAIL = 300        # chars of ffmpeg stderr kept in decode errors
 
 ProgressCallback = Callable[[int, int], Awaitable[None]]
+AudioSource = Union[
+    str, AudioSegment, Callable[[], Awaitable[Union[str, AudioSegment]]]
+]
 ChunkTextCallback = Callable[[int, int, str], Awaitable[None]]
 
 
+def _is_settled(entry: Optional[Tuple[str, Optional[str]]]) -> bool:
+    """Whether a stored chunk result can be replayed instead of re-run.
+
+    Only successes are: Google's free endpoint reports throttling as
+    "unintelligible" too, so a stored ``silent`` chunk may well succeed now.
+    """
+    return entry is not None and entry[0] == CHUNK_OK
+
+
 class SpeechToTextProcessor:
     """Handles speech-to-text conversion using Google Web Speech API.
 
     Long audio (>~60s) is automatically split into chunks on silence boundaries
-    and transcribed sequentially. Individual unintelligible chunks are skipped
+    and transcribed by a bounded pool of concurrent workers; results are still
+    reported in chunk order. Individual unintelligible chunks are skipped
     rather than aborting the whole transcription.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, config: Optional[Any] = None, cache: Optional[SttCache] = None) -> None:
         self._logger = get_logger(self.__class__.__name__)
         self._recognizer = sr.Recognizer()
+        self._cache = cache
+        self._ffmpeg_path = getattr(config, "ffmpeg_path_resolved", None)
+        self._max_workers = (
+            getattr(config, "stt_max_parallel_chunks", None) or _MAX_PARALLEL_CHUNKS
+        )
+        # One bucket per processor: every transcription running through this
+        # instance shares the same request budget towards Google.
+        self._bucket = TokenBucket(
+            getattr(config, "stt_requests_per_second", None) or _REQUESTS_PER_SECOND,
+            capacity=_REQUEST_BURST,
+        )
+
+    async def decode_audio(self, audio_path: str) -> AudioSegment:
+        """Decode any audio file to 16 kHz mono 16-bit PCM in memory.
+
+        One ffmpeg process reads the file and writes raw s16le PCM to stdout,
+        so there is no intermediate WAV and no second decode. Without an
+        ffmpeg binary, pydub decodes the file (WAV works natively).
+
+        Raises:
+            AIProcessorError: If the file is missing or cannot be decoded.
+        """
+        if not Path(audio_path).exists():
+            self._logger.error(f"Audio file not found at {audio_path}")
+            raise AIProcessorError("Audio file not found")
+
+        ffmpeg = self._resolve_ffmpeg()
+        if ffmpeg is None:
+            try:
+                audio = await asyncio.to_thread(AudioSegment.from_file, str(audio_path))
+                return await asyncio.to_thread(
+                    lambda: audio.set_channels(1).set_frame_rate(_STT_SAMPLE_RATE).set_sample_width(2)
+                )
+            except Exception as e:
+                self._logger.error(f"Audio decode failed: {e}", exc_info=True)
+                raise AIProcessorError(
+                    "Could not decode audio file (unsupported format or corrupt data)"
+                ) from e
+
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", str(audio_path),
+            "-vn", "-ac", "1", "-ar", str(_STT_SAMPLE_RATE),
+            "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        pcm, stderr = await process.communicate()
+        if process.returncode != 0 or not pcm:
+            detail = stderr.decode(errors="replace").strip()[-_DECODE_ERROR_TAIL:]
+            self._logger.error(f"ffmpeg decode failed ({process.returncode}): {detail}")
+            raise AIProcessorError(
+                "Could not decode audio file (unsupported format or corrupt data)"
+            )
+        # An odd trailing byte would be half a sample; drop it.
+        pcm = pcm[: len(pcm) - (len(pcm) % 2)]
+        return AudioSegment(
+            data=pcm, sample_width=2, frame_rate=_STT_SAMPLE_RATE, channels=1
+        )
+
+    def _resolve_ffmpeg(self) -> Optional[str]:
+        """The configured ffmpeg, else pydub's converter if it is on PATH."""
+        if self._ffmpeg_path and Path(self._ffmpeg_path).is_file():
+            return self._ffmpeg_path
+        return shutil.which(AudioSegment.converter or "ffmpeg")
 
     async def transcribe_voice_to_text(
         self,
-        audio_wav_path: str,
-        language: str = "fa-IR",
+        audio: AudioSource,
+        language: str = DEFAULT_STT_LANGUAGE,
         progress_cb: Optional[ProgressCallback] = None,
         on_chunk_text: Optional[ChunkTextCallback] = None,
         chunk_filter: Optional[Set[int]] = None,
+        cache_key: Optional[str] = None,
     ) -> str:
         """Transcribe audio of any length to text.
 
         Args:
-            audio_wav_path: Path to a WAV file (mono/16kHz recommended).
+            audio: Path to an audio file in any ffmpeg-readable format,
+                audio already returned by :meth:`decode_audio`, or an async
+                loader returning either. A loader is only awaited when some
+                chunk actually needs transcribing (see ``cache_key``).
             language: BCP-47 language tag for Google STT.
             progress_cb: Optional async callback invoked as ``(current, total)``
                 after each chunk is processed (called regardless of whether the
-                chunk produced any text).
+                chunk produced any text). Calls arrive in chunk order.
             on_chunk_text: Optional async callback invoked as
                 ``(chunk_index, total, text)`` after each chunk with non-empty
                 transcription. Skipped/unintelligible chunks are not reported.
+                Chunks may finish out of order; a finished chunk is held back
+                until every earlier chunk has been reported.
             chunk_filter: Optional set of 1-indexed chunk numbers to process.
                 When set, only listed chunks are transcribed; all others are
                 skipped without calling either callback. Used for partial
                 retries of failed chunks from an earlier run. Splitting is
                 deterministic, so chunk N on retry is the same audio segment
                 as chunk N on the original attempt.
+            cache_key: Optional key from :func:`stt_cache_key` /
+                :func:`file_cache_key`. Per-chunk results are stored under it.
+                Chunks that already succeeded are replayed from the store;
+                every other chunk runs again. When nothing is left to run,
+                the audio is never loaded.
 
         Returns:
             The full transcribed text of processed chunks, joined with spaces.
         """
-        audio_path = Path(audio_wav_path)
-        if not audio_path.exists():
-            self._logger.error(f"Audio file not found at {audio_wav_path}")
-            raise AIProcessorError("Audio file not found")
-
-        audio = await asyncio.to_thread(AudioSegment.from_file, str(audio_path))
-        duration_ms = len(audio)
-        self._logger.info(f"Audio duration: {duration_ms / 1000:.1f}s")
-
-        if duration_ms <= _CHUNK_MS:
-            if chunk_filter is not None and 1 not in chunk_filter:
-                raise AIProcessorError(
-                    f"Audio has only 1 chunk; requested chunks "
-                    f"{sorted(chunk_filter)} are out of range"
-                )
-            text, error_kind = await self._transcribe_chunk_with_retry(
-                str(audio_path), language, 1, 1
-            )
-            if not text:
-                if error_kind == "service":
-                    raise AIProcessorError(
-                        "STT service unavailable — please try again in a moment"
-                    )
-                raise AIProcessorError("Speech was unintelligible")
-            if text and on_chunk_text:
-                await on_chunk_text(1, 1, text.strip())
-            if progress_cb:
-                await progress_cb(1, 1)
-            return text
-
-        chunks = await asyncio.to_thread(self._split_audio, audio)
-        total = len(chunks)
-
-        if chunk_filter is not None:
-            out_of_range = sorted(i for i in chunk_filter if i < 1 or i > total)
-            if out_of_range:
-                raise AIProcessorError(
-                    f"Chunk indices {out_of_range} out of range "
-                    f"(audio has {total} chunks)"
+        cache = self._get_cache() if cache_key else None
+        stored = cache.load(cache_key) if cache is not None else None
+        known: Dict[int, Tuple[str, Optional[str]]] = {}
+        chunks: Optional[List[AudioSegment]] = None
+        if stored is not None:
+            total, known = stored
+        else:
+            chunks = await self._load_chunks(audio)
+            total = len(chunks)
+        self._check_chunk_filter(chunk_filter, total)
+
+        # Chunk numbering comes from the deterministic split, so a filtered
+        # retry still addresses the same segments.
+        selected = [
+            idx for idx in range(1, total + 1)
+            if chunk_filter is None or idx in chunk_filter
+        ]
+        pending = [idx for idx in selected if not _is_settled(known.get(idx))]
+        if pending and chunks is None:
+            chunks = await self._load_chunks(audio)
+            if len(chunks) != total:
+                self._logger.info(
+                    f"Stored transcript has {total} chunks but audio now splits "
+                    f"into {len(chunks)}; transcribing from scratch"
                 )
+                total, known = len(chunks), {}
+                self._check_chunk_filter(chunk_filter, total)
+                selected = [
+                    idx for idx in range(1, total + 1)
+                    if chunk_filter is None or idx in chunk_filter
+                ]
+                pending = list(selected)
+        if known:
             self._logger.info(
-                f"Split long audio into {total} chunks; "
-                f"filter active for {sorted(chunk_filter)}"
+                f"Reusing {len(selected) - len(pending)}/{len(selected)} stored chunk results"
             )
-        else:
-            self._logger.info(f"Split long audio into {total} chunks")
 
-        temp_dir = str(audio_path.parent)
-        stem = audio_path.stem
         parts: List[str] = []
         service_failures = 0  # chunks that failed with network/HTTP errors
         silent_failures = 0   # chunks that failed with "unintelligible" / no speech
 
-        for idx, segment in enumerate(chunks, start=1):
-            if chunk_filter is not None and idx not in chunk_filter:
-                continue
-
-            chunk_path = os.path.join(temp_dir, f"{stem}_chunk_{idx}.wav")
-            try:
-                await asyncio.to_thread(segment.export, chunk_path, format="wav")
+        results: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+        for idx in selected:
+            if idx not in pending:
+                status, text = known[idx]
+                results[idx] = (text, None) if status == CHUNK_OK else (None, status)
+        next_pos = 0
+        deliver_lock = asyncio.Lock()
+        workers = asyncio.Semaphore(self._max_workers)
+
+        async def deliver_ready() -> None:
+            # Report the finished prefix of ``selected`` in chunk order.
+            nonlocal next_pos, service_failures, silent_failures
+            async with deliver_lock:
+                while next_pos < len(selected) and selected[next_pos] in results:
+                    idx = selected[next_pos]
+                    next_pos += 1
+                    text, error_kind = results.pop(idx)
+                    if text:
+                        parts.append(text)
+                        if on_chunk_text:
+                            await on_chunk_text(idx, total, text)
+                    elif error_kind == "service":
+                        service_failures += 1
+                    else:
+                        silent_failures += 1
+                    if progress_cb:
+                        await progress_cb(idx, total)
+
+        async def run_chunk(idx: int) -> None:
+            async with workers:
                 text, error_kind = await self._transcribe_chunk_with_retry(
-                    chunk_path, language, idx, total
+                    chunks[idx - 1], language, idx, total
                 )
-                if text:
-                    parts.append(text)
-                    if on_chunk_text:
-                        await on_chunk_text(idx, total, text)
-                elif error_kind == "service":
-                    service_failures += 1
-                else:
-                    silent_failures += 1
-            finally:
-                try:
-                    Path(chunk_path).unlink(missing_ok=True)
-                except Exception:
-                    pass
-
-            if progress_cb:
-                await progress_cb(idx, total)
-
-            # Space requests apart so we don't trip Google's free-tier throttle.
-            if idx < total:
-                await asyncio.sleep(_INTER_CHUNK_DELAY_S)
+            results[idx] = (text, error_kind)
+            if cache is not None:
+                cache.put_chunk(
+                    cache_key, total, idx,
+                    CHUNK_OK if text else (error_kind or CHUNK_SILENT), text,
+                )
+            await deliver_ready()
+
+        # Stored chunks ahead of the first pending one go out immediately.
+        await deliver_ready()
+        tasks = [asyncio.create_task(run_chunk(idx)) for idx in pending]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
 
         self._logger.info(
             f"Transcription complete: {len(parts)}/{total} chunks delivered, "
@@ -177,9 +282,50 @@ class SpeechToTextProcessor:
 
         return " ".join(parts)
 
+    def _get_cache(self) -> SttCache:
+        if self._cache is None:
+            self._cache = get_stt_cache()
+        return self._cache
+
+    async def _load_chunks(self, audio: AudioSource) -> List[AudioSegment]:
+        """Decode ``audio`` (resolving a loader first) and split it into chunks."""
+        if callable(audio):
+            audio = await audio()
+        if not isinstance(audio, AudioSegment):
+            audio = await self.decode_audio(audio)
+        if audio.channels != 1:
+            # The recognizer takes mono PCM; downmix once, before any slicing.
+            audio = await asyncio.to_thread(audio.set_channels, 1)
+        duration_ms = len(audio)
+        self._logger.info(f"Audio duration: {duration_ms / 1000:.1f}s")
+        if duration_ms <= _CHUNK_MS:
+            return [audio]
+        chunks = await asyncio.to_thread(self._split_audio, audio)
+        self._logger.info(f"Split long audio into {len(chunks)} chunks")
+        return chunks
+
+    @staticmethod
+    def _check_chunk_filter(chunk_filter: Optional[Set[int]], total: int) -> None:
+        """Reject a ``chunk_filter`` naming chunks the audio does not have."""
+        if chunk_filter is None:
+            return
+        if total == 1:
+            if 1 not in chunk_filter:
+                raise AIProcessorError(
+                    f"Audio has only 1 chunk; requested chunks "
+                    f"{sorted(chunk_filter)} are out of range"
+                )
+            return
+        out_of_range = sorted(i for i in chunk_filter if i < 1 or i > total)
+        if out_of_range:
+            raise AIProcessorError(
+                f"Chunk indices {out_of_range} out of range "
+                f"(audio has {total} chunks)"
+            )
+
     async def _transcribe_chunk_with_retry(
         self,
-        chunk_path: str,
+        segment: AudioSegment,
         language: str,
         idx: int,
         total: int,
@@ -201,9 +347,11 @@ class SpeechToTextProcessor:
         had_service_error = False
 
         for attempt in range(1, _MAX_CHUNK_ATTEMPTS + 1):
+            # Every attempt, retries included, draws from the shared budget.
+            await self._bucket.acquire()
             try:
                 text = await asyncio.to_thread(
-                    self._transcribe_file_sync, chunk_path, language
+                    self._transcribe_segment_sync, segment, language
                 )
                 if text:
                     return text.strip(), None
@@ -299,17 +447,16 @@ class SpeechToTextProcessor:
             i = end - _OVERLAP_MS
         return chunks
 
-    def _transcribe_file_sync(self, audio_wav_path: str, language: str) -> str:
-        """Synchronously transcribe a single short WAV file."""
-        audio_path = Path(audio_wav_path)
-        if not audio_path.exists():
-            self._logger.error(f"Audio file not found at {audio_wav_path}")
-            raise AIProcessorError("Audio file not found")
+    def _transcribe_segment_sync(self, segment: AudioSegment, language: str) -> str:
+        """Synchronously transcribe one short mono segment.
 
+        The segment's PCM frames go to the recognizer as in-memory
+        ``AudioData``; nothing is written to disk.
+        """
         try:
-            with sr.AudioFile(str(audio_path)) as source:
-                audio_data = self._recognizer.record(source)
-
+            audio_data = sr.AudioData(
+                segment.raw_data, segment.frame_rate, segment.sample_width
+            )
             text = self._recognizer.recognize_google(audio_data, language=language)
             self._logger.info(f"Transcription successful: '{text[:100]}...'")
             return text
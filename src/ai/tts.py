@@ -1,131 +1,230 @@
-"""Text-to-Speech processing for SakaiBot."""
-
-from __future__ import annotations
-
-import asyncio
-import tempfile
-import uuid
-from pathlib import Path
-from typing import Optional
-
-# Ensure .env is loaded before reading environment variables
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not available, rely on Pydantic Settings or system env
-
-from ..core.tts_config import DEFAULT_VOICE
-from ..utils.logging import get_logger
-from .providers.tts_gemini import synthesize_speech as gemini_synthesize_speech
-
-
-class TextToSpeechProcessor:
-    """Handles text-to-speech conversion with multiple provider support."""
-
-    def __init__(self) -> None:
-        self._logger = get_logger(self.__class__.__name__)
-        self._last_error: Optional[str] = None
-
-    @property
-    def last_error(self) -> Optional[str]:
-        return self._last_error
-
-    def _resolve_voice(self, requested_voice: Optional[str]) -> str:
-        """Resolve voice name to a valid Google GenAI voice.
-        
-        Valid voices: achernar, achird, algenib, algieba, alnilam, aoede, autonoe, 
-        callirrhoe, charon, despina, enceladus, erinome, fenrir, gacrux, iapetus, 
-        kore, laomedeia, leda, orus, puck, pulcherrima, rasalgethi, sadachbia, 
-        sadaltager, schedar, sulafat, umbriel, vindemiatrix, zephyr, zubenelgenubi
-        
-        Masculine voices: Orus, Charon, Fenrir, Puck, Gacrux, Alnilam, Schedar, 
-        Rasalgethi, Iapetus, Achernar, Zephyr
-        """
+"""Text-to-Speech processing for SakaiBot.
+
+Gemini returns 24 kHz mono 16-bit PCM. ``.ogg`` outputs are encoded to
+OGG/Opus by piping that PCM through a single ffmpeg process. This is the
+format Telegram expects for voice notes, and it is about 20x smaller than
+the WAV. ``generate_speech_file`` picks OGG whenever ffmpeg is available
+and falls back to WAV when it is not.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional
+
+# Ensure .env is loaded before reading environment variables
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv not available, rely on Pydantic Settings or system env
+
+from pydub import AudioSegment
+
+from ..core.exceptions import AIProcessorError
+from ..core.tts_config import (
+    DEFAULT_CHANNELS,
+    DEFAULT_SAMPLE_RATE,
+    DEFAULT_VOICE,
+    GOOGLE_API_KEYS,
+    LONG_TEXT_SEGMENT_CHARS,
+    MAX_PARALLEL_SEGMENTS_PER_KEY,
+)
+from ..utils.helpers import split_message
+from ..utils.logging import get_logger
+from .providers.tts_gemini import synthesize_pcm, wave_file
+
+# Opus bitrate for voice notes; speech stays clear well below this.
+_OPUS_BITRATE = "32k"
+
+
+class TextToSpeechProcessor:
+    """Handles text-to-speech conversion with multiple provider support."""
+
+    def __init__(self, config: Optional[Any] = None) -> None:
+        self._logger = get_logger(self.__class__.__name__)
+        self._last_error: Optional[str] = None
+        self._ffmpeg_path = getattr(config, "ffmpeg_path_resolved", None)
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    def _resolve_voice(self, requested_voice: Optional[str]) -> str:
+        """Resolve voice name to a valid Google GenAI voice.
+        
+        Valid voices: achernar, achird, algenib, algieba, alnilam, aoede, autonoe, 
+        callirrhoe, charon, despina, enceladus, erinome, fenrir, gacrux, iapetus, 
+        kore, laomedeia, leda, orus, puck, pulcherrima, rasalgethi, sadachbia, 
+        sadaltager, schedar, sulafat, umbriel, vindemiatrix, zephyr, zubenelgenubi
+        
+        Masculine voices: Orus, Charon, Fenrir, Puck, Gacrux, Alnilam, Schedar, 
+        Rasalgethi, Iapetus, Achernar, Zephyr
+        """
         if not requested_voice or not requested_voice.strip():
             return DEFAULT_VOICE
-        
-        voice = requested_voice.strip()
-        
-        # Map old Microsoft/Edge TTS voice names to Google GenAI voices
-        # If it's already a valid Google voice, pass it through
-        if voice.lower() in [
-            'achernar', 'achird', 'algenib', 'algieba', 'alnilam', 'aoede', 
-            'autonoe', 'callirrhoe', 'charon', 'despina', 'enceladus', 'erinome', 
-            'fenrir', 'gacrux', 'iapetus', 'kore', 'laomedeia', 'leda', 'orus', 
-            'puck', 'pulcherrima', 'rasalgethi', 'sadachbia', 'sadaltager', 
-            'schedar', 'sulafat', 'umbriel', 'vindemiatrix', 'zephyr', 'zubenelgenubi'
-        ]:
-            return voice.lower()
-        
+        
+        voice = requested_voice.strip()
+        
+        # Map old Microsoft/Edge TTS voice names to Google GenAI voices
+        # If it's already a valid Google voice, pass it through
+        if voice.lower() in [
+            'achernar', 'achird', 'algenib', 'algieba', 'alnilam', 'aoede', 
+            'autonoe', 'callirrhoe', 'charon', 'despina', 'enceladus', 'erinome', 
+            'fenrir', 'gacrux', 'iapetus', 'kore', 'laomedeia', 'leda', 'orus', 
+            'puck', 'pulcherrima', 'rasalgethi', 'sadachbia', 'sadaltager', 
+            'schedar', 'sulafat', 'umbriel', 'vindemiatrix', 'zephyr', 'zubenelgenubi'
+        ]:
+            return voice.lower()
+        
         # Old voice names - default to Orus (masculine)
         return DEFAULT_VOICE
-
-    async def _synthesize_with_gemini(self, text: str, voice_name: str, output_file: str) -> bool:
-        """Synthesize speech using Gemini TTS provider."""
-        self._logger.info("Generating TTS via Google GenAI (Gemini) TTS.")
-        
-        def _call_gemini() -> bool:
-            success, error_msg = gemini_synthesize_speech(text, output_file, voice_name)
-            if not success and error_msg:
-                self._logger.error(f"Gemini TTS error: {error_msg}")
-                self._last_error = error_msg
-            return success
-        
-        return await asyncio.to_thread(_call_gemini)
-
-    async def text_to_speech(
-        self,
-        text_to_speak: str,
-        voice: Optional[str] = None,
-        output_filename: str = "temp_tts_output.wav",
-        rate: str = "+0%",
-        volume: str = "+0%",
-    ) -> bool:
-        """Convert text to speech using Gemini TTS provider."""
-        if not text_to_speak:
-            self._logger.warning("No text provided to speak")
-            return False
-
-        self._last_error = None
-
-        try:
-            voice_name = self._resolve_voice(voice)
-            success = await self._synthesize_with_gemini(text_to_speak, voice_name, output_filename)
-            
-            if not success:
-                if not self._last_error:
-                    self._last_error = "تولید گفتار با سرویس گوگل انجام نشد."
-                return False
-
-            return True
-        except Exception as e:
-            self._logger.error(f"TTS error: {e}", exc_info=True)
-            self._last_error = str(e)
-            return False
-
-    async def generate_speech_file(
+
+    def _resolve_ffmpeg(self) -> Optional[str]:
+        """The configured ffmpeg, else pydub's converter if it is on PATH."""
+        if self._ffmpeg_path and Path(self._ffmpeg_path).is_file():
+            return self._ffmpeg_path
+        return shutil.which(AudioSegment.converter or "ffmpeg")
+
+    def audio_suffix(self) -> str:
+        """``.ogg`` when Opus encoding is available, else ``.wav``."""
+        return ".ogg" if self._resolve_ffmpeg() else ".wav"
+
+    async def save_audio(self, pcm: bytes, output_file: str) -> None:
+        """Write TTS PCM to ``output_file``: OGG/Opus for ``.ogg``, else WAV.
+
+        Raises:
+            AIProcessorError: Opus encoding failed or ffmpeg is missing
+        """
+        if Path(output_file).suffix.lower() not in (".ogg", ".opus"):
+            await asyncio.to_thread(wave_file, output_file, pcm)
+            return
+
+        ffmpeg = self._resolve_ffmpeg()
+        if ffmpeg is None:
+            raise AIProcessorError("FFmpeg is required to encode voice notes")
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ar", str(DEFAULT_SAMPLE_RATE), "-ac", str(DEFAULT_CHANNELS),
+            "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", _OPUS_BITRATE, "-application", "voip",
+            "-f", "ogg", str(output_file),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate(pcm)
+        if process.returncode != 0:
+            Path(output_file).unlink(missing_ok=True)
+            self._logger.error(
+                f"Opus encode failed (exit {process.returncode}): "
+                f"{stderr.decode(errors='replace').strip()[:300]}"
+            )
+            raise AIProcessorError("Could not encode the voice note")
+
+    def speech_segments(self, text: str) -> List[str]:
+        """Split text at sentence boundaries into pieces synthesized separately."""
+        return [
+            segment for segment in split_message((text or "").strip(), max_length=LONG_TEXT_SEGMENT_CHARS)
+            if segment.strip()
+        ]
+
+    async def stream_speech(self, text: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Yield the PCM of each segment of ``text``, in order.
+
+        All segments are synthesized concurrently, bounded by
+        ``MAX_PARALLEL_SEGMENTS_PER_KEY`` per configured key, so the first
+        segment is ready to play while the rest are still generating.
+
+        Raises:
+            AIProcessorError: A segment could not be synthesized
+        """
+        voice_name = self._resolve_voice(voice)
+        segments = self.speech_segments(text)
+        limit = asyncio.Semaphore(max(1, len(GOOGLE_API_KEYS)) * MAX_PARALLEL_SEGMENTS_PER_KEY)
+
+        async def synthesize(segment: str) -> bytes:
+            async with limit:
+                return await synthesize_pcm(segment, voice_name)
+
+        tasks = [asyncio.ensure_future(synthesize(segment)) for segment in segments]
+        try:
+            for index, task in enumerate(tasks, 1):
+                try:
+                    yield await task
+                except Exception as e:
+                    if len(tasks) == 1:
+                        raise AIProcessorError(str(e)) from e
+                    raise AIProcessorError(f"TTS failed on segment {index}/{len(tasks)}: {e}") from e
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def text_to_speech(
+        self,
+        text_to_speak: str,
+        voice: Optional[str] = None,
+        output_filename: str = "temp_tts_output.wav",
+        rate: str = "+0%",
+        volume: str = "+0%",
+    ) -> bool:
+        """Convert text to speech using Gemini TTS provider."""
+        if not text_to_speak:
+            self._logger.warning("No text provided to speak")
+            return False
+
+        self._last_error = None
+
+        try:
+            voice_name = self._resolve_voice(voice)
+            segments = len(self.speech_segments(text_to_speak))
+            if segments > 1:
+                self._logger.info(f"Generating long-form TTS in {segments} segments.")
+            else:
+                self._logger.info("Generating TTS via Google GenAI (Gemini) TTS.")
+            pcm = b"".join([chunk async for chunk in self.stream_speech(text_to_speak, voice_name)])
+            if not pcm:
+                self._last_error = "تولید گفتار با سرویس گوگل انجام نشد."
+                return False
+
+            await self.save_audio(pcm, output_filename)
+            return True
+        except AIProcessorError as e:
+            self._logger.error(f"Gemini TTS error: {e}")
+            self._last_error = str(e)
+            return False
+        except Exception as e:
+            self._logger.error(f"TTS error: {e}", exc_info=True)
+            self._last_error = str(e)
+            return False
+
+    async def generate_speech_file(
         self,
         text: str,
         voice: str = DEFAULT_VOICE,
-        rate: str = "+0%",
-        volume: str = "+0%",
-    ) -> Optional[str]:
-        """Generate a speech WAV file and return the path if successful."""
-        temp_path = Path(tempfile.gettempdir()) / f"temp_tts_{uuid.uuid4().hex}.wav"
-        try:
-            success = await self.text_to_speech(
-                text_to_speak=text,
-                voice=voice,
-                output_filename=str(temp_path),
-                rate=rate,
-                volume=volume,
-            )
-            if success:
-                return str(temp_path)
-            temp_path.unlink(missing_ok=True)
-            return None
-        except Exception as exc:
-            self._logger.error("Error generating speech file: %s", exc)
-            temp_path.unlink(missing_ok=True)
-            return None
+        rate: str = "+0%",
+        volume: str = "+0%",
+    ) -> Optional[str]:
+        """Generate a speech file (OGG/Opus, or WAV without ffmpeg) and return its path."""
+        temp_path = Path(tempfile.gettempdir()) / f"temp_tts_{uuid.uuid4().hex}{self.audio_suffix()}"
+        try:
+            success = await self.text_to_speech(
+                text_to_speak=text,
+                voice=voice,
+                output_filename=str(temp_path),
+                rate=rate,
+                volume=volume,
+            )
+            if success:
+                return str(temp_path)
+            temp_path.unlink(missing_ok=True)
+            return None
+        except Exception as exc:
+            self._logger.error("Error generating speech file: %s", exc)
+            temp_path.unlink(missing_ok=True)
+            return None
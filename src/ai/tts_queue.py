@@ -1,13 +1,19 @@
-"""TTS Queue System for handling multiple TTS requests from Telegram replies."""
+"""TTS Queue System for handling multiple TTS requests from Telegram replies.
+
+One worker blocks on an ``asyncio.Queue`` until a request arrives. Each request
+carries a completion future, and every status change also wakes
+``wait_for_change`` watchers, so nothing here polls on a timer.
+"""
 
 import asyncio
 import uuid
 from pathlib import Path
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 from .tts import TextToSpeechProcessor
+from ..core.config import get_settings
 from ..utils.logging import get_logger
 from ..utils.task_manager import get_task_manager
 
@@ -30,6 +36,8 @@ class TTSRequest:
     status: TTSStatus = TTSStatus.PENDING
     audio_file: Optional[str] = None
     error_message: Optional[str] = None
+    # Resolved with the request itself once it is COMPLETED or FAILED
+    done: Optional["asyncio.Future[TTSRequest]"] = field(default=None, repr=False, compare=False)
 
 
 class TTSQueue:
@@ -38,11 +46,21 @@ class TTSQueue:
     def __init__(self):
         self._queue: asyncio.Queue[TTSRequest] = asyncio.Queue()
         self._requests: Dict[str, TTSRequest] = {}
-        self._processor = TextToSpeechProcessor()
+        # Built on first use: the queue is created at import time, before
+        # settings (ffmpeg path) are guaranteed to load.
+        self._processor: Optional[TextToSpeechProcessor] = None
         self._logger = get_logger(self.__class__.__name__)
-        self._is_processing = False
-        self._max_concurrent = 1  # Process one at a time to avoid API rate limits
+        self._worker: Optional[asyncio.Task] = None
+        # Replaced on every status change; watchers wait on the current one
+        self._changed = asyncio.Event()
         
+    @property
+    def processor(self) -> TextToSpeechProcessor:
+        """The TTS processor, configured from the app settings."""
+        if self._processor is None:
+            self._processor = TextToSpeechProcessor(get_settings())
+        return self._processor
+
     async def add_request(
         self, 
         text: str, 
@@ -57,7 +75,8 @@ class TTSQueue:
             text=text,
             chat_id=chat_id,
             message_id=message_id,
-            voice=voice
+            voice=voice,
+            done=asyncio.get_running_loop().create_future(),
         )
         
         self._requests[request_id] = request
@@ -65,69 +84,50 @@ class TTSQueue:
         
         self._logger.info(f"Added TTS request {request_id} for chat {chat_id}, message {message_id}")
         
-        # Start processing if not already running
-        if not self._is_processing:
-            self._logger.debug("Starting queue processing")
-            task_manager = get_task_manager()
-            task_manager.create_task(self._process_queue())
-        else:
-            self._logger.debug(f"Queue already processing. Current queue size: {self._queue.qsize()}")
+        # One long-lived worker; it sleeps inside queue.get() while idle
+        if self._worker is None or self._worker.done():
+            self._logger.debug("Starting TTS queue worker")
+            self._worker = get_task_manager().create_task(self._process_queue())
         
         return request_id
     
+    def _notify(self) -> None:
+        """Wake everyone waiting in ``wait_for_change``."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    def _finish(self, request: TTSRequest) -> None:
+        if request.done is not None and not request.done.done():
+            request.done.set_result(request)
+        self._notify()
+    
     async def _process_queue(self):
-        """Process TTS requests from the queue."""
-        if self._is_processing:
-            return
-            
-        self._is_processing = True
-        semaphore = asyncio.Semaphore(self._max_concurrent)
-        
-        try:
-            while True:
-                try:
-                    request = await asyncio.wait_for(
-                        self._queue.get(), 
-                        timeout=1.0
-                    )
-                    
-                    async with semaphore:
-                        await self._process_single_request(request)
-                    
-                    # Mark task as done after processing
-                    self._queue.task_done()
-                        
-                except asyncio.TimeoutError:
-                    # Check if queue is empty
-                    if self._queue.empty():
-                        # Wait a bit more to see if new items arrive
-                        await asyncio.sleep(0.5)
-                        if self._queue.empty():
-                            break
-                    continue
-                except Exception as e:
-                    self._logger.error(f"Error processing TTS queue: {e}", exc_info=True)
-                    # Continue processing other requests even if one fails
-                    continue
-        finally:
-            self._is_processing = False
-            self._logger.debug("Queue processing stopped")
+        """Process TTS requests one at a time, blocking while the queue is empty."""
+        while True:
+            request = await self._queue.get()
+            try:
+                await self._process_single_request(request)
+            except Exception as e:
+                self._logger.error(f"Error processing TTS queue: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
     
     async def _process_single_request(self, request: TTSRequest):
         """Process a single TTS request."""
         request_id = request.request_id
         self._logger.info(f"Processing TTS request {request_id} (text length: {len(request.text)} chars)")
         
+        if request_id not in self._requests:
+            return  # cleaned up while still queued
+        
         try:
-            # Small delay to avoid rate limiting when processing multiple requests quickly
-            await asyncio.sleep(0.5)
-            
             # Update status to processing
             request.status = TTSStatus.PROCESSING
             self._logger.debug(f"Request {request_id} status set to PROCESSING")
+            self._notify()
             
             # Generate speech file
-            audio_file = await self._processor.generate_speech_file(
+            audio_file = await self.processor.generate_speech_file(
                 text=request.text,
                 voice=request.voice
             )
@@ -138,18 +138,47 @@ class TTSQueue:
                 self._logger.info(f"TTS request {request_id} completed successfully")
             else:
                 request.status = TTSStatus.FAILED
-                request.error_message = self._processor.last_error or "Failed to generate audio file"
+                request.error_message = self.processor.last_error or "Failed to generate audio file"
                 self._logger.error(f"TTS request {request_id} failed: {request.error_message}")
                 
         except Exception as e:
             request.status = TTSStatus.FAILED
             request.error_message = str(e)
             self._logger.error(f"TTS request {request_id} failed with exception: {e}", exc_info=True)
+        finally:
+            self._finish(request)
     
     def get_request_status(self, request_id: str) -> Optional[TTSRequest]:
         """Get the status of a TTS request."""
         return self._requests.get(request_id)
     
+    def watch_state(self, request_id: str) -> Tuple[Optional[TTSStatus], Optional[int]]:
+        """A request's (status, queue position), to pass to ``wait_for_change``."""
+        request = self._requests.get(request_id)
+        if not request:
+            return None, None
+        return request.status, self.get_request_position(request_id)
+    
+    async def wait_for_change(
+        self,
+        request_id: str,
+        seen: Tuple[Optional[TTSStatus], Optional[int]]
+    ) -> Optional[TTSRequest]:
+        """Block until the request's status or queue position differs from ``seen``.
+        
+        Returns the request, or None once it has been cleaned up.
+        """
+        while self.watch_state(request_id) == seen:
+            await self._changed.wait()
+        return self._requests.get(request_id)
+    
+    async def wait_for_result(self, request_id: str) -> Optional[TTSRequest]:
+        """Await the request's completion future (COMPLETED or FAILED)."""
+        request = self._requests.get(request_id)
+        if not request or request.done is None:
+            return request
+        return await asyncio.shield(request.done)
+    
     def get_request_position(self, request_id: str) -> Optional[int]:
         """Get the position of a request in the queue (1-based).
         
@@ -198,6 +227,7 @@ class TTSQueue:
         
         if request_id in self._requests:
             del self._requests[request_id]
+            self._notify()
     
     @property
     def queue_size(self) -> int:
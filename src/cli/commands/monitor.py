@@ -83,8 +83,8 @@ async def _start_monitoring(verbose: bool):
             from src.utils.cache import CacheManager
             
             ai_processor = AIProcessor(config)
-            stt_processor = SpeechToTextProcessor()
-            tts_processor = TextToSpeechProcessor()
+            stt_processor = SpeechToTextProcessor(config)
+            tts_processor = TextToSpeechProcessor(config)
             telegram_utils = TelegramUtils()
             cache_manager = CacheManager()
             
@@ -72,12 +72,13 @@ async def _run_panel(port, host, expose_lan, tls_cert, tls_key, with_monitoring,
 
     # Shared AI core (used by both the panel and, if enabled, monitoring).
     ai_processor = AIProcessor(config)
-    stt_processor = SpeechToTextProcessor()
-    tts_processor = TextToSpeechProcessor()
+    stt_processor = SpeechToTextProcessor(config)
+    tts_processor = TextToSpeechProcessor(config)
 
     registered = []
     live_taps = []
     analyze_started = False
+    state = None
 
     try:
         if with_monitoring:
@@ -171,6 +172,10 @@ async def _run_panel(port, host, expose_lan, tls_cert, tls_key, with_monitoring,
             from src.panel.monitor_runtime import unregister_monitoring
 
             unregister_monitoring(client, registered + live_taps)
+        if state is not None and state.message_store is not None:
+            state.message_store.close()  # after the taps stop writing to it
+        if state is not None:
+            state.media_cache.maintain()  # persist last-use times from cache hits
         if analyze_started:
             from src.ai.analyze_queue import analyze_queue
 
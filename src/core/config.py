@@ -22,7 +22,10 @@ from .constants import (
     DEFAULT_GEMINI_TTS_MODEL,
     DEFAULT_STT_SUMMARY_MODEL,
     DEFAULT_FLUX_WORKER_URL,
-    DEFAULT_SDXL_WORKER_URL
+    DEFAULT_SDXL_WORKER_URL,
+    DEFAULT_IMAGE_MAX_CONCURRENCY,
+    DEFAULT_IMAGE_CACHE_MAX_MB,
+    DEFAULT_IMAGE_CACHE_MAX_AGE_HOURS
 )
 from .exceptions import ConfigurationError
 
@@ -78,6 +81,11 @@ class Config(BaseSettings):
     gemini_model_flash: str = Field(default=DEFAULT_GEMINI_MODEL_FLASH, description="Gemini Flash Model (simple tasks: translate, image)")
     gemini_model_web_search: str = Field(default=DEFAULT_GEMINI_MODEL_WEB_SEARCH, description="Gemini model used when use_web_search=True (pinned because Gemini 3.x lacks free-tier Search grounding)")
     gemini_model_pro_fallback: Optional[str] = Field(default=None, description="Gemini model used when the Pro tier hits quota")
+    gemini_key_scheduling: str = Field(default="least_loaded", description="How concurrent requests pick a Gemini key: least_loaded (spread over healthy keys) or sequential (1→2→3→4 on failure)")
+    gemini_key_rpm_limit: Optional[int] = Field(default=None, ge=1, description="Local requests-per-minute budget per Gemini key for the scheduler")
+    gemini_key_rpd_limit: Optional[int] = Field(default=None, ge=1, description="Local requests-per-day budget per Gemini key for the scheduler")
+    gemini_quota_tier: str = Field(default="free", description="Client-side Gemini quota tracking: free (throttle to free-tier RPM/TPM/RPD before a 429) or off (paid tiers)")
+    gemini_key_max_concurrency: int = Field(default=4, ge=1, description="Gemini requests allowed in flight per API key")
     gemini_model_prompt: Optional[str] = Field(default=None, description="Gemini model override for /prompt")
     gemini_model_analyze: Optional[str] = Field(default=None, description="Gemini model override for /analyze")
     gemini_model_tellme: Optional[str] = Field(default=None, description="Gemini model override for /tellme")
@@ -89,6 +97,8 @@ class Config(BaseSettings):
     gemini_tts_model: str = Field(default=DEFAULT_GEMINI_TTS_MODEL, description="Gemini TTS model")
     gemini_tts_voice: str = Field(default=DEFAULT_TTS_VOICE, description="Default Gemini TTS voice")
     stt_ai_summary_enabled: bool = Field(default=False, description="Enable AI summary after /stt transcription")
+    stt_max_parallel_chunks: int = Field(default=4, ge=1, description="Audio chunks transcribed concurrently for long voice notes")
+    stt_requests_per_second: float = Field(default=2.5, gt=0, description="Sustained request rate to the speech API across all chunks")
     
     # UserBot Configuration
     userbot_max_analyze_messages: int = Field(
@@ -111,6 +121,10 @@ class Config(BaseSettings):
         description="SDXL Cloudflare Worker endpoint URL"
     )
     sdxl_api_key: Optional[str] = Field(default=None, description="SDXL Worker Bearer token")
+    flux_max_concurrency: int = Field(default=DEFAULT_IMAGE_MAX_CONCURRENCY, ge=1, description="Flux requests generated concurrently")
+    sdxl_max_concurrency: int = Field(default=DEFAULT_IMAGE_MAX_CONCURRENCY, ge=1, description="SDXL requests generated concurrently")
+    image_cache_max_mb: int = Field(default=DEFAULT_IMAGE_CACHE_MAX_MB, ge=1, description="Disk budget for cached generated images")
+    image_cache_max_age_hours: float = Field(default=DEFAULT_IMAGE_CACHE_MAX_AGE_HOURS, gt=0, description="Cached images older than this are deleted")
     
     # Application Settings
     environment: str = Field(default="production", description="Environment (development/production)")
@@ -156,6 +170,22 @@ class Config(BaseSettings):
             raise ValueError("LLM fallback provider must be 'openrouter', 'gemini', or 'none'")
         return normalized
     
+    @field_validator("gemini_key_scheduling")
+    @classmethod
+    def validate_gemini_key_scheduling(cls, v: str) -> str:
+        normalized = (v or "").strip().lower()
+        if normalized not in ["least_loaded", "sequential"]:
+            raise ValueError("Gemini key scheduling must be 'least_loaded' or 'sequential'")
+        return normalized
+    
+    @field_validator("gemini_quota_tier")
+    @classmethod
+    def validate_gemini_quota_tier(cls, v: str) -> str:
+        normalized = (v or "").strip().lower()
+        if normalized not in ["free", "off"]:
+            raise ValueError("Gemini quota tier must be 'free' or 'off'")
+        return normalized
+    
     @field_validator(
         "openrouter_api_key", "openrouter_api_key_1", "openrouter_api_key_2",
         "openrouter_api_key_3", "openrouter_api_key_4"
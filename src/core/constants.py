@@ -52,11 +52,14 @@ DEFAULT_GEMINI_MODEL: Final[str] = DEFAULT_GEMINI_MODEL_FLASH
 DEFAULT_TTS_VOICE: Final[str] = "Orus"  # Google GenAI TTS voice (masculine)
 DEFAULT_GEMINI_TTS_MODEL: Final[str] = "gemini-3.1-flash-tts-preview"
 DEFAULT_STT_SUMMARY_MODEL: Final[str] = DEFAULT_GEMINI_MODEL_FLASH
+DEFAULT_STT_LANGUAGE: Final[str] = "fa-IR"
 CONFIRMATION_KEYWORD: Final[str] = "confirm"
 
 # Task type definitions for model selection
 COMPLEX_TASKS: Final[tuple[str, ...]] = ("analyze", "tellme", "prompt")
-SIMPLE_TASKS: Final[tuple[str, ...]] = ("translate", "image_enhance", "prompt_enhancer")
+SIMPLE_TASKS: Final[tuple[str, ...]] = (
+    "translate", "image_enhance", "prompt_enhancer", "analyze_window"
+)
 
 # Logging Constants
 LOG_FORMAT: Final[str] = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -75,5 +78,12 @@ IMAGE_GENERATION_TIMEOUT: Final[int] = 120  # seconds
 IMAGE_GENERATION_CONNECT_TIMEOUT: Final[int] = 30  # seconds
 MAX_IMAGE_PROMPT_LENGTH: Final[int] = 1000
 IMAGE_TEMP_DIR: Final[str] = "temp/images"
+DEFAULT_IMAGE_MAX_CONCURRENCY: Final[int] = 2  # requests in flight per backend
+IMAGE_RATE_LIMIT_ERROR: Final[str] = "Rate limit exceeded. Please try again later."
+IMAGE_RATE_LIMIT_RETRIES: Final[int] = 2
+IMAGE_RATE_LIMIT_BACKOFF_SECONDS: Final[float] = 5.0  # doubled per consecutive 429
+IMAGE_RATE_LIMIT_MAX_BACKOFF_SECONDS: Final[float] = 60.0
+DEFAULT_IMAGE_CACHE_MAX_MB: Final[int] = 500  # generated images kept on disk
+DEFAULT_IMAGE_CACHE_MAX_AGE_HOURS: Final[float] = 72.0
 DEFAULT_FLUX_WORKER_URL: Final[str] = "https://image-smoke-ad69.fa-ra9931143.workers.dev"
 DEFAULT_SDXL_WORKER_URL: Final[str] = "https://image-api.cpt-n3m0.workers.dev"
@@ -51,6 +51,19 @@ def _get_google_api_key() -> Optional[str]:
     return None
 
 
+def _get_google_api_keys() -> List[str]:
+    """All usable Gemini keys for TTS rotation, in ``_get_google_api_key`` priority order."""
+    keys: List[str] = []
+    for name in (
+        "GEMINI_API_KEY_TTS", "GEMINI_API_KEY_1", "GEMINI_API_KEY_2",
+        "GEMINI_API_KEY_3", "GEMINI_API_KEY_4", "GEMINI_API_KEY", "GOOGLE_API_KEY",
+    ):
+        key = os.getenv(name)
+        if key and len(key) > 10 and "YOUR_GEMINI_API_KEY_HERE" not in key and key not in keys:
+            keys.append(key)
+    return keys
+
+
 def _first_env_value(*names: str) -> Optional[str]:
     """Return the first non-empty environment value from ``names``."""
     for name in names:
@@ -62,6 +75,7 @@ def _first_env_value(*names: str) -> Optional[str]:
 
 # TTS API Configuration
 GOOGLE_API_KEY: Optional[str] = _get_google_api_key()
+GOOGLE_API_KEYS: List[str] = _get_google_api_keys()
 
 # Retry Configuration
 MAX_RETRIES: int = 3
@@ -84,3 +98,9 @@ DEFAULT_VOICE: str = (
 DEFAULT_SAMPLE_RATE: int = 24000
 DEFAULT_CHANNELS: int = 1
 DEFAULT_SAMPLE_WIDTH: int = 2
+
+# Long-text Settings
+# Texts longer than this are split at sentence boundaries and synthesized in parallel
+LONG_TEXT_SEGMENT_CHARS: int = 600
+# Concurrent segment requests allowed per configured TTS key
+MAX_PARALLEL_SEGMENTS_PER_KEY: int = 2
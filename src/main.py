@@ -25,6 +25,7 @@ from .utils.structured_logging import (
 from .utils.task_manager import get_task_manager
 from .utils.instance_lock import InstanceLock
 from .ai.analyze_queue import analyze_queue
+from .ai.http_transport import get_http_transport
 from .cli.handler import CLIHandler
 from .telegram.connection_health import ConnectionHealthMonitor
 
@@ -44,8 +45,8 @@ class SakaiBot:
         
         # Initialize AI components
         self._ai_processor = AIProcessor(config)
-        self._stt_processor = SpeechToTextProcessor()
-        self._tts_processor = TextToSpeechProcessor()
+        self._stt_processor = SpeechToTextProcessor(config)
+        self._tts_processor = TextToSpeechProcessor(config)
         
         # Initialize event handlers
         self._event_handlers = EventHandlers(
@@ -186,6 +187,9 @@ class SakaiBot:
             await analyze_queue.start_cleanup_task()
             self._logger.info("Analyze queue cleanup task started")
             
+            # Open keep-alive connections to the AI hosts in the background
+            get_http_transport().start_warm_up(self._config)
+            
             # Start connection health monitor
             self._health_monitor = ConnectionHealthMonitor(self._client_manager)
             await self._health_monitor.start_monitoring()
@@ -236,6 +240,12 @@ class SakaiBot:
             except Exception as e:
                 self._logger.error(f"Error cancelling tasks: {e}", exc_info=True)
             
+            # Close the shared AI HTTP pools
+            try:
+                await get_http_transport().aclose()
+            except Exception as e:
+                self._logger.error(f"Error closing HTTP transport: {e}")
+            
             # Disconnect client
             if self._client_manager.is_connected():
                 print("Disconnecting Telegram client...")
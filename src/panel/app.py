@@ -6,9 +6,10 @@ shell); every ``/api/*`` route except ``/api/health`` requires the token.
 """
 
 import asyncio
+import contextlib
 import json
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
 from fastapi import APIRouter, Body, Depends, FastAPI, File, Form, Request, UploadFile
 from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
@@ -18,11 +19,15 @@ from ..utils.logging import get_logger
 from .auth import require_token
 from .avatars import initials_svg
 from .errors import PanelError, PanelNotFound
+from .file_responses import conditional_file_response
 
 logger = get_logger(__name__)
 
 STATIC_DIR = Path(__file__).parent / "static"
 
+# Server-sent event streams must reach the browser unbuffered.
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive"}
+
 
 def _attachment_disposition(name: str) -> str:
     """Header-injection-safe ``Content-Disposition: attachment`` for a download.
@@ -38,8 +43,22 @@ def _attachment_disposition(name: str) -> str:
     return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(name)}"
 
 
+@contextlib.asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Background upkeep for the app's lifetime (media cache maintenance)."""
+    task = asyncio.create_task(app.state.panel.media_cache.run_maintenance())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
 def create_app(state: Any) -> FastAPI:
-    app = FastAPI(title="SakaiBot Control Panel", docs_url=None, redoc_url=None)
+    app = FastAPI(
+        title="SakaiBot Control Panel", docs_url=None, redoc_url=None, lifespan=_lifespan
+    )
     app.state.panel = state
 
     # ---- error handlers (never leak internals) ----
@@ -285,12 +304,15 @@ def create_app(state: Any) -> FastAPI:
         return Response(content=initials_svg(entity_id, name), media_type="image/svg+xml")
 
     @api.get("/entity/{entity_id}/media/{message_id}/thumb")
-    async def media_thumb(entity_id: int, message_id: int) -> Response:
+    async def media_thumb(request: Request, entity_id: int, message_id: int) -> Response:
         info = await state.entity.media_file(entity_id, message_id, thumb=True)
-        return FileResponse(info["path"], media_type=info["mime"] or "image/jpeg")
+        return conditional_file_response(
+            request, info["path"], info["mime"] or "image/jpeg",
+            etag_parts=(entity_id, message_id, "t"),
+        )
 
     @api.get("/entity/{entity_id}/media/{message_id}/file")
-    async def media_file(entity_id: int, message_id: int) -> Response:
+    async def media_file(request: Request, entity_id: int, message_id: int) -> Response:
         info = await state.entity.media_file(entity_id, message_id, thumb=False)
         mime = info["mime"] or "application/octet-stream"
         # Telegram media comes from arbitrary peers. Anything that isn't a plain
@@ -299,7 +321,17 @@ def create_app(state: Any) -> FastAPI:
         headers: Dict[str, str] = {}
         if not (mime.startswith(("image/", "audio/", "video/")) and mime != "image/svg+xml"):
             headers["Content-Disposition"] = _attachment_disposition(Path(info["path"]).name)
-        return FileResponse(info["path"], media_type=mime, headers=headers)
+        if "stream" in info:
+            # First view: bytes flow as Telegram delivers them (shared download).
+            if info.get("size"):
+                headers["Content-Length"] = str(info["size"])
+            headers["Cache-Control"] = "no-store"
+            return StreamingResponse(info["stream"].subscribe(), media_type=mime, headers=headers)
+        # Telegram media under one (entity, message) never changes: cache it for
+        # good, revalidate with a strong ETag, and serve ranges for seeking.
+        return conditional_file_response(
+            request, info["path"], mime, etag_parts=(entity_id, message_id), headers=headers
+        )
 
     # ---- live channel (SSE): typing / presence / new messages ----
     @api.get("/events")
@@ -327,9 +359,7 @@ def create_app(state: Any) -> FastAPI:
             finally:
                 state.events.unsubscribe(sub)
 
-        return StreamingResponse(gen(), media_type="text/event-stream", headers={
-            "Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Connection": "keep-alive",
-        })
+        return StreamingResponse(gen(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
     # ---- commands ----
     @api.post("/cmd/prompt")
@@ -340,6 +370,33 @@ def create_app(state: Any) -> FastAPI:
             web=bool(payload.get("web")),
         )
 
+    # Streamed variants: answer deltas as SSE, then the usual result envelope
+    # in a final "done" event. Validation errors still return a JSON error.
+    def _command_stream(events) -> StreamingResponse:
+        async def gen():
+            async for ev in events:
+                yield f"data: {json.dumps(ev, default=str)}\n\n"
+
+        return StreamingResponse(gen(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+    @api.post("/cmd/prompt/stream")
+    async def cmd_prompt_stream(payload: Dict[str, Any] = Body(default={})) -> StreamingResponse:
+        return _command_stream(await state.commands.stream_prompt(
+            payload.get("text", ""),
+            think=bool(payload.get("think")),
+            web=bool(payload.get("web")),
+        ))
+
+    @api.post("/cmd/tellme/stream")
+    async def cmd_tellme_stream(payload: Dict[str, Any] = Body(default={})) -> StreamingResponse:
+        return _command_stream(await state.commands.stream_tellme(
+            int(payload.get("entity_id")),
+            payload.get("question", ""),
+            count=int(payload.get("count", 100)),
+            think=bool(payload.get("think")),
+            web=bool(payload.get("web")),
+        ))
+
     @api.post("/cmd/translate")
     async def cmd_translate(payload: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
         return await state.commands.run_translate(
@@ -383,11 +440,22 @@ def create_app(state: Any) -> FastAPI:
         )
 
     @api.get("/cmd/result-media/{token}")
-    async def result_media(token: str) -> Response:
+    async def result_media(request: Request, token: str) -> Response:
         info = state.result_tokens.get(token)
         if not info:
             raise PanelNotFound("Result expired or not found.")
-        return FileResponse(info["path"], media_type=info["mime"])
+        if "error" in info:
+            raise PanelError(info["error"], status_code=502)
+        if "stream" in info:
+            # Long TTS still being synthesized: play what exists, then the rest.
+            return StreamingResponse(
+                info["stream"].wav_bytes(), media_type=info["mime"],
+                headers={"Cache-Control": "no-store"},
+            )
+        return conditional_file_response(
+            request, info["path"], info["mime"],
+            etag_parts=("r", token), cache_control="private, max-age=86400",
+        )
 
     # ---- authorized users ----
     @api.get("/auth")
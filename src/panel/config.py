@@ -85,6 +85,11 @@ class PanelConfig:
     # provided — exposing a userbot console over plaintext LAN is refused.
     tls_certfile: Optional[str] = None
     tls_keyfile: Optional[str] = None
+    # Disk budget for cached avatars / thumbs / media (PANEL_MEDIA_CACHE_MB);
+    # least-recently-viewed files, and any unused for PANEL_MEDIA_CACHE_DAYS,
+    # are evicted in the background.
+    media_cache_mb: int = 1024
+    media_cache_days: float = 30.0
 
     def __post_init__(self) -> None:
         if self.host not in _LOOPBACK_HOSTS and not self.tls_enabled:
@@ -134,4 +139,6 @@ class PanelConfig:
             with_monitoring=bool(with_monitoring),
             tls_certfile=tls_certfile or os.environ.get("PANEL_TLS_CERT") or None,
             tls_keyfile=tls_keyfile or os.environ.get("PANEL_TLS_KEY") or None,
+            media_cache_mb=int(os.environ.get("PANEL_MEDIA_CACHE_MB", "1024")),
+            media_cache_days=float(os.environ.get("PANEL_MEDIA_CACHE_DAYS", "30")),
         )
@@ -0,0 +1,121 @@
+"""Cacheable file responses for panel media: strong ETags, 304s and byte ranges.
+
+Cached Telegram media never changes under a given (entity, message), so it is
+served with a strong validator and a long ``immutable`` lifetime. A repeat view
+is then answered from the browser cache, or with an empty 304 when revalidated
+through a tunnel. Single ``Range`` requests get a 206 so audio/video seeking
+only transfers what is played. This is done here rather than relying on
+``FileResponse``, because older Starlette releases within our FastAPI pin
+have no range support.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from .errors import PanelNotFound
+
+# ``private``: media is per-account; shared caches (e.g. a tunnel edge) must not keep it.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+_CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def media_etag(*parts: object, stat: os.stat_result) -> str:
+    """Strong ETag from identifying parts plus the file's size and mtime."""
+    ident = "-".join(str(p) for p in parts)
+    return f'"{ident}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches.
+    candidates = (t.strip() for t in header.split(","))
+    return any(t[2:] == etag if t.startswith("W/") else t == etag for t in candidates)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` of a single byte range, or None if unsatisfiable.
+
+    Raises:
+        ValueError: Not a single ``bytes=`` range (the caller serves the whole file)
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError(header)
+    first, last = match.groups()
+    if first == "":  # suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+async def _read_slice(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    remaining = end - start + 1
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def conditional_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    *,
+    etag_parts: Tuple[object, ...],
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """Serve ``path`` honouring ``If-None-Match``, ``Range`` and ``If-Range``."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise PanelNotFound("Media is no longer cached.")
+    etag = media_etag(*etag_parts, stat=stat)
+    base = dict(headers or {})
+    base.update({"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"})
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=base)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, stat.st_size)
+        except ValueError:
+            pass  # multi-range or malformed: the whole file is a valid answer
+        else:
+            if byte_range is None:
+                base["Content-Range"] = f"bytes */{stat.st_size}"
+                return Response(status_code=416, headers=base)
+            start, end = byte_range
+            base["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            base["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _read_slice(Path(path), start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=base,
+            )
+
+    return FileResponse(path, media_type=media_type, headers=base, stat_result=stat)
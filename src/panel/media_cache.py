@@ -2,27 +2,79 @@
 
 Aggressive caching is a ban-safety measure: re-viewing a chat or avatar must
 not re-hit Telegram. Files live under ``cache/panel`` (gitignored area).
+
+Cached files are tracked in an in-memory LRU index (relative path -> size,
+last use), persisted to ``cache/panel/index.json`` and rebuilt from one
+directory scan when that manifest is missing. Lookups are dict hits instead of
+a ``glob`` over a directory that grows to tens of thousands of files. Once
+the cache is over its byte budget, or the manifest needs saving, a background
+thread evicts entries older than the age budget and then least-recently-used
+entries, and saves the manifest. Writes trigger that pass directly; a panel
+that only reads from the cache relies on ``run_maintenance``, started from the
+app lifespan, to persist last-use times and expire old entries.
 """
 
+import asyncio
+import json
+import os
+import shutil
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from ..utils.disk_cache import TRIM_TARGET_RATIO
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
 
 CACHE_ROOT = Path("cache/panel")
 
 AVATAR_TTL_SECONDS = 24 * 3600  # profile photos rarely change
 
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+MANIFEST_NAME = "index.json"
+# How often the lifespan task runs ``maintain`` for hit-only traffic.
+MAINTENANCE_INTERVAL_SECONDS = 600
+
+_THUMB_SUFFIX = ".thumb.jpg"
+
 
 class MediaCache:
-    """Thin path manager + freshness checks for cached binary assets."""
+    """Path manager, LRU index and eviction for cached binary assets."""
 
-    def __init__(self, root: Path = CACHE_ROOT) -> None:
+    def __init__(
+        self,
+        root: Path = CACHE_ROOT,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ) -> None:
         self.root = Path(root)
         self.avatars = self.root / "avatars"
         self.media = self.root / "media"
         self.results = self.root / "results"
-        for d in (self.avatars, self.media, self.results):
+        self.partial = self.root / "partial"
+        # Anything still here was cut off by a restart mid-download.
+        shutil.rmtree(self.partial, ignore_errors=True)
+        for d in (self.avatars, self.media, self.results, self.partial):
             d.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        # rel path -> [size, last_used], least recently used first
+        self._index: "OrderedDict[str, List[float]]" = OrderedDict()
+        # "{entity}_{message}" -> rel path of the full media file
+        self._media_names: Dict[str, str] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._maintenance: Optional[asyncio.Future] = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._load_index()
 
     # --- avatars ---
     def avatar_path(self, entity_id: int) -> Path:
@@ -37,20 +89,24 @@ class MediaCache:
         return self.media / f"{entity_id}_{message_id}{suffix}"
 
     def thumb_path(self, entity_id: int, message_id: int) -> Path:
-        return self.media / f"{entity_id}_{message_id}.thumb.jpg"
+        return self.media / f"{entity_id}_{message_id}{_THUMB_SUFFIX}"
+
+    def partial_path(self, entity_id: int, message_id: int) -> Path:
+        # Staging file of an in-progress tee download (see tee_download.py).
+        return self.partial / f"{entity_id}_{message_id}.part"
 
     def find_media(self, entity_id: int, message_id: int) -> Optional[Path]:
         """The real cached media file. Telethon picks the extension at download
-        time (e.g. .jpg/.tgs/.webm), so glob for ``{e}_{m}.<ext>`` — excluding
-        the ``.thumb.jpg`` companion. Fixes a cache-miss where the freshness
-        check looked at a ``.bin`` path that was never actually written."""
-        stem = f"{entity_id}_{message_id}"
-        for p in self.media.glob(stem + ".*"):
-            if p.name.endswith(".thumb.jpg"):
-                continue
-            if self.is_fresh(p):
-                return p
-        return None
+        time (e.g. .jpg/.tgs/.webm), so the index maps ``{e}_{m}`` to whatever
+        was recorded — never the ``.thumb.jpg`` companion."""
+        with self._lock:
+            rel = self._media_names.get(f"{entity_id}_{message_id}")
+        if rel is None:
+            return None
+        path = self.root / rel
+        if not self.touch(path):
+            return None
+        return path
 
     @staticmethod
     def is_fresh(path: Path, ttl_seconds: Optional[float] = None) -> bool:
@@ -62,3 +118,187 @@ class MediaCache:
             return (time.time() - path.stat().st_mtime) < ttl_seconds
         except OSError:
             return False
+
+    # --- index ---
+    def record(self, path: Any) -> None:
+        """Track a file just written into the cache (a miss that was filled)."""
+        path = Path(path)
+        rel = self._rel(path)
+        if rel is None:
+            return
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            self.misses += 1
+            self._add(rel, size, time.time())
+            self._dirty = True
+        self._schedule_maintenance()
+
+    def touch(self, path: Any) -> bool:
+        """Mark a cached file as used; False (and forgotten) if it is gone."""
+        path = Path(path)
+        rel = self._rel(path)
+        if rel is None:
+            return False
+        if not path.exists():
+            with self._lock:
+                self._remove(rel)
+            return False
+        with self._lock:
+            entry = self._index.get(rel)
+            if entry is None:
+                # Written outside ``record`` (e.g. before an upgrade); adopt it.
+                try:
+                    self._add(rel, path.stat().st_size, time.time())
+                except OSError:
+                    return False
+            else:
+                entry[1] = time.time()
+                self._index.move_to_end(rel)
+            self.hits += 1
+            self._dirty = True
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "files": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _rel(self, path: Path) -> Optional[str]:
+        try:
+            rel = path.resolve().relative_to(self.root.resolve())
+        except (OSError, ValueError):
+            return None
+        if rel.parts[:1] not in (("avatars",), ("media",)):
+            return None
+        return rel.as_posix()
+
+    def _add(self, rel: str, size: int, last_used: float) -> None:
+        self._remove(rel)
+        self._index[rel] = [size, last_used]
+        self._bytes += size
+        name = rel.split("/", 1)[1]
+        if rel.startswith("media/") and not name.endswith(_THUMB_SUFFIX):
+            self._media_names[name.split(".", 1)[0]] = rel
+
+    def _remove(self, rel: str) -> None:
+        entry = self._index.pop(rel, None)
+        if entry is None:
+            return
+        self._bytes -= int(entry[0])
+        name = rel.split("/", 1)[1]
+        stem = name.split(".", 1)[0]
+        if self._media_names.get(stem) == rel:
+            del self._media_names[stem]
+
+    # --- manifest ---
+    def _manifest_path(self) -> Path:
+        return self.root / MANIFEST_NAME
+
+    def _load_index(self) -> None:
+        entries: List[List[Any]] = []
+        try:
+            data = json.loads(self._manifest_path().read_text(encoding="utf-8"))
+            entries = [e for e in data.get("entries", []) if isinstance(e, list) and len(e) == 3]
+        except FileNotFoundError:
+            entries = self._scan()
+            self._dirty = bool(entries)
+        except Exception as exc:  # noqa: BLE001 - a corrupt manifest is rebuilt
+            logger.warning("media cache manifest unreadable, rebuilding: %s", exc)
+            entries = self._scan()
+            self._dirty = True
+        for rel, size, last_used in sorted(entries, key=lambda e: e[2]):
+            self._add(str(rel), int(size), float(last_used))
+        if self._dirty:
+            self.maintain()
+
+    def _scan(self) -> List[List[Any]]:
+        """One-time walk used only when no manifest exists."""
+        entries: List[List[Any]] = []
+        for d in (self.avatars, self.media):
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_file():
+                                st = entry.stat()
+                                entries.append([f"{d.name}/{entry.name}", st.st_size, st.st_mtime])
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return entries
+
+    def _save_manifest(self) -> None:
+        with self._lock:
+            entries = [[rel, int(e[0]), e[1]] for rel, e in self._index.items()]
+            self._dirty = False
+        path = self._manifest_path()
+        tmp = path.with_suffix(".json.tmp")
+        try:
+            tmp.write_text(json.dumps({"version": 1, "entries": entries}), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("media cache manifest not saved: %s", exc)
+            with self._lock:
+                self._dirty = True
+
+    # --- eviction ---
+    def _schedule_maintenance(self) -> None:
+        """Run ``maintain`` in a worker thread (inline when no loop is running)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.maintain()
+            return
+        if self._maintenance is None or self._maintenance.done():
+            self._maintenance = loop.run_in_executor(None, self.maintain)
+
+    async def run_maintenance(self, interval: float = MAINTENANCE_INTERVAL_SECONDS) -> None:
+        """Run ``maintain`` every ``interval`` seconds until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.maintain)
+            except Exception as exc:  # noqa: BLE001 - keep maintaining next time
+                logger.warning("media cache maintenance failed: %s", exc)
+
+    def maintain(self) -> int:
+        """Evict expired entries, then LRU entries over budget; save the manifest."""
+        cutoff = time.time() - self.max_age_seconds
+        victims: List[str] = []
+        with self._lock:
+            for rel, (_, last_used) in list(self._index.items()):
+                if last_used >= cutoff:
+                    break  # LRU order: everything after is newer
+                victims.append(rel)
+                self._remove(rel)
+            if self._bytes > self.max_bytes:
+                target = int(self.max_bytes * TRIM_TARGET_RATIO)
+                while self._index and self._bytes > target:
+                    rel = next(iter(self._index))
+                    victims.append(rel)
+                    self._remove(rel)
+            if victims:
+                self.evicted += len(victims)
+                self._dirty = True
+            dirty = self._dirty
+        for rel in victims:
+            try:
+                os.unlink(self.root / rel)
+            except OSError:
+                pass
+        if victims:
+            logger.info("media cache evicted %d file(s)", len(victims))
+        if dirty:
+            self._save_manifest()
+        return len(victims)
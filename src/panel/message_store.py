@@ -0,0 +1,267 @@
+"""Persistent per-entity message store for chat history (SQLite, WAL).
+
+Re-opening or scrolling a chat must not re-read pages we already have: every
+``get_messages`` goes through the throttle's pacing gap, so switching between
+a few busy chats used to take seconds. This keeps the normalized
+``EntityService._format_message`` rows on disk and tracks, per entity, ONE
+contiguous *span* ``[low, high]`` of message ids that is known to be complete
+(every message in that range is stored). History pages inside the span are
+served locally; only the gaps above ``high`` / below ``low`` are fetched, as
+``min_id`` / ``max_id`` deltas.
+
+The live update tap (``monitor_runtime.register_live_updates``) appends new
+rows as they arrive, so a chat whose span was verified recently can be opened
+and polled with zero Telegram reads. Only chats the panel has opened (those
+with a span) are recorded, and live growth is capped at
+``MAX_ROWS_PER_ENTITY`` rows per chat by trimming the oldest ones.
+Contains NO Telegram API calls.
+"""
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.logging import get_logger
+from .media_cache import CACHE_ROOT
+
+logger = get_logger(__name__)
+
+STORE_PATH = CACHE_ROOT / "messages.db"
+
+# A span verified against Telegram this recently is trusted as current while
+# the live tap keeps it topped up; past this, the next open re-checks with a
+# (cheap) min_id delta read. Bounds staleness across reconnects / missed updates.
+LIVE_TRUST_SECONDS = 120
+
+# Rows kept per chat once live appends push past it; the oldest are dropped
+# (and the span raised) so a busy chat left open for days stays bounded.
+MAX_ROWS_PER_ENTITY = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    entity_id INTEGER NOT NULL,
+    id        INTEGER NOT NULL,
+    reply_to  INTEGER,
+    data      TEXT    NOT NULL,
+    PRIMARY KEY (entity_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spans (
+    entity_id INTEGER PRIMARY KEY,
+    low       INTEGER NOT NULL,
+    high      INTEGER NOT NULL,
+    complete  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# (item, reply_to_msg_id) — what EntityService reads/serves.
+Row = Tuple[Dict[str, Any], Optional[int]]
+
+
+@dataclass
+class Span:
+    """The contiguous id range stored for an entity. ``complete`` means ``low``
+    is the first message of the chat (nothing older exists)."""
+
+    low: int
+    high: int
+    complete: bool = False
+
+    def contains(self, message_id: int) -> bool:
+        return self.low <= message_id <= self.high
+
+
+class MessageStore:
+    """SQLite-backed row + span store. All calls are short, synchronous and
+    local (WAL mode keeps readers from blocking the single writer)."""
+
+    def __init__(self, path: Path = STORE_PATH, max_rows: int = MAX_ROWS_PER_ENTITY) -> None:
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        # entity -> monotonic time the span's top was last checked against
+        # Telegram. In-memory on purpose: after a restart nothing is "current".
+        self._verified: Dict[int, float] = {}
+        self.live = False  # set by the live tap once it's feeding new rows
+
+    def close(self) -> None:
+        try:
+            self._db.close()
+        except sqlite3.Error:
+            pass
+
+    # ---------- spans ----------
+    def span(self, entity_id: int) -> Optional[Span]:
+        cur = self._db.execute(
+            "SELECT low, high, complete FROM spans WHERE entity_id = ?", (int(entity_id),)
+        )
+        r = cur.fetchone()
+        return Span(r[0], r[1], bool(r[2])) if r else None
+
+    def set_span(self, entity_id: int, span: Span) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO spans (entity_id, low, high, complete) "
+                "VALUES (?, ?, ?, ?)",
+                (int(entity_id), int(span.low), int(span.high), int(span.complete)),
+            )
+
+    def reset(self, entity_id: int, span: Span) -> None:
+        """Start a fresh span, dropping rows outside it (they can't be trusted
+        to be contiguous with the new range and would only be re-read anyway)."""
+        eid = int(entity_id)
+        with self._db:
+            self._db.execute(
+                "DELETE FROM messages WHERE entity_id = ? AND (id < ? OR id > ?)",
+                (eid, int(span.low), int(span.high)),
+            )
+            self.set_span(eid, span)
+
+    def mark_verified(self, entity_id: int) -> None:
+        self._verified[int(entity_id)] = time.monotonic()
+
+    def is_current(self, entity_id: int) -> bool:
+        """True when the span's top can be served without a delta read."""
+        if not self.live:
+            return False
+        ts = self._verified.get(int(entity_id))
+        return ts is not None and (time.monotonic() - ts) < LIVE_TRUST_SECONDS
+
+    # ---------- rows ----------
+    def put(self, entity_id: int, rows: Iterable[Row]) -> None:
+        eid = int(entity_id)
+        params = [
+            (eid, int(item["id"]), reply_to, json.dumps(item, default=str))
+            for item, reply_to in rows
+        ]
+        if not params:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages (entity_id, id, reply_to, data) "
+                "VALUES (?, ?, ?, ?)",
+                params,
+            )
+
+    def page(
+        self,
+        entity_id: int,
+        *,
+        limit: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[Row]:
+        """Newest-first rows inside the entity's span (the same order
+        ``get_messages`` returns), bounded by before/after ids."""
+        span = self.span(entity_id)
+        if span is None:
+            return []
+        lo = span.low if after_id is None else max(span.low, int(after_id) + 1)
+        hi = span.high if before_id is None else min(span.high, int(before_id) - 1)
+        cur = self._db.execute(
+            "SELECT data, reply_to FROM messages WHERE entity_id = ? AND id BETWEEN ? AND ? "
+            "ORDER BY id DESC LIMIT ?",
+            (int(entity_id), lo, hi, int(limit)),
+        )
+        return [(json.loads(data), reply_to) for data, reply_to in cur.fetchall()]
+
+    def get(self, entity_id: int, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        wanted = [int(i) for i in ids]
+        if not wanted:
+            return {}
+        marks = ",".join("?" * len(wanted))
+        cur = self._db.execute(
+            f"SELECT id, data FROM messages WHERE entity_id = ? AND id IN ({marks})",
+            (int(entity_id), *wanted),
+        )
+        return {mid: json.loads(data) for mid, data in cur.fetchall()}
+
+    # ---------- live updates ----------
+    def add_new(self, entity_id: int, item: Dict[str, Any], reply_to: Optional[int]) -> None:
+        """A new message seen live. Ignored for chats without a span (never
+        opened in the panel). Extends the span only while it is current —
+        otherwise the row just waits for the next delta read to confirm it."""
+        eid = int(entity_id)
+        span = self.span(eid)
+        if span is None:
+            return
+        self.put(eid, [(item, reply_to)])
+        if self.is_current(eid) and int(item["id"]) > span.high:
+            span.high = int(item["id"])
+            self.set_span(eid, span)
+        self._trim(eid, span)
+
+    def _trim(self, entity_id: int, span: Span) -> None:
+        """Keep only the newest ``max_rows`` rows, raising the span's low end
+        past whatever was dropped (older pages are re-read on scroll)."""
+        cur = self._db.execute(
+            "SELECT id FROM messages WHERE entity_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (entity_id, self.max_rows),
+        )
+        r = cur.fetchone()
+        if r is None:
+            return
+        cutoff = r[0]  # newest id that no longer fits
+        with self._db:
+            self._db.execute(
+                "DELETE FROM messages WHERE entity_id = ? AND id <= ?", (entity_id, cutoff)
+            )
+            if span.high <= cutoff:
+                # Nothing of the verified range is left; start over on next open.
+                self._db.execute("DELETE FROM spans WHERE entity_id = ?", (entity_id,))
+                self._verified.pop(entity_id, None)
+            elif span.low <= cutoff:
+                self.set_span(entity_id, Span(cutoff + 1, span.high, complete=False))
+
+    def update(self, entity_id: int, item: Dict[str, Any]) -> None:
+        """An edit: refresh a stored row in place, keeping its reply preview."""
+        eid = int(entity_id)
+        old = self.get(eid, [item["id"]]).get(int(item["id"]))
+        if old is None:
+            return
+        merged = dict(item)
+        if "reply" in old and "reply" not in merged:
+            merged["reply"] = old["reply"]
+        with self._db:
+            self._db.execute(
+                "UPDATE messages SET data = ? WHERE entity_id = ? AND id = ?",
+                (json.dumps(merged, default=str), eid, int(item["id"])),
+            )
+
+    def remove(self, entity_id: int, ids: Iterable[int]) -> None:
+        wanted = [int(i) for i in ids]
+        if not wanted:
+            return
+        marks = ",".join("?" * len(wanted))
+        with self._db:
+            self._db.execute(
+                f"DELETE FROM messages WHERE entity_id = ? AND id IN ({marks})",
+                (int(entity_id), *wanted),
+            )
+
+    def forget_ids(self, ids: Iterable[int]) -> None:
+        """A deletion Telegram reported without its chat (private chats and
+        basic groups). Drop the rows AND the spans of every entity holding one
+        of those ids, so a coincidental id match elsewhere is re-read rather
+        than served with a hole."""
+        wanted = [int(i) for i in ids]
+        if not wanted:
+            return
+        marks = ",".join("?" * len(wanted))
+        with self._db:
+            affected = [
+                r[0]
+                for r in self._db.execute(
+                    f"SELECT DISTINCT entity_id FROM messages WHERE id IN ({marks})", wanted
+                ).fetchall()
+            ]
+            for eid in affected:
+                self._db.execute("DELETE FROM messages WHERE entity_id = ?", (eid,))
+                self._db.execute("DELETE FROM spans WHERE entity_id = ?", (eid,))
+                self._verified.pop(eid, None)
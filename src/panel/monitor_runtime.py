@@ -14,7 +14,7 @@ copy is fixed.
 
 from typing import Any, Dict, List, Optional, Tuple
 
-from telethon import events
+from telethon import events, utils
 
 from ..utils.logging import get_logger
 
@@ -85,30 +85,80 @@ def register_monitoring(
     return registered
 
 
+def _store_key(msg: Any, fallback: Any) -> Optional[int]:
+    """The dialogs-list id (unmarked) a message belongs to — the key the
+    message store and ``EntityService.history`` use."""
+    peer = getattr(msg, "peer_id", None)
+    if peer is not None:
+        try:
+            return utils.get_peer_id(peer, add_mark=False)
+        except Exception:  # noqa: BLE001
+            pass
+    return utils.resolve_id(fallback)[0] if fallback else None
+
+
 def register_live_updates(client: Any, hub: Any, entity_service: Any) -> List[Tuple[Any, Any]]:
     """Tap Telegram's existing update stream → EventHub for the SSE channel.
 
     RPC-free: the handlers only read fields already on the update (incoming
     message, typing action, online flag) and enqueue a normalized dict — they
     never call back to Telegram. Like register_monitoring, this is allowed here
-    because monitor_runtime is the panel's sole add_event_handler site."""
+    because monitor_runtime is the panel's sole add_event_handler site.
+
+    When the panel has a message store, the same taps also keep it current:
+    new (incoming AND outgoing) messages of chats it already holds are
+    appended, edits refresh stored rows and deletions drop them — so open
+    chats are served locally."""
+    store = getattr(entity_service.state, "message_store", None)
+    if store is not None:
+        store.live = True
 
     async def on_new_message(event: Any) -> None:
         try:
-            if hub.subscriber_count == 0:
-                return  # nobody is listening — skip all formatting work
             msg = event.message
-            if getattr(msg, "out", False):
-                return  # outgoing is already echoed by the composer
             cid = event.chat_id
+            key = _store_key(msg, cid) if store is not None else None
+            stored = key is not None and store.span(key) is not None
+            if hub.subscriber_count == 0 and not stored:
+                return  # nobody is listening — skip all formatting work
+            outgoing = bool(getattr(msg, "out", False))
+            if outgoing and not stored:
+                return  # outgoing is already echoed by the composer
             row = (entity_service.state.dialogs.find(cid) or {}) if cid else {}
             item = entity_service._format_message(
                 msg, row.get("kind", "pv"), row.get("display_name", str(cid))
             )
-            hub.publish({"type": "message", "entity_id": cid, "message": item})
+            if stored:
+                store.add_new(key, item, entity_service._reply_to_id(msg))
+            if not outgoing and hub.subscriber_count:
+                hub.publish({"type": "message", "entity_id": cid, "message": item})
         except Exception as exc:  # noqa: BLE001 - live tap must never crash the loop
             logger.debug("live new-message tap skipped: %s", exc)
 
+    async def on_message_edited(event: Any) -> None:
+        try:
+            msg = event.message
+            cid = event.chat_id
+            key = _store_key(msg, cid)
+            if key is None:
+                return
+            row = (entity_service.state.dialogs.find(cid) or {}) if cid else {}
+            store.update(key, entity_service._format_message(
+                msg, row.get("kind", "pv"), row.get("display_name", str(cid))
+            ))
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("live edit tap skipped: %s", exc)
+
+    async def on_message_deleted(event: Any) -> None:
+        try:
+            ids = list(getattr(event, "deleted_ids", None) or [])
+            if event.chat_id:
+                store.remove(utils.resolve_id(event.chat_id)[0], ids)
+            else:
+                store.forget_ids(ids)  # private chat / basic group: chat unknown
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("live delete tap skipped: %s", exc)
+
     async def on_user_update(event: Any) -> None:
         try:
             if hub.subscriber_count == 0:
@@ -132,9 +182,14 @@ def register_live_updates(client: Any, hub: Any, entity_service: Any) -> List[Tu
             logger.debug("live user-update tap skipped: %s", exc)
 
     pairs = [
-        (on_new_message, events.NewMessage(incoming=True)),
+        (on_new_message, events.NewMessage() if store is not None else events.NewMessage(incoming=True)),
         (on_user_update, events.UserUpdate()),
     ]
+    if store is not None:
+        pairs += [
+            (on_message_edited, events.MessageEdited()),
+            (on_message_deleted, events.MessageDeleted()),
+        ]
     for handler, flt in pairs:
         client.add_event_handler(handler, flt)
     logger.info("Panel registered %d live-update tap(s) for SSE", len(pairs))
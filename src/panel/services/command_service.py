@@ -2,20 +2,30 @@
 panel to render. It calls the existing AI core (which returns values) and the
 media generators. It NEVER sends/edits/forwards anything to Telegram.
 
+/prompt and /tellme can also stream: ``stream_prompt`` / ``stream_tellme``
+return an async iterator of SSE events — ``{"type": "delta", "text": ...}``
+as the answer is generated, then ``{"type": "done", "result": <envelope>}``
+or ``{"type": "error", "error": ...}``.
+
 Results envelope:
     {"ok": True, "kind": "text"|"image"|"audio",
      "html": "<rendered html>",            # text/caption
      "text": "raw text",                   # stt transcript
      "media_url": "/api/cmd/result-media/<token>",  # image/audio
      "meta": {...}}                         # model/provider/latency/tokens/...
+
+Long /tts texts return as soon as their first segment is synthesized; the
+media URL then streams a WAV that grows as the remaining segments arrive
+and is swapped for the finished file once synthesis completes.
 """
 
 import asyncio
 import secrets
+import struct
 import tempfile
 import uuid
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 from ...core.exceptions import AIProcessorError
 from ...utils.logging import get_logger
@@ -28,10 +38,67 @@ logger = get_logger(__name__)
 COMMAND_DEADLINE_SECONDS = 240
 
 
+def _audio_mime(path: str) -> str:
+    return "audio/ogg" if path.endswith(".ogg") else "audio/wav"
+
+
+class AudioStream:
+    """PCM produced in the background, readable by any number of listeners."""
+
+    def __init__(self, rate: int = 24000, channels: int = 1, sample_width: int = 2) -> None:
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, pcm: bytes) -> None:
+        async with self._changed:
+            self.chunks.append(pcm)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[str] = None) -> None:
+        """End the stream; with ``error`` listeners fail instead of ending cleanly."""
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def _wav_header(self) -> bytes:
+        # Length unknown while streaming: use the maximum, as live WAV streams do.
+        block_align = self.channels * self.sample_width
+        return b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVEfmt " + struct.pack(
+            "<IHHIIHH", 16, 1, self.channels, self.rate, self.rate * block_align,
+            block_align, self.sample_width * 8,
+        ) + b"data" + struct.pack("<I", 0xFFFFFFFF)
+
+    async def wav_bytes(self) -> AsyncIterator[bytes]:
+        """A WAV header, then every chunk as it becomes available.
+
+        Raises once the buffered audio is sent if synthesis failed, so the
+        response is cut off rather than ending as if the audio were complete."""
+        yield self._wav_header()
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: sent < len(self.chunks) or self.done)
+                pending = self.chunks[sent:]
+            if not pending:
+                if self.error:
+                    raise RuntimeError(f"TTS stream failed: {self.error}")
+                return
+            sent += len(pending)
+            for chunk in pending:
+                yield chunk
+
+
 class CommandService:
     def __init__(self, state: Any) -> None:
         self.state = state
         self._ffmpeg_ready = False
+        self._background: Set[asyncio.Task] = set()
 
     # ---------- result media token registry ----------
     def _register_media(self, path: str, mime: str) -> str:
@@ -76,8 +143,40 @@ class CommandService:
                 status_code=504,
             )
 
+    async def _stream_events(self, items: AsyncIterator[Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Turn a provider response stream into panel SSE events.
+
+        The whole stream shares the command deadline; a failure mid-stream
+        becomes an ``error`` event because the HTTP status is already sent.
+        """
+        from ...ai.response_metadata import AIResponseMetadata
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + COMMAND_DEADLINE_SECONDS
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(
+                        items.__anext__(), timeout=max(deadline - loop.time(), 0.001)
+                    )
+                except StopAsyncIteration:
+                    break
+                if isinstance(item, AIResponseMetadata):
+                    yield {"type": "done", "result": self._render_text(item)}
+                else:
+                    yield {"type": "delta", "text": item}
+        except asyncio.TimeoutError:
+            yield {"type": "error", "error": "The request took too long and was stopped. Try a smaller request."}
+        except AIProcessorError as exc:
+            yield {"type": "error", "error": str(exc)}
+        except Exception as exc:  # noqa: BLE001 - surfaced to the browser, not re-raised
+            logger.error("Streamed command failed: %s", exc, exc_info=True)
+            yield {"type": "error", "error": "Internal panel error."}
+        finally:
+            await items.aclose()
+
     # ---------- prompt ----------
-    async def run_prompt(self, text: str, *, think: bool = False, web: bool = False) -> Dict[str, Any]:
+    def _prompt_text(self, text: str) -> str:
         self._ensure_ai()
         from ...utils.validators import InputValidator
         from ...ai.prompts import PROMPT_ADAPTIVE_PROMPT
@@ -89,8 +188,10 @@ class CommandService:
             text = InputValidator.validate_prompt(text)
         except ValueError as exc:
             raise PanelError(str(exc))
+        return PROMPT_ADAPTIVE_PROMPT.format(user_prompt=text)
 
-        full_prompt = PROMPT_ADAPTIVE_PROMPT.format(user_prompt=text)
+    async def run_prompt(self, text: str, *, think: bool = False, web: bool = False) -> Dict[str, Any]:
+        full_prompt = self._prompt_text(text)
         result = await self._deadline(self.state.ai_processor.execute_custom_prompt(
             user_prompt=full_prompt,
             max_tokens=32000,
@@ -100,6 +201,19 @@ class CommandService:
         ))
         return self._render_text(result)
 
+    async def stream_prompt(
+        self, text: str, *, think: bool = False, web: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Validate, then return the SSE event stream for a /prompt run."""
+        full_prompt = self._prompt_text(text)
+        return self._stream_events(self.state.ai_processor.stream_custom_prompt(
+            user_prompt=full_prompt,
+            max_tokens=32000,
+            task_type="prompt",
+            use_thinking=think,
+            use_web_search=web,
+        ))
+
     # ---------- translate ----------
     async def run_translate(self, text: str, target_lang: str, source: str = "auto") -> Dict[str, Any]:
         self._ensure_ai()
@@ -130,17 +244,42 @@ class CommandService:
         messages = await self.state.entity.messages_for_ai(entity_id, count)
         if not messages:
             raise PanelError("No text messages found in that chat to analyze.")
+
+        windows = 0
+
+        async def on_progress(done: int, total: int) -> None:
+            # Long chats are analyzed window by window; the open chat's SSE
+            # stream shows "window k/n" on the pending result.
+            nonlocal windows
+            windows = total
+            self.state.events.publish({
+                "type": "progress", "task": "analyze", "entity_id": int(entity_id),
+                "done": done, "total": total,
+            })
+
         result = await self._deadline(self.state.ai_processor.analyze_conversation_messages(
             messages_data=messages,
             analysis_mode=mode,
             output_language=language,
             use_thinking=think,
+            progress_cb=on_progress,
         ))
         out = self._render_text(result)
         out["meta"] = {**out.get("meta", {}), "messages": len(messages), "mode": mode}
+        if windows > 1:
+            out["meta"]["windows"] = windows
         return out
 
     # ---------- tellme ----------
+    async def _tellme_history(self, entity_id: int, question: str, count: int) -> List[Dict[str, Any]]:
+        self._ensure_ai()
+        if not question:
+            raise PanelError("A question is required.")
+        messages = await self.state.entity.messages_for_ai(entity_id, count)
+        if not messages:
+            raise PanelError("No text messages found in that chat.")
+        return messages
+
     async def run_tellme(
         self,
         entity_id: int,
@@ -150,18 +289,29 @@ class CommandService:
         think: bool = False,
         web: bool = False,
     ) -> Dict[str, Any]:
-        self._ensure_ai()
         question = (question or "").strip()
-        if not question:
-            raise PanelError("A question is required.")
-        messages = await self.state.entity.messages_for_ai(entity_id, count)
-        if not messages:
-            raise PanelError("No text messages found in that chat.")
+        messages = await self._tellme_history(entity_id, question, count)
         result = await self._deadline(self.state.ai_processor.answer_question_from_chat_history(
             messages_data=messages, user_question=question, use_thinking=think, use_web_search=web
         ))
         return self._render_text(result)
 
+    async def stream_tellme(
+        self,
+        entity_id: int,
+        question: str,
+        *,
+        count: int = 100,
+        think: bool = False,
+        web: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Fetch the history, then return the SSE event stream for a /tellme run."""
+        question = (question or "").strip()
+        messages = await self._tellme_history(entity_id, question, count)
+        return self._stream_events(self.state.ai_processor.stream_answer_from_chat_history(
+            messages_data=messages, user_question=question, use_thinking=think, use_web_search=web
+        ))
+
     # ---------- image ----------
     async def run_image(self, model: str, prompt: str) -> Dict[str, Any]:
         model = (model or "flux").strip().lower()
@@ -194,12 +344,61 @@ class CommandService:
         kwargs: Dict[str, Any] = {}
         if voice:
             kwargs["voice"] = voice
+        if len(self.state.tts_processor.speech_segments(text)) > 1:
+            return await self._stream_tts(text, voice)
         path = await self.state.tts_processor.generate_speech_file(text, **kwargs)
         if not path:
             raise PanelError("TTS generation failed.", status_code=502)
-        url = self._register_media(path, "audio/wav")
+        url = self._register_media(path, _audio_mime(path))
         return {"ok": True, "kind": "audio", "media_url": url, "meta": {"voice": voice}}
 
+    async def _stream_tts(self, text: str, voice: Optional[str]) -> Dict[str, Any]:
+        """Long text: answer once the first segment exists, stream the rest."""
+        segments = self.state.tts_processor.stream_speech(text, voice)
+        try:
+            first = await self._deadline(segments.__anext__())
+        except (AIProcessorError, StopAsyncIteration) as exc:
+            await segments.aclose()
+            raise PanelError(f"TTS generation failed. {exc}".strip(), status_code=502)
+
+        stream = AudioStream()
+        await stream.append(first)
+        token = secrets.token_urlsafe(16)
+        self.state.result_tokens[token] = {"stream": stream, "mime": "audio/wav"}
+
+        async def produce() -> None:
+            error = None
+            try:
+                async for pcm in segments:
+                    await stream.append(pcm)
+            except AIProcessorError as exc:
+                logger.error("Streamed TTS stopped early: %s", exc)
+                error = str(exc) or "synthesis stopped early"
+            finally:
+                await stream.finish(error)
+                await segments.aclose()
+            if error:
+                # Never publish the truncated audio as the finished file.
+                self.state.result_tokens[token] = {"error": f"TTS generation failed. {error}"}
+                return
+            # Later plays (and seeking) get the finished, encoded file instead.
+            tts = self.state.tts_processor
+            path = Path(tempfile.gettempdir()) / f"panel_tts_{uuid.uuid4().hex}{tts.audio_suffix()}"
+            try:
+                await tts.save_audio(b"".join(stream.chunks), str(path))
+            except AIProcessorError as exc:
+                logger.error("Could not save streamed TTS: %s", exc)
+                return
+            self.state.result_tokens[token] = {"path": str(path), "mime": _audio_mime(str(path))}
+
+        task = asyncio.create_task(produce())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return {
+            "ok": True, "kind": "audio", "media_url": f"/api/cmd/result-media/{token}",
+            "meta": {"voice": voice, "streaming": True},
+        }
+
     # ---------- stt ----------
     def _ensure_ffmpeg(self) -> None:
         if self._ffmpeg_ready:
@@ -217,15 +416,6 @@ class CommandService:
                 os.environ["PATH"] = ff_dir + os.pathsep + os.environ.get("PATH", "")
         self._ffmpeg_ready = True
 
-    @staticmethod
-    def _to_wav(src: str, dst: str) -> None:
-        """Decode any audio (ogg/opus/mp3/...) to mono 16kHz PCM WAV."""
-        from pydub import AudioSegment
-
-        seg = AudioSegment.from_file(src)
-        seg = seg.set_channels(1).set_frame_rate(16000)
-        seg.export(dst, format="wav")
-
     async def run_stt(self, entity_id: int, message_id: int) -> Dict[str, Any]:
         client = self.state.client
         if client is None:
@@ -246,40 +436,57 @@ class CommandService:
             raise PanelError("That message is not a voice/audio message.")
 
         tmp_base = Path(tempfile.gettempdir()) / f"panel_stt_{entity_id}_{message_id}_{uuid.uuid4().hex[:6]}"
-        downloaded = await self.state.throttle.tg_read(
-            lambda: client.download_media(msg.media, file=str(tmp_base)), kind="download"
-        )
-        if not downloaded:
-            raise PanelError("Could not download the voice message.", status_code=502)
-
-        # Telegram voice notes are OGG/Opus; SpeechRecognition only reads PCM
-        # WAV/AIFF/FLAC. Convert to mono/16kHz WAV first (off the event loop),
-        # mirroring the chat STT handler. Without this, short clips that take
-        # the single-chunk path fail with a "not a RIFF file" error.
-        wav_path = f"{tmp_base}.stt.wav"
-        try:
-            await asyncio.to_thread(self._to_wav, str(downloaded), wav_path)
-        except Exception as exc:  # noqa: BLE001
-            raise PanelError(
-                f"Could not decode the audio (is FFmpeg installed?): {exc}",
-                status_code=502,
+        downloaded = None
+
+        async def download() -> str:
+            nonlocal downloaded
+            downloaded = await self.state.throttle.tg_read(
+                lambda: client.download_media(msg.media, file=str(tmp_base)), kind="download"
             )
+            if not downloaded:
+                raise PanelError("Could not download the voice message.", status_code=502)
+            return str(downloaded)
+
+        async def load_audio():
+            # Only runs when the transcript store can't answer on its own.
+            if not downloaded:
+                await download()
+
+            # Telegram voice notes are OGG/Opus; decode them once, straight to
+            # 16kHz mono PCM in memory (one ffmpeg pass, no intermediate WAV),
+            # mirroring the chat STT handler.
+            try:
+                return await self.state.stt_processor.decode_audio(str(downloaded))
+            except AIProcessorError as exc:
+                raise PanelError(
+                    f"Could not decode the audio (is FFmpeg installed?): {exc}",
+                    status_code=502,
+                )
+
+        from ...core.constants import DEFAULT_STT_LANGUAGE
+        from ...utils.stt_cache import file_cache_key, stt_cache_key
 
         # Unintelligible / silent audio raises AIProcessorError — that's a
         # normal outcome for a voice note, not a panel failure. Return a
         # graceful empty transcript instead of a 500.
         note = None
+        cache_key = stt_cache_key(msg, DEFAULT_STT_LANGUAGE)
+        if cache_key is None:
+            # No Telegram document id: key the store on the file's content.
+            path = await download()
+            try:
+                cache_key = await asyncio.to_thread(file_cache_key, path, DEFAULT_STT_LANGUAGE)
+            except OSError as exc:  # the store is an optimization; transcribe anyway
+                logger.debug("stt content key failed for %s: %s", path, exc)
         try:
-            transcript = await self.state.stt_processor.transcribe_voice_to_text(wav_path)
+            transcript = await self.state.stt_processor.transcribe_voice_to_text(
+                load_audio, cache_key=cache_key
+            )
         except AIProcessorError as exc:
             transcript = ""
             note = str(exc)
         transcript = (transcript or "").strip()
 
-        from ...utils.helpers import clean_temp_files
-
-        clean_temp_files(wav_path)
-
         from ...utils.telegram_html import clean_telegram_html
 
         if transcript:
@@ -292,9 +499,15 @@ class CommandService:
             "text": transcript,
             "html": html,
         }
-        try:
-            url = self._register_media(str(downloaded), self.state.entity._guess_mime(Path(downloaded)))
-            result["media_url"] = url
-        except Exception:  # noqa: BLE001 - audio playback is a bonus
-            pass
+        if downloaded:
+            try:
+                url = self._register_media(str(downloaded), self.state.entity._guess_mime(Path(downloaded)))
+                result["media_url"] = url
+            except Exception:  # noqa: BLE001 - audio playback is a bonus
+                pass
+        else:
+            # Served from the transcript store without a download: play the
+            # note through the media endpoint, which serves the panel's cached
+            # copy or downloads it when the player asks.
+            result["media_url"] = f"/api/entity/{int(entity_id)}/media/{int(message_id)}/file"
         return result
@@ -2,8 +2,9 @@
 and lazy/cached real profile photos. All READ-ONLY and throttled.
 """
 
+import asyncio
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from telethon.tl.types import (
     InputMessagesFilterDocument,
@@ -22,8 +23,11 @@ from telethon.tl.types import (
 )
 
 from ...utils.logging import get_logger
+from ...utils.sender_names import get_sender_names
+from ...utils.transcript_cache import TranscriptCache
 from ..errors import PanelNotFound, PanelUnavailable
 from ..media_cache import AVATAR_TTL_SECONDS
+from ..tee_download import TeeDownload
 
 logger = get_logger(__name__)
 
@@ -35,6 +39,15 @@ class EntityService:
     def __init__(self, state: Any) -> None:
         self.state = state
         self._profile_cache: Dict[int, tuple] = {}  # id -> (data, monotonic ts)
+        # Serializes store-backed history per chat so concurrent page loads
+        # don't race on the same span.
+        self._history_locks: Dict[int, asyncio.Lock] = {}
+        self._transcripts = TranscriptCache()  # analyze/tellme windows per chat
+        # (entity, message) -> download being streamed to viewers right now
+        self._downloads: Dict[Tuple[int, int], TeeDownload] = {}
+        # (entity, message) -> first view still fetching the message / starting
+        self._opening: Dict[Tuple[int, int], asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
 
     def _require_client(self):
         if self.state.client is None:
@@ -97,15 +110,10 @@ class EntityService:
             return "You"
         if entity_kind == "pv":
             return entity_name
-        sender = getattr(msg, "sender", None)  # cached only; no extra RPC
-        if sender is not None:
-            name = " ".join(
-                p for p in [getattr(sender, "first_name", ""), getattr(sender, "last_name", "")] if p
-            ).strip()
-            if name:
-                return name
-            if getattr(sender, "title", None):
-                return sender.title
+        # Entity attached to the page, else the process-wide name cache; no RPC.
+        name = get_sender_names().name_for(msg)
+        if name:
+            return name
         sid = getattr(msg, "sender_id", None)
         return f"#{sid}" if sid else "Unknown"
 
@@ -143,6 +151,126 @@ class EntityService:
             }.get(mk, "Media" if getattr(msg, "media", None) else "")
         return {"id": msg.id, "sender": self._sender_name(msg, kind, ename), "text": text}
 
+    @staticmethod
+    def _reply_to_id(msg: Any) -> Optional[int]:
+        return getattr(getattr(msg, "reply_to", None), "reply_to_msg_id", None)
+
+    @staticmethod
+    def _snippet_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+        """A reply preview built from an already-stored row (no RPC)."""
+        text = (item.get("text") or "").strip()
+        if not text:
+            text = {
+                "photo": "Photo", "sticker": "Sticker", "video": "Video",
+                "gif": "GIF", "voice": "Voice message", "music": "Voice message",
+                "document": "File",
+            }.get(item.get("media_kind"), "Media" if item.get("has_media") else "")
+        return {"id": item["id"], "sender": item.get("sender"), "text": text}
+
+    async def _read(
+        self, client: Any, entity_id: int, kind: str, ename: str, **kwargs: Any
+    ) -> List[tuple]:
+        """One throttled get_messages page as (item, reply_to_id) rows."""
+        messages = await self.state.throttle.tg_read(
+            lambda: client.get_messages(int(entity_id), **kwargs)
+        )
+        return [(self._format_message(m, kind, ename), self._reply_to_id(m)) for m in messages]
+
+    async def _attach_replies(
+        self, client: Any, entity_id: int, kind: str, ename: str, rows: List[tuple]
+    ) -> None:
+        """Fill reply previews: from the local store first, then batch-resolve
+        whatever is left for the whole page in ONE extra read."""
+        store = self.state.message_store
+        pending = {rid for item, rid in rows if rid is not None and "reply" not in item}
+        if not pending:
+            return
+        rmap: Dict[int, Dict[str, Any]] = {}
+        if store is not None:
+            rmap = {mid: self._snippet_from_item(it) for mid, it in store.get(entity_id, pending).items()}
+        missing = pending - set(rmap)
+        if missing:
+            try:
+                replied = await self.state.throttle.tg_read(
+                    lambda: client.get_messages(int(entity_id), ids=list(missing))
+                )
+                rmap.update({
+                    r.id: self._reply_snippet(r, kind, ename)
+                    for r in replied
+                    if r is not None
+                })
+            except Exception as exc:  # noqa: BLE001 - reply preview is best-effort
+                logger.debug("reply preview fetch failed for %s: %s", entity_id, exc)
+        for item, rid in rows:
+            if rid in rmap and "reply" not in item:
+                item["reply"] = rmap[rid]
+
+    async def _history_cached(
+        self,
+        client: Any,
+        entity_id: int,
+        kind: str,
+        ename: str,
+        *,
+        limit: int,
+        before_id: Optional[int],
+        after_id: Optional[int],
+    ) -> List[tuple]:
+        """Serve a history page from the message store, reading only the gaps.
+
+        Above the span: one ``min_id`` delta (skipped entirely while the live
+        tap keeps the span current). Below it: one ``max_id`` read for just the
+        rows the page is short by."""
+        from ..message_store import Span
+
+        store = self.state.message_store
+        eid = int(entity_id)
+        span = store.span(eid)
+
+        if before_id and not (span and span.low <= int(before_id) <= span.high + 1):
+            # Scrolled outside what we hold (or nothing held) — plain read.
+            rows = await self._read(client, eid, kind, ename, limit=limit, max_id=int(before_id))
+            store.put(eid, rows)
+            return rows
+
+        if not before_id and not (span and store.is_current(eid)):
+            delta_kwargs: Dict[str, Any] = {"limit": limit}
+            if span:
+                delta_kwargs["min_id"] = span.high
+            rows = await self._read(client, eid, kind, ename, **delta_kwargs)
+            ids = [item["id"] for item, _ in rows]
+            if span and len(rows) < limit:
+                # The gap above the span is closed — extend it upward.
+                store.put(eid, rows)
+                span.high = max([span.high, *ids])
+                store.set_span(eid, span)
+            elif rows:
+                # First open, or more new messages than a page: start over.
+                span = Span(min(ids), max(ids), complete=len(rows) < limit)
+                store.reset(eid, span)
+                store.put(eid, rows)
+            store.mark_verified(eid)
+
+        if span is None:
+            return []  # an empty chat
+        if after_id and int(after_id) < span.low - 1:
+            # Polling from below the span — can't vouch for that gap locally.
+            rows = await self._read(client, eid, kind, ename, limit=limit, min_id=int(after_id))
+            store.put(eid, rows)
+            return rows
+
+        rows = store.page(eid, limit=limit, before_id=before_id, after_id=after_id)
+        short = limit - len(rows)
+        if short > 0 and not after_id and not span.complete:
+            older = await self._read(client, eid, kind, ename, limit=short, max_id=span.low)
+            store.put(eid, older)
+            if older:
+                span.low = min(item["id"] for item, _ in older)
+            span.complete = len(older) < short
+            store.set_span(eid, span)
+            rows.extend(older)
+        return rows
+
     async def history(
         self,
         entity_id: int,
@@ -157,43 +285,28 @@ class EntityService:
         kind = row.get("kind", "pv")
         ename = row.get("display_name", str(entity_id))
 
-        kwargs: Dict[str, Any] = {"limit": limit}
-        if before_id:
-            kwargs["max_id"] = int(before_id)
-        if after_id:  # live polling: only messages newer than what we have
-            kwargs["min_id"] = int(after_id)
-
-        messages = await self.state.throttle.tg_read(
-            lambda: client.get_messages(int(entity_id), **kwargs)
-        )
-        items: List[Dict[str, Any]] = [self._format_message(m, kind, ename) for m in messages]
-
-        # Batch-resolve reply previews for the whole page in ONE extra read.
-        reply_ids = {
-            getattr(m.reply_to, "reply_to_msg_id", None)
-            for m in messages
-            if getattr(m, "reply_to", None) is not None
-        }
-        reply_ids.discard(None)
-        if reply_ids:
-            try:
-                replied = await self.state.throttle.tg_read(
-                    lambda: client.get_messages(int(entity_id), ids=list(reply_ids))
+        store = self.state.message_store
+        if store is not None:
+            async with self._history_locks.setdefault(int(entity_id), asyncio.Lock()):
+                rows = await self._history_cached(
+                    client, entity_id, kind, ename,
+                    limit=limit, before_id=before_id, after_id=after_id,
                 )
-                rmap = {
-                    r.id: self._reply_snippet(r, kind, ename)
-                    for r in replied
-                    if r is not None
-                }
-                for item, m in zip(items, messages):
-                    rid = getattr(getattr(m, "reply_to", None), "reply_to_msg_id", None)
-                    if rid in rmap:
-                        item["reply"] = rmap[rid]
-            except Exception as exc:  # noqa: BLE001 - reply preview is best-effort
-                logger.debug("reply preview fetch failed for %s: %s", entity_id, exc)
-
-        oldest_id = messages[-1].id if messages else None
-        newest_id = messages[0].id if messages else None
+                await self._attach_replies(client, entity_id, kind, ename, rows)
+                # Persist resolved previews so the next open needs no reply read.
+                store.put(int(entity_id), [r for r in rows if "reply" in r[0]])
+        else:
+            kwargs: Dict[str, Any] = {"limit": limit}
+            if before_id:
+                kwargs["max_id"] = int(before_id)
+            if after_id:  # live polling: only messages newer than what we have
+                kwargs["min_id"] = int(after_id)
+            rows = await self._read(client, entity_id, kind, ename, **kwargs)
+            await self._attach_replies(client, entity_id, kind, ename, rows)
+
+        items: List[Dict[str, Any]] = [item for item, _ in rows]
+        oldest_id = items[-1]["id"] if items else None
+        newest_id = items[0]["id"] if items else None
         return {"ok": True, "items": items, "oldest_id": oldest_id, "newest_id": newest_id}
 
     async def _owner_name(self) -> str:
@@ -218,23 +331,36 @@ class EntityService:
         """Chronological [{sender, text, timestamp}] for analyze/tellme.
 
         Outgoing messages are attributed to the owner's REAL name (not "You"),
-        so the AI refers to everyone by name instead of addressing "you"."""
+        so the AI refers to everyone by name instead of addressing "you".
+        The window is assembled incrementally: back-to-back commands on the
+        same chat only read the messages that arrived since the last one."""
         client = self._require_client()
         count = max(1, min(int(count), 10000))
         row = self.state.dialogs.find(entity_id) or {}
         kind = row.get("kind", "pv")
         ename = row.get("display_name", str(entity_id))
         owner = await self._owner_name()
-        messages = await self.state.throttle.tg_read(
-            lambda: client.get_messages(int(entity_id), limit=count)
-        )
-        out: List[Dict[str, Any]] = []
-        for msg in reversed(messages):  # oldest -> newest
-            if not (msg.message or "").strip():
-                continue
-            sender = owner if getattr(msg, "out", False) else self._sender_name(msg, kind, ename)
-            out.append({"sender": sender, "text": msg.message, "timestamp": msg.date})
-        return out
+
+        async def fetch(kwargs: Dict[str, Any]) -> List[Any]:
+            return await self.state.throttle.tg_read(
+                lambda: client.get_messages(int(entity_id), **kwargs)
+            )
+
+        async def convert(page: List[Any]) -> List[Optional[Dict[str, Any]]]:
+            if kind != "pv":
+                # Warm the name cache: senders missing from the page are
+                # resolved in ONE throttled bulk lookup.
+                await get_sender_names().resolve(client, page, read=self.state.throttle.tg_read)
+            out: List[Optional[Dict[str, Any]]] = []
+            for msg in page:
+                if not (msg.message or "").strip():
+                    out.append(None)
+                    continue
+                sender = owner if getattr(msg, "out", False) else self._sender_name(msg, kind, ename)
+                out.append({"sender": sender, "text": msg.message, "timestamp": msg.date})
+            return out
+
+        return await self._transcripts.window(int(entity_id), count, fetch, convert)
 
     # ---------- media enumeration ----------
     @staticmethod
@@ -409,8 +535,10 @@ class EntityService:
         cache = self.state.media_cache
         path = cache.avatar_path(entity_id)
         if cache.is_fresh(path, AVATAR_TTL_SECONDS):
+            cache.touch(path)
             return str(path)
         if cache.is_fresh(cache.avatar_sentinel(entity_id), AVATAR_TTL_SECONDS):
+            cache.touch(cache.avatar_sentinel(entity_id))
             return None  # known to have no photo
 
         client = self._require_client()
@@ -424,10 +552,12 @@ class EntityService:
             logger.warning("avatar download failed for %s: %s", entity_id, exc)
             return None
         if result:
+            cache.record(result)
             return str(result)
         # No photo — write a sentinel to avoid re-downloading on every scroll.
         try:
             cache.avatar_sentinel(entity_id).write_text("1", encoding="utf-8")
+            cache.record(cache.avatar_sentinel(entity_id))
         except OSError:
             pass
         return None
@@ -440,38 +570,113 @@ class EntityService:
         cache = self.state.media_cache
 
         # Cache hit. Thumbs are a fixed path; full media has a Telethon-chosen
-        # extension, so look it up via find_media (the old .bin check missed it).
+        # extension, so look it up in the index via find_media.
         if thumb:
             cached = cache.thumb_path(entity_id, message_id)
-            if cache.is_fresh(cached):
+            if cache.touch(cached):
                 return {"path": str(cached), "mime": self._guess_mime(cached)}
         else:
             hit = cache.find_media(entity_id, message_id)
             if hit:
                 return {"path": str(hit), "mime": self._guess_mime(hit)}
+            key = (int(entity_id), int(message_id))
+            running = self._downloads.get(key)
+            if running is not None:
+                # Another viewer is already downloading it: follow along.
+                return self._tee_info(running)
+            # Registered before the first await, so a concurrent first view
+            # joins this fetch instead of starting a second download.
+            opening = self._opening.get(key)
+            if opening is None:
+                opening = asyncio.create_task(self._open_media(client, entity_id, message_id))
+                self._opening[key] = opening
+                opening.add_done_callback(lambda t: self._opened(key, t))
+            # Shielded: one viewer going away must not cancel the others' fetch.
+            return await asyncio.shield(opening)
+
+        msg = await self._media_message(client, entity_id, message_id)
+        out = await self.state.throttle.tg_read(
+            lambda: client.download_media(msg, file=str(cache.thumb_path(entity_id, message_id)), thumb=-1),
+            kind="download",
+        )
+        if not out:
+            raise PanelNotFound("Could not download media.")
+        cache.record(out)
+        return {"path": str(out), "mime": self._guess_mime(Path(out))}
+
+    def _opened(self, key: Tuple[int, int], task: asyncio.Task) -> None:
+        if self._opening.get(key) is task:
+            del self._opening[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here even if every viewer left
 
+    async def _media_message(self, client: Any, entity_id: int, message_id: int) -> Any:
         msg = await self.state.throttle.tg_read(
             lambda: client.get_messages(int(entity_id), ids=int(message_id))
         )
         if not msg or getattr(msg, "media", None) is None:
             raise PanelNotFound("No media on that message.")
+        return msg
 
-        if thumb:
-            out = await self.state.throttle.tg_read(
-                lambda: client.download_media(msg, file=str(cache.thumb_path(entity_id, message_id)), thumb=-1),
-                kind="download",
-            )
-        else:
-            # No suffix → Telethon appends the correct one (.jpg/.tgs/.webm/...).
-            base = cache.media_path(entity_id, message_id).with_suffix("")
-            out = await self.state.throttle.tg_read(
-                lambda: client.download_media(msg, file=str(base)),
-                kind="download",
-            )
+    async def _open_media(self, client: Any, entity_id: int, message_id: int) -> Dict[str, Any]:
+        """First view of full media: start a tee download or fetch it whole."""
+        cache = self.state.media_cache
+        msg = await self._media_message(client, entity_id, message_id)
+        if getattr(msg, "document", None) is not None:
+            # Files/videos/voice: stream to the viewer while Telegram sends it.
+            return self._start_tee(client, msg, entity_id, message_id)
+        # No suffix → Telethon appends the correct one (.jpg/.tgs/.webm/...).
+        base = cache.media_path(entity_id, message_id).with_suffix("")
+        out = await self.state.throttle.tg_read(
+            lambda: client.download_media(msg, file=str(base)),
+            kind="download",
+        )
         if not out:
             raise PanelNotFound("Could not download media.")
+        cache.record(out)
         return {"path": str(out), "mime": self._guess_mime(Path(out))}
 
+    def _start_tee(self, client: Any, msg: Any, entity_id: int, message_id: int) -> Dict[str, Any]:
+        """Begin a shared ``iter_download`` into the cache; returns its stream info."""
+        cache = self.state.media_cache
+        file = getattr(msg, "file", None)
+        size = getattr(file, "size", None)
+        final = cache.media_path(entity_id, message_id, getattr(file, "ext", None) or ".bin")
+        key = (int(entity_id), int(message_id))
+        tee = TeeDownload(cache.partial_path(entity_id, message_id), final, size)
+        self._downloads[key] = tee
+
+        async def _download() -> None:
+            try:
+                await self.state.throttle.tg_read(
+                    lambda: tee.run(lambda: client.iter_download(msg.document, file_size=size)),
+                    kind="download",
+                )
+                cache.record(final)
+            except asyncio.CancelledError as exc:
+                tee.fail(exc)
+                raise
+            except Exception as exc:  # noqa: BLE001 - surfaced to the viewers
+                logger.warning("media download failed for %s/%s: %s", entity_id, message_id, exc)
+                tee.fail(exc)
+            finally:
+                self._downloads.pop(key, None)
+
+        # Owned by the service, not the response: a viewer closing the tab
+        # doesn't cancel the download the cache (and other viewers) rely on.
+        task = asyncio.create_task(_download())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return self._tee_info(tee)
+
+    def _tee_info(self, tee: TeeDownload) -> Dict[str, Any]:
+        return {
+            "stream": tee,
+            "path": str(tee.final),
+            "mime": self._guess_mime(tee.final),
+            "size": tee.size,
+        }
+
     _MIME_OVERRIDES = {
         ".tgs": "application/gzip",       # gzipped Lottie sticker
         ".webm": "video/webm",
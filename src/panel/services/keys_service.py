@@ -151,7 +151,9 @@ class KeysService:
     async def _gemini_ping(self, key: str) -> None:
         from google import genai
 
-        client = genai.Client(api_key=key)
+        from ...ai.http_transport import get_http_transport
+
+        client = genai.Client(api_key=key, http_options=get_http_transport().genai_http_options())
         # Listing models needs only a valid key (no generation quota).
         pager = client.aio.models.list()
         if hasattr(pager, "__aiter__"):
@@ -163,11 +165,13 @@ class KeysService:
     async def _openrouter_ping(self, key: str) -> None:
         from openai import AsyncOpenAI
 
-        client = AsyncOpenAI(base_url="https://openrouter.ai/api/v1", api_key=key)
-        try:
-            await client.models.list()
-        finally:
-            await client.close()
+        from ...ai.http_transport import get_http_transport
+
+        # Shared pool: never close() this client, that would close the pool.
+        client = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1", api_key=key, http_client=get_http_transport().client()
+        )
+        await client.models.list()
 
     # ---------- hot reload ----------
     async def reload_ai(self) -> None:
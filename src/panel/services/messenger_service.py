@@ -31,6 +31,13 @@ class MessengerService:
             raise PanelUnavailable()
         return self.state.client
 
+    def _store_new(self, entity_id: int, sent: Any, message: Dict[str, Any]) -> None:
+        """Record our own send in the history store (the live tap may see it
+        too; the write is idempotent)."""
+        store = self.state.message_store
+        if store is not None:
+            store.add_new(int(entity_id), message, self.state.entity._reply_to_id(sent))
+
     async def send_text(
         self, entity_id: int, text: str, reply_to: Optional[int] = None
     ) -> Dict[str, Any]:
@@ -52,6 +59,7 @@ class MessengerService:
         kind = row.get("kind", "pv")
         ename = row.get("display_name", str(entity_id))
         message = self.state.entity._format_message(sent, kind, ename)
+        self._store_new(entity_id, sent, message)
         logger.info("panel send -> entity %s (%d chars)", entity_id, len(text))
         return {"ok": True, "message": message}
 
@@ -98,6 +106,7 @@ class MessengerService:
         kind = row.get("kind", "pv")
         ename = row.get("display_name", str(entity_id))
         message = self.state.entity._format_message(sent, kind, ename)
+        self._store_new(entity_id, sent, message)
         logger.info("panel send_file -> entity %s (%s, %d bytes)", entity_id, safe_name, len(upload))
         return {"ok": True, "message": message}
 
@@ -123,6 +132,8 @@ class MessengerService:
         message = self.state.entity._format_message(
             edited, row.get("kind", "pv"), row.get("display_name", str(entity_id))
         )
+        if self.state.message_store is not None:
+            self.state.message_store.update(int(entity_id), message)
         return {"ok": True, "message": message}
 
     async def forward_message(
@@ -148,5 +159,7 @@ class MessengerService:
         await self.state.throttle.tg_write(
             lambda: client.delete_messages(int(entity_id), [int(message_id)], revoke=True)
         )
+        if self.state.message_store is not None:
+            self.state.message_store.remove(int(entity_id), [int(message_id)])
         logger.info("panel delete -> entity %s msg %s", entity_id, message_id)
         return {"ok": True, "deleted": int(message_id)}
@@ -3,6 +3,7 @@ board, model matrix, and help. READ-ONLY."""
 
 from typing import Any, Dict, List
 
+from ...ai.http_transport import get_http_transport
 from ...utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -78,8 +79,20 @@ class StatusService:
             "mappings": len(settings.get("active_command_to_topic_map", {}) or {}),
             "system": {"cpu_percent": cpu, "mem_percent": mem},
             "panel": {"real_photos": self.state.panel_config.real_photos},
+            "http": get_http_transport().stats(),
+            "media_cache": self.state.media_cache.stats(),
+            "gemini_quota": self._gemini_quota(cfg),
         }
 
+    @staticmethod
+    def _gemini_quota(cfg: Any) -> Any:
+        """Client-side free-tier counters, or None when accounting is off."""
+        if getattr(cfg, "gemini_quota_tier", "off") != "free":
+            return None
+        from ...ai.quota_tracker import get_quota_tracker
+
+        return get_quota_tracker().snapshot()
+
     def keys(self) -> Dict[str, Any]:
         from ...ai.api_key_manager import get_api_key_manager
 
@@ -11,6 +11,7 @@ from typing import Any, Dict, Optional
 from .config import PanelConfig
 from .events import EventHub
 from .media_cache import MediaCache
+from .message_store import MessageStore
 from .throttle import Throttle
 
 
@@ -31,6 +32,7 @@ class PanelState:
     user_verifier: Any
     throttle: Throttle
     media_cache: MediaCache
+    message_store: Optional[MessageStore] = None            # persistent chat history rows
 
     # mutable runtime state
     dialogs_cache: Optional[Dict[str, Any]] = None          # {'items':[...], 'ts':float}
@@ -102,7 +104,11 @@ def build_panel_state(
         settings_manager=SettingsManager(),
         user_verifier=TelegramUserVerifier(client) if client is not None else None,
         throttle=Throttle(),
-        media_cache=MediaCache(),
+        media_cache=MediaCache(
+            max_bytes=panel_config.media_cache_mb * 1024 * 1024,
+            max_age_seconds=panel_config.media_cache_days * 24 * 3600,
+        ),
+        message_store=MessageStore(),
     )
 
     state.env_writer = EnvWriter()
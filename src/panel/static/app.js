@@ -807,6 +807,7 @@
       if (ev.type === "message" && ev.entity_id === entityId) ingestNewMessages([ev.message], myToken);
       else if (ev.type === "typing" && ev.entity_id === entityId) showTyping();
       else if (ev.type === "presence") applyPresence(ev.entity_id, ev.presence);
+      else if (ev.type === "progress") applyProgress(ev);
     };
     sse.onerror = () => {
       // CONNECTING = the browser is auto-retrying; only fall back to polling
@@ -1390,6 +1391,13 @@
     persistResults();
     renderResults();
   }
+  // Long /analyze runs report "window k/n" over the live channel.
+  function applyProgress(ev) {
+    const entry = aiResults.find((r) => r.status === "pending" && r.cat === ev.task && r.entityId === ev.entity_id);
+    if (!entry || !(ev.total > 1)) return;
+    entry.progress = ev.done >= ev.total ? `Merging ${ev.total} windows…` : `Window ${ev.done + 1}/${ev.total}…`;
+    renderResults();
+  }
   function failResult(entry, message, retryAfter) {
     entry.status = "error";
     entry.error = message + (retryAfter ? ` (retry in ~${retryAfter}s)` : "");
@@ -1458,8 +1466,10 @@
     const body = el("div", { class: "rbody" });
     if (r.status === "error") {
       body.appendChild(el("div", { class: "rhtml", text: "⚠️ " + (r.error || "Failed") }));
+    } else if (r.status === "pending" && r.partial) {
+      body.appendChild(el("div", { class: "rhtml rstream", dir: "auto", text: r.partial }));
     } else if (r.status === "pending") {
-      body.appendChild(el("div", { class: "muted", text: "Running…" }));
+      body.appendChild(el("div", { class: "muted", text: r.progress || "Running…" }));
     } else if (r.kind === "image") {
       if (r.mediaUrl) body.appendChild(el("img", { class: "rimg", src: mediaUrl(r.mediaUrl) }));
       if (r.enhanced) body.appendChild(metaChips({ prompt: r.enhanced }));
@@ -1484,12 +1494,57 @@
     renderResults();
   }
 
+  // Text answers stream in (SSE over a POST): the card fills with the raw
+  // partial text, then the final "done" event swaps in the rendered result.
+  const STREAM_KINDS = new Set(["prompt", "tellme"]);
+  async function streamCommand(kind, payload, entry) {
+    const res = await fetch(`/api/cmd/${kind}/stream`, {
+      method: "POST",
+      headers: { Authorization: "Bearer " + State.token, "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+    if (!res.ok) {
+      let data = null;
+      try { data = await res.json(); } catch (_) { data = null; }
+      const err = new Error((data && data.error) || `Request failed (${res.status})`);
+      err.status = res.status; err.retry_after = data && data.retry_after;
+      throw err;
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = "", frame = 0;
+    const paint = () => { frame = 0; renderResults(); };
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let cut;
+      while ((cut = buf.indexOf("\n\n")) >= 0) {
+        const line = buf.slice(0, cut); buf = buf.slice(cut + 2);
+        if (!line.startsWith("data: ")) continue;
+        const ev = JSON.parse(line.slice(6));
+        if (ev.type === "delta") {
+          entry.partial = (entry.partial || "") + ev.text;
+          if (!frame) frame = requestAnimationFrame(paint);  // coalesce repaints
+        } else if (ev.type === "done") {
+          return ev.result;
+        } else if (ev.type === "error") {
+          throw new Error(ev.error || "Failed");
+        }
+      }
+    }
+    throw new Error("The answer stream ended unexpectedly.");
+  }
+
   async function runCommand(kind, payload, title, btn) {
     $("#modal").classList.add("hidden"); // reveal the results rail behind the AI sheet
     if (btn) { btn.disabled = true; btn.dataset.html = btn.innerHTML; btn.innerHTML = '<span class="spin"></span><span>Running…</span>'; }
     const entry = pushResult(kind, title);
+    if (payload && payload.entity_id != null) entry.entityId = payload.entity_id;
     try {
-      const data = await api("/cmd/" + kind, { method: "POST", body: payload });
+      const data = STREAM_KINDS.has(kind)
+        ? await streamCommand(kind, payload, entry)
+        : await api("/cmd/" + kind, { method: "POST", body: payload });
       finishResult(entry, data);
     } catch (e) {
       failResult(entry, e.message, e.retry_after);
@@ -1507,6 +1562,7 @@
     if (m.output_tokens) parts.push((m.input_tokens ? m.input_tokens + "/" : "") + m.output_tokens + " tok");
     if (m.messages) parts.push(m.messages + " msgs");
     if (m.mode) parts.push(m.mode);
+    if (m.windows) parts.push(m.windows + " windows");
     if (m.prompt) parts.push("prompt: " + m.prompt);
     // Surface silent downgrades so weaker output is never mistaken for a bug.
     if (m.provider_fallback) parts.push("⤵ fallback provider");
@@ -1626,18 +1682,41 @@
 
     if (d.live && d.live.keys) {
       body.appendChild(el("h3", { text: "Live key health", style: "margin:14px 0 6px" }));
-      body.appendChild(el("table", { class: "keytable" }, [
-        el("tr", {}, [el("th", { text: "#" }), el("th", { text: "Status" }), el("th", { text: "Available" }), el("th", { text: "Errors" })]),
-        ...d.live.keys.map((k) => el("tr", {}, [
-          el("td", { text: "#" + (k.index + 1) + (k.is_current ? " ◀" : "") }),
-          el("td", {}, [el("span", { class: "pill " + (k.status === "healthy" ? "good" : k.status === "exhausted" ? "bad" : "warn"), text: k.status })]),
-          el("td", { text: k.available ? "yes" : "no" }),
-          el("td", { text: String(k.error_count) }),
-        ])),
-      ]));
+      const live = el("div");
+      live.replaceChildren(...renderLiveKeys(d.live));
+      body.appendChild(live);
+      // Scheduler counters move with every request: poll while the board is open.
+      const timer = setInterval(async () => {
+        if (!live.isConnected || $("#modal").classList.contains("hidden")) { clearInterval(timer); return; }
+        try { const fresh = await api("/keys"); if (fresh.live) live.replaceChildren(...renderLiveKeys(fresh.live)); }
+        catch (e) { clearInterval(timer); }
+      }, 3000);
     }
   }
 
+  function renderLiveKeys(s) {
+    const dash = (v) => (v == null ? "—" : String(v));
+    const dec = s.last_decision;
+    const limits = [s.rpm_limit ? `${s.rpm_limit} rpm` : null, s.rpd_limit ? `${s.rpd_limit} rpd` : null].filter(Boolean).join(" · ");
+    const summary = el("div", { class: "muted", style: "margin-bottom:6px",
+      text: `Scheduling: ${s.scheduling || "sequential"}` + (limits ? ` (${limits} per key)` : "")
+        + (dec ? ` — last pick #${dec.index + 1} (${dec.reason})` : "") });
+    const table = el("table", { class: "keytable" }, [
+      el("tr", {}, ["#", "Status", "Available", "In-flight", "Latency", "Last min", "Today", "Errors"].map((h) => el("th", { text: h }))),
+      ...s.keys.map((k) => el("tr", {}, [
+        el("td", { text: "#" + (k.index + 1) + (k.is_current ? " ◀" : "") }),
+        el("td", {}, [el("span", { class: "pill " + (k.status === "healthy" ? "good" : k.status === "exhausted" ? "bad" : "warn"), text: k.status })]),
+        el("td", { text: k.available ? "yes" : "no" }),
+        el("td", { text: dash(k.in_flight) }),
+        el("td", { text: k.latency_ms == null ? "—" : k.latency_ms + "ms" }),
+        el("td", { text: dash(k.requests_last_minute) }),
+        el("td", { text: dash(k.requests_today) }),
+        el("td", { text: String(k.error_count) }),
+      ])),
+    ]);
+    return [summary, table];
+  }
+
   function renderModels(d) {
     const kv = el("div", { class: "kv" });
     const add = (k, v) => { kv.appendChild(el("div", { class: "k", text: k })); kv.appendChild(el("div", { text: v == null ? "—" : String(v) })); };
@@ -0,0 +1,122 @@
+"""Tee-streaming media downloads: fill the disk cache while viewers watch.
+
+``download_media`` only returns once the whole file is on disk, so a large
+video used to show a spinner for the full Telegram transfer. A ``TeeDownload``
+writes Telethon's ``iter_download`` chunks to a staging file under
+``cache/panel/partial``. Any number of viewers stream from that file as it
+grows, and a second viewer of the same message attaches to the running
+download instead of starting another. On completion the file moves into
+``media/`` and is recorded in the ``MediaCache`` index.
+
+Readers re-open the file for every read instead of holding a handle, so the
+final rename never races a long-lived open file (which would fail on Windows).
+All file I/O runs in worker threads: a viewer reads 256 KB at a time for the
+whole length of a video, and on an SD card that must not stall the loop that
+also runs Telethon.
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+import anyio
+
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_READ_SIZE = 256 * 1024
+
+
+class TeeDownload:
+    """One Telegram download shared by every viewer of the same media."""
+
+    def __init__(self, staging: Path, final: Path, size: Optional[int] = None) -> None:
+        self.staging = Path(staging)
+        self.final = Path(final)
+        self.size = size
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._written = 0
+        self._changed = asyncio.Event()
+        self.staging.parent.mkdir(parents=True, exist_ok=True)
+        self.staging.write_bytes(b"")
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def run(self, chunks: Callable[[], AsyncIterator[bytes]]) -> Path:
+        """Write ``chunks()`` to disk, publishing progress to subscribers.
+
+        Safe to call again after a failed attempt (e.g. a FloodWait retry):
+        the file restarts from zero and readers wait for the bytes they lack,
+        which are the same bytes of the same file.
+        """
+        self._written = 0
+        async with await anyio.open_file(self.staging, "wb") as f:
+            async for chunk in chunks():
+                await f.write(chunk)
+                await f.flush()
+                self._written += len(chunk)
+                self._notify()
+        await asyncio.to_thread(self._publish)
+        self.done = True
+        self._notify()
+        return self.final
+
+    def fail(self, exc: BaseException) -> None:
+        """Give up for good: end every subscriber with an error."""
+        self.error = exc
+        self._notify()
+        try:
+            self.staging.unlink()
+        except OSError:
+            pass
+
+    def _publish(self) -> None:
+        """Move the finished file into place. On Windows a reader's brief
+        per-read handle can block the rename; it is gone within moments."""
+        for attempt in range(20):
+            try:
+                os.replace(self.staging, self.final)
+                return
+            except PermissionError:
+                if attempt == 19:
+                    raise
+                time.sleep(0.05)
+
+    def _read_sync(self, offset: int, limit: int) -> bytes:
+        # The file may move to ``final`` between choosing a path and opening it.
+        paths = (self.final,) if self.done else (self.staging, self.final)
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    return f.read(limit)
+            except FileNotFoundError:
+                if path == paths[-1]:
+                    raise
+        return b""
+
+    async def _read(self, offset: int) -> bytes:
+        limit = min(_READ_SIZE, self._written - offset)
+        return await asyncio.to_thread(self._read_sync, offset, limit)
+
+    async def subscribe(self) -> AsyncIterator[bytes]:
+        """Yield the file from the start, following the download as it grows."""
+        offset = 0
+        while True:
+            if self.error is not None:
+                raise RuntimeError(f"Media download failed: {self.error}")
+            if offset < self._written:
+                chunk = await self._read(offset)
+                if chunk:
+                    offset += len(chunk)
+                    yield chunk
+                    continue
+            if self.done:
+                return
+            await self._changed.wait()
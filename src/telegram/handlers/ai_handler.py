@@ -1,6 +1,7 @@
 """AI command handler for prompt, translate, analyze, and tellme commands."""
 
 import re
+import time
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -8,13 +9,13 @@ from telethon import TelegramClient
 from telethon.tl.types import Message
 
 from ...ai.processor import AIProcessor
-from ...ai.response_metadata import build_response_parts
+from ...ai.response_metadata import AIResponseMetadata, build_response_parts
 
 from ...core.exceptions import AIProcessorError
 from ...utils.task_manager import get_task_manager
 from ...utils.rate_limiter import get_ai_rate_limiter
 from ...utils.validators import InputValidator
-from ...utils.message_sender import MessageSender
+from ...utils.message_sender import MessageSender, ProgressiveEditor
 from ...utils.telegram_html import clean_telegram_html
 from ...utils.error_handler import ErrorHandler
 from ...utils.metrics import get_metrics_collector, TimingContext
@@ -23,6 +24,10 @@ from ...ai.analyze_queue import analyze_queue
 from .base import BaseHandler
 
 
+# Minimum seconds between progress edits of the /analyze status message.
+ANALYZE_PROGRESS_EDIT_INTERVAL = 2.0
+
+
 def format_analysis_metadata(
     num_messages: int,
     unique_senders: list,
@@ -117,6 +122,7 @@ class AIHandler(BaseHandler):
         """
         super().__init__()
         self._ai_processor = ai_processor
+        self._me_user = None  # account owner, fetched once for transcripts
     
     async def process_ai_command(
         self,
@@ -207,13 +213,19 @@ class AIHandler(BaseHandler):
                         f"<i>Check /status for details</i>"
                     )
                 elif command_type == "/prompt":
-                    response = await self._handle_prompt_command(**command_args)
+                    response = await self._handle_prompt_command(
+                        client=client, status_msg=thinking_msg, **command_args
+                    )
                 elif command_type == "/translate":
                     response = await self._handle_translate_command(**command_args)
                 elif command_type == "/analyze":
-                    response = await self._handle_analyze_command(client, chat_id, **command_args)
+                    response = await self._handle_analyze_command(
+                        client, chat_id, status_msg=thinking_msg, **command_args
+                    )
                 elif command_type == "/tellme":
-                    response = await self._handle_tellme_command(client, chat_id, **command_args)
+                    response = await self._handle_tellme_command(
+                        client, chat_id, status_msg=thinking_msg, **command_args
+                    )
                 else:
                     response = (
                         f"❌ <b>Unknown Command</b>\n\n"
@@ -285,13 +297,49 @@ class AIHandler(BaseHandler):
                 except Exception:
                     pass
     
+    async def _stream_with_preview(
+        self,
+        stream,
+        client: Optional[TelegramClient],
+        status_msg: Optional[Message]
+    ) -> AIResponseMetadata:
+        """Consume a response stream, previewing it in ``status_msg`` as it grows.
+
+        Returns the stream's final AIResponseMetadata; the caller sends the
+        complete, paginated answer over the preview afterwards.
+        """
+        editor = (
+            ProgressiveEditor(MessageSender(client), status_msg)
+            if client is not None and status_msg is not None
+            else None
+        )
+        text = ""
+        final = None
+        try:
+            async for item in stream:
+                if isinstance(item, AIResponseMetadata):
+                    final = item
+                    continue
+                text += item
+                if editor is not None:
+                    await editor.update(text)
+        finally:
+            if editor is not None:
+                await editor.close()
+        return final or AIResponseMetadata(response_text=text.strip())
+
     async def _handle_prompt_command(
         self, 
         user_prompt_text: str, 
         use_thinking: bool = False,
-        use_web_search: bool = False
+        use_web_search: bool = False,
+        client: Optional[TelegramClient] = None,
+        status_msg: Optional[Message] = None
     ) -> str:
-        """Handle /prompt command with optional thinking and web search flags."""
+        """Handle /prompt command with optional thinking and web search flags.
+
+        The answer is streamed into ``status_msg`` while it is generated.
+        """
         if not user_prompt_text:
             return "📋 <b>Command Usage</b>\n\n<b>Format:</b> <code>/prompt=&lt;your question or instruction&gt;</code>\n\nPlease provide a question or instruction after the equals sign."
         
@@ -311,12 +359,16 @@ class AIHandler(BaseHandler):
             # Use adaptive prompt that detects tone and responds appropriately
             full_prompt = PROMPT_ADAPTIVE_PROMPT.format(user_prompt=user_prompt_with_format)
             
-            response = await self._ai_processor.execute_custom_prompt(
-                user_prompt=full_prompt,
-                max_tokens=32000,  # Use full token budget for complete responses
-                task_type="prompt",
-                use_thinking=use_thinking,
-                use_web_search=use_web_search
+            response = await self._stream_with_preview(
+                self._ai_processor.stream_custom_prompt(
+                    user_prompt=full_prompt,
+                    max_tokens=32000,  # Use full token budget for complete responses
+                    task_type="prompt",
+                    use_thinking=use_thinking,
+                    use_web_search=use_web_search
+                ),
+                client,
+                status_msg
             )
             
             # Response is now AIResponseMetadata with execution status
@@ -372,6 +424,55 @@ class AIHandler(BaseHandler):
         except AIProcessorError as e:
             return f"AI Error: {e}"
     
+    async def _collect_messages_data(
+        self,
+        client: TelegramClient,
+        chat_id: int,
+        num_messages: int
+    ) -> list:
+        """Build the chronological [{sender, text, timestamp}] transcript.
+        
+        Backed by the shared transcript cache, so back-to-back /analyze and
+        /tellme on the same chat cost one small delta read instead of two
+        full walks of the history.
+        """
+        from ...utils.transcript_cache import get_transcript_cache
+        from ...utils.sender_names import get_sender_names
+        
+        if self._me_user is None:
+            self._me_user = await client.get_me()
+        me_user = self._me_user
+        # Use actual Telegram name instead of "You" for bot's own messages
+        me_name = me_user.first_name or me_user.username or "You"
+        
+        async def fetch(kwargs):
+            return await client.get_messages(chat_id, **kwargs)
+        
+        async def convert(page):
+            # Senders come from the entities returned with the page; anything
+            # missing is resolved in one bulk lookup, never per message.
+            names = await get_sender_names().resolve(client, page)
+            entries = []
+            for msg in page:
+                if not msg.text:
+                    entries.append(None)
+                    continue
+                if msg.out or msg.sender_id == me_user.id:
+                    sender_name = me_name
+                else:
+                    sender_name = names.get(msg.sender_id) or f"User_{msg.sender_id}"
+                
+                entries.append({
+                    'sender': sender_name,
+                    'text': msg.text,
+                    'timestamp': msg.date
+                })
+            return entries
+        
+        return await get_transcript_cache().window(
+            ("telegram", chat_id), num_messages, fetch, convert
+        )
+    
     async def _handle_analyze_command(
         self,
         client: TelegramClient,
@@ -379,7 +480,8 @@ class AIHandler(BaseHandler):
         num_messages: int,
         analysis_mode: str = "general",
         output_language: str = "persian",
-        use_thinking: bool = False
+        use_thinking: bool = False,
+        status_msg: Optional[Message] = None
     ) -> str:
         """Handle /analyze command with optional Persian translation.
         
@@ -389,6 +491,8 @@ class AIHandler(BaseHandler):
             num_messages: Number of messages to analyze
             analysis_mode: Analysis type (general/fun/romance)
             output_language: Output language ('persian' or 'english')
+            status_msg: Processing message to update with window progress
+                while a long chat is analyzed in windows
         
         Returns:
             Analysis text in requested language
@@ -402,44 +506,43 @@ class AIHandler(BaseHandler):
             return f"❌ <b>Invalid Analysis Mode</b>\n\n<code>{analysis_mode}</code> is not a valid analysis mode.\n\n<b>Valid modes:</b> <code>general</code>, <code>fun</code>, <code>romance</code>"
         
         try:
-            # Get chat history
-            history = await client.get_messages(chat_id, limit=num_messages)
-            me_user = await client.get_me()
-            
-            messages_data = []
-            for msg in reversed(history):
-                if msg and msg.text:
-                    # Fetch sender entity explicitly
-                    try:
-                        sender = await msg.get_sender()
-                        sender_name = (
-                            # Use actual Telegram name instead of "You" for bot's own messages
-                            (me_user.first_name or me_user.username or "You")
-                            if msg.sender_id == me_user.id
-                            else (
-                                getattr(sender, 'first_name', None) or
-                                getattr(sender, 'username', None) or
-                                f"User_{msg.sender_id}"
-                            )
-                        )
-                    except Exception:
-                        sender_name = f"User_{msg.sender_id}"
-
-                    messages_data.append({
-                        'sender': sender_name,
-                        'text': msg.text,
-                        'timestamp': msg.date
-                    })
+            # Get chat history (incremental: only messages newer than the last
+            # analyze/tellme on this chat are fetched)
+            messages_data = await self._collect_messages_data(client, chat_id, num_messages)
             
             if not messages_data:
                 return "📭 <b>No Messages Found</b>\n\nNo text messages were found in the specified message history to analyze.\n\n<b>Suggestion:</b> Try analyzing a different number of messages or ensure the chat contains text messages."
             
+            last_edit_at = 0.0
+            
+            async def on_progress(done: int, total: int) -> None:
+                """Show window k/n on the processing message (rate-limited)."""
+                nonlocal last_edit_at
+                if status_msg is None or total <= 1:
+                    return
+                now = time.monotonic()
+                if done not in (0, total) and (now - last_edit_at) < ANALYZE_PROGRESS_EDIT_INTERVAL:
+                    return
+                last_edit_at = now
+                step = (
+                    f"Merging {total} windows..." if done == total
+                    else f"Analyzing window {done + 1}/{total}..."
+                )
+                await MessageSender(client).edit_message_safe(
+                    status_msg,
+                    f"🔄 <b>Analyze</b>\n\n"
+                    f"{step}\n"
+                    f"<i>{len(messages_data)} messages</i>",
+                    parse_mode='html'
+                )
+            
             # Generate analysis DIRECTLY in target language
             analysis_result = await self._ai_processor.analyze_conversation_messages(
                 messages_data,
                 analysis_mode=analysis_mode,
                 output_language=output_language,
-                use_thinking=use_thinking
+                use_thinking=use_thinking,
+                progress_cb=on_progress
             )
             
             # Validate and return result
@@ -491,9 +594,10 @@ class AIHandler(BaseHandler):
         num_messages: int,
         user_question: str,
         use_thinking: bool = False,
-        use_web_search: bool = False
+        use_web_search: bool = False,
+        status_msg: Optional[Message] = None
     ) -> str:
-        """Handle /tellme command."""
+        """Handle /tellme command, streaming the answer into ``status_msg``."""
         # Validate number of messages
         if not InputValidator.validate_number(str(num_messages), min_val=1, max_val=10000):
             return f"❌ <b>Invalid Message Count</b>\n\n<code>{num_messages}</code> is not a valid number.\n\n<b>Valid range:</b> 1 to 10,000 messages"
@@ -505,43 +609,22 @@ class AIHandler(BaseHandler):
             return f"❌ <b>Invalid Question</b>\n\n{str(e)}\n\nPlease check your question and try again."
         
         try:
-            # Get chat history
-            history = await client.get_messages(chat_id, limit=num_messages)
-            me_user = await client.get_me()
-            
-            messages_data = []
-            for msg in reversed(history):
-                if msg and msg.text:
-                    # Fetch sender entity explicitly
-                    try:
-                        sender = await msg.get_sender()
-                        sender_name = (
-                            # Use actual Telegram name instead of "You" for bot's own messages
-                            (me_user.first_name or me_user.username or "You")
-                            if msg.sender_id == me_user.id
-                            else (
-                                getattr(sender, 'first_name', None) or
-                                getattr(sender, 'username', None) or
-                                f"User_{msg.sender_id}"
-                            )
-                        )
-                    except Exception:
-                        sender_name = f"User_{msg.sender_id}"
-
-                    messages_data.append({
-                        'sender': sender_name,
-                        'text': msg.text,
-                        'timestamp': msg.date
-                    })
+            # Get chat history (incremental: only messages newer than the last
+            # analyze/tellme on this chat are fetched)
+            messages_data = await self._collect_messages_data(client, chat_id, num_messages)
             
             if not messages_data:
                 return "📭 <b>No Messages Found</b>\n\nNo text messages were found in the specified history to answer your question.\n\n<b>Suggestion:</b> Try analyzing a different number of messages or ensure the chat contains text messages."
             
-            response = await self._ai_processor.answer_question_from_chat_history(
-                messages_data, 
-                user_question,
-                use_thinking=use_thinking,
-                use_web_search=use_web_search
+            response = await self._stream_with_preview(
+                self._ai_processor.stream_answer_from_chat_history(
+                    messages_data,
+                    user_question,
+                    use_thinking=use_thinking,
+                    use_web_search=use_web_search
+                ),
+                client,
+                status_msg
             )
             
             # Response is now AIResponseMetadata with execution status
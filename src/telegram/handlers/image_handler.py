@@ -2,7 +2,6 @@
 
 import asyncio
 import html
-from pathlib import Path
 from typing import Dict, Any, Optional
 
 from telethon import TelegramClient
@@ -13,7 +12,12 @@ from ...ai.image_generator import ImageGenerator
 from ...ai.image_queue import image_queue, ImageStatus
 from ...ai.prompt_enhancer import PromptEnhancer
 from ...ai.processor import AIProcessor
-from ...core.constants import SUPPORTED_IMAGE_MODELS
+from ...core.config import get_settings
+from ...core.constants import (
+    IMAGE_RATE_LIMIT_ERROR,
+    IMAGE_RATE_LIMIT_RETRIES,
+    SUPPORTED_IMAGE_MODELS,
+)
 from ...core.exceptions import AIProcessorError
 from ...utils.rate_limiter import get_ai_rate_limiter
 from ...utils.validators import InputValidator
@@ -41,8 +45,9 @@ class ImageHandler(BaseHandler):
         """
         super().__init__()
         self._ai_processor = ai_processor
-        self._image_generator = image_generator
-        self._prompt_enhancer = prompt_enhancer
+        self._image_generator = image_generator
+        self._prompt_enhancer = prompt_enhancer
+        image_queue.configure(get_settings())
 
     @staticmethod
     def _escape_caption_text(text: str, max_length: int) -> str:
@@ -166,6 +171,9 @@ class ImageHandler(BaseHandler):
         # Add to queue
         request_id = image_queue.add_request(model, prompt, user_id)
         
+        # Enhance while we wait for our turn, off the critical path
+        enhancement = self._prompt_enhancer.start_enhancement(prompt)
+        
         # Get queue position
         queue_position = image_queue.get_queue_position(request_id, model)
         
@@ -180,48 +188,39 @@ class ImageHandler(BaseHandler):
             reply_to=reply_to_id
         )
         
+        async def show_position(position: int) -> None:
+            if position > 1:
+                await client.edit_message(
+                    thinking_msg,
+                    f"⏳ In {model.upper()} queue: position {position}..."
+                )
+        
         try:
-            # Wait for our turn and process when ready
-            while True:
-                current_request = image_queue.get_request(request_id)
-                if not current_request:
-                    await client.edit_message(thinking_msg, "❌ Request not found")
-                    return
-                
-                # Check if it's our turn to process
-                if image_queue.try_start_processing(request_id, model):
-                    # It's our turn! Process it
-                    break
-                
-                # Check status
-                if current_request.status == ImageStatus.FAILED:
-                    await client.edit_message(
-                        thinking_msg,
-                        f"❌ Error: {current_request.error_message or 'Unknown error'}"
-                    )
-                    return
-                elif current_request.status == ImageStatus.COMPLETED:
-                    # Request was completed (shouldn't happen, but handle it)
-                    if current_request.image_path:
-                        await self._send_image(
-                            client, chat_id, reply_to_id, thinking_msg,
-                            current_request.image_path, model, prompt
-                        )
-                    return
-                
-                # Update queue position
-                position = image_queue.get_queue_position(request_id, model)
-                if position and position > 1:
-                    await client.edit_message(
-                        thinking_msg,
-                        f"⏳ In {model.upper()} queue: position {position}..."
+            # Wait for our turn; wakes only when the queue changes
+            current_request = await image_queue.wait_for_turn(request_id, model, on_position=show_position)
+            if not current_request:
+                await client.edit_message(thinking_msg, "❌ Request not found")
+                return
+            
+            if current_request.status == ImageStatus.FAILED:
+                await client.edit_message(
+                    thinking_msg,
+                    f"❌ Error: {current_request.error_message or 'Unknown error'}"
+                )
+                return
+            elif current_request.status == ImageStatus.COMPLETED:
+                # Request was completed (shouldn't happen, but handle it)
+                if current_request.image_path:
+                    await self._send_image(
+                        client, chat_id, reply_to_id, thinking_msg,
+                        current_request.image_path, model, prompt
                     )
-                
-                await asyncio.sleep(2)  # Check every 2 seconds
+                return
             
             # Process the request now that it's our turn
             await self._process_single_request(
-                request_id, client, chat_id, reply_to_id, thinking_msg, model, prompt
+                request_id, client, chat_id, reply_to_id, thinking_msg, model, prompt,
+                enhancement
             )
         
         except Exception as e:
@@ -290,7 +289,8 @@ class ImageHandler(BaseHandler):
         reply_to_id: int,
         thinking_msg: Message,
         model: str,
-        prompt: str
+        prompt: str,
+        enhancement: Optional["asyncio.Future"] = None
     ):
         """
         Process a single image generation request.
@@ -303,27 +303,32 @@ class ImageHandler(BaseHandler):
             thinking_msg: Status message to update
             model: Model name
             prompt: Original prompt
+            enhancement: Enhancement started when the request was queued
         """
         metrics = get_metrics_collector()
         
         try:
-            # Update status: enhancing prompt
-            try:
-                await client.edit_message(
-                    thinking_msg,
-                    f"🎨 Enhancing prompt with AI..."
-                )
-            except (MessageIdInvalidError, MessageNotModifiedError):
-                # If we can't edit the message (deleted/invalid), fall back to sending a new one
-                thinking_msg = await client.send_message(
-                    chat_id,
-                    f"🎨 Enhancing prompt with AI...",
-                    reply_to=reply_to_id
-                )
+            if enhancement is None:
+                enhancement = self._prompt_enhancer.start_enhancement(prompt)
             
-            # Enhance prompt
+            # Update status: enhancing prompt (usually finished while queued)
+            if not enhancement.done():
+                try:
+                    await client.edit_message(
+                        thinking_msg,
+                        f"🎨 Enhancing prompt with AI..."
+                    )
+                except (MessageIdInvalidError, MessageNotModifiedError):
+                    # If we can't edit the message (deleted/invalid), fall back to sending a new one
+                    thinking_msg = await client.send_message(
+                        chat_id,
+                        f"🎨 Enhancing prompt with AI...",
+                        reply_to=reply_to_id
+                    )
+            
+            # Enhance prompt; only the part not overlapped by the queue wait is timed
             with TimingContext('image_command.enhancement_duration', tags={'model': model}):
-                enhanced_prompt, model_used = await self._prompt_enhancer.enhance_prompt(prompt)
+                enhanced_prompt, model_used = await asyncio.shield(enhancement)
             
             # Update status: generating image
             try:
@@ -339,14 +344,19 @@ class ImageHandler(BaseHandler):
                     reply_to=reply_to_id
                 )
             
-            # Generate image
+            # Generate image; a 429 backs off every worker of this backend, then retries
             with TimingContext('image_command.generation_duration', tags={'model': model}):
-                if model == "flux":
-                    success, image_path, error_message = await self._image_generator.generate_with_flux(enhanced_prompt)
-                elif model == "sdxl":
-                    success, image_path, error_message = await self._image_generator.generate_with_sdxl(enhanced_prompt)
-                else:
-                    success, image_path, error_message = (False, None, f"Invalid model: {model}")
+                for _ in range(IMAGE_RATE_LIMIT_RETRIES + 1):
+                    await image_queue.wait_for_backoff(model)
+                    if model == "flux":
+                        success, image_path, error_message = await self._image_generator.generate_with_flux(enhanced_prompt)
+                    elif model == "sdxl":
+                        success, image_path, error_message = await self._image_generator.generate_with_sdxl(enhanced_prompt)
+                    else:
+                        success, image_path, error_message = (False, None, f"Invalid model: {model}")
+                    if success or error_message != IMAGE_RATE_LIMIT_ERROR:
+                        break
+                    image_queue.note_rate_limited(model)
             
             if success and image_path:
                 # Mark as completed
@@ -451,10 +461,4 @@ class ImageHandler(BaseHandler):
         except (MessageIdInvalidError, MessageNotModifiedError):
             # If it's already gone or can't be deleted, ignore
             pass
-        
-        # Clean up temp file
-        try:
-            Path(image_path).unlink(missing_ok=True)
-        except Exception as e:
-            self._logger.warning(f"Failed to cleanup image file {image_path}: {e}")
 
@@ -8,7 +8,6 @@ from typing import Optional, List, Set
 
 from telethon import TelegramClient
 from telethon.tl.types import Message
-from pydub import AudioSegment
 
 from ...ai.stt import SpeechToTextProcessor
 from ...ai.processor import AIProcessor
@@ -16,10 +15,11 @@ from ...ai.prompts import (
     VOICE_MESSAGE_SUMMARY_PROMPT
 )
 from ...core.config import get_settings
-from ...core.constants import MAX_MESSAGE_LENGTH, DEFAULT_STT_SUMMARY_MODEL
+from ...core.constants import MAX_MESSAGE_LENGTH, DEFAULT_STT_LANGUAGE, DEFAULT_STT_SUMMARY_MODEL
 from ...core.exceptions import AIProcessorError
 from ...utils.helpers import clean_temp_files, split_message
 from ...utils.message_sender import MessageSender
+from ...utils.stt_cache import stt_cache_key
 from .base import BaseHandler
 
 
@@ -140,7 +140,6 @@ class STTHandler(BaseHandler):
         # Use /tmp for Docker (read-only root filesystem) or system temp
         import tempfile
         temp_dir = "/tmp" if os.path.exists("/tmp") and os.access("/tmp", os.W_OK) else tempfile.gettempdir()
-        converted_wav_path = os.path.join(temp_dir, f"temp_voice_stt_{original_message.id}_{replied_voice_message.id}.wav")
         path_modified = False
         original_path = ""
         message_sender = MessageSender(client)
@@ -149,27 +148,24 @@ class STTHandler(BaseHandler):
             # Setup FFmpeg path
             path_modified, original_path = await self._setup_ffmpeg_path()
 
-            # Download voice/audio to temp directory
-            base_download_name = os.path.join(temp_dir, f"temp_voice_download_stt_{original_message.id}_{replied_voice_message.id}")
-            downloaded_voice_path = await client.download_media(
-                replied_voice_message.media,
-                file=base_download_name
-            )
+            async def load_audio():
+                """Download and decode; skipped when every chunk is already stored."""
+                nonlocal downloaded_voice_path
+                base_download_name = os.path.join(temp_dir, f"temp_voice_download_stt_{original_message.id}_{replied_voice_message.id}")
+                downloaded_voice_path = await client.download_media(
+                    replied_voice_message.media,
+                    file=base_download_name
+                )
 
-            if not downloaded_voice_path or not Path(downloaded_voice_path).exists():
-                raise FileNotFoundError("Downloaded voice file not found or download failed")
+                if not downloaded_voice_path or not Path(downloaded_voice_path).exists():
+                    raise FileNotFoundError("Downloaded voice file not found or download failed")
 
-            self._logger.info(f"Voice downloaded to '{downloaded_voice_path}'. Converting to WAV (mono/16kHz)...")
+                self._logger.info(f"Voice downloaded to '{downloaded_voice_path}'. Decoding to 16kHz mono PCM...")
 
-            # Convert to mono/16kHz WAV off the event loop (long files would otherwise block).
-            try:
-                await asyncio.to_thread(self._convert_to_stt_wav, downloaded_voice_path, converted_wav_path)
-            except Exception as conv_err:
-                self._logger.error(f"Audio decode/conversion failed: {conv_err}", exc_info=True)
-                raise AIProcessorError(
-                    "Could not decode audio file (unsupported format or corrupt data)"
-                ) from conv_err
-            self._logger.info(f"Voice converted to '{converted_wav_path}'")
+                # One ffmpeg pass straight to in-memory PCM; the chunker works on it directly.
+                decoded_audio = await self._stt_processor.decode_audio(downloaded_voice_path)
+                self._logger.info(f"Voice decoded: {len(decoded_audio) / 1000:.1f}s")
+                return decoded_audio
 
             # Streaming delivery state: send each chunk as its own message as soon as it's ready.
             # First successful chunk REPLACES the status message via edit; later chunks become new sends.
@@ -246,10 +242,11 @@ class STTHandler(BaseHandler):
 
             # Transcribe (auto-chunks for long audio); each chunk is streamed as it arrives.
             full_transcript = await self._stt_processor.transcribe_voice_to_text(
-                converted_wav_path,
+                load_audio,
                 progress_cb=on_progress,
                 on_chunk_text=on_chunk_text,
                 chunk_filter=chunk_filter,
+                cache_key=stt_cache_key(replied_voice_message, DEFAULT_STT_LANGUAGE),
             )
 
             # If no chunk was ever delivered (e.g. transcript came back empty without an error),
@@ -340,14 +337,7 @@ class STTHandler(BaseHandler):
             await self._restore_ffmpeg_path(path_modified, original_path)
 
             # Clean up temporary files
-            clean_temp_files(downloaded_voice_path, converted_wav_path)
-
-    @staticmethod
-    def _convert_to_stt_wav(src_path: str, dst_path: str) -> None:
-        """Convert any audio file to a mono/16kHz WAV suitable for STT."""
-        audio = AudioSegment.from_file(src_path)
-        audio = audio.set_channels(1).set_frame_rate(16000)
-        audio.export(dst_path, format="wav")
+            clean_temp_files(downloaded_voice_path)
 
     # ------------------------------------------------------------------
     # Chunk-spec / summary helpers (used by the /stt retry path)
@@ -587,12 +577,12 @@ class STTHandler(BaseHandler):
             transcribed_text=transcribed_text
         )
         
-        def _call_gemini() -> Optional[str]:
-            import google.generativeai as genai
+        async def _call_gemini() -> Optional[str]:
+            from google import genai
+            from ...ai.http_transport import get_http_transport
             
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
+            client = genai.Client(api_key=api_key, http_options=get_http_transport().genai_http_options())
+            response = await client.aio.models.generate_content(model=model_name, contents=prompt)
             
             candidate = getattr(response, "text", None)
             if candidate and candidate.strip():
@@ -616,7 +606,7 @@ class STTHandler(BaseHandler):
                 return None
         
         try:
-            result = await asyncio.to_thread(_call_gemini)
+            result = await _call_gemini()
             if result:
                 return result
         except Exception as exc:
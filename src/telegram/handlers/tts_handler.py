@@ -1,6 +1,5 @@
 """TTS (Text-to-Speech) command handler."""
 
-import asyncio
 from pathlib import Path
 from typing import Optional
 
@@ -50,7 +49,7 @@ class TTSHandler(BaseHandler):
         
         # Use /tmp for Docker (read-only root filesystem) or system temp
         temp_dir = "/tmp" if os.path.exists("/tmp") and os.access("/tmp", os.W_OK) else tempfile.gettempdir()
-        temp_output_filename = os.path.join(temp_dir, f"temp_tts_output_{event_message.id}_{event_message.date.timestamp()}.wav")
+        temp_output_filename = os.path.join(temp_dir, f"temp_tts_output_{event_message.id}_{event_message.date.timestamp()}{self._tts_processor.audio_suffix()}")
         
         thinking_msg = await client.send_message(
             chat_id,
@@ -226,15 +225,17 @@ class TTSHandler(BaseHandler):
     ) -> None:
         """Monitor TTS request and send result when ready.
         
+        Sleeps until the queue reports a status or position change (or the
+        request's completion future resolves) instead of polling.
         When TTS completes, deletes both the original command message and status message,
         then sends only the voice message to keep chat clean.
         """
-        update_counter = 0
         last_position = None
         last_status_text = None
         
         try:
             while True:
+                seen = tts_queue.watch_state(request_id)
                 request = tts_queue.get_request_status(request_id)
                 if not request:
                     break
@@ -298,27 +299,28 @@ class TTSHandler(BaseHandler):
                     if last_status_text != processing_text:
                         await self._safe_edit_message(status_message, processing_text, client)
                         last_status_text = processing_text
+                    
+                    # Nothing else changes until the request finishes
+                    await tts_queue.wait_for_result(request_id)
+                    continue
                 
                 elif request.status == TTSStatus.PENDING:
-                    # Update position periodically (every 2 seconds)
-                    update_counter += 1
-                    if update_counter % 2 == 0:
-                        current_position = tts_queue.get_request_position(request_id)
-                        if current_position != last_position:
-                            last_position = current_position
-                            if current_position:
-                                voice_name = request.voice or DEFAULT_VOICE
-                                pending_text = (
-                                    f"🗣️ Converting text to speech...\n"
-                                    f"📋 Status: In queue (Position: {current_position})\n"
-                                    f"🔊 Voice: {voice_name}"
-                                )
-                                if last_status_text != pending_text:
-                                    await self._safe_edit_message(status_message, pending_text, client)
-                                    last_status_text = pending_text
+                    # Show the new position whenever a request ahead of us moves on
+                    current_position = seen[1]
+                    if current_position != last_position:
+                        last_position = current_position
+                        if current_position:
+                            voice_name = request.voice or DEFAULT_VOICE
+                            pending_text = (
+                                f"🗣️ Converting text to speech...\n"
+                                f"📋 Status: In queue (Position: {current_position})\n"
+                                f"🔊 Voice: {voice_name}"
+                            )
+                            if last_status_text != pending_text:
+                                await self._safe_edit_message(status_message, pending_text, client)
+                                last_status_text = pending_text
                 
-                # Update status periodically
-                await asyncio.sleep(1)
+                await tts_queue.wait_for_change(request_id, seen)
         
         except Exception as e:
             self._logger.error(f"Error monitoring TTS request {request_id}: {e}", exc_info=True)
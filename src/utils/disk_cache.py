@@ -0,0 +1,72 @@
+"""Shared eviction for the file-per-entry caches (images, TTS audio).
+
+Those caches bump a file's mtime on every read, so mtime order is LRU order.
+``trim_directory`` deletes files past an optional age budget, then the
+least-recently-used files until the directory fits its byte budget.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Over budget, caches trim to this fraction of it rather than to the limit
+# itself, so back-to-back writes don't each pay for a scan-and-delete.
+TRIM_TARGET_RATIO = 0.9
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+def trim_directory(
+    directory: Path,
+    max_bytes: int,
+    max_age_seconds: Optional[float] = None,
+    counts: Callable[[str], bool] = lambda name: True,
+) -> int:
+    """Evict files from ``directory``; returns how many were deleted.
+
+    Args:
+        directory: The cache directory (not recursed into)
+        max_bytes: Byte budget for the files ``counts`` accepts
+        max_age_seconds: Delete ANY file not touched for this long (this
+            also clears abandoned temp files); None disables age eviction
+        counts: Filename predicate selecting the cache entries that count
+            toward, and may be evicted for, the byte budget
+    """
+    now = time.time()
+    removed = 0
+    entries: List[Tuple[float, int, str]] = []
+    total = 0
+    try:
+        scan = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in scan:
+        try:
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+        except OSError:
+            continue
+        if max_age_seconds is not None and now - st.st_mtime > max_age_seconds:
+            removed += _unlink(entry.path)
+            continue
+        if counts(entry.name):
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+    if total > max_bytes:
+        target = int(max_bytes * TRIM_TARGET_RATIO)
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if _unlink(path):
+                total -= size
+                removed += 1
+    return removed
@@ -0,0 +1,117 @@
+"""Content-addressed cache of generated images.
+
+Image workers are slow and rate limited, and the same enhanced prompt is
+regularly sent twice (a retried command, the panel and Telegram asking for the
+same thing). Generated images are stored in ``temp/images`` under::
+
+    sha256(backend, enhanced prompt).png
+
+and a hit is returned without calling the worker. Downloads are streamed
+into a ``.part`` file that is atomically renamed on completion, so a reader
+never sees half an image.
+
+The directory used to grow forever. After each write, a background
+thread deletes files older than the age budget, then the least-recently-used
+files until the directory fits its byte budget. Reads bump a file's mtime.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from ..core.constants import (
+    DEFAULT_IMAGE_CACHE_MAX_AGE_HOURS,
+    DEFAULT_IMAGE_CACHE_MAX_MB,
+    IMAGE_TEMP_DIR,
+)
+from .disk_cache import trim_directory
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_CACHE_SUFFIX = ".png"
+
+
+def image_cache_key(backend: str, prompt: str) -> str:
+    """Stable content hash of one generation request."""
+    payload = "\x1f".join([(backend or "").lower(), prompt or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """Directory of generated images with age and LRU (mtime) eviction."""
+
+    def __init__(
+        self,
+        directory: Path = Path(IMAGE_TEMP_DIR),
+        max_bytes: int = DEFAULT_IMAGE_CACHE_MAX_MB * 1024 * 1024,
+        max_age_seconds: float = DEFAULT_IMAGE_CACHE_MAX_AGE_HOURS * 3600,
+    ) -> None:
+        self._dir = Path(directory)
+        self._max_bytes = max_bytes
+        self._max_age = max_age_seconds
+        self._eviction: Optional[asyncio.Future] = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}{IMAGE_CACHE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached image for ``key``, or None."""
+        path = self._path(key)
+        try:
+            st = path.stat()
+            if st.st_size == 0 or time.time() - st.st_mtime > self._max_age:
+                raise FileNotFoundError(path)
+            os.utime(path, None)  # mark as recently used
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return str(path)
+
+    def temp_path(self, key: str) -> Path:
+        """A private file to stream a download into before ``commit``."""
+        self._dir.mkdir(parents=True, exist_ok=True)
+        return self._dir / f"{key}.{uuid.uuid4().hex[:8]}.part"
+
+    def commit(self, key: str, temp_path: Path) -> str:
+        """Atomically publish a finished download; returns its cache path."""
+        path = self._path(key)
+        os.replace(temp_path, path)
+        self.schedule_eviction()
+        return str(path)
+
+    def schedule_eviction(self) -> None:
+        """Run ``evict`` in a worker thread (inline when no loop is running)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.evict()
+            return
+        if self._eviction is None or self._eviction.done():
+            self._eviction = loop.run_in_executor(None, self.evict)
+
+    def evict(self) -> int:
+        """Delete expired files, then LRU files until under the byte budget."""
+        # Age eviction also covers images from before the cache and abandoned
+        # .part files; only finished images count toward the budget.
+        removed = trim_directory(
+            self._dir,
+            self._max_bytes,
+            self._max_age,
+            counts=lambda name: not name.endswith(".part"),
+        )
+        if removed:
+            self.evicted += removed
+            logger.info(f"Image cache evicted {removed} file(s)")
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
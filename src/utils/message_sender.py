@@ -1,6 +1,7 @@
 """Enterprise-grade message sending utility with retry, pagination, and markdown support."""
 
 import asyncio
+import time
 from typing import List, Optional, Tuple
 
 from telethon import TelegramClient
@@ -11,11 +12,19 @@ from ..core.constants import MAX_MESSAGE_LENGTH
 from ..utils.logging import get_logger
 from ..utils.helpers import split_message
 from ..utils.rtl_fixer import ensure_rtl_safe
+from ..utils.telegram_html import clean_telegram_html
 
 # Hard ceiling on cumulative FloodWait sleeps per call so a punitive wait
 # doesn't block the handler indefinitely.
 _MAX_FLOOD_WAIT_OCCURRENCES = 2
 
+# Progressive edits while an answer streams in: at most one edit per interval
+# (Telegram throttles frequent edits of one message), and the preview shows
+# only the head of the answer - the final send paginates the full text.
+STREAM_EDIT_INTERVAL_SECONDS = 1.5
+STREAM_PREVIEW_MAX_CHARS = 3500
+STREAM_CURSOR = " ▌"
+
 
 class MessageSender:
     """Handles reliable message sending with pagination, retry, and markdown support."""
@@ -338,3 +347,64 @@ class MessageSender:
             edit_message=thinking_msg
         )
 
+
+class ProgressiveEditor:
+    """Rate-limited progressive edits of one message while a reply streams in.
+
+    ``update`` never waits on Telegram: edits run in the background, at most
+    one in flight and one per ``interval``, so a slow edit or a FloodWait
+    never stalls the stream being consumed. Each update carries the whole
+    answer so far, so updates skipped between edits lose nothing; the caller
+    replaces the preview with the final answer afterwards.
+    """
+
+    def __init__(
+        self,
+        sender: MessageSender,
+        message: Message,
+        interval: float = STREAM_EDIT_INTERVAL_SECONDS,
+        parse_mode: Optional[str] = 'html'
+    ):
+        self._sender = sender
+        self._message = message
+        self._interval = interval
+        self._parse_mode = parse_mode
+        self._shown: Optional[str] = None
+        self._last_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.edits = 0
+
+    @staticmethod
+    def render_preview(text: str) -> str:
+        """Telegram-safe preview of a partial answer, with a typing cursor."""
+        text = text.strip()
+        if len(text) > STREAM_PREVIEW_MAX_CHARS:
+            text = text[:STREAM_PREVIEW_MAX_CHARS].rstrip() + " …"
+        return clean_telegram_html(text) + STREAM_CURSOR
+
+    async def update(self, text: str) -> None:
+        """Show the partial answer ``text`` if no edit is due or in flight."""
+        if not text.strip():
+            return
+        if self._task is not None and not self._task.done():
+            return
+        if time.monotonic() - self._last_edit < self._interval:
+            return
+        self._last_edit = time.monotonic()
+        self._task = asyncio.ensure_future(self._flush(text))
+
+    async def _flush(self, text: str) -> None:
+        preview = self.render_preview(text)
+        if preview == self._shown:
+            return
+        if await self._sender.edit_message_safe(
+            self._message, preview, parse_mode=self._parse_mode, max_retries=1
+        ):
+            self._shown = preview
+            self.edits += 1
+
+    async def close(self) -> None:
+        """Wait for an in-flight edit so it can't land after the final answer."""
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
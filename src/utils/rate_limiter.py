@@ -1,5 +1,7 @@
 """Rate limiting utility for API calls and commands."""
 
+import asyncio
+import time
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from typing import Dict, Optional
@@ -103,6 +105,49 @@ class RateLimiter:
             self._logger.debug(f"Cleaned up {len(users_to_remove)} old rate limit entries")
 
 
+class TokenBucket:
+    """Async token bucket that paces requests to a shared upstream service."""
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize token bucket.
+        
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+        self._rate = rate
+        self._capacity = max(1.0, capacity)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> float:
+        """
+        Wait until a token is available and take it.
+        
+        Waiters are served in arrival order.
+        
+        Returns:
+            Seconds spent waiting
+        """
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            wait = (1 - self._tokens) / self._rate
+            await asyncio.sleep(wait)
+            # The token that accrued while sleeping is the one we take.
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+            return wait
+
+
 # Global rate limiter instance for AI commands
 _ai_rate_limiter: Optional[RateLimiter] = None
 
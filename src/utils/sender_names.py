@@ -0,0 +1,135 @@
+"""Process-wide sender display names for chat transcripts.
+
+Naming every message's sender with ``await msg.get_sender()`` costs one
+Telegram round-trip per message on a cold cache — for a 10,000-message
+/analyze that dominates the command and risks FloodWait. Telethon already
+attaches the users/chats returned WITH a ``get_messages`` page to each message
+(``msg.sender``), so most names are free; the few that aren't are resolved
+together in one bulk ``get_entity`` call. Names land in a bounded LRU shared by
+the Telegram handlers and the panel's ``EntityService``.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from telethon.utils import resolve_id
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MAX_CACHED_NAMES = 5000
+
+Reader = Callable[[Callable[[], Awaitable[Any]]], Awaitable[Any]]
+
+
+def display_name(entity: Any) -> Optional[str]:
+    """Human name for a User / Chat / Channel, or None if it has none."""
+    if entity is None:
+        return None
+    name = " ".join(
+        p for p in [getattr(entity, "first_name", None), getattr(entity, "last_name", None)] if p
+    ).strip()
+    return name or getattr(entity, "title", None) or getattr(entity, "username", None) or None
+
+
+class SenderNameCache:
+    """Bounded LRU of sender id → display name with batch resolution."""
+
+    def __init__(self, max_size: int = MAX_CACHED_NAMES) -> None:
+        self._max_size = max_size
+        self._names: "OrderedDict[int, str]" = OrderedDict()
+
+    def get(self, sender_id: Optional[int]) -> Optional[str]:
+        if sender_id is None:
+            return None
+        name = self._names.get(sender_id)
+        if name is not None:
+            self._names.move_to_end(sender_id)
+        return name
+
+    def put(self, sender_id: Optional[int], name: Optional[str]) -> None:
+        if sender_id is None or not name:
+            return
+        self._names[sender_id] = name
+        self._names.move_to_end(sender_id)
+        while len(self._names) > self._max_size:
+            self._names.popitem(last=False)
+
+    def name_for(self, msg: Any) -> Optional[str]:
+        """Name from the entity Telethon attached to the message (no RPC),
+        falling back to the cache. Learns the name as a side effect."""
+        sender_id = getattr(msg, "sender_id", None)
+        name = display_name(getattr(msg, "sender", None))
+        if name:
+            self.put(sender_id, name)
+            return name
+        return self.get(sender_id)
+
+    async def resolve(
+        self, client: Any, messages: Iterable[Any], read: Optional[Reader] = None
+    ) -> Dict[int, str]:
+        """Names for every sender in ``messages``.
+
+        Senders not attached to the page and not cached are fetched in ONE
+        bulk ``get_entity`` call. ``read`` optionally wraps that call (the panel
+        passes its throttle). Unresolvable senders are simply left out.
+        """
+        names: Dict[int, str] = {}
+        unknown = set()
+        for msg in messages:
+            sender_id = getattr(msg, "sender_id", None)
+            if sender_id is None or sender_id in names:
+                continue
+            name = self.name_for(msg)
+            if name:
+                names[sender_id] = name
+            else:
+                unknown.add(sender_id)
+        if not unknown or client is None:
+            return names
+
+        async def _bulk() -> Any:
+            # Input peers come from the session's entity cache (no RPC); ids it
+            # has never seen can't be fetched by id at all, so skip those.
+            peers = []
+            for sender_id in unknown:
+                try:
+                    peers.append(await client.get_input_entity(sender_id))
+                except (ValueError, TypeError):
+                    continue
+            return await client.get_entity(peers) if peers else []
+
+        try:
+            entities = await (read(_bulk) if read is not None else _bulk())
+        except Exception as exc:  # noqa: BLE001 - names are best-effort
+            logger.debug(f"Bulk sender lookup failed for {len(unknown)} id(s): {exc}")
+            return names
+        for entity in entities or []:
+            name = display_name(entity)
+            eid = getattr(entity, "id", None)
+            if not name or eid is None:
+                continue
+            # get_entity returns bare ids; senders may carry the marked form.
+            for sender_id in unknown:
+                if resolve_id(sender_id)[0] == eid:
+                    self.put(sender_id, name)
+                    names[sender_id] = name
+        return names
+
+
+# Global sender name cache instance
+_sender_names: Optional[SenderNameCache] = None
+
+
+def get_sender_names() -> SenderNameCache:
+    """
+    Get the global SenderNameCache instance.
+
+    Returns:
+        Global SenderNameCache instance
+    """
+    global _sender_names
+    if _sender_names is None:
+        _sender_names = SenderNameCache()
+    return _sender_names
@@ -0,0 +1,187 @@
+"""Persistent per-chunk transcript store for /stt.
+
+Transcribing a voice note means downloading it, decoding it and sending every
+chunk to the speech API. Running ``/stt`` twice on the same note, or opening it
+from both the panel and Telegram, used to repeat all of that. Results are now
+stored per chunk, keyed by::
+
+    sha256("tg-doc", document id, language)      # Telegram voice/audio
+    sha256("sha256", file content hash, language) # anything else
+
+Each chunk is recorded as ``ok`` (with its text), ``service`` (network/API
+failure, worth retrying) or ``silent`` (unintelligible). Only ``ok`` chunks are
+replayed: Google's free endpoint reports throttling as "unintelligible" too,
+so any other chunk runs again on the next request. A repeat request whose
+chunks all succeeded is answered from the store without touching the audio.
+A ``chunk_filter`` retry re-runs only the listed chunks that did not succeed.
+Chunk numbers come from the deterministic split, and the stored chunk count
+guards against a split that changed between runs.
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+STT_CACHE_FILE = Path("cache/stt_transcripts.db")
+STT_CACHE_TTL_SECONDS = 30 * 24 * 3600
+# Bumped whenever chunking changes in a way the chunk count would not reveal.
+STT_CACHE_VERSION = 1
+
+CHUNK_OK = "ok"
+CHUNK_SERVICE = "service"
+CHUNK_SILENT = "silent"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stt_chunks (
+    key        TEXT    NOT NULL,
+    chunk      INTEGER NOT NULL,
+    total      INTEGER NOT NULL,
+    status     TEXT    NOT NULL,
+    text       TEXT,
+    updated_at REAL    NOT NULL,
+    PRIMARY KEY (key, chunk)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stt_chunks_updated_at ON stt_chunks (updated_at);
+"""
+
+
+def _digest(*parts: Any) -> str:
+    payload = "\x1f".join(str(p) for p in (STT_CACHE_VERSION, *parts))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def stt_cache_key(message: Any, language: str) -> Optional[str]:
+    """Key for a Telegram voice/audio message (or its media), or None.
+
+    The document id is stable for the file no matter which chat or message
+    it was forwarded into.
+    """
+    document = getattr(message, "document", None)
+    if document is None:
+        document = getattr(getattr(message, "media", None), "document", None)
+    doc_id = getattr(document, "id", None)
+    if doc_id is None:
+        return None
+    return _digest("tg-doc", doc_id, language)
+
+
+def file_cache_key(path: str, language: str) -> str:
+    """Content-hash key for an audio file that has no Telegram document."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return _digest("sha256", h.hexdigest(), language)
+
+
+class SttCache:
+    """SQLite-backed store of per-chunk STT results."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = STT_CACHE_FILE,
+        ttl_seconds: float = STT_CACHE_TTL_SECONDS,
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            try:
+                path = Path(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(path), check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.executescript(_SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                # Transcription works without the store; it just repeats work.
+                logger.warning(f"STT transcript cache disabled: {e}")
+                self._db = None
+
+    def load(self, key: str) -> Optional[Tuple[int, Dict[int, Tuple[str, Optional[str]]]]]:
+        """Stored ``(total, {chunk: (status, text)})`` for ``key``, or None."""
+        if self._db is None:
+            return None
+        try:
+            rows = self._db.execute(
+                "SELECT chunk, total, status, text FROM stt_chunks "
+                "WHERE key = ? AND updated_at >= ?",
+                (key, time.time() - self._ttl),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"STT transcript cache read failed: {e}")
+            return None
+        totals = {row[1] for row in rows}
+        if len(totals) != 1:
+            # Nothing stored, or rows from two different splits: unusable.
+            self.misses += 1
+            return None
+        self.hits += 1
+        return totals.pop(), {row[0]: (row[2], row[3]) for row in rows}
+
+    def put_chunk(
+        self, key: str, total: int, chunk: int, status: str, text: Optional[str] = None
+    ) -> None:
+        """Record one chunk's outcome, replacing any earlier attempt."""
+        if self._db is None:
+            return
+        now = time.time()
+        try:
+            with self._db:
+                # A different chunk count means the split changed; the old
+                # numbering no longer matches, so start the record over.
+                self._db.execute(
+                    "DELETE FROM stt_chunks WHERE key = ? AND total != ?", (key, total)
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO stt_chunks "
+                    "(key, chunk, total, status, text, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, chunk, total, status, text, now),
+                )
+                self._db.execute(
+                    "DELETE FROM stt_chunks WHERE updated_at < ?", (now - self._ttl,)
+                )
+        except sqlite3.Error as e:
+            logger.debug(f"STT transcript cache write failed: {e}")
+
+    def clear(self) -> None:
+        if self._db is not None:
+            try:
+                with self._db:
+                    self._db.execute("DELETE FROM stt_chunks")
+            except sqlite3.Error as e:
+                logger.debug(f"STT transcript cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+
+# Global STT transcript cache instance
+_stt_cache: Optional[SttCache] = None
+
+
+def get_stt_cache() -> SttCache:
+    """
+    Get the global SttCache instance.
+
+    Returns:
+        Global SttCache instance
+    """
+    global _stt_cache
+    if _stt_cache is None:
+        _stt_cache = SttCache()
+    return _stt_cache
@@ -0,0 +1,131 @@
+"""Incremental transcript windows for /analyze and /tellme.
+
+Analyze/tellme can ask for up to 10,000 messages. Re-walking the whole window
+for every command on the same chat is slow and wastes Telegram reads, so this
+keeps the last assembled window per chat and, on the next request, fetches
+only what is missing: messages newer than the cached high-water mark
+(``min_id``) and, if a bigger window is asked for, the older tail (``max_id``).
+
+The cache knows nothing about Telegram itself — callers pass a ``fetch``
+coroutine (a ``get_messages`` wrapper taking the paging kwargs) and a batch
+``convert`` coroutine that turns a chronological page of messages into
+``{sender, text, timestamp}`` entries (``None`` for non-text messages).
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MAX_WINDOW_MESSAGES = 10000   # same ceiling as /analyze and /tellme
+MAX_CACHED_CHATS = 8          # LRU bound on how many windows stay in memory
+WINDOW_TTL_SECONDS = 30 * 60  # rebuild from scratch past this (edits/deletes)
+
+Fetch = Callable[[Dict[str, Any]], Awaitable[List[Any]]]
+Convert = Callable[[List[Any]], Awaitable[List[Optional[Dict[str, Any]]]]]
+
+
+@dataclass
+class _Window:
+    # Chronological (message id, entry-or-None). Non-text messages are kept as
+    # None so "the last N messages" means the same thing as get_messages(limit=N).
+    rows: List[Tuple[int, Optional[Dict[str, Any]]]] = field(default_factory=list)
+    complete: bool = False   # the oldest row is the start of the chat
+    built: float = field(default_factory=time.monotonic)
+
+
+class TranscriptCache:
+    """Per-chat LRU of assembled message windows with delta refresh."""
+
+    def __init__(
+        self,
+        max_chats: int = MAX_CACHED_CHATS,
+        ttl_seconds: float = WINDOW_TTL_SECONDS,
+    ) -> None:
+        self._max_chats = max_chats
+        self._ttl = ttl_seconds
+        self._windows: "OrderedDict[Any, _Window]" = OrderedDict()
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._logger = get_logger(self.__class__.__name__)
+
+    @staticmethod
+    async def _read(fetch: Fetch, convert: Convert, **kwargs: Any) -> List[Tuple[int, Any]]:
+        messages = [m for m in await fetch(kwargs) if m is not None]
+        messages.reverse()  # get_messages is newest-first
+        entries = await convert(messages)
+        return [(m.id, entry) for m, entry in zip(messages, entries)]
+
+    async def window(
+        self, key: Any, count: int, fetch: Fetch, convert: Convert
+    ) -> List[Dict[str, Any]]:
+        """Chronological text entries from the chat's last ``count`` messages.
+
+        Args:
+            key: Cache key for the chat (callers namespace it, e.g. ("panel", id)).
+            count: How many of the most recent messages to cover (1..10,000).
+            fetch: ``await fetch(kwargs)`` → messages for get_messages(**kwargs).
+            convert: ``await convert(page)`` → one entry (or None) per message.
+        """
+        count = max(1, min(int(count), MAX_WINDOW_MESSAGES))
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            win = self._windows.get(key)
+            if win is not None and (time.monotonic() - win.built) > self._ttl:
+                win = None
+
+            if win is None:
+                rows = await self._read(fetch, convert, limit=count)
+                win = _Window(rows=rows, complete=len(rows) < count)
+                fetched = len(rows)
+            else:
+                high = win.rows[-1][0] if win.rows else 0
+                newer = await self._read(fetch, convert, limit=count, min_id=high)
+                fetched = len(newer)
+                if len(newer) >= count:
+                    # More new messages than the window — the cache can't help.
+                    win = _Window(rows=newer)
+                else:
+                    win.rows.extend(newer)
+
+            short = count - len(win.rows)
+            if short > 0 and not win.complete and win.rows:
+                older = await self._read(fetch, convert, limit=short, max_id=win.rows[0][0])
+                fetched += len(older)
+                win.rows[:0] = older
+                win.complete = len(older) < short
+
+            del win.rows[:-MAX_WINDOW_MESSAGES]
+            self._windows[key] = win
+            self._windows.move_to_end(key)
+            while len(self._windows) > self._max_chats:
+                old_key, _ = self._windows.popitem(last=False)
+                self._locks.pop(old_key, None)
+
+            self._logger.debug(
+                f"Transcript window {key}: {count} requested, {fetched} fetched"
+            )
+            return [entry for _, entry in win.rows[-count:] if entry]
+
+    def invalidate(self, key: Any) -> None:
+        self._windows.pop(key, None)
+
+
+# Global transcript cache instance
+_transcript_cache: Optional[TranscriptCache] = None
+
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Get the global TranscriptCache instance.
+
+    Returns:
+        Global TranscriptCache instance
+    """
+    global _transcript_cache
+    if _transcript_cache is None:
+        _transcript_cache = TranscriptCache()
+    return _transcript_cache
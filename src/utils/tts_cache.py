@@ -0,0 +1,116 @@
+"""Content-addressed cache of synthesized TTS audio.
+
+The same phrase is often spoken twice: a repeated ``/tts``, a panel replay, or a
+greeting the user sends daily. Each repeat used to cost a Gemini TTS call and
+its quota. Synthesized PCM is stored as a WAV file named::
+
+    sha256(model, voice, text)
+
+in ``cache/tts/``. A hit returns the PCM without touching the network.
+Reading a file bumps its mtime, and when the directory grows past its byte
+budget the least-recently-used files are deleted first.
+"""
+
+import hashlib
+import os
+import wave
+from pathlib import Path
+from typing import Dict, Optional
+
+from .disk_cache import trim_directory
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+TTS_CACHE_DIR = Path("cache/tts")
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def tts_cache_key(text: str, voice: str, model: str) -> str:
+    """Stable content hash of one synthesis request."""
+    payload = "\x1f".join([model or "", (voice or "").lower(), text or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TtsAudioCache:
+    """Directory of WAV files with LRU (mtime) eviction under a byte budget."""
+
+    def __init__(
+        self,
+        directory: Path = TTS_CACHE_DIR,
+        max_bytes: int = TTS_CACHE_MAX_BYTES,
+    ) -> None:
+        self._dir = Path(directory)
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}.wav"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """PCM frames stored under ``key``, or None."""
+        path = self._path(key)
+        try:
+            with wave.open(str(path), "rb") as wf:
+                pcm = wf.readframes(wf.getnframes())
+            os.utime(path, None)  # mark as recently used
+        except (OSError, wave.Error, EOFError):
+            self.misses += 1
+            return None
+        if not pcm:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pcm
+
+    def put(
+        self,
+        key: str,
+        pcm: bytes,
+        rate: int = 24000,
+        channels: int = 1,
+        sample_width: int = 2,
+    ) -> None:
+        """Store PCM under ``key`` (atomic replace), then enforce the budget."""
+        if not pcm:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            with wave.open(str(tmp), "wb") as wf:
+                wf.setnchannels(channels)
+                wf.setsampwidth(sample_width)
+                wf.setframerate(rate)
+                wf.writeframes(pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"TTS cache write failed: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """Delete least-recently-used files until under the byte budget."""
+        trim_directory(self._dir, self._max_bytes, counts=lambda name: name.endswith(".wav"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# Global TTS audio cache instance
+_tts_cache: Optional[TtsAudioCache] = None
+
+
+def get_tts_cache() -> TtsAudioCache:
+    """
+    Get the global TtsAudioCache instance.
+
+    Returns:
+        Global TtsAudioCache instance
+    """
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = TtsAudioCache()
+    return _tts_cache
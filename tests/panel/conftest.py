@@ -121,6 +121,16 @@ def build_mock_ai():
     ai.translate_text_with_phonetics = AsyncMock(return_value="TRANSLATION_RESULT")
     ai.analyze_conversation_messages = AsyncMock(return_value=meta("ANALYZE_RESULT"))
     ai.answer_question_from_chat_history = AsyncMock(return_value=meta("TELLME_RESULT"))
+
+    def stream(text):
+        async def gen(**_):
+            for i in range(0, len(text), 4):
+                yield text[i:i + 4]
+            yield meta(text)
+        return MagicMock(side_effect=gen)
+
+    ai.stream_custom_prompt = stream("PROMPT_RESULT")
+    ai.stream_answer_from_chat_history = stream("TELLME_RESULT")
     return ai
 
 
@@ -169,9 +179,14 @@ def build_state(tmp_path, *, client=None, ai=None, real_photos=False):
     tts = MagicMock()
     (tmp_path / "tts.wav").write_bytes(b"RIFFxxxx")
     tts.generate_speech_file = AsyncMock(return_value=str(tmp_path / "tts.wav"))
+    tts.speech_segments = MagicMock(side_effect=lambda text: [text])
+    tts.audio_suffix = MagicMock(return_value=".ogg")
+    tts.save_audio = AsyncMock()
 
     stt = MagicMock()
     stt.transcribe_voice_to_text = AsyncMock(return_value="TRANSCRIBED TEXT")
+    # Audio decode needs FFmpeg + a real file; keep offline tests FFmpeg-free.
+    stt.decode_audio = AsyncMock(return_value=object())
 
     verifier = MagicMock()
     verifier.verify_user_by_identifier = AsyncMock(
@@ -220,9 +235,6 @@ def build_state(tmp_path, *, client=None, ai=None, real_photos=False):
     state.messenger = MessengerService(state)
     from src.panel.onboarding import OnboardingService
     state.onboarding = OnboardingService(state)
-    # Audio decode needs FFmpeg + a real file; transcription is mocked, so stub
-    # the WAV conversion to keep offline tests FFmpeg-free.
-    state.commands._to_wav = lambda src, dst: None
     return state
 
 
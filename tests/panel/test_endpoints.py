@@ -29,6 +29,8 @@ def test_status_shape(client, auth_headers):
     assert body["client"] == "connected"
     assert body["account"]["name"] == "Owner"
     assert body["provider"] == "gemini"
+    assert set(body["media_cache"]) >= {"hits", "misses", "evicted"}
+    assert body["gemini_quota"] is None  # free-tier accounting is off
 
 
 def test_dialogs_classification_and_counts(client, auth_headers):
@@ -82,6 +84,7 @@ def test_media_download_forces_attachment_for_docs(client, panel_state):
     mc = panel_state.media_cache
     mc.media.mkdir(parents=True, exist_ok=True)
     (mc.media / "101_5.html").write_bytes(b"<h1>hi</h1>")
+    mc.record(mc.media / "101_5.html")
     r = client.get(f"/api/entity/101/media/5/file?t={TOKEN}")
     assert r.status_code == 200
     assert r.headers.get("content-disposition", "").startswith("attachment")
@@ -92,6 +95,7 @@ def test_media_download_inline_for_images(client, panel_state):
     mc = panel_state.media_cache
     mc.media.mkdir(parents=True, exist_ok=True)
     (mc.media / "101_6.jpg").write_bytes(b"\xff\xd8\xff\xe0jpeg")
+    mc.record(mc.media / "101_6.jpg")
     r = client.get(f"/api/entity/101/media/6/file?t={TOKEN}")
     assert r.status_code == 200
     assert "attachment" not in r.headers.get("content-disposition", "")
@@ -122,3 +126,68 @@ def test_degraded_mode_when_no_client(tmp_path):
     # live dialog walk is unavailable
     d = c.get("/api/dialogs", headers={"Authorization": f"Bearer {TOKEN}"})
     assert d.status_code == 503
+
+
+def _sse_events(resp):
+    import json
+
+    return [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.startswith("data: ")]
+
+
+def test_prompt_stream_sends_deltas_then_result(client, auth_headers):
+    r = client.post("/api/cmd/prompt/stream", json={"text": "Explain gravity"}, headers=auth_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(r)
+    deltas = [ev["text"] for ev in events if ev["type"] == "delta"]
+    assert len(deltas) > 1 and "".join(deltas) == "PROMPT_RESULT"
+    assert events[-1]["type"] == "done"
+    assert "PROMPT_RESULT" in events[-1]["result"]["html"]
+
+
+def test_stream_validation_errors_are_plain_json(client, auth_headers):
+    r = client.post("/api/cmd/prompt/stream", json={"text": "  "}, headers=auth_headers)
+    assert r.status_code == 400
+    assert r.json()["ok"] is False
+
+
+def _cached_clip(panel_state, name="101_7.ogg", data=bytes(range(256)) * 4):
+    mc = panel_state.media_cache
+    (mc.media / name).write_bytes(data)
+    mc.record(mc.media / name)
+    return data
+
+
+def test_media_revalidates_with_strong_etag(client, panel_state):
+    """Repeat views cost a 304, and Telegram media is cached as immutable."""
+    _cached_clip(panel_state)
+    url = f"/api/entity/101/media/7/file?t={TOKEN}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/")
+    assert "immutable" in first.headers["cache-control"]
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_media_range_returns_partial_content(client, panel_state):
+    data = _cached_clip(panel_state)
+    url = f"/api/entity/101/media/7/file?t={TOKEN}"
+    r = client.get(url, headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert r.content == data[100:200]
+
+    tail = client.get(url, headers={"Range": "bytes=-24"})
+    assert tail.status_code == 206 and tail.content == data[-24:]
+
+    bad = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert bad.status_code == 416
+    assert bad.headers["content-range"] == f"bytes */{len(data)}"
+
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == data
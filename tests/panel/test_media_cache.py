@@ -0,0 +1,98 @@
+"""Indexed media cache: manifest round-trip, LRU/age eviction, counters."""
+
+import asyncio
+import json
+import time
+
+from src.panel.media_cache import MANIFEST_NAME, MediaCache
+
+
+def _write(cache, name, size):
+    path = cache.media / name
+    path.write_bytes(b"x" * size)
+    cache.record(path)
+    return path
+
+
+def test_index_survives_restart_via_manifest(tmp_path):
+    cache = MediaCache(tmp_path)
+    clip = _write(cache, "5_7.webm", 10)
+    _write(cache, "5_7.thumb.jpg", 3)
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+    reopened = MediaCache(tmp_path)
+    assert reopened.find_media(5, 7) == clip
+    assert reopened.stats()["files"] == 2 and reopened.stats()["bytes"] == 13
+
+
+def test_missing_manifest_is_rebuilt_from_one_scan(tmp_path):
+    (tmp_path / "media").mkdir(parents=True)
+    (tmp_path / "media" / "9_1.jpg").write_bytes(b"jpeg")
+    cache = MediaCache(tmp_path)
+    assert cache.find_media(9, 1) == tmp_path / "media" / "9_1.jpg"
+    entries = json.loads((tmp_path / MANIFEST_NAME).read_text())["entries"]
+    assert [e[0] for e in entries] == ["media/9_1.jpg"]
+
+
+def test_least_recently_viewed_files_are_evicted_over_budget(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=250)
+    old = _write(cache, "1_1.jpg", 100)
+    lru = _write(cache, "1_2.jpg", 100)
+    assert cache.find_media(1, 1) == old  # viewing it makes 1_2 the LRU entry
+    _write(cache, "1_3.jpg", 100)
+
+    assert not lru.exists() and cache.find_media(1, 2) is None
+    assert cache.find_media(1, 1) == old
+    stats = cache.stats()
+    assert stats["evicted"] == 1 and stats["bytes"] == 200
+    assert stats["misses"] == 3 and stats["hits"] == 2
+
+
+def test_entries_unused_past_the_age_budget_are_evicted(tmp_path):
+    cache = MediaCache(tmp_path, max_age_seconds=3600)
+    stale = _write(cache, "2_1.ogg", 5)
+    cache._index["media/2_1.ogg"][1] = time.time() - 7200
+    fresh = _write(cache, "2_2.ogg", 5)  # recording runs a maintenance pass
+
+    assert not stale.exists() and cache.find_media(2, 1) is None
+    assert cache.find_media(2, 2) == fresh
+
+
+def test_externally_deleted_file_is_a_miss(tmp_path):
+    cache = MediaCache(tmp_path)
+    _write(cache, "3_1.jpg", 4).unlink()
+    assert cache.find_media(3, 1) is None
+    assert cache.stats()["files"] == 0
+
+
+async def test_periodic_maintenance_persists_hits_and_expires_entries(tmp_path):
+    cache = MediaCache(tmp_path, max_age_seconds=3600)
+    stale = _write(cache, "2_1.jpg", 10)
+    kept = _write(cache, "2_2.jpg", 10)
+    cache._index["media/2_1.jpg"][1] = time.time() - 7200  # unused for two hours
+    cache.touch(kept)  # a hit: no write, so nothing is scheduled
+
+    task = asyncio.create_task(cache.run_maintenance(interval=0.01))
+    await asyncio.sleep(0.1)
+    task.cancel()
+
+    assert not stale.exists() and cache.find_media(2, 1) is None
+    entries = json.loads((tmp_path / MANIFEST_NAME).read_text())["entries"]
+    assert [e[0] for e in entries] == ["media/2_2.jpg"]
+    assert entries[0][2] == cache._index["media/2_2.jpg"][1]
+
+
+def test_panel_lifespan_runs_cache_maintenance(panel_state, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from src.panel.app import create_app
+
+    started = []
+
+    async def run_maintenance():
+        started.append(True)
+
+    monkeypatch.setattr(panel_state.media_cache, "run_maintenance", run_maintenance)
+    with TestClient(create_app(panel_state)):
+        pass
+    assert started == [True]
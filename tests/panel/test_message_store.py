@@ -0,0 +1,108 @@
+"""Persistent history store: local pages, min_id/max_id gap reads, live appends."""
+
+import pytest
+
+from src.panel.message_store import MessageStore, Span
+
+from .conftest import make_message
+
+
+def _chat(ids):
+    """A mock get_messages over a chat holding ``ids`` (newest-first pages)."""
+    ids = sorted(ids, reverse=True)
+
+    async def _get(entity_id, **kw):
+        if "ids" in kw:
+            return [make_message(id=i, text=f"m{i}") for i in kw["ids"] if i in ids]
+        sel = [i for i in ids
+               if i > kw.get("min_id", 0) and (not kw.get("max_id") or i < kw["max_id"])]
+        return [make_message(id=i, text=f"m{i}") for i in sel[: kw.get("limit", 30)]]
+
+    return _get
+
+
+@pytest.fixture
+def store_state(panel_state, tmp_path):
+    panel_state.message_store = MessageStore(tmp_path / "messages.db")
+    yield panel_state
+    panel_state.message_store.close()
+
+
+@pytest.mark.asyncio
+async def test_reopen_reads_only_the_delta(store_state, mock_client):
+    mock_client.get_messages.side_effect = _chat(range(1, 51))
+    first = await store_state.entity.history(201, limit=10)
+    assert [i["id"] for i in first["items"]] == list(range(50, 40, -1))
+
+    mock_client.get_messages.reset_mock()
+    mock_client.get_messages.side_effect = _chat(range(1, 53))  # two new messages
+    again = await store_state.entity.history(201, limit=10)
+    assert [i["id"] for i in again["items"]] == list(range(52, 42, -1))
+    calls = mock_client.get_messages.call_args_list
+    assert len(calls) == 1 and calls[0].kwargs.get("min_id") == 50
+
+
+@pytest.mark.asyncio
+async def test_scroll_back_fetches_only_the_missing_rows(store_state, mock_client):
+    mock_client.get_messages.side_effect = _chat(range(1, 51))
+    await store_state.entity.history(201, limit=10)   # holds 41..50
+    mock_client.get_messages.reset_mock()
+
+    page = await store_state.entity.history(201, limit=10, before_id=45)
+    assert [i["id"] for i in page["items"]] == list(range(44, 34, -1))
+    calls = mock_client.get_messages.call_args_list
+    assert len(calls) == 1
+    assert calls[0].kwargs.get("max_id") == 41 and calls[0].kwargs.get("limit") == 6
+
+    mock_client.get_messages.reset_mock()
+    await store_state.entity.history(201, limit=10, before_id=45)
+    mock_client.get_messages.assert_not_called()  # now fully local
+
+
+@pytest.mark.asyncio
+async def test_live_rows_serve_open_and_poll_without_reads(store_state, mock_client):
+    store = store_state.message_store
+    store.live = True
+    mock_client.get_messages.side_effect = _chat(range(1, 11))
+    await store_state.entity.history(201, limit=10)
+    mock_client.get_messages.reset_mock()
+
+    store.add_new(201, store_state.entity._format_message(
+        make_message(id=11, text="live"), "group", "Friends Group"), None)
+    polled = await store_state.entity.history(201, after_id=10)
+    assert [i["id"] for i in polled["items"]] == [11]
+    opened = await store_state.entity.history(201, limit=5)
+    assert opened["newest_id"] == 11
+    mock_client.get_messages.assert_not_called()
+
+
+def test_forget_ids_drops_the_span(tmp_path):
+    store = MessageStore(tmp_path / "m.db")
+    store.put(5, [({"id": 7, "text": "x"}, None)])
+    store.set_span(5, Span(7, 7, complete=True))
+    store.forget_ids([7])
+    assert store.span(5) is None and store.page(5, limit=10) == []
+    store.close()
+
+
+def test_live_rows_of_unopened_chats_are_not_stored(tmp_path):
+    store = MessageStore(tmp_path / "m.db")
+    store.live = True
+    store.add_new(5, {"id": 7, "text": "x"}, None)
+    assert store.get(5, [7]) == {}
+    store.close()
+
+
+def test_live_growth_is_capped_per_chat(tmp_path):
+    store = MessageStore(tmp_path / "m.db", max_rows=3)
+    store.live = True
+    store.put(5, [({"id": i, "text": f"m{i}"}, None) for i in range(1, 4)])
+    store.set_span(5, Span(1, 3, complete=True))
+    store.mark_verified(5)
+
+    store.add_new(5, {"id": 4, "text": "m4"}, None)
+    store.add_new(5, {"id": 5, "text": "m5"}, None)
+    assert store.span(5) == Span(3, 5, complete=False)
+    assert [item["id"] for item, _ in store.page(5, limit=10)] == [5, 4, 3]
+    assert store.get(5, [1, 2]) == {}
+    store.close()
@@ -83,6 +83,8 @@ ALL_ENDPOINT_CALLS = [
     ("POST", "/api/cmd/translate", {"text": "hello", "target_lang": "fa"}),
     ("POST", "/api/cmd/analyze", {"entity_id": 201, "count": 5, "mode": "general", "language": "english"}),
     ("POST", "/api/cmd/tellme", {"entity_id": 201, "count": 5, "question": "what?"}),
+    ("POST", "/api/cmd/prompt/stream", {"text": "Explain gravity simply"}),
+    ("POST", "/api/cmd/tellme/stream", {"entity_id": 201, "count": 5, "question": "what?"}),
     ("POST", "/api/cmd/image", {"model": "flux", "prompt": "a cat"}),
     ("POST", "/api/cmd/tts", {"text": "hello there"}),
     ("POST", "/api/cmd/stt", {"entity_id": 201, "message_id": 7}),
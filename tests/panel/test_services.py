@@ -1,8 +1,10 @@
 """Service-layer tests (offline) — exercise real services with mock client/AI."""
 
+import asyncio
 from datetime import datetime, timezone
 from pathlib import Path
 from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from telethon.tl.types import (
@@ -11,7 +13,11 @@ from telethon.tl.types import (
     UserStatusRecently,
 )
 
-from .conftest import make_message
+from src.core.constants import DEFAULT_STT_LANGUAGE
+from src.core.exceptions import AIProcessorError
+from src.utils.stt_cache import file_cache_key
+
+from .conftest import TOKEN, make_message
 
 
 @pytest.mark.asyncio
@@ -91,11 +97,89 @@ async def test_tts_returns_audio_url(panel_state):
 
 
 @pytest.mark.asyncio
-async def test_stt_transcribes(panel_state, mock_client):
+async def test_long_tts_streams_before_synthesis_finishes(panel_state):
+    release = asyncio.Event()
+
+    async def stream_speech(text, voice=None):
+        yield b"\x01\x00" * 10
+        await release.wait()
+        yield b"\x02\x00" * 10
+
+    tts = panel_state.tts_processor
+    tts.speech_segments = MagicMock(return_value=["first.", "second."])
+    tts.stream_speech = stream_speech
+    out = await panel_state.commands.run_tts("first. second.")
+    assert out["meta"]["streaming"] is True
+    token = out["media_url"].rsplit("/", 1)[-1]
+    stream = panel_state.result_tokens[token]["stream"]
+    assert stream.chunks == [b"\x01\x00" * 10]  # playable before segment 2 exists
+
+    body = stream.wav_bytes()
+    header = await body.__anext__()
+    assert header.startswith(b"RIFF") and header[8:12] == b"WAVE"
+    assert await body.__anext__() == b"\x01\x00" * 10
+    release.set()
+    assert await body.__anext__() == b"\x02\x00" * 10
+
+    for _ in range(50):
+        if "path" in panel_state.result_tokens[token]:
+            break
+        await asyncio.sleep(0.01)
+    info = panel_state.result_tokens[token]
+    assert info["path"].endswith(".ogg") and info["mime"] == "audio/ogg"
+    tts.save_audio.assert_awaited_once_with(b"\x01\x00" * 10 + b"\x02\x00" * 10, info["path"])
+
+
+@pytest.mark.asyncio
+async def test_long_tts_failing_midway_is_not_published_as_finished(panel_state, client):
+    async def stream_speech(text, voice=None):
+        yield b"\x01\x00" * 10
+        raise AIProcessorError("segment 2 failed")
+
+    tts = panel_state.tts_processor
+    tts.speech_segments = MagicMock(return_value=["first.", "second."])
+    tts.stream_speech = stream_speech
+    out = await panel_state.commands.run_tts("first. second.")
+    token = out["media_url"].rsplit("/", 1)[-1]
+    stream = panel_state.result_tokens[token]["stream"]
+
+    body = stream.wav_bytes()
+    await body.__anext__()  # header
+    assert await body.__anext__() == b"\x01\x00" * 10
+    with pytest.raises(RuntimeError, match="segment 2 failed"):
+        await body.__anext__()  # the live listener sees the failure
+
+    await asyncio.sleep(0.01)
+    tts.save_audio.assert_not_awaited()
+    r = client.get(out["media_url"], headers={"Authorization": f"Bearer {TOKEN}"})
+    assert r.status_code == 502 and "segment 2 failed" in r.json()["error"]
+
+
+@pytest.mark.asyncio
+async def test_stt_transcribes(panel_state, mock_client, tmp_path):
+    voice = tmp_path / "voice.oga"
+    voice.write_bytes(b"OggS" + b"\x00" * 64)
+    mock_client.download_media = AsyncMock(return_value=str(voice))
     out = await panel_state.commands.run_stt(201, 7)
     assert out["kind"] == "text"
     assert out["text"] == "TRANSCRIBED TEXT"
+    assert out["media_url"].startswith("/api/cmd/result-media/")
     mock_client.send_message.assert_not_called()
+    # No document id on the message: the store is keyed on the file content.
+    kwargs = panel_state.stt_processor.transcribe_voice_to_text.call_args.kwargs
+    assert kwargs["cache_key"] == file_cache_key(str(voice), DEFAULT_STT_LANGUAGE)
+
+
+@pytest.mark.asyncio
+async def test_stored_transcript_still_offers_playback(panel_state, mock_client):
+    note = make_message(
+        id=7, voice=SimpleNamespace(), media=SimpleNamespace(), document=SimpleNamespace(id=4242)
+    )
+    mock_client.get_messages = AsyncMock(return_value=note)
+    out = await panel_state.commands.run_stt(201, 7)
+    assert out["text"] == "TRANSCRIBED TEXT"
+    assert out["media_url"] == "/api/entity/201/media/7/file"
+    mock_client.download_media.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -190,9 +274,11 @@ def test_find_media_excludes_thumb(tmp_path):
     from src.panel.media_cache import MediaCache
     c = MediaCache(tmp_path / "c")
     (c.media / "5_7.thumb.jpg").write_bytes(b"x")
+    c.record(c.media / "5_7.thumb.jpg")
     assert c.find_media(5, 7) is None  # only a thumbnail exists
     real = c.media / "5_7.webm"
     real.write_bytes(b"y")
+    c.record(real)
     assert c.find_media(5, 7) == real
 
 
@@ -0,0 +1,156 @@
+"""Tee-streaming media downloads: viewers read while the cache file fills."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from .conftest import TOKEN, make_message
+
+CHUNKS = [b"a" * 1000, b"b" * 1000, b"c" * 500]
+
+
+def _document_message(message_id, size):
+    msg = make_message(id=message_id, document=SimpleNamespace(), media=SimpleNamespace())
+    msg.file = SimpleNamespace(size=size, ext=".mp4")
+    return msg
+
+
+@pytest.fixture
+def video_download(panel_state, mock_client):
+    """A 2500-byte video whose chunks are released one ``gate`` at a time."""
+    gate = asyncio.Semaphore(0)
+    calls = []
+
+    def iter_download(document, **kwargs):
+        calls.append(kwargs)
+
+        async def gen():
+            for chunk in CHUNKS:
+                await gate.acquire()
+                yield chunk
+        return gen()
+
+    msg = _document_message(8, 2500)
+    mock_client.get_messages = AsyncMock(return_value=msg)
+    mock_client.iter_download = MagicMock(side_effect=iter_download)
+    return gate, calls
+
+
+async def _drain(stream):
+    return b"".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_viewers_share_one_download_that_fills_the_cache(panel_state, mock_client, video_download):
+    gate, calls = video_download
+    first = await panel_state.entity.media_file(101, 8)
+    assert first["mime"] == "video/mp4" and first["size"] == 2500
+    reader = asyncio.create_task(_drain(first["stream"].subscribe()))
+
+    gate.release()
+    await asyncio.sleep(0.05)
+    second = await panel_state.entity.media_file(101, 8)  # joins mid-download
+    assert second["stream"] is first["stream"]
+    late = asyncio.create_task(_drain(second["stream"].subscribe()))
+
+    gate.release()
+    gate.release()
+    body = b"".join(CHUNKS)
+    assert await reader == body and await late == body
+    await asyncio.sleep(0.05)
+
+    assert mock_client.get_messages.await_count == 1
+    assert len(calls) == 1 and calls[0]["file_size"] == 2500
+    cached = panel_state.media_cache.find_media(101, 8)
+    assert cached is not None and cached.read_bytes() == body
+    assert (await panel_state.entity.media_file(101, 8))["path"] == str(cached)
+    assert not list(panel_state.media_cache.partial.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_failed_download_ends_viewers_and_caches_nothing(panel_state, mock_client):
+    def iter_download(document, **kwargs):
+        async def gen():
+            yield b"partial"
+            raise ConnectionError("dc went away")
+        return gen()
+
+    msg = _document_message(9, 100)
+    mock_client.get_messages = AsyncMock(return_value=msg)
+    mock_client.iter_download = MagicMock(side_effect=iter_download)
+
+    info = await panel_state.entity.media_file(101, 9)
+    with pytest.raises(RuntimeError, match="dc went away"):
+        await _drain(info["stream"].subscribe())
+    await asyncio.sleep(0.05)
+    assert panel_state.media_cache.find_media(101, 9) is None
+    assert not list(panel_state.media_cache.partial.iterdir())
+
+
+def test_first_view_streams_over_http(client, mock_client):
+    msg = _document_message(10, 2500)
+    mock_client.get_messages = AsyncMock(return_value=msg)
+
+    def iter_download(document, **kwargs):
+        async def gen():
+            for chunk in CHUNKS:
+                yield chunk
+        return gen()
+
+    mock_client.iter_download = MagicMock(side_effect=iter_download)
+    r = client.get(f"/api/entity/101/media/10/file?t={TOKEN}")
+    assert r.status_code == 200
+    assert r.content == b"".join(CHUNKS)
+    assert r.headers["content-length"] == "2500"
+    assert r.headers["cache-control"] == "no-store"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_views_start_one_download(panel_state, mock_client, video_download):
+    gate, calls = video_download
+    msg = mock_client.get_messages.return_value
+
+    async def slow_get_messages(*args, **kwargs):
+        await asyncio.sleep(0.01)  # both viewers arrive while this RPC is out
+        return msg
+
+    mock_client.get_messages = AsyncMock(side_effect=slow_get_messages)
+    first, second = await asyncio.gather(
+        panel_state.entity.media_file(101, 8),
+        panel_state.entity.media_file(101, 8),
+    )
+    assert second["stream"] is first["stream"]
+    readers = [asyncio.create_task(_drain(i["stream"].subscribe())) for i in (first, second)]
+    for _ in CHUNKS:
+        gate.release()
+    body = b"".join(CHUNKS)
+    assert [await r for r in readers] == [body, body]
+    assert mock_client.get_messages.await_count == 1
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_reads_run_off_the_event_loop(tmp_path, monkeypatch):
+    from src.panel.tee_download import TeeDownload
+
+    threads = []
+    read_sync = TeeDownload._read_sync
+
+    def spy(self, offset, limit):
+        threads.append(threading.current_thread())
+        return read_sync(self, offset, limit)
+
+    monkeypatch.setattr(TeeDownload, "_read_sync", spy)
+    tee = TeeDownload(tmp_path / "v.part", tmp_path / "v.mp4", 2500)
+
+    async def chunks():
+        for chunk in CHUNKS:
+            yield chunk
+
+    reader = asyncio.create_task(_drain(tee.subscribe()))
+    await tee.run(chunks)
+    assert await reader == b"".join(CHUNKS)
+    assert threads and threading.main_thread() not in threads
@@ -278,3 +278,87 @@ class TestKeyRotationSequence:
         # Keys should be available again
         assert manager.all_keys_exhausted() is False
         assert manager.get_current_key() is not None
+
+
+class TestLeastLoadedScheduler:
+    """Tests for the weighted least-loaded key scheduler."""
+
+    def _manager(self, keys=("key1", "key2", "key3"), **kwargs):
+        return GeminiKeyManager(list(keys), cooldown_seconds=60, scheduling="least_loaded", **kwargs)
+
+    def test_concurrent_leases_spread_across_keys(self):
+        """Requests in flight at the same time land on different keys."""
+        manager = self._manager()
+        leases = [manager.acquire_key() for _ in range(3)]
+        assert sorted(lease.key for lease in leases) == ["key1", "key2", "key3"]
+
+        manager.release_key(leases[1], success=True)
+        # key2 is idle again while the others are still busy.
+        assert manager.acquire_key().key == "key2"
+
+    def test_slow_key_gets_less_traffic(self):
+        """A key with high recent latency loses ties to faster keys."""
+        manager = self._manager(keys=("slow", "fast"))
+        manager._keys[0].record_latency(8.0)
+        manager._keys[1].record_latency(0.5)
+        picks = []
+        for _ in range(4):
+            lease = manager.acquire_key()
+            picks.append(lease.key)
+        # fast: (n+1)*0.5 stays below slow's 8.0 for several concurrent leases
+        assert picks == ["fast"] * 4
+
+    def test_rpm_budget_skips_spent_key(self):
+        """Keys past their local RPM budget are skipped while others have room."""
+        manager = self._manager(keys=("key1", "key2"), rpm_limit=1)
+        first = manager.acquire_key()
+        manager.release_key(first, success=True)
+        second = manager.acquire_key()
+        assert second.key != first.key
+        manager.release_key(second, success=True)
+
+        # Every budget spent: still served, flagged as over budget.
+        assert manager.acquire_key() is not None
+        assert manager.get_status()["last_decision"]["reason"] == "over_budget"
+
+    def test_release_is_idempotent(self):
+        """Releasing a lease twice does not drive in-flight negative."""
+        manager = self._manager(keys=("key1",))
+        lease = manager.acquire_key()
+        manager.release_key(lease)
+        manager.release_key(lease)
+        assert manager.get_status()["keys"][0]["in_flight"] == 0
+
+    def test_rate_limit_marks_the_leased_key(self):
+        """Failures are recorded on the key that served the request."""
+        manager = self._manager(keys=("key1", "key2"))
+        a = manager.acquire_key()
+        b = manager.acquire_key()
+        manager.mark_key_rate_limited(a.key)
+        status = {k["index"]: k["status"] for k in manager.get_status()["keys"]}
+        assert status[a.index] == "rate_limited"
+        assert status[b.index] == "healthy"
+
+    def test_status_exposes_scheduler_counters(self):
+        """get_status() reports per-key load and the last decision."""
+        manager = self._manager(keys=("key1", "key2"), rpm_limit=10, rpd_limit=100)
+        lease = manager.acquire_key()
+        status = manager.get_status()
+        assert status["scheduling"] == "least_loaded"
+        assert (status["rpm_limit"], status["rpd_limit"]) == (10, 100)
+        assert status["last_decision"]["index"] == lease.index
+        key = status["keys"][lease.index]
+        assert key["in_flight"] == 1
+        assert key["requests_last_minute"] == 1 and key["requests_today"] == 1
+        manager.release_key(lease, success=True)
+        assert manager.get_status()["keys"][lease.index]["latency_ms"] is not None
+
+    def test_sequential_mode_leases_current_key(self):
+        """Sequential scheduling keeps the legacy rotation order."""
+        manager = GeminiKeyManager(["key1", "key2"], cooldown_seconds=60)
+        assert manager.acquire_key().key == "key1"
+        assert manager.acquire_key().key == "key1"
+
+    def test_unknown_scheduling_mode_rejected(self):
+        with pytest.raises(ValueError):
+            GeminiKeyManager(["key1"], scheduling="random")
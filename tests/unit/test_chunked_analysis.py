@@ -0,0 +1,117 @@
+"""Unit tests for map-reduce analysis of long chats."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.chunked_analysis import (
+    analyze_in_windows,
+    estimate_tokens,
+    split_into_windows,
+)
+from src.ai.providers.gemini import GeminiProvider
+from src.ai.response_metadata import AIResponseMetadata
+from src.core.exceptions import AIProcessorError
+
+
+def _lines(n, width=60):
+    return [f"[2025-01-01 10:00:00] User_{i % 5}: " + "x" * width for i in range(n)]
+
+
+def test_windows_are_contiguous_balanced_and_within_budget():
+    lines = _lines(1000)
+    windows = split_into_windows(lines, budget=2000)
+    assert [line for w in windows for line in w] == lines
+    sizes = [sum(estimate_tokens(line) for line in w) for w in windows]
+    assert all(size <= 2000 for size in sizes)
+    assert max(sizes) - min(sizes) <= 2 * max(estimate_tokens(line) for line in lines)
+
+
+def test_small_transcript_is_one_window():
+    assert split_into_windows(_lines(10), budget=10_000) == [_lines(10)]
+    assert split_into_windows([], budget=10) == []
+
+
+@pytest.mark.asyncio
+async def test_windows_run_concurrently_then_merge_in_order():
+    in_flight = peak = 0
+    prompts = []
+    progress = []
+
+    async def execute_prompt(prompt, **kwargs):
+        nonlocal in_flight, peak
+        prompts.append((prompt, kwargs))
+        if kwargs["task_type"] == "analyze":
+            return AIResponseMetadata(response_text="FINAL", input_tokens=10, output_tokens=5)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        part = prompt.split("Chat part ")[1].split("/")[0]
+        return AIResponseMetadata(response_text=f"notes-{part}", input_tokens=100, output_tokens=20)
+
+    async def on_progress(done, total):
+        progress.append((done, total))
+
+    result = await analyze_in_windows(
+        execute_prompt, _lines(1000), "general", "english",
+        max_tokens=32000, temperature=0.5, concurrency=2,
+        progress_cb=on_progress, window_budget=2000,
+    )
+
+    windows = len(prompts) - 1
+    assert windows > 2 and peak == 2
+    assert progress[0] == (0, windows) and progress[-1] == (windows, windows)
+    final_prompt, final_kwargs = prompts[-1]
+    assert final_kwargs["task_type"] == "analyze" and final_kwargs["max_tokens"] == 32000
+    positions = [final_prompt.index(f"notes-{i}") for i in range(1, windows + 1)]
+    assert positions == sorted(positions)
+    assert result.response_text == "FINAL"
+    assert result.input_tokens == 100 * windows + 10
+
+
+@pytest.mark.asyncio
+async def test_failed_window_fails_the_analysis():
+    async def execute_prompt(prompt, **kwargs):
+        if "Chat part 2/" in prompt:
+            raise AIProcessorError("boom")
+        await asyncio.sleep(0)
+        return AIResponseMetadata(response_text="notes")
+
+    with pytest.raises(AIProcessorError):
+        await analyze_in_windows(
+            execute_prompt, _lines(1000), "general", "english",
+            max_tokens=100, temperature=0.5, window_budget=2000,
+        )
+
+
+@pytest.mark.asyncio
+async def test_provider_switches_to_windows_for_long_chats(monkeypatch):
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=["test-key-1", "test-key-2", "test-key-3"],
+        gemini_api_key=None,
+        gemini_model="gemini-default",
+        gemini_model_pro="gemini-pro",
+        gemini_model_flash="gemini-flash",
+        gemini_model_pro_fallback=None,
+    ))
+    calls = []
+
+    async def fake_execute_prompt(prompt, **kwargs):
+        calls.append(kwargs["task_type"])
+        return AIResponseMetadata(response_text="ok")
+
+    monkeypatch.setattr(provider, "execute_prompt", fake_execute_prompt)
+    messages = [
+        {"timestamp": datetime(2025, 1, 1), "sender_name": "A", "text": "y" * 200}
+        for _ in range(2000)
+    ]
+    await provider.analyze_messages(messages, analysis_type="general")
+    assert calls.count("analyze") == 1 and calls.count("analyze_window") > 1
+    assert provider.get_model_for_task("analyze_window") == "gemini-flash"
+
+    calls.clear()
+    await provider.analyze_messages(messages[:20], analysis_type="general")
+    assert calls == ["analyze"]
@@ -0,0 +1,91 @@
+"""Unit tests for the per-key async Gemini client pool."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.providers.gemini import GeminiProvider
+
+
+class _FakeModels:
+    def __init__(self, tracker, key):
+        self._tracker = tracker
+        self._key = key
+
+    async def generate_content(self, model, contents, config=None):
+        t = self._tracker
+        t["in_flight"][self._key] = t["in_flight"].get(self._key, 0) + 1
+        t["total"] += 1
+        t["peak_total"] = max(t["peak_total"], t["total"])
+        t["peak"][self._key] = max(t["peak"].get(self._key, 0), t["in_flight"][self._key])
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            t["in_flight"][self._key] -= 1
+            t["total"] -= 1
+        return SimpleNamespace(text=f"answer from {self._key}", usage_metadata=None)
+
+
+def _provider(monkeypatch, keys, max_concurrency=None):
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=keys,
+        gemini_api_key=None,
+        gemini_model="m-flash",
+        gemini_model_pro="m-pro",
+        gemini_model_flash="m-flash",
+        gemini_model_pro_fallback=None,
+        gemini_quota_tier="off",
+        gemini_key_max_concurrency=max_concurrency,
+    ))
+    tracker = {"in_flight": {}, "peak": {}, "total": 0, "peak_total": 0, "created": []}
+
+    def fake_get_client(api_key=None):
+        client = provider._clients.get(api_key)
+        if client is None:
+            tracker["created"].append(api_key)
+            client = SimpleNamespace(aio=SimpleNamespace(models=_FakeModels(tracker, api_key)))
+            provider._clients[api_key] = client
+        return client
+
+    monkeypatch.setattr(provider, "_get_client", fake_get_client)
+    return provider, tracker
+
+
+async def _run(provider):
+    return await provider._execute_prompt_internal(
+        full_prompt="hi", model="m-flash", max_tokens=100, temperature=0.5,
+        task_type="prompt", use_thinking=False, use_web_search=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_standard_calls_on_different_keys_overlap(monkeypatch):
+    provider, tracker = _provider(monkeypatch, ["test-key-1", "test-key-2"])
+    results = await asyncio.gather(*(_run(provider) for _ in range(4)))
+    assert all(r.response_text.startswith("answer from") for r in results)
+    assert tracker["peak_total"] > 1
+    assert set(tracker["created"]) == {"test-key-1", "test-key-2"}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_per_key(monkeypatch):
+    provider, tracker = _provider(monkeypatch, ["test-key-1"], max_concurrency=2)
+    await asyncio.gather(*(_run(provider) for _ in range(6)))
+    assert tracker["peak"]["test-key-1"] == 2
+    assert tracker["created"] == ["test-key-1"]
+
+
+def test_real_clients_are_cached_per_key(monkeypatch):
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=["test-key-1", "test-key-2"],
+        gemini_api_key=None,
+        gemini_model="m-flash",
+        gemini_model_pro="m-pro",
+        gemini_model_flash="m-flash",
+        gemini_model_pro_fallback=None,
+        gemini_quota_tier="off",
+    ))
+    first = provider._get_client("test-key-1")
+    assert provider._get_client("test-key-1") is first
+    assert provider._get_client("test-key-2") is not first
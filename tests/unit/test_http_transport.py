@@ -0,0 +1,91 @@
+"""Unit tests for the shared pooled HTTP transport."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.http_transport import HttpTransport
+from src.ai.providers import openrouter as openrouter_module
+from src.ai.providers.openrouter import OpenRouterProvider
+
+
+async def _keepalive_server():
+    """Tiny HTTP/1.1 server that keeps connections open; returns (server, url, accepts)."""
+    accepts = []
+
+    async def handle(reader, writer):
+        accepts.append(1)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                body = b"" if head.startswith(b"HEAD") else b"ok"
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/", accepts
+
+
+@pytest.mark.asyncio
+async def test_repeated_requests_reuse_one_connection():
+    server, url, accepts = await _keepalive_server()
+    transport = HttpTransport()
+    try:
+        for _ in range(3):
+            response = await transport.client().get(url)
+            assert response.text == "ok"
+        stats = transport.stats()["hosts"]["127.0.0.1"]
+        assert stats["requests"] == 3
+        assert stats["connections"] == 1 and stats["reused"] == 2
+        assert len(accepts) == 1
+    finally:
+        await transport.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_the_connection_ahead_of_time():
+    server, url, accepts = await _keepalive_server()
+    transport = HttpTransport()
+    try:
+        await transport.warm_up([url + "some/path", url, "not a url"])
+        assert len(accepts) == 1
+        await transport.client().get(url)
+        assert len(accepts) == 1  # first real request rides the warm connection
+        assert transport.stats()["open_connections"] >= 1
+    finally:
+        await transport.aclose()
+        server.close()
+        await server.wait_closed()
+
+
+def test_genai_options_point_at_the_shared_clients():
+    transport = HttpTransport()
+    options = transport.genai_http_options()
+    assert options.httpx_async_client is transport.client()
+    assert options.httpx_client is transport.sync_client()
+
+
+def test_openrouter_key_switch_keeps_the_pool(monkeypatch):
+    transport = HttpTransport()
+    monkeypatch.setattr(openrouter_module, "get_http_transport", lambda: transport)
+    provider = OpenRouterProvider(SimpleNamespace(
+        openrouter_api_keys=["sk-or-v1-test123456", "sk-or-v1-test654321"],
+        openrouter_api_key=None,
+        openrouter_model="default-model",
+        openrouter_model_pro="pro-model",
+        openrouter_model_flash="flash-model",
+    ))
+    first = provider._get_client(api_key="sk-or-v1-test123456")
+    second = provider._get_client(api_key="sk-or-v1-test654321")
+    assert first is not second
+    assert first._client is second._client is transport.client()
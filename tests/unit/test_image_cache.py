@@ -0,0 +1,131 @@
+"""Unit tests for the generated-image cache and streamed image downloads."""
+
+import os
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.ai import image_generator as image_generator_module
+from src.ai.image_generator import ImageGenerator
+from src.utils.disk_cache import trim_directory
+from src.utils.image_cache import ImageCache, image_cache_key
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+
+
+def _store(cache, key, data):
+    tmp = cache.temp_path(key)
+    tmp.write_bytes(data)
+    return cache.commit(key, tmp)
+
+
+def test_key_depends_on_backend_and_prompt():
+    base = image_cache_key("flux", "a red fox")
+    assert base == image_cache_key("FLUX", "a red fox")
+    assert base != image_cache_key("sdxl", "a red fox")
+    assert base != image_cache_key("flux", "a red fox.")
+
+
+def test_commit_then_get_returns_the_cached_file(tmp_path):
+    cache = ImageCache(directory=tmp_path)
+    assert cache.get("k") is None
+    path = _store(cache, "k", PNG)
+    assert cache.get("k") == path
+    assert open(path, "rb").read() == PNG
+    assert not list(tmp_path.glob("*.part"))
+    assert cache.stats() == {"hits": 1, "misses": 1, "evicted": 0}
+
+
+def test_eviction_enforces_age_then_size_budget(tmp_path):
+    cache = ImageCache(directory=tmp_path, max_bytes=3500, max_age_seconds=3600)
+    for key in ("old", "lru", "recent"):
+        _store(cache, key, b"\x00" * 1000)
+    legacy = tmp_path / "image_flux_1234abcd_99.png"
+    legacy.write_bytes(b"\x00" * 10)
+    now = time.time()
+    os.utime(legacy, (now - 7200, now - 7200))
+    os.utime(tmp_path / "old.png", (now - 7200, now - 7200))
+    os.utime(tmp_path / "lru.png", (now - 60, now - 60))
+
+    assert cache.evict() == 2  # the expired files only; 2000 bytes fit
+    assert not legacy.exists()
+    _store(cache, "new", b"\x00" * 2000)  # commit outside a loop evicts inline
+
+    assert cache.get("old") is None
+    assert cache.get("lru") is None
+    assert cache.get("recent") is not None
+    assert cache.get("new") is not None
+
+
+@pytest.fixture
+def generator(monkeypatch, tmp_path):
+    """ImageGenerator against a fake Flux worker; returns (generator, calls)."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["prompt"])
+        if "blocked" in request.url.params["prompt"]:
+            return httpx.Response(200, json={"error": "NSFW prompt"})
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=PNG)
+
+    settings = SimpleNamespace(
+        flux_worker_url="https://flux.example/",
+        image_cache_max_mb=10,
+        image_cache_max_age_hours=1,
+    )
+    monkeypatch.setattr(image_generator_module, "get_settings", lambda: settings)
+    gen = ImageGenerator()
+    gen._cache = ImageCache(directory=tmp_path)
+    gen._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return gen, calls
+
+
+@pytest.mark.asyncio
+async def test_identical_request_is_served_from_cache(generator):
+    gen, calls = generator
+    ok, path, err = await gen.generate_with_flux("a red fox")
+    assert ok and err is None
+    assert open(path, "rb").read() == PNG
+
+    again = await gen.generate_with_flux("a red fox")
+    assert again == (True, path, None)
+    assert calls == ["a red fox"]
+
+
+@pytest.mark.asyncio
+async def test_json_error_body_is_still_reported(generator, tmp_path):
+    gen, _ = generator
+    ok, path, err = await gen.generate_with_flux("blocked prompt")
+    assert not ok and path is None
+    assert "NSFW prompt" in err
+    assert not list(tmp_path.iterdir())
+
+
+def test_shared_trim_keeps_recent_files_and_ignores_uncounted(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["a.wav", "b.wav", "c.wav"]):
+        (tmp_path / name).write_bytes(b"\x00" * 1000)
+        os.utime(tmp_path / name, (now - 300 + i * 100, now - 300 + i * 100))
+    (tmp_path / "d.tmp").write_bytes(b"\x00" * 5000)
+
+    removed = trim_directory(tmp_path, 2500, counts=lambda name: name.endswith(".wav"))
+    assert removed == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.wav", "c.wav", "d.tmp"]
+
+
+@pytest.mark.asyncio
+async def test_image_chunks_are_written_off_the_event_loop(generator, monkeypatch):
+    gen, _ = generator
+    calls = []
+    to_thread = image_generator_module.asyncio.to_thread
+
+    async def spy(func, *args):
+        calls.append(getattr(func, "__name__", ""))
+        return await to_thread(func, *args)
+
+    monkeypatch.setattr(image_generator_module.asyncio, "to_thread", spy)
+    ok, path, _ = await gen.generate_with_flux("a blue fox")
+    assert ok and open(path, "rb").read() == PNG
+    assert "write" in calls
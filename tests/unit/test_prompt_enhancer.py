@@ -0,0 +1,103 @@
+"""Unit tests for speculative, cached prompt enhancement."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.prompt_enhancer import PromptEnhancer
+
+
+class _FakeProcessor:
+    is_configured = True
+    provider_name = "Gemini"
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def execute_custom_prompt(self, user_prompt, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("provider down")
+        return SimpleNamespace(
+            response_text="A highly detailed red fox in the snow",
+            provider_used="Gemini",
+        )
+
+
+@pytest.mark.asyncio
+async def test_enhancement_runs_in_background_and_is_shared():
+    processor = _FakeProcessor()
+    enhancer = PromptEnhancer(processor)
+
+    started = enhancer.start_enhancement("fox")
+    waiter = asyncio.create_task(enhancer.enhance_prompt("fox"))
+    await asyncio.sleep(0)
+    assert processor.calls == 1 and not started.done()
+
+    processor.release.set()
+    expected = ("A highly detailed red fox in the snow", "gemini")
+    assert await started == expected
+    assert await waiter == expected
+    assert processor.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_skips_the_llm():
+    processor = _FakeProcessor()
+    processor.release.set()
+    enhancer = PromptEnhancer(processor)
+
+    first = await enhancer.enhance_prompt("fox")
+    again = enhancer.start_enhancement("fox")
+    assert again.done() and again.result() == first
+    assert processor.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_to_original_prompt_is_not_cached():
+    processor = _FakeProcessor(fail=True)
+    processor.release.set()
+    enhancer = PromptEnhancer(processor)
+
+    assert await enhancer.enhance_prompt("fox") == ("fox", "none")
+    assert await enhancer.enhance_prompt("fox") == ("fox", "none")
+    assert processor.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_enhancement():
+    processor = _FakeProcessor()
+    enhancer = PromptEnhancer(processor)
+
+    impatient = asyncio.create_task(enhancer.enhance_prompt("fox"))
+    await asyncio.sleep(0)
+    impatient.cancel()
+    await asyncio.sleep(0)
+
+    processor.release.set()
+    assert (await enhancer.enhance_prompt("fox"))[1] == "gemini"
+    assert processor.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_placeholder_reply_is_treated_as_failure():
+    processor = _FakeProcessor()
+    processor.release.set()
+
+    async def placeholder_reply(user_prompt, **kwargs):
+        processor.calls += 1
+        return SimpleNamespace(
+            response_text="⚠️ <b>Processing Error</b> I received your request but couldn't",
+            provider_used="Gemini",
+            is_placeholder=True,
+        )
+
+    processor.execute_custom_prompt = placeholder_reply
+    enhancer = PromptEnhancer(processor)
+    assert await enhancer.enhance_prompt("fox") == ("fox", "none")
+    assert await enhancer.enhance_prompt("fox") == ("fox", "none")
+    assert processor.calls == 2  # not remembered
@@ -0,0 +1,151 @@
+"""Unit tests for client-side Gemini quota tracking."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.providers import gemini as gemini_module
+from src.ai.providers.gemini import GeminiProvider
+from src.ai.quota_tracker import ModelQuota, QuotaTracker, quota_for_model
+from src.core.exceptions import AIProcessorError
+
+QUOTAS = {"m-pro": ModelQuota(rpm=2, tpm=1000, rpd=3), "m-flash": ModelQuota(rpm=100, rpd=1000)}
+
+
+def test_limits_match_longest_prefix():
+    assert quota_for_model("gemini-2.5-flash-lite-preview").rpd == 1000
+    assert quota_for_model("models/gemini-2.5-flash").rpd == 250
+    assert quota_for_model("some-other-model") == ModelQuota()
+
+
+def test_rpm_window_and_daily_budget(tmp_path):
+    tracker = QuotaTracker(tmp_path / "q.json", quotas=QUOTAS)
+    assert tracker.wait_time("k1", "m-pro") == 0
+    tracker.reserve("k1", "m-pro")
+    tracker.reserve("k1", "m-pro")
+    wait = tracker.wait_time("k1", "m-pro")
+    assert 59 < wait <= 60
+    assert tracker.wait_time("k2", "m-pro") == 0  # per key
+    assert tracker.wait_time("k1", "m-flash") == 0  # per model
+
+    tracker.reserve("k1", "m-pro")
+    assert tracker.wait_time("k1", "m-pro") is None  # RPD spent
+
+
+def test_tpm_counts_settled_tokens(tmp_path):
+    tracker = QuotaTracker(tmp_path / "q.json", quotas=QUOTAS)
+    reservation = tracker.reserve("k1", "m-pro", tokens=100)
+    assert tracker.wait_time("k1", "m-pro", tokens=800) == 0
+    tracker.settle(reservation, 950)
+    assert tracker.wait_time("k1", "m-pro", tokens=100) > 0
+
+
+def test_counters_survive_restart_without_raw_keys(tmp_path):
+    path = tmp_path / "q.json"
+    tracker = QuotaTracker(path, quotas=QUOTAS)
+    for _ in range(3):
+        tracker.reserve("secret-key-1", "m-pro")
+    tracker.save()
+    assert "secret-key-1" not in path.read_text()
+
+    restarted = QuotaTracker(path, quotas=QUOTAS)
+    assert restarted.wait_time("secret-key-1", "m-pro") is None
+    assert restarted.wait_time("secret-key-2", "m-pro") == 0
+
+
+def _provider(tmp_path, monkeypatch, keys, window_seconds=60.0):
+    tracker = QuotaTracker(tmp_path / "q.json", quotas=QUOTAS, window_seconds=window_seconds)
+    monkeypatch.setattr(gemini_module, "get_quota_tracker", lambda: tracker)
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=keys,
+        gemini_api_key=None,
+        gemini_model="m-flash",
+        gemini_model_pro="m-pro",
+        gemini_model_flash="m-flash",
+        gemini_model_pro_fallback=None,
+        gemini_quota_tier="free",
+    ))
+    return provider, tracker
+
+
+@pytest.mark.asyncio
+async def test_full_key_is_skipped_before_any_request(tmp_path, monkeypatch):
+    provider, tracker = _provider(tmp_path, monkeypatch, ["test-key-1", "test-key-2"])
+    tracker.reserve("test-key-1", "m-pro")
+    tracker.reserve("test-key-1", "m-pro")
+
+    for _ in range(2):
+        lease, key, reservation = await provider._acquire_key("m-pro", "hello")
+        assert key == "test-key-2"
+        provider._release_key(lease, success=True)
+    assert tracker.reroutes == 2
+
+
+@pytest.mark.asyncio
+async def test_full_minute_window_holds_instead_of_429(tmp_path, monkeypatch):
+    provider, tracker = _provider(tmp_path, monkeypatch, ["test-key-1"], window_seconds=0.2)
+    tracker.reserve("test-key-1", "m-pro")
+    tracker.reserve("test-key-1", "m-pro")
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    _, key, _ = await provider._acquire_key("m-pro", "hello")
+    assert key == "test-key-1"
+    assert loop.time() - started >= 0.1
+    assert tracker.held_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_spent_pro_day_falls_back_without_calling_google(tmp_path, monkeypatch):
+    provider, tracker = _provider(tmp_path, monkeypatch, ["test-key-1"])
+    for _ in range(3):
+        tracker.reserve("test-key-1", "m-pro")
+
+    with pytest.raises(AIProcessorError, match="RETRY_WITH_FLASH"):
+        await provider._acquire_key("m-pro", "hello")
+    assert provider.get_model_for_task("prompt") == "m-flash"
+
+    for _ in range(1000):
+        tracker.reserve("test-key-1", "m-flash")
+    with pytest.raises(AIProcessorError, match="exhausted for today"):
+        await provider._acquire_key("m-flash", "hello")
+
+
+@pytest.mark.asyncio
+async def test_holding_does_not_count_phantom_key_requests(tmp_path, monkeypatch):
+    provider, tracker = _provider(tmp_path, monkeypatch, ["test-key-1"], window_seconds=0.2)
+    tracker.reserve("test-key-1", "m-pro")
+    tracker.reserve("test-key-1", "m-pro")
+
+    lease, _, _ = await provider._acquire_key("m-pro", "hello")
+    provider._release_key(lease, success=True)
+    state = provider._key_manager._keys[0]
+    assert state.total_requests == 1 and state.day_requests == 1
+
+
+@pytest.mark.asyncio
+async def test_in_key_retries_reserve_quota(tmp_path, monkeypatch):
+    provider, tracker = _provider(tmp_path, monkeypatch, ["test-key-1"])
+    replies = iter(["", "", "done"])
+
+    async def generate_content(**kwargs):
+        return SimpleNamespace(text=next(replies), candidates=[], usage_metadata=None)
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    monkeypatch.setattr(provider, "_get_client", lambda key=None: client)
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(gemini_module.asyncio, "sleep", no_sleep)
+    result = await provider.execute_prompt("hello", task_type="translate")
+    assert result.response_text == "done"
+    assert tracker.snapshot()["usage"][0]["requests_today"] == 3
+
+
+def test_daily_exhaustion_is_remembered(tmp_path):
+    tracker = QuotaTracker(tmp_path / "q.json", quotas=QUOTAS)
+    tracker.note_day_exhausted("k1", "m-pro")
+    assert tracker.wait_time("k1", "m-pro") is None
+    assert tracker.snapshot()["usage"][0]["requests_today"] == 3
@@ -8,7 +8,7 @@ import asyncio
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
-from src.utils.rate_limiter import RateLimiter, get_ai_rate_limiter
+from src.utils.rate_limiter import RateLimiter, TokenBucket, get_ai_rate_limiter
 
 
 class TestRateLimiter:
@@ -177,3 +177,24 @@ class TestRateLimiterEdgeCases:
 
         # Next should fail
         assert await limiter.check_rate_limit(user_id) is False
+
+
+class TestTokenBucket:
+    """Tests for TokenBucket pacing."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_paced(self):
+        """Capacity is served immediately, later calls wait for refill."""
+        bucket = TokenBucket(rate=20, capacity=2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await bucket.acquire() == 0.0
+        assert await bucket.acquire() == 0.0
+        await bucket.acquire()
+        await bucket.acquire()
+        assert loop.time() - started >= 0.09
+
+    def test_rejects_non_positive_rate(self):
+        """A zero rate would block forever."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
@@ -0,0 +1,150 @@
+"""Unit tests for the event-driven TTS and image request queues."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.ai import image_queue as image_queue_module
+from src.ai.image_queue import ImageQueue, ImageStatus
+from src.ai.tts_queue import TTSQueue, TTSStatus
+
+
+class _GatedProcessor:
+    """generate_speech_file that finishes only when its gate is opened."""
+
+    def __init__(self, tmp_path: Path):
+        self._tmp_path = tmp_path
+        self.gates = {}
+        self.last_error = None
+
+    async def generate_speech_file(self, text, voice=None):
+        gate = self.gates.setdefault(text, asyncio.Event())
+        await gate.wait()
+        path = self._tmp_path / f"{text}.ogg"
+        path.write_bytes(b"OggS")
+        return str(path)
+
+
+@pytest.mark.asyncio
+async def test_tts_watchers_wake_on_position_change_and_completion(tmp_path):
+    queue = TTSQueue()
+    processor = _GatedProcessor(tmp_path)
+    queue._processor = processor
+    first = await queue.add_request("one", chat_id=1, message_id=1)
+    second = await queue.add_request("two", chat_id=1, message_id=2)
+
+    seen = queue.watch_state(second)
+    assert seen == (TTSStatus.PENDING, 2)
+    # The worker picks "one", so "two" moves to the head of the queue.
+    await asyncio.wait_for(queue.wait_for_change(second, seen), timeout=1)
+    assert queue.watch_state(second) == (TTSStatus.PENDING, 1)
+    assert queue.get_request_status(first).status == TTSStatus.PROCESSING
+
+    result = asyncio.ensure_future(queue.wait_for_result(first))
+    await asyncio.sleep(0)
+    assert not result.done()
+    processor.gates.setdefault("one", asyncio.Event()).set()
+    done = await asyncio.wait_for(result, timeout=1)
+    assert done.status == TTSStatus.COMPLETED
+    assert queue.get_completed_audio(first) == str(tmp_path / "one.ogg")
+
+    processor.gates.setdefault("two", asyncio.Event()).set()
+    done = await asyncio.wait_for(queue.wait_for_result(second), timeout=1)
+    assert done.status == TTSStatus.COMPLETED
+    queue._worker.cancel()
+
+
+@pytest.mark.asyncio
+async def test_image_wait_for_turn_reports_positions_then_starts():
+    queue = ImageQueue(limits={"flux": 1})
+    first = queue.add_request("flux", "a", user_id=1)
+    second = queue.add_request("flux", "b", user_id=1)
+    assert queue.try_start_processing(first, "flux")
+
+    positions = []
+
+    async def on_position(position):
+        positions.append(position)
+
+    waiter = asyncio.ensure_future(queue.wait_for_turn(second, "flux", on_position))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    queue.mark_completed(first, "/tmp/a.png")
+    request = await asyncio.wait_for(waiter, timeout=1)
+    assert request.request_id == second
+    assert request.status == ImageStatus.PROCESSING
+    assert positions == []  # it went straight from "next in line" to running
+
+
+@pytest.mark.asyncio
+async def test_image_worker_sleeps_until_work_arrives():
+    queue = ImageQueue()
+    handled = []
+
+    async def process(request):
+        handled.append(request.prompt)
+        queue.mark_completed(request.request_id, f"/tmp/{request.prompt}.png")
+
+    worker = asyncio.ensure_future(queue.start_processing("sdxl", process))
+    await asyncio.sleep(0)
+    assert handled == []
+    queue.add_request("sdxl", "cat", user_id=1)
+    queue.add_request("sdxl", "dog", user_id=1)
+    for _ in range(10):
+        if len(handled) == 2:
+            break
+        await asyncio.sleep(0)
+    assert handled == ["cat", "dog"]
+    worker.cancel()
+
+
+def test_image_positions_are_tracked_per_model_without_scans():
+    queue = ImageQueue(limits={"flux": 2})
+    ids = [queue.add_request("flux", f"p{i}", user_id=1) for i in range(5)]
+    other = queue.add_request("sdxl", "s", user_id=1)
+    assert [queue.get_queue_position(i, "flux") for i in ids] == [1, 2, 3, 4, 5]
+    assert queue.get_queue_position(other, "sdxl") == 1
+
+    assert queue.process_next("flux").request_id == ids[0]
+    assert queue.process_next("flux").request_id == ids[1]
+    assert queue.process_next("flux") is None  # at the concurrency limit
+    assert [queue.get_queue_position(i, "flux") for i in ids[2:]] == [1, 2, 3]
+
+    queue.cleanup_request(ids[3])  # cancelled mid-queue
+    assert queue.get_queue_position(ids[2], "flux") == 1
+    assert queue.get_queue_position(ids[4], "flux") == 2
+    assert queue.get_pending_count("flux") == 2
+    assert queue.get_pending_count() == 3
+
+
+def test_finished_requests_are_evicted(monkeypatch):
+    monkeypatch.setattr(image_queue_module, "FINISHED_HISTORY_SIZE", 3)
+    queue = ImageQueue(limits={"flux": 10})
+    ids = [queue.add_request("flux", f"p{i}", user_id=1) for i in range(5)]
+    for request_id in ids:
+        assert queue.try_start_processing(request_id, "flux")
+        queue.mark_completed(request_id, f"/tmp/{request_id}.png")
+    assert queue.get_request(ids[0]) is None
+    assert queue.get_status(ids[-1]) == "completed"
+    assert queue.get_running_count("flux") == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_backoff_is_shared_by_all_workers():
+    queue = ImageQueue(limits={"flux": 2})
+    first = queue.add_request("flux", "a", user_id=1)
+    second = queue.add_request("flux", "b", user_id=1)
+    assert queue.try_start_processing(first, "flux")
+
+    delay = queue.note_rate_limited("flux")
+    assert delay > 0
+    assert queue.note_rate_limited("flux") == 2 * delay  # consecutive 429s back off longer
+    # A free slot is not enough while the backend is backing off.
+    assert not queue.try_start_processing(second, "flux")
+
+    queue._queues["flux"].backoff_until = 0
+    assert queue.try_start_processing(second, "flux")
+    queue.mark_completed(first, "/tmp/a.png")
+    assert queue.note_rate_limited("flux") == delay  # success reset the streak
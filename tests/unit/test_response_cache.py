@@ -0,0 +1,134 @@
+"""Unit tests for the content-addressed LLM response cache."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.providers import gemini as gemini_module
+from src.ai.providers.gemini import GeminiProvider
+from src.ai.response_cache import ResponseCache, response_cache_key
+from src.ai.response_metadata import AIResponseMetadata
+
+
+def _meta(text="Translation: Hi\nPhonetic: (های)"):
+    return AIResponseMetadata(
+        response_text=text, model_used="flash", provider_used="Google Gemini",
+        latency_seconds=2.5, input_tokens=40, output_tokens=12,
+    )
+
+
+def test_key_normalizes_whitespace_but_not_model_or_temperature():
+    base = response_cache_key("translate", "flash", "  hello\n  world ", 0.2)
+    assert base == response_cache_key("translate", "flash", "hello world", 0.2)
+    assert base != response_cache_key("translate", "pro", "hello world", 0.2)
+    assert base != response_cache_key("translate", "flash", "hello world", 0.7)
+    assert base != response_cache_key("prompt_enhancer", "flash", "hello world", 0.2)
+
+
+def test_hit_is_marked_and_costs_nothing(tmp_path):
+    cache = ResponseCache(tmp_path / "r.db")
+    assert cache.get("k") is None
+    cache.put("k", _meta())
+    hit = cache.get("k")
+    assert hit.cache_hit is True
+    assert hit.response_text == _meta().response_text and hit.model_used == "flash"
+    assert hit.input_tokens is None and hit.output_tokens is None
+    assert hit.latency_seconds < 0.1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_restart_and_expires(tmp_path):
+    ResponseCache(tmp_path / "r.db").put("k", _meta())
+    assert ResponseCache(tmp_path / "r.db").get("k").cache_hit is True
+    assert ResponseCache(tmp_path / "r.db", ttl_seconds=-1).get("k") is None
+
+
+def test_empty_responses_are_not_cached(tmp_path):
+    cache = ResponseCache(tmp_path / "r.db")
+    cache.put("k", _meta(text="  "))
+    assert cache.get("k") is None
+
+
+def test_memory_lru_and_disk_size_bound(tmp_path):
+    cache = ResponseCache(tmp_path / "r.db", memory_entries=2, max_disk_bytes=2000)
+    for i in range(20):
+        cache.put(f"k{i}", _meta(text="x" * 200))
+    assert len(cache._memory) == 2
+    total = cache._db.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    assert total <= 2000
+    assert cache.get("k19") is not None
+    assert ResponseCache(tmp_path / "r.db").get("k0") is None  # evicted, oldest first
+
+
+@pytest.mark.asyncio
+async def test_repeated_translation_makes_one_provider_call(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "r.db")
+    monkeypatch.setattr(gemini_module, "get_response_cache", lambda: cache)
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=["test-key-1"],
+        gemini_api_key=None,
+        gemini_model="gemini-default",
+        gemini_model_pro="gemini-pro",
+        gemini_model_flash="gemini-flash",
+        gemini_model_pro_fallback=None,
+    ))
+    calls = []
+
+    async def fake_execute_prompt_internal(**kwargs):
+        calls.append(kwargs)
+        return _meta()
+
+    monkeypatch.setattr(provider, "_execute_prompt_internal", fake_execute_prompt_internal)
+
+    first = await provider.translate_text("سلام", "en")
+    second = await provider.translate_text("سلام", "en")
+    assert first == second
+    assert len(calls) == 1
+
+    # Free-form prompts never opt in.
+    await provider.execute_prompt("hello", task_type="prompt")
+    await provider.execute_prompt("hello", task_type="prompt")
+    assert len(calls) == 3
+
+
+def test_placeholder_responses_are_not_cached(tmp_path):
+    cache = ResponseCache(tmp_path / "r.db")
+    placeholder = _meta(text="⚠️ <b>Processing Error</b>")
+    placeholder.is_placeholder = True
+    cache.put("k", placeholder)
+    assert cache.get("k") is None
+    assert ResponseCache(tmp_path / "r.db").get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_empty_model_reply_is_not_served_from_cache(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "r.db")
+    monkeypatch.setattr(gemini_module, "get_response_cache", lambda: cache)
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=["test-key-1"],
+        gemini_api_key=None,
+        gemini_model="gemini-default",
+        gemini_model_pro="gemini-pro",
+        gemini_model_flash="gemini-flash",
+        gemini_model_pro_fallback=None,
+        gemini_quota_tier="off",
+    ))
+    calls = []
+
+    async def generate_content(model, contents, config=None):
+        calls.append(model)
+        return SimpleNamespace(text="", candidates=[], usage_metadata=None)
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    monkeypatch.setattr(provider, "_get_client", lambda api_key=None: client)
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(gemini_module.asyncio, "sleep", no_sleep)
+
+    first = await provider.translate_text("سلام", "en")
+    attempts = len(calls)
+    second = await provider.translate_text("سلام", "en")
+    assert "Processing Error" in str(first) and "Processing Error" in str(second)
+    assert len(calls) == 2 * attempts
@@ -0,0 +1,67 @@
+"""Tests for batched sender name resolution."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.utils.sender_names import SenderNameCache, display_name
+
+
+def _msg(sender_id, sender=None):
+    return SimpleNamespace(sender_id=sender_id, sender=sender)
+
+
+def test_display_name_fallbacks():
+    assert display_name(SimpleNamespace(first_name="Ada", last_name="L")) == "Ada L"
+    assert display_name(SimpleNamespace(first_name=None, title="Group")) == "Group"
+    assert display_name(SimpleNamespace(username="ada")) == "ada"
+    assert display_name(None) is None
+
+
+@pytest.mark.asyncio
+async def test_attached_senders_need_no_rpc():
+    client = MagicMock()
+    client.get_entity = AsyncMock()
+    cache = SenderNameCache()
+    page = [_msg(1, SimpleNamespace(first_name="Ada")) for _ in range(50)]
+    names = await cache.resolve(client, page)
+    assert names == {1: "Ada"}
+    client.get_entity.assert_not_called()
+    assert cache.name_for(_msg(1)) == "Ada"  # learned from the page
+
+
+@pytest.mark.asyncio
+async def test_unknown_senders_resolved_in_one_bulk_call():
+    client = MagicMock()
+    client.get_input_entity = AsyncMock(side_effect=lambda i: f"peer{i}")
+    client.get_entity = AsyncMock(return_value=[
+        SimpleNamespace(id=2, first_name="Bob"),
+        SimpleNamespace(id=3, first_name="Cy"),
+    ])
+    reads = []
+
+    async def read(factory):
+        reads.append(factory)
+        return await factory()
+
+    cache = SenderNameCache()
+    page = [_msg(2), _msg(3), _msg(2), _msg(3)]
+    names = await cache.resolve(client, page, read=read)
+    assert names == {2: "Bob", 3: "Cy"}
+    client.get_entity.assert_awaited_once()
+    assert len(reads) == 1
+
+    client.get_entity.reset_mock()
+    assert await cache.resolve(client, page) == {2: "Bob", 3: "Cy"}
+    client.get_entity.assert_not_called()
+
+
+def test_lru_is_bounded():
+    cache = SenderNameCache(max_size=2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    cache.get(1)
+    cache.put(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a" and cache.get(3) == "c"
@@ -0,0 +1,51 @@
+"""Tests for the vectorized STT silence detector."""
+
+import pytest
+from pydub import AudioSegment
+from pydub import silence as pydub_silence
+
+from src.ai import silence
+
+np = pytest.importorskip("numpy")
+
+
+def _speech_like(seconds, rate=16000, channels=1, seed=0):
+    """Noise bursts separated by quiet gaps of varying length."""
+    rng = np.random.default_rng(seed)
+    n = seconds * rate
+    x = np.zeros((n, channels))
+    t = 0
+    while t < n:
+        speak = int(rng.uniform(0.3, 5) * rate)
+        gap = int(rng.uniform(0.05, 1.5) * rate)
+        x[t:t + speak] = rng.normal(0, rng.uniform(500, 6000), size=(len(x[t:t + speak]), channels))
+        x[t + speak:t + speak + gap] = rng.normal(0, 30, size=(len(x[t + speak:t + speak + gap]), channels))
+        t += speak + gap
+    pcm = np.clip(x, -32768, 32767).astype(np.int16).tobytes()
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=rate, channels=channels)
+
+
+@pytest.mark.parametrize(
+    "rate,channels,seek_step",
+    [(16000, 1, 10), (44100, 2, 10), (22050, 1, 1), (8000, 1, 7)],
+)
+def test_matches_pydub_silence_ranges(rate, channels, seek_step):
+    audio = _speech_like(20, rate, channels, seed=rate)
+    thresh = audio.dBFS - 14
+    expected = pydub_silence.detect_silence(audio, 700, thresh, seek_step)
+    assert expected  # the fixture really contains splittable gaps
+    assert silence.detect_silence(audio, 700, thresh, seek_step) == expected
+
+
+def test_split_returns_the_same_segments():
+    audio = _speech_like(30, seed=3)
+    args = dict(min_silence_len=700, silence_thresh=audio.dBFS - 14, keep_silence=250, seek_step=10)
+    expected = [s.raw_data for s in pydub_silence.split_on_silence(audio, **args)]
+    assert [s.raw_data for s in silence.split_on_silence(audio, **args)] == expected
+
+
+def test_edge_cases():
+    quiet = AudioSegment.silent(duration=2000, frame_rate=16000)
+    assert silence.detect_silence(quiet, 700, -40, 10) == [[0, 2000]]
+    assert silence.split_on_silence(quiet, 700, -40, 250, 10) == []
+    assert silence.detect_silence(AudioSegment.silent(duration=300), 700, -40, 10) == []
@@ -0,0 +1,212 @@
+"""Unit tests for streamed LLM responses and progressive Telegram edits."""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.processor import AIProcessor
+from src.ai.providers.gemini import GeminiProvider
+from src.ai.providers.openrouter import OpenRouterProvider
+from src.ai.response_metadata import AIResponseMetadata
+from src.core.exceptions import AIProcessorError
+from src.utils.message_sender import ProgressiveEditor
+
+
+class _StreamingProvider:
+    is_configured = True
+
+    def __init__(self, name, deltas, fail_after=None):
+        self.provider_name = name
+        self._deltas = deltas
+        self._fail_after = fail_after
+        self.calls = []
+
+    async def stream_prompt(self, **kwargs):
+        self.calls.append(kwargs)
+        for i, delta in enumerate(self._deltas):
+            if i == self._fail_after:
+                raise AIProcessorError("stream broke")
+            yield delta
+        if self._fail_after is not None and self._fail_after >= len(self._deltas):
+            raise AIProcessorError("stream broke")
+        yield AIResponseMetadata(response_text="".join(self._deltas), provider_used=self.provider_name)
+
+
+def _processor(primary, fallback):
+    processor = object.__new__(AIProcessor)
+    processor._config = SimpleNamespace(llm_provider="gemini")
+    processor._logger = logging.getLogger("test")
+    processor._primary_provider = primary
+    processor._provider = primary
+    processor._fallback_provider = fallback
+    processor._using_fallback = False
+    return processor
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+@pytest.mark.asyncio
+async def test_fallback_takes_over_before_first_delta():
+    primary = _StreamingProvider("primary", ["never"], fail_after=0)
+    fallback = _StreamingProvider("fallback", ["Hel", "lo"])
+    items = await _collect(_processor(primary, fallback).stream_custom_prompt("hi", use_thinking=True))
+
+    assert items[:2] == ["Hel", "lo"]
+    final = items[-1]
+    assert final.response_text == "Hello"
+    assert final.provider_fallback_applied is True
+    assert final.thinking_requested is True and final.thinking_applied is False
+    assert fallback.calls[0]["use_thinking"] is False
+
+
+@pytest.mark.asyncio
+async def test_failure_after_first_delta_is_not_spliced_with_fallback():
+    primary = _StreamingProvider("primary", ["Par", "tial"], fail_after=1)
+    fallback = _StreamingProvider("fallback", ["other"])
+    seen = []
+    with pytest.raises(AIProcessorError):
+        async for item in _processor(primary, fallback).stream_custom_prompt("hi"):
+            seen.append(item)
+    assert seen == ["Par"]
+    assert fallback.calls == []
+
+
+class _FakeStream:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+def _chunk(content=None, finish=None, usage=None):
+    choices = [] if content is None and finish is None else [
+        SimpleNamespace(delta=SimpleNamespace(content=content, model_extra={}), finish_reason=finish)
+    ]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.mark.asyncio
+async def test_openrouter_streams_deltas_then_usage(monkeypatch):
+    provider = OpenRouterProvider(SimpleNamespace(
+        openrouter_api_keys=["sk-or-v1-test123456"],
+        openrouter_api_key=None,
+        openrouter_model="default-model",
+        openrouter_model_pro="pro-model",
+        openrouter_model_flash="flash-model",
+    ))
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return _FakeStream([
+            _chunk("Hello"), _chunk(", world"), _chunk(finish="stop"),
+            _chunk(usage=SimpleNamespace(prompt_tokens=7, completion_tokens=3)),
+        ])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(provider, "_get_client", lambda: fake_client)
+
+    items = await _collect(provider.stream_prompt("hi", task_type="prompt"))
+    assert items[:2] == ["Hello", ", world"]
+    final = items[-1]
+    assert final.response_text == "Hello, world"
+    assert (final.input_tokens, final.output_tokens) == (7, 3)
+    assert requests[0]["stream"] is True
+    assert requests[0]["stream_options"] == {"include_usage": True}
+
+
+def _gemini_chunk(*parts, usage=None):
+    content = SimpleNamespace(parts=[SimpleNamespace(text=t, thought=thought) for t, thought in parts])
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], usage_metadata=usage)
+
+
+@pytest.mark.asyncio
+async def test_gemini_pro_429_before_first_delta_streams_from_flash(monkeypatch):
+    from google import genai
+
+    provider = GeminiProvider(SimpleNamespace(
+        gemini_api_keys=["test-key-1"],
+        gemini_api_key=None,
+        gemini_model="gemini-default",
+        gemini_model_pro="gemini-pro",
+        gemini_model_flash="gemini-flash",
+        gemini_model_pro_fallback=None,
+    ))
+    models = []
+
+    async def generate_content_stream(model, contents, config):
+        models.append(model)
+        if model == "gemini-pro":
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return _FakeStream([
+            _gemini_chunk(("planning...", True)),
+            _gemini_chunk(("Hi ", None)),
+            _gemini_chunk(("there", None), usage=SimpleNamespace(prompt_token_count=5, candidates_token_count=2)),
+        ])
+
+    fake = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(
+        generate_content_stream=generate_content_stream)))
+    monkeypatch.setattr(genai, "Client", lambda api_key, **kwargs: fake)
+
+    items = await _collect(provider.stream_prompt("hi", task_type="prompt", use_thinking=True))
+    assert models == ["gemini-pro", "gemini-flash"]
+    assert items[:2] == ["Hi ", "there"]
+    final = items[-1]
+    assert final.response_text == "Hi there"
+    assert final.model_fallback_applied is True and final.model_used == "gemini-flash"
+    assert final.thinking_applied is True and "planning" in final.thinking_summary
+    assert final.output_tokens == 2
+
+
+class _RecordingSender:
+    def __init__(self, delay=0.0):
+        self.edits = []
+        self._delay = delay
+
+    async def edit_message_safe(self, message, text, parse_mode=None, max_retries=2):
+        await asyncio.sleep(self._delay)
+        self.edits.append(text)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_progressive_editor_is_rate_limited():
+    sender = _RecordingSender()
+    editor = ProgressiveEditor(sender, message=object(), interval=60)
+    text = ""
+    for word in ["one ", "two ", "three "]:
+        text += word
+        await editor.update(text)
+    await editor.close()
+
+    # First update edits immediately; the rest fall inside the interval.
+    assert sender.edits == [ProgressiveEditor.render_preview("one ")]
+
+
+@pytest.mark.asyncio
+async def test_progressive_editor_never_blocks_on_slow_edits():
+    sender = _RecordingSender(delay=0.05)
+    editor = ProgressiveEditor(sender, message=object(), interval=0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for i in range(20):
+        await editor.update("x" * (i + 1))
+    assert loop.time() - started < 0.05
+    await editor.close()
+    assert len(sender.edits) == 1
+
+
+def test_preview_is_truncated_and_html_safe():
+    preview = ProgressiveEditor.render_preview("<h2>Title</h2> a < b " + "x" * 5000)
+    assert "<h2>" not in preview
+    assert len(preview) < 3600
+    assert preview.endswith("▌")
@@ -0,0 +1,55 @@
+"""Tests for the per-chunk /stt transcript store."""
+
+from types import SimpleNamespace
+
+from src.utils.stt_cache import (
+    CHUNK_OK,
+    CHUNK_SERVICE,
+    SttCache,
+    file_cache_key,
+    stt_cache_key,
+)
+
+
+def _voice(doc_id):
+    return SimpleNamespace(document=SimpleNamespace(id=doc_id, access_hash=99))
+
+
+def test_key_follows_the_document_not_the_message():
+    forwarded = SimpleNamespace(media=SimpleNamespace(document=SimpleNamespace(id=7)))
+    assert stt_cache_key(_voice(7), "fa-IR") == stt_cache_key(forwarded, "fa-IR")
+    assert stt_cache_key(_voice(7), "fa-IR") != stt_cache_key(_voice(8), "fa-IR")
+    assert stt_cache_key(_voice(7), "fa-IR") != stt_cache_key(_voice(7), "en-US")
+    assert stt_cache_key(SimpleNamespace(media=None), "fa-IR") is None
+
+
+def test_file_key_is_a_content_hash(tmp_path):
+    a, b = tmp_path / "a.ogg", tmp_path / "b.ogg"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+    assert file_cache_key(str(a), "fa-IR") == file_cache_key(str(b), "fa-IR")
+    b.write_bytes(b"different")
+    assert file_cache_key(str(a), "fa-IR") != file_cache_key(str(b), "fa-IR")
+
+
+def test_chunks_survive_restart_and_retry_overwrites(tmp_path):
+    SttCache(tmp_path / "s.db").put_chunk("k", 3, 1, CHUNK_OK, "salam")
+    cache = SttCache(tmp_path / "s.db")
+    cache.put_chunk("k", 3, 2, CHUNK_SERVICE)
+    assert cache.load("k") == (3, {1: (CHUNK_OK, "salam"), 2: (CHUNK_SERVICE, None)})
+
+    cache.put_chunk("k", 3, 2, CHUNK_OK, "khoobi")
+    assert cache.load("k")[1][2] == (CHUNK_OK, "khoobi")
+    assert cache.load("missing") is None
+
+
+def test_changed_split_discards_the_old_numbering(tmp_path):
+    cache = SttCache(tmp_path / "s.db")
+    cache.put_chunk("k", 3, 1, CHUNK_OK, "old")
+    cache.put_chunk("k", 4, 2, CHUNK_OK, "new")
+    assert cache.load("k") == (4, {2: (CHUNK_OK, "new")})
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    SttCache(tmp_path / "s.db").put_chunk("k", 1, 1, CHUNK_OK, "salam")
+    assert SttCache(tmp_path / "s.db", ttl_seconds=-1).load("k") is None
@@ -1,11 +1,17 @@
 """Tests for speech-to-text request handling."""
 
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
 import pytest
 from pydub import AudioSegment
 
 from src.ai import stt as stt_module
 from src.ai.stt import SpeechToTextProcessor
 from src.core.exceptions import AIProcessorError
+from src.utils.stt_cache import CHUNK_OK, CHUNK_SILENT, SttCache
 
 
 @pytest.mark.asyncio
@@ -18,7 +24,7 @@ async def test_single_clip_bad_request_is_retried_and_hidden(
 
     attempts = 0
 
-    def fail_with_google_bad_request(self, audio_wav_path, language):
+    def fail_with_google_bad_request(self, segment, language):
         nonlocal attempts
         attempts += 1
         raise AIProcessorError(
@@ -28,7 +34,7 @@ async def test_single_clip_bad_request_is_retried_and_hidden(
     monkeypatch.setattr(stt_module, "_RETRY_BASE_DELAY_S", 0)
     monkeypatch.setattr(
         SpeechToTextProcessor,
-        "_transcribe_file_sync",
+        "_transcribe_segment_sync",
         fail_with_google_bad_request,
     )
 
@@ -48,3 +54,215 @@ def test_bad_request_is_classified_as_service_error() -> None:
     )
 
     assert SpeechToTextProcessor._is_service_error(err) is True
+
+
+def _chunked_processor(tmp_path, monkeypatch, n_chunks, delays, workers=3, cache=None):
+    """Processor over a fake long clip split into ``n_chunks`` segments."""
+    wav_path = tmp_path / "long.wav"
+    AudioSegment.silent(duration=1000).export(wav_path, format="wav")
+    monkeypatch.setattr(stt_module, "_CHUNK_MS", 500)
+    monkeypatch.setattr(
+        SpeechToTextProcessor,
+        "_split_audio",
+        # Chunk N is N*100 ms long so the fake recognizer can tell them apart.
+        lambda self, audio: [AudioSegment.silent(duration=100 * i) for i in range(1, n_chunks + 1)],
+    )
+    state = {"active": 0, "peak": 0, "seen": []}
+    lock = threading.Lock()
+
+    def fake_transcribe(self, segment, language):
+        idx = round(len(segment) / 100)
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["seen"].append(idx)
+        time.sleep(delays.get(idx, 0.01))
+        with lock:
+            state["active"] -= 1
+        return f"text{idx}"
+
+    monkeypatch.setattr(SpeechToTextProcessor, "_transcribe_segment_sync", fake_transcribe)
+    processor = SpeechToTextProcessor(
+        SimpleNamespace(stt_max_parallel_chunks=workers, stt_requests_per_second=1000),
+        cache=cache,
+    )
+    return processor, str(wav_path), state
+
+
+@pytest.mark.asyncio
+async def test_chunks_run_concurrently_but_report_in_order(tmp_path, monkeypatch) -> None:
+    # Chunk 1 is the slowest, so every other chunk finishes before it.
+    processor, wav_path, state = _chunked_processor(
+        tmp_path, monkeypatch, 6, {1: 0.2}, workers=3
+    )
+    reported = []
+    progress = []
+
+    async def on_chunk_text(idx, total, text):
+        reported.append((idx, text))
+
+    async def progress_cb(current, total):
+        progress.append(current)
+
+    text = await processor.transcribe_voice_to_text(
+        wav_path, progress_cb=progress_cb, on_chunk_text=on_chunk_text
+    )
+
+    assert text == " ".join(f"text{i}" for i in range(1, 7))
+    assert reported == [(i, f"text{i}") for i in range(1, 7)]
+    assert progress == list(range(1, 7))
+    assert state["peak"] == 3
+
+
+@pytest.mark.asyncio
+async def test_chunk_filter_keeps_deterministic_indices(tmp_path, monkeypatch) -> None:
+    processor, wav_path, state = _chunked_processor(tmp_path, monkeypatch, 5, {2: 0.1})
+    reported = []
+
+    async def on_chunk_text(idx, total, text):
+        reported.append((idx, total))
+
+    text = await processor.transcribe_voice_to_text(
+        wav_path, on_chunk_text=on_chunk_text, chunk_filter={2, 4}
+    )
+
+    assert text == "text2 text4"
+    assert reported == [(2, 5), (4, 5)]
+    assert sorted(state["seen"]) == [2, 4]
+
+
+def test_segment_reaches_recognizer_in_memory(tmp_path, monkeypatch) -> None:
+    captured = {}
+
+    class FakeRecognizer:
+        def recognize_google(self, audio_data, language):
+            captured["data"] = audio_data
+            return "salam"
+
+    processor = SpeechToTextProcessor()
+    processor._recognizer = FakeRecognizer()
+    monkeypatch.chdir(tmp_path)
+    segment = AudioSegment.silent(duration=250, frame_rate=16000)
+
+    assert processor._transcribe_segment_sync(segment, "fa-IR") == "salam"
+    assert captured["data"].frame_data == segment.raw_data
+    assert captured["data"].sample_rate == 16000
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_decode_reads_raw_pcm_from_a_single_ffmpeg_pass(tmp_path) -> None:
+    pcm = bytes(range(256)) * 64  # 8192 bytes = 4096 samples
+    (tmp_path / "pcm.bin").write_bytes(pcm)
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    # Record the arguments and emit the PCM fixture on stdout.
+    fake_ffmpeg.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" > "{tmp_path}/args.txt"\n'
+        f'cat "{tmp_path}/pcm.bin"\n'
+    )
+    fake_ffmpeg.chmod(0o755)
+    voice = tmp_path / "voice.ogg"
+    voice.write_bytes(b"OggS")
+
+    processor = SpeechToTextProcessor(SimpleNamespace(ffmpeg_path_resolved=str(fake_ffmpeg)))
+    audio = await processor.decode_audio(str(voice))
+
+    assert audio.raw_data == pcm
+    assert (audio.frame_rate, audio.channels, audio.sample_width) == (16000, 1, 2)
+    args = (tmp_path / "args.txt").read_text().split()
+    assert args[args.index("-f") + 1] == "s16le" and args[-1] == "pipe:1"
+    assert list(tmp_path.glob("*.wav")) == []
+
+
+@pytest.mark.asyncio
+async def test_decode_failure_is_reported(tmp_path) -> None:
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    fake_ffmpeg.write_text("#!/bin/sh\necho 'Invalid data' >&2\nexit 1\n")
+    fake_ffmpeg.chmod(0o755)
+    voice = tmp_path / "voice.ogg"
+    voice.write_bytes(b"junk")
+
+    processor = SpeechToTextProcessor(SimpleNamespace(ffmpeg_path_resolved=str(fake_ffmpeg)))
+    with pytest.raises(AIProcessorError, match="Could not decode"):
+        await processor.decode_audio(str(voice))
+
+
+@pytest.mark.asyncio
+async def test_repeat_request_is_served_from_the_store(tmp_path, monkeypatch) -> None:
+    cache = SttCache(tmp_path / "stt.db")
+    processor, wav_path, state = _chunked_processor(
+        tmp_path, monkeypatch, 4, {}, cache=cache
+    )
+    first = await processor.transcribe_voice_to_text(wav_path, cache_key="voice-1")
+    assert len(state["seen"]) == 4
+
+    loads = []
+
+    async def load_audio():
+        loads.append(1)
+        return wav_path
+
+    reported = []
+
+    async def on_chunk_text(idx, total, text):
+        reported.append(idx)
+
+    again = await processor.transcribe_voice_to_text(
+        load_audio, on_chunk_text=on_chunk_text, cache_key="voice-1"
+    )
+    assert again == first
+    assert reported == [1, 2, 3, 4]
+    assert loads == [] and len(state["seen"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_retry_reruns_only_chunks_that_failed(tmp_path, monkeypatch) -> None:
+    cache = SttCache(tmp_path / "stt.db")
+    processor, wav_path, state = _chunked_processor(
+        tmp_path, monkeypatch, 4, {}, cache=cache
+    )
+    monkeypatch.setattr(stt_module, "_RETRY_BASE_DELAY_S", 0)
+    working = SpeechToTextProcessor._transcribe_segment_sync
+
+    def flaky(self, segment, language):
+        if round(len(segment) / 100) == 3:
+            raise AIProcessorError("API request failed: 503")
+        return working(self, segment, language)
+
+    monkeypatch.setattr(SpeechToTextProcessor, "_transcribe_segment_sync", flaky)
+    assert await processor.transcribe_voice_to_text(wav_path, cache_key="v") == "text1 text2 text4"
+
+    monkeypatch.setattr(SpeechToTextProcessor, "_transcribe_segment_sync", working)
+    state["seen"].clear()
+    text = await processor.transcribe_voice_to_text(
+        wav_path, chunk_filter={2, 3}, cache_key="v"
+    )
+    assert text == "text2 text3"
+    assert state["seen"] == [3]  # chunk 2 came from the store
+    assert cache.load("v")[1][3] == (CHUNK_OK, "text3")
+
+
+@pytest.mark.asyncio
+async def test_plain_repeat_reruns_chunks_stored_as_silent(tmp_path, monkeypatch) -> None:
+    cache = SttCache(tmp_path / "stt.db")
+    processor, wav_path, state = _chunked_processor(
+        tmp_path, monkeypatch, 3, {}, cache=cache
+    )
+    monkeypatch.setattr(stt_module, "_RETRY_BASE_DELAY_S", 0)
+    working = SpeechToTextProcessor._transcribe_segment_sync
+
+    def throttled(self, segment, language):
+        # Throttling on Google's free endpoint looks like unintelligible audio.
+        if round(len(segment) / 100) == 2:
+            raise AIProcessorError("Speech was unintelligible")
+        return working(self, segment, language)
+
+    monkeypatch.setattr(SpeechToTextProcessor, "_transcribe_segment_sync", throttled)
+    assert await processor.transcribe_voice_to_text(wav_path, cache_key="v") == "text1 text3"
+    assert cache.load("v")[1][2][0] == CHUNK_SILENT
+
+    monkeypatch.setattr(SpeechToTextProcessor, "_transcribe_segment_sync", working)
+    state["seen"].clear()
+    assert await processor.transcribe_voice_to_text(wav_path, cache_key="v") == "text1 text2 text3"
+    assert state["seen"] == [2]  # chunks 1 and 3 came from the store
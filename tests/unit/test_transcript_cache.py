@@ -0,0 +1,81 @@
+"""Tests for the incremental analyze/tellme transcript cache."""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.transcript_cache import TranscriptCache
+
+
+class FakeChat:
+    """get_messages over a growing chat; records the paging kwargs used."""
+
+    def __init__(self, n):
+        self.ids = list(range(1, n + 1))
+        self.calls = []
+
+    async def fetch(self, kwargs):
+        self.calls.append(kwargs)
+        sel = [
+            i for i in reversed(self.ids)
+            if i > kwargs.get("min_id", 0) and (not kwargs.get("max_id") or i < kwargs["max_id"])
+        ]
+        return [
+            SimpleNamespace(id=i, text="" if i % 10 == 0 else f"m{i}")
+            for i in sel[: kwargs["limit"]]
+        ]
+
+
+async def convert(page):
+    return [
+        {"sender": "A", "text": m.text, "timestamp": datetime(2025, 1, 1)} if m.text else None
+        for m in page
+    ]
+
+
+@pytest.mark.asyncio
+async def test_second_command_reads_only_the_delta():
+    chat = FakeChat(5000)
+    cache = TranscriptCache()
+    first = await cache.window("c", 5000, chat.fetch, convert)
+    assert len(first) == 4500  # every 10th message has no text
+    assert first[0]["text"] == "m1" and first[-1]["text"] == "m4999"
+
+    chat.ids += [5001, 5002]
+    second = await cache.window("c", 5000, chat.fetch, convert)
+    assert chat.calls[-1] == {"limit": 5000, "min_id": 5000}
+    assert len(chat.calls) == 2
+    assert second[-1]["text"] == "m5002" and second[0]["text"] == "m3"
+
+
+@pytest.mark.asyncio
+async def test_larger_window_fetches_only_the_older_tail():
+    chat = FakeChat(300)
+    cache = TranscriptCache()
+    await cache.window("c", 100, chat.fetch, convert)
+    out = await cache.window("c", 250, chat.fetch, convert)
+    assert chat.calls[-1] == {"limit": 150, "max_id": 201}
+    assert out[0]["text"] == "m51" and out[-1]["text"] == "m299"
+
+
+@pytest.mark.asyncio
+async def test_flood_of_new_messages_replaces_the_window():
+    chat = FakeChat(50)
+    cache = TranscriptCache()
+    await cache.window("c", 20, chat.fetch, convert)
+    chat.ids += list(range(51, 91))
+    out = await cache.window("c", 20, chat.fetch, convert)
+    assert out[-1]["text"] == "m89" and out[0]["text"] == "m71"
+    assert len(chat.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_lru_bound_and_ttl():
+    chat = FakeChat(10)
+    cache = TranscriptCache(max_chats=2, ttl_seconds=0)
+    for key in ("a", "b", "c"):
+        await cache.window(key, 5, chat.fetch, convert)
+    assert list(cache._windows) == ["b", "c"]
+    await cache.window("c", 5, chat.fetch, convert)  # expired → full rebuild
+    assert chat.calls[-1] == {"limit": 5}
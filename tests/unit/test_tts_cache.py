@@ -0,0 +1,94 @@
+"""Unit tests for the TTS audio cache and the async Gemini TTS engine."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai.api_key_manager import APIKeyManager, SCHEDULING_LEAST_LOADED
+from src.ai.providers import tts_gemini
+from src.utils.tts_cache import TtsAudioCache, tts_cache_key
+
+
+def test_key_depends_on_text_voice_and_model():
+    base = tts_cache_key("salam", "orus", "tts-model")
+    assert base == tts_cache_key("salam", "Orus", "tts-model")
+    assert base != tts_cache_key("salam!", "orus", "tts-model")
+    assert base != tts_cache_key("salam", "kore", "tts-model")
+    assert base != tts_cache_key("salam", "orus", "other-model")
+
+
+def test_put_then_get_round_trips_pcm(tmp_path):
+    cache = TtsAudioCache(directory=tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", b"\x01\x02" * 100)
+    assert cache.get("k") == b"\x01\x02" * 100
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = TtsAudioCache(directory=tmp_path, max_bytes=2500)
+    cache.put("old", b"\x00" * 1000)
+    cache.put("new", b"\x00" * 1000)
+    os.utime(tmp_path / "old.wav", (1, 1))
+    os.utime(tmp_path / "new.wav", (2, 2))
+    cache.get("old")  # touching it makes "new" the LRU entry
+    cache.put("third", b"\x00" * 1000)
+    assert cache.get("new") is None
+    assert cache.get("old") is not None
+    assert cache.get("third") is not None
+
+
+def _response(pcm):
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=pcm))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    """Two keys; the first answers 429. Returns the list of keys called."""
+    calls = []
+
+    class _Models:
+        def __init__(self, key):
+            self._key = key
+
+        async def generate_content(self, model, contents, config=None):
+            calls.append(self._key)
+            if self._key == "tts-key-aaaaaaaa":
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+            return _response(b"\x05\x06" * 50)
+
+    manager = APIKeyManager(
+        ["tts-key-aaaaaaaa", "tts-key-bbbbbbbb"],
+        provider_name="Gemini TTS",
+        scheduling=SCHEDULING_LEAST_LOADED,
+    )
+    cache = TtsAudioCache(directory=tmp_path)
+    monkeypatch.setattr(tts_gemini, "_key_manager", manager)
+    monkeypatch.setattr(tts_gemini, "get_tts_cache", lambda: cache)
+    monkeypatch.setattr(
+        tts_gemini, "_get_client",
+        lambda key: SimpleNamespace(aio=SimpleNamespace(models=_Models(key))),
+    )
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_key_rotates_without_backoff(engine, monkeypatch):
+    async def no_sleep(_):
+        raise AssertionError("a 429 must not back off")
+
+    monkeypatch.setattr(tts_gemini.asyncio, "sleep", no_sleep)
+    pcm = await tts_gemini.synthesize_pcm("salam", "orus", model="tts-model")
+    assert pcm == b"\x05\x06" * 50
+    assert engine == ["tts-key-aaaaaaaa", "tts-key-bbbbbbbb"]
+
+
+@pytest.mark.asyncio
+async def test_repeated_phrase_is_served_from_cache(engine):
+    first = await tts_gemini.synthesize_pcm("salam", "orus", model="tts-model")
+    calls = len(engine)
+    second = await tts_gemini.synthesize_pcm("salam", "orus", model="tts-model")
+    assert second == first
+    assert len(engine) == calls
@@ -0,0 +1,114 @@
+"""Unit tests for sentence-split, parallel long-text TTS and Opus encoding."""
+
+import asyncio
+import importlib
+import wave
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai import tts as tts_module
+from src.core.exceptions import AIProcessorError
+from src.ai.tts import TextToSpeechProcessor
+
+LONG_TEXT = " ".join(f"Sentence number {i} is here." for i in range(60))
+
+
+@pytest.fixture
+def fake_synth(monkeypatch):
+    """Later segments finish first; records peak concurrency."""
+    tracker = {"active": 0, "peak": 0}
+
+    async def synthesize_pcm(text, voice_name=None, model=None):
+        tracker["active"] += 1
+        tracker["peak"] = max(tracker["peak"], tracker["active"])
+        try:
+            await asyncio.sleep(0.05 / (1 + len(tracker.setdefault("order", []))))
+            tracker["order"].append(text)
+            return text.encode() * 2  # whole 16-bit frames
+        finally:
+            tracker["active"] -= 1
+
+    monkeypatch.setattr(tts_module, "synthesize_pcm", synthesize_pcm)
+    monkeypatch.setattr(tts_module, "GOOGLE_API_KEYS", ["k1", "k2"])
+    return tracker
+
+
+def test_segments_follow_sentence_boundaries():
+    segments = TextToSpeechProcessor().speech_segments(LONG_TEXT)
+    assert len(segments) > 1
+    assert all(s.endswith(".") for s in segments)
+    assert " ".join(segments) == LONG_TEXT
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_segments_in_order_within_the_key_limit(fake_synth):
+    processor = TextToSpeechProcessor()
+    segments = processor.speech_segments(LONG_TEXT)
+    chunks = [c async for c in processor.stream_speech(LONG_TEXT, "orus")]
+    assert chunks == [s.encode() * 2 for s in segments]
+    assert 1 < fake_synth["peak"] <= 2 * tts_module.MAX_PARALLEL_SEGMENTS_PER_KEY
+
+
+@pytest.mark.asyncio
+async def test_long_text_is_written_as_one_wav(fake_synth, tmp_path):
+    processor = TextToSpeechProcessor()
+    out = tmp_path / "long.wav"
+    assert await processor.text_to_speech(LONG_TEXT, "orus", str(out))
+    with wave.open(str(out), "rb") as wf:
+        pcm = wf.readframes(wf.getnframes())
+    assert pcm == b"".join(s.encode() * 2 for s in processor.speech_segments(LONG_TEXT))
+
+
+@pytest.mark.asyncio
+async def test_failed_segment_surfaces_as_error(monkeypatch):
+    async def synthesize_pcm(text, voice_name=None, model=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(tts_module, "synthesize_pcm", synthesize_pcm)
+    processor = TextToSpeechProcessor()
+    assert not await processor.text_to_speech(LONG_TEXT, "orus", "unused.wav")
+    assert "segment 1/" in processor.last_error and "boom" in processor.last_error
+
+
+@pytest.mark.asyncio
+async def test_ogg_output_is_encoded_through_one_ffmpeg_pipe(tmp_path):
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    # Record the arguments; "encode" by prefixing stdin with an OggS marker.
+    fake_ffmpeg.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" > "{tmp_path}/args.txt"\n'
+        'for last; do :; done\n'
+        '{ printf OggS; cat; } > "$last"\n'
+    )
+    fake_ffmpeg.chmod(0o755)
+    processor = TextToSpeechProcessor(SimpleNamespace(ffmpeg_path_resolved=str(fake_ffmpeg)))
+    assert processor.audio_suffix() == ".ogg"
+
+    out = tmp_path / "voice.ogg"
+    await processor.save_audio(b"\x01\x00" * 8, str(out))
+    assert out.read_bytes() == b"OggS" + b"\x01\x00" * 8
+    args = (tmp_path / "args.txt").read_text().split()
+    assert args[args.index("-c:a") + 1] == "libopus"
+    assert args[args.index("-ar") + 1] == "24000" and "pipe:0" in args
+
+
+@pytest.mark.asyncio
+async def test_encode_failure_is_reported(tmp_path):
+    fake_ffmpeg = tmp_path / "ffmpeg"
+    fake_ffmpeg.write_text("#!/bin/sh\necho 'Unknown encoder' >&2\nexit 1\n")
+    fake_ffmpeg.chmod(0o755)
+    processor = TextToSpeechProcessor(SimpleNamespace(ffmpeg_path_resolved=str(fake_ffmpeg)))
+    with pytest.raises(AIProcessorError, match="encode"):
+        await processor.save_audio(b"\x00\x00", str(tmp_path / "voice.ogg"))
+    assert not (tmp_path / "voice.ogg").exists()
+
+
+def test_queue_processor_uses_the_configured_ffmpeg(monkeypatch):
+    # ``src.ai.tts_queue`` is shadowed by the queue instance in ``src.ai``.
+    tts_queue_module = importlib.import_module("src.ai.tts_queue")
+    settings = SimpleNamespace(ffmpeg_path_resolved="/opt/ffmpeg/bin/ffmpeg")
+    monkeypatch.setattr(tts_queue_module, "get_settings", lambda: settings)
+    queue = tts_queue_module.TTSQueue()
+    assert queue.processor._ffmpeg_path == "/opt/ffmpeg/bin/ffmpeg"
+    assert queue.processor is queue.processor
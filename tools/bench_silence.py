@@ -0,0 +1,67 @@
+"""Benchmark STT silence detection: pydub's loop vs. the NumPy detector.
+
+Run from the repo root:
+
+    python tools/bench_silence.py            # 10 and 60 minutes of audio
+    python tools/bench_silence.py 5 30 120   # custom lengths, in minutes
+
+Audio is synthetic (noise bursts separated by quiet gaps, 16 kHz mono, the
+format the STT pipeline decodes to), so no recording is needed. Both
+detectors run with the exact parameters ``SpeechToTextProcessor`` uses, and
+the script checks that they agree before printing timings.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from pydub import AudioSegment
+from pydub import silence as pydub_silence
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.ai import silence  # noqa: E402
+from src.ai.stt import _SILENCE_MIN_MS, _SILENCE_SEEK_STEP_MS  # noqa: E402
+
+RATE = 16_000
+
+
+def synthetic_speech(minutes: float, seed: int = 0) -> AudioSegment:
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * RATE)
+    x = np.zeros(n, dtype=np.float32)
+    t = 0
+    while t < n:
+        speak = int(rng.uniform(0.5, 8) * RATE)
+        gap = int(rng.uniform(0.1, 1.5) * RATE)
+        x[t:t + speak] = rng.normal(0, rng.uniform(800, 6000), size=len(x[t:t + speak]))
+        x[t + speak:t + speak + gap] = rng.normal(0, 30, size=len(x[t + speak:t + speak + gap]))
+        t += speak + gap
+    pcm = np.clip(x, -32768, 32767).astype(np.int16).tobytes()
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=RATE, channels=1)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main(lengths):
+    print(f"{'audio':>8}  {'pydub':>9}  {'numpy':>9}  {'speedup':>8}  ranges")
+    for minutes in lengths:
+        audio = synthetic_speech(minutes)
+        args = (audio, _SILENCE_MIN_MS, audio.dBFS - 14, _SILENCE_SEEK_STEP_MS)
+        slow, t_slow = timed(pydub_silence.detect_silence, *args)
+        fast, t_fast = timed(silence.detect_silence, *args)
+        if slow != fast:
+            raise SystemExit(f"Detectors disagree on {minutes} min of audio")
+        print(
+            f"{minutes:>6g}m  {t_slow:>8.2f}s  {t_fast:>8.3f}s  "
+            f"{t_slow / max(t_fast, 1e-9):>7.0f}x  {len(fast)}"
+        )
+
+
+if __name__ == "__main__":
+    main([float(a) for a in sys.argv[1:]] or [10, 60])